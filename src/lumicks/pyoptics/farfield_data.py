@@ -1,7 +1,21 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from typing import Tuple, Union
 
 import numpy as np
 
+_PLANE_WAVE_ARRAYS = (
+    "cos_phi",
+    "sin_phi",
+    "cos_theta",
+    "sin_theta",
+    "kx",
+    "ky",
+    "kz",
+    "kp",
+    "Einf_theta",
+    "Einf_phi",
+)
+
 
 @dataclass
 class FarfieldData:
@@ -33,8 +47,195 @@ class FarfieldData:
         Ez : np.ndarray
             Array with the electric field in the z direction
         """
-        Ex = self.Einf_theta * self.cos_phi * self.cos_theta - self.Einf_phi * self.sin_phi
-        Ey = self.Einf_theta * self.sin_phi * self.cos_theta + self.Einf_phi * self.cos_phi
-        Ez = self.Einf_theta * self.sin_theta
+        return _transform_to_xyz(self)
+
+    def plane_waves(self) -> "PlaneWaves":
+        """Return the plane waves in the aperture as a `PlaneWaves` list, in the order of
+        `np.nonzero(aperture)`. Every sample of the back focal plane has the same area, which is
+        accounted for by the phase correction factor, and therefore the quadrature weights are
+        one."""
+        rows, cols = np.nonzero(self.aperture)
+        shape = self.aperture.shape
+        return PlaneWaves(
+            **{
+                name: np.ascontiguousarray(np.broadcast_to(getattr(self, name), shape)[rows, cols])
+                for name in _PLANE_WAVE_ARRAYS
+            },
+            weights=np.ones(rows.size),
+            rows=rows,
+            cols=cols,
+            grid_shape=shape,
+        )
+
+    def pruned(self, tolerance: float):
+        """Return a copy of the far field in which the plane waves and polarization channels
+        (along theta and phi) with the smallest contribution are dropped, such that the dropped
+        power is at most `tolerance` times the total power, and a `PruningSummary` with the
+        fraction of the plane waves and channels that is kept.
+
+        The power of a channel is proportional to :math:`|E_{inf}|^2 / \\cos(\\theta)`, as the
+        back focal plane is sampled uniformly in :math:`\\sin(\\theta)`. A dropped channel gets
+        an amplitude of zero, and a plane wave of which both channels are dropped is removed from
+        the aperture, such that the calculations skip it. Channels with an amplitude of exactly
+        zero are always dropped.
+
+        Parameters
+        ----------
+        tolerance : float
+            Fraction of the total power that may be dropped, >= 0
+
+        Returns
+        -------
+        farfield_data : FarfieldData
+            The far field without the dropped plane waves and channels
+        summary : PruningSummary
+            Summary of the plane waves and channels that are kept
+        """
+        if tolerance < 0:
+            raise ValueError("The pruning tolerance needs to be positive or zero")
+        rows, cols = np.nonzero(self.aperture)
+        cos_theta = self.cos_theta[rows, cols]
+        amplitudes = np.abs(
+            np.concatenate(
+                (
+                    np.broadcast_to(self.Einf_theta, self.aperture.shape)[rows, cols],
+                    np.broadcast_to(self.Einf_phi, self.aperture.shape)[rows, cols],
+                )
+            )
+        )
+        power = amplitudes**2 / np.tile(cos_theta, 2)
+        order = np.argsort(power, kind="stable")
+        dropped = np.zeros(power.size, dtype=bool)
+        dropped[
+            order[: np.searchsorted(np.cumsum(power[order]), tolerance * np.sum(power), "right")]
+        ] = True
+        # Channels without any power are dropped even if the tolerance is zero
+        dropped |= power == 0
+        keep_theta, keep_phi = np.split(~dropped, 2)
+
+        Einf_theta, Einf_phi = [
+            np.array(np.broadcast_to(E, self.aperture.shape), dtype="complex128")
+            for E in (self.Einf_theta, self.Einf_phi)
+        ]
+        Einf_theta[rows[~keep_theta], cols[~keep_theta]] = 0
+        Einf_phi[rows[~keep_phi], cols[~keep_phi]] = 0
+        aperture = self.aperture.copy()
+        aperture[rows, cols] = keep_theta | keep_phi
+
+        # The response of the bead to every plane wave is the same, up to a rotation. Therefore,
+        # the sum of the magnitudes of the dropped plane waves bounds the error of the fields
+        # relative to the sum of the magnitudes of all plane waves, which bounds the fields.
+        magnitudes = amplitudes / np.tile(self.kz[rows, cols], 2)
+        total_power = np.sum(power)
+        summary = PruningSummary(
+            kept_plane_waves=int(np.count_nonzero(keep_theta | keep_phi)),
+            total_plane_waves=int(rows.size),
+            kept_channels=int(np.count_nonzero(~dropped)),
+            total_channels=int(dropped.size),
+            dropped_power=float(np.sum(power[dropped]) / total_power) if total_power > 0 else 0.0,
+            error_bound=(
+                float(np.sum(magnitudes[dropped]) / np.sum(magnitudes)) if total_power > 0 else 0.0
+            ),
+        )
+        return (
+            replace(self, Einf_theta=Einf_theta, Einf_phi=Einf_phi, aperture=aperture),
+            summary,
+        )
+
+
+@dataclass(frozen=True)
+class PruningSummary:
+    """Summary of the plane waves and polarization channels that are kept by
+    `FarfieldData.pruned()`.
+
+    Attributes
+    ----------
+    kept_plane_waves : int
+        Number of plane waves of which at least one polarization channel is kept
+    total_plane_waves : int
+        Number of plane waves in the aperture before pruning
+    kept_channels : int
+        Number of polarization channels (along theta and phi) that are kept
+    total_channels : int
+        Number of polarization channels before pruning, twice the number of plane waves
+    dropped_power : float
+        Power of the dropped channels, relative to the total power
+    error_bound : float
+        Upper bound of the error of the fields at any location, relative to the fields of all
+        plane waves when they add up in phase, which is an upper bound of the fields
+    """
+
+    kept_plane_waves: int
+    total_plane_waves: int
+    kept_channels: int
+    total_channels: int
+    dropped_power: float
+    error_bound: float
+
+    @property
+    def kept_fraction(self) -> float:
+        """Fraction of the polarization channels that is kept"""
+        return self.kept_channels / self.total_channels if self.total_channels else 1.0
+
+
+@dataclass(frozen=True)
+class PlaneWaves:
+    """Compact list of the plane waves in the aperture of an objective. The attributes with the
+    same names as those of `FarfieldData` are one-dimensional, contiguous arrays with a value per
+    plane wave, such that the calculations do not have to skip the samples of the back focal plane
+    outside of the aperture. The plane wave with index i is the sample (rows[i], cols[i]) of a
+    square grid with the shape `grid_shape`, see `to_grid()`.
+
+    The fields are the sum of the plane waves with amplitudes `Einf_theta` and `Einf_phi`,
+    multiplied by the quadrature weights `weights`. The weights are relative to the area of a
+    sample of the back focal plane, which is part of the phase correction factor of the
+    calculations.
+    """
+
+    cos_phi: np.ndarray
+    sin_phi: np.ndarray
+    cos_theta: np.ndarray
+    sin_theta: np.ndarray
+    kx: np.ndarray
+    ky: np.ndarray
+    kz: np.ndarray
+    kp: np.ndarray
+    Einf_theta: np.ndarray
+    Einf_phi: np.ndarray
+    weights: np.ndarray
+    rows: np.ndarray
+    cols: np.ndarray
+    grid_shape: Tuple[int, int]
+
+    @property
+    def size(self) -> int:
+        """Number of plane waves"""
+        return self.kz.size
+
+    def transform_to_xyz(self):
+        """Transform the amplitudes $E_\\theta$, $E_\\phi$ of the plane waves to cartesian
+        components in x, y and z, see `FarfieldData.transform_to_xyz()`. The quadrature weights
+        are not applied."""
+        return _transform_to_xyz(self)
+
+    def weighted_amplitudes(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the amplitudes `Einf_theta` and `Einf_phi` multiplied by the quadrature
+        weights"""
+        return self.Einf_theta * self.weights, self.Einf_phi * self.weights
+
+    def to_grid(self, values: np.ndarray, fill_value=0) -> np.ndarray:
+        """Return `values`, with one value per plane wave along the last axis, on the square grid
+        of samples of the back focal plane. Samples without a plane wave are set to
+        `fill_value`."""
+        values = np.asarray(values)
+        grid = np.full((*values.shape[:-1], *self.grid_shape), fill_value, dtype=values.dtype)
+        grid[..., self.rows, self.cols] = values
+        return grid
+
+
+def _transform_to_xyz(data: Union[FarfieldData, PlaneWaves]):
+    Ex = data.Einf_theta * data.cos_phi * data.cos_theta - data.Einf_phi * data.sin_phi
+    Ey = data.Einf_theta * data.sin_phi * data.cos_theta + data.Einf_phi * data.cos_phi
+    Ez = data.Einf_theta * data.sin_theta
 
-        return Ex, Ey, Ez
+    return Ex, Ey, Ez
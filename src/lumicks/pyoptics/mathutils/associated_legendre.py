@@ -110,3 +110,60 @@ def associated_legendre_over_sin_theta(n, cos_theta):
         bk2 = bk1
         bk1 = bk
     return -3.0 * (cos_theta * bk1 - bk2 / 2)
+
+
+def normalized_legendre_pi_tau(n_max: int, cos_theta: np.ndarray, sin_theta: np.ndarray):
+    """Evaluate the angular functions :math:`\\pi_n^m(\\theta) = m \\bar{P}_n^m(\\cos(\\theta)) /
+    \\sin(\\theta)` and :math:`\\tau_n^m(\\theta) = d\\bar{P}_n^m(\\cos(\\theta))/d\\theta` for all
+    degrees 1 <= n <= `n_max` and orders 0 <= m <= n. The functions :math:`\\bar{P}_n^m` are the
+    associated Legendre functions that are normalized such that :math:`Y_n^m(\\theta, \\phi) =
+    \\bar{P}_n^m(\\cos(\\theta)) e^{i m \\phi}` are orthonormal spherical harmonics, including the
+    Condon-Shortley phase.
+
+    Parameters
+    ----------
+    n_max : int
+        Maximum degree
+    cos_theta : np.ndarray
+        Cosine of the angles to calculate at.
+    sin_theta : np.ndarray
+        Sine of the angles to calculate at, which is non-negative.
+
+    Returns
+    -------
+    pi_nm : np.ndarray
+        Array with shape (n_max, n_max + 1, cos_theta.size), where `pi_nm[n - 1, m]` contains the
+        values of :math:`\\pi_n^m`. Entries with m > n are zero.
+    tau_nm : np.ndarray
+        Array with the same shape as `pi_nm`, with the values of :math:`\\tau_n^m`.
+
+    Notes
+    -----
+    The functions :math:`\\bar{P}_n^m / \\sin(\\theta)`, for m >= 1, follow from the standard
+    three-term recurrence relation in n, which is linear and therefore applies equally to the
+    functions divided by :math:`\\sin(\\theta)`. This avoids the division by zero at the poles.
+    """
+    cos_theta = np.ravel(cos_theta)
+    sin_theta = np.ravel(sin_theta)
+    pi_nm = np.zeros((n_max, n_max + 1, cos_theta.size))
+    tau_nm = np.zeros_like(pi_nm)
+
+    # P_over_sin[n] holds P_n^m / sin(theta) for the current order m, and diagonal holds P_m^m
+    diagonal = np.full(cos_theta.shape, 1 / np.sqrt(4 * np.pi))
+    for m in range(1, n_max + 1):
+        P_over_sin = np.zeros((n_max + 1, cos_theta.size))
+        P_over_sin[m] = -np.sqrt((2 * m + 1) / (2 * m)) * diagonal
+        diagonal = P_over_sin[m] * sin_theta
+        for n in range(m + 1, n_max + 1):
+            a = np.sqrt((4 * n**2 - 1) / (n**2 - m**2))
+            b = np.sqrt(((n - 1) ** 2 - m**2) / (4 * (n - 1) ** 2 - 1))
+            P_over_sin[n] = a * (cos_theta * P_over_sin[n - 1] - b * P_over_sin[n - 2])
+        for n in range(m, n_max + 1):
+            pi_nm[n - 1, m] = m * P_over_sin[n]
+            # sin(theta) dP_n^m/dtheta = n cos(theta) P_n^m - c_nm P_{n-1}^m
+            c = np.sqrt((2 * n + 1) * (n**2 - m**2) / (2 * n - 1))
+            tau_nm[n - 1, m] = n * cos_theta * P_over_sin[n] - c * P_over_sin[n - 1]
+            if m == 1:
+                # dP_n^0/dtheta = sqrt(n (n + 1)) P_n^1
+                tau_nm[n - 1, 0] = np.sqrt(n * (n + 1)) * P_over_sin[n] * sin_theta
+    return pi_nm, tau_nm
@@ -1 +1 @@
-from .fast import fast_gauss, fast_psf
+from .fast import fast_gauss, fast_psf, fast_psf_z_slices
@@ -1,5 +1,7 @@
 import numpy as np
 
+from ..sampling import resolve_bfp_sampling_n
+
 """
 Functions to calculate a point spread function of a focused wavefront by direct summation of plane
 waves.
@@ -63,10 +65,10 @@ def focused_gauss(
     z : np.array
       array of z locations for evaluation. The final locations are determined by the
       output of numpy.meshgrid(x, y, z) [m]
-    bfp_sampling_n : int
+    bfp_sampling_n : Union[int, str]
       Number of discrete steps with which the back focal plane is sampled, from
       the center to the edge. The total number of plane waves scales with the square of
-      bfp_sampling_n. Default is 50 [-]
+      bfp_sampling_n. Can be "auto", see `direct_psf()`. Default is 50 [-]
     return_grid : bool
       return the sampling grid. Default is False
 
@@ -165,10 +167,11 @@ def direct_psf(
     z: np.array:
         array of z locations for evaluation. The final locations are determined by the output of
         `numpy.meshgrid(x, y, z)` [m]
-    bfp_sampling_n: int
+    bfp_sampling_n: Union[int, str]
         number of discrete steps with which the back focal plane is sampled, from the center to the
         edge. The total number of plane waves scales with the square of `bfp_sampling_n` (default =
-        50) [-]
+        50). If "auto", the smallest number of samples for which the fields are not aliased at the
+        requested locations is used, see `sampling.minimum_bfp_sampling_n()` [-]
     return_grid: bool
         return the sampling grid (default = `False`)
 
@@ -195,11 +198,14 @@ def direct_psf(
     k = 2 * np.pi * n_medium / lambda_vac
     ks = k * NA / n_medium
 
-    # Calculate the minimum sampling of the Back Focal plane according to [2]
-    # We take 50x50 plane waves in one quadrant as a minimum, but > 50 is
-    # recommended [2]
-    # M = int(np.max((bfp_sampling_n, 2 * NA**2 * np.max(np.abs(z)) /
-    #            (np.sqrt(n_medium**2 - NA**2) * lambda_vac))))
+    bfp_sampling_n = resolve_bfp_sampling_n(
+        bfp_sampling_n,
+        lambda_vac,
+        n_medium,
+        NA,
+        max(np.max(np.abs(X)), np.max(np.abs(Y))),
+        np.max(np.abs(Z)),
+    )
     npupilsamples = 2 * bfp_sampling_n - 1
 
     dk = ks / (bfp_sampling_n - 1)
@@ -277,13 +283,17 @@ def direct_psf(
 
     # Now the meat: add plane waves from the angles corresponding to the
     # sampling of the back focal plane. This numerically approximates equation
-    # 3.33 of [2]
-    rows, cols = np.nonzero(aperture)
-    for row, col in zip(rows, cols):
-        Exp = np.exp(1j * kx[row, col] * X + 1j * ky[row, col] * Y + 1j * kz[row, col] * Z)
-        Ex += Einfx[row, col] * Exp
-        Ey += Einfy[row, col] * Exp
-        Ez += Einfz[row, col] * Exp
+    # 3.33 of [2]. Only the plane waves in the aperture contribute, which are gathered in
+    # contiguous lists first
+    kx, ky, kz, Einfx, Einfy, Einfz = [
+        np.broadcast_to(value, aperture.shape)[aperture]
+        for value in (kx, ky, kz, Einfx, Einfy, Einfz)
+    ]
+    for idx in range(kz.size):
+        Exp = np.exp(1j * kx[idx] * X + 1j * ky[idx] * Y + 1j * kz[idx] * Z)
+        Ex += Einfx[idx] * Exp
+        Ey += Einfy[idx] * Exp
+        Ez += Einfz[idx] * Exp
 
     for E in [Ex, Ey, Ez]:
         E *= -1j * focal_length * np.exp(-1j * k * focal_length) * dk**2 / (2 * np.pi)
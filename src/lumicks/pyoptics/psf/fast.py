@@ -1,8 +1,9 @@
-from typing import Tuple, Union
+from typing import Iterator, Tuple, Union
 
 import numpy as np
 
 from ..mathutils import czt
+from ..sampling import resolve_bfp_sampling_n
 
 """
 Functions to calculate point spread functions of focused wavefronts by use of chirped z-transforms.
@@ -61,10 +62,10 @@ def fast_gauss(
     z : Union[np.array, float]
         Numpy array of locations along z, in meters, where to calculate the fields. Can be a single
         number as well.
-    bfp_sampling_n :  int, optional
+    bfp_sampling_n :  Union[int, str], optional
         number of discrete steps with which the back focal plane is sampled, from the center to the
-        edge. The total number of plane waves scales with the square of bfp_sampling_n. Default
-        value = 125.
+        edge. The total number of plane waves scales with the square of bfp_sampling_n. Can be
+        "auto", see `fast_psf()`. Default value = 125.
     return_grid : bool, optional
         return the sampling grid (default value = False).
 
@@ -176,10 +177,12 @@ def fast_psf(
     z : Union[np.array, float]
         Numpy array of locations along z, where to calculate the fields. Can be a single number as
         well [m]
-    bfp_sampling_n : int, optional
+    bfp_sampling_n : Union[int, str], optional
         Number of discrete steps with which the back focal plane is sampled, from the center to the
         edge. The total number of plane waves scales with the square of bfp_sampling_n (default =
-        125)
+        125). If "auto", the smallest number of samples for which the fields are not aliased at
+        the requested locations is used, see `sampling.minimum_bfp_sampling_n()`. A warning is
+        logged if the number of samples is lower than that.
     return_grid : bool, optional
         Return the sampling grid (default = False)
 
@@ -204,6 +207,150 @@ def fast_psf(
         field calculations," Opt. Express 14, 11277-11291 (2006)
     """
 
+    bfp_sampling_n = _resolve_bfp_sampling_n(
+        bfp_sampling_n, lambda_vac, n_medium, NA, x_range, y_range, z
+    )
+    calculate_fields, (x_center, x_range, y_center, y_range) = _fast_psf_factory(
+        f_input_field,
+        lambda_vac,
+        n_bfp,
+        n_medium,
+        focal_length,
+        NA,
+        x_range,
+        numpoints_x,
+        y_range,
+        numpoints_y,
+        bfp_sampling_n,
+    )
+    z = np.atleast_1d(z)
+    Ex, Ey, Ez = calculate_fields(z)
+
+    retval = (np.squeeze(Ex), np.squeeze(Ey), np.squeeze(Ez))
+
+    if return_grid:
+        xrange_v = np.linspace(-x_range + x_center, x_range + x_center, numpoints_x)
+        yrange_v = np.linspace(-y_range + y_center, y_range + y_center, numpoints_y)
+        X, Y, Z = np.meshgrid(xrange_v, yrange_v, np.squeeze(z), indexing="ij")
+        retval += (np.squeeze(X), np.squeeze(Y), np.squeeze(Z))
+
+    return retval
+
+
+def fast_psf_z_slices(
+    f_input_field,
+    lambda_vac: float,
+    n_bfp: float,
+    n_medium: float,
+    focal_length: float,
+    NA: float,
+    x_range: Union[float, Tuple[float, float]],
+    numpoints_x: int,
+    y_range: Union[float, Tuple[float, float]],
+    numpoints_y: int,
+    z: np.array,
+    bfp_sampling_n=125,
+) -> Iterator[Tuple[float, np.ndarray, np.ndarray, np.ndarray]]:
+    """Calculate the vectorial Point Spread Function of an arbitrary input field in the same way as
+    `fast_psf()`, but one plane of constant z at a time. The sampling of the back focal plane and
+    the chirp-z transforms are set up once, and the memory consumption does not depend on the
+    number of planes.
+
+    Parameters
+    ----------
+    f_input_field : callable
+        Function with the input field in the back focal plane, see `fast_psf()`.
+    lambda_vac : float
+        Wavelength of the light [m]
+    n_bfp : float
+        Refractive index at the back focal plane of the objective [-]
+    n_medium : float
+        Refractive index of the medium into which the light is focused [-]
+    focal_length : float
+        Focal length of the objective [m]
+    NA : float
+        Numerical Aperture of the objective [-]
+    x_range : Union[float, tuple(float, float)]
+        Size of the calculation range along x, see `fast_psf()` [m]
+    numpoints_x : int
+        Number of points to calculate along the x dimension. Must be >= 1
+    y_range : Union[float, tuple(float, float)]
+        Same as x, but along y [m]
+    numpoints_y : int
+        Same as x, but for y
+    z : Union[np.array, float]
+        Numpy array of locations along z, where to calculate the fields. Can be a single number as
+        well [m]
+    bfp_sampling_n : Union[int, str], optional
+        Number of discrete steps with which the back focal plane is sampled, from the center to the
+        edge. Can be "auto", see `fast_psf()` (default = 125)
+
+    Returns
+    -------
+    Iterator[Tuple[float, np.ndarray, np.ndarray, np.ndarray]]
+        A generator that yields the tuple (z, Ex, Ey, Ez) for every location in `z`, in order. The
+        fields are the same as those that `fast_psf()` returns for that location.
+    """
+    bfp_sampling_n = _resolve_bfp_sampling_n(
+        bfp_sampling_n, lambda_vac, n_medium, NA, x_range, y_range, z
+    )
+    calculate_fields, _ = _fast_psf_factory(
+        f_input_field,
+        lambda_vac,
+        n_bfp,
+        n_medium,
+        focal_length,
+        NA,
+        x_range,
+        numpoints_x,
+        y_range,
+        numpoints_y,
+        bfp_sampling_n,
+    )
+
+    def slices():
+        for z_plane in np.atleast_1d(z):
+            Ex, Ey, Ez = calculate_fields(np.atleast_1d(z_plane))
+            yield (z_plane, np.squeeze(Ex), np.squeeze(Ey), np.squeeze(Ez))
+
+    return slices()
+
+
+def _resolve_bfp_sampling_n(
+    bfp_sampling_n: Union[int, str],
+    lambda_vac: float,
+    n_medium: float,
+    NA: float,
+    x_range: Union[float, Tuple[float, float]],
+    y_range: Union[float, Tuple[float, float]],
+    z: Union[float, np.ndarray],
+) -> int:
+    """Return the sampling of the back focal plane for the calculation range in x, y and z, with
+    `bfp_sampling_n` being an integer or "auto", see `fast_psf()`"""
+    lateral_extent = max(np.max(np.abs(x_range)), np.max(np.abs(y_range)))
+    return resolve_bfp_sampling_n(
+        bfp_sampling_n, lambda_vac, n_medium, NA, lateral_extent, np.max(np.abs(z))
+    )
+
+
+def _fast_psf_factory(
+    f_input_field,
+    lambda_vac: float,
+    n_bfp: float,
+    n_medium: float,
+    focal_length: float,
+    NA: float,
+    x_range: Union[float, Tuple[float, float]],
+    numpoints_x: int,
+    y_range: Union[float, Tuple[float, float]],
+    numpoints_y: int,
+    bfp_sampling_n: int,
+):
+    """Sample the back focal plane, calculate the amplitudes of the plane waves in the focus and
+    set up the chirp-z transforms for `fast_psf()`. Returns a function `f(z)` that calculates the
+    fields (Ex, Ey, Ez) with the shape (numpoints_x, numpoints_y, z.size), and the tuple (x_center,
+    x_range, y_center, y_range), where the ranges are half of the size of the range of locations."""
+
     def _check_axis(numpts, axrange, axis):
         names = {"x": ("numpoints_x", "x_range"), "y": ("numpoints_y", "y_range")}
         if numpts < 1:
@@ -229,7 +376,6 @@ def fast_psf(
     x_range = 0.0 if x_range.size == 1 else np.abs(np.diff(x_range))
     y_center = np.mean(y_range)
     y_range = 0.0 if y_range.size == 1 else np.abs(np.diff(y_range))
-    z = np.atleast_1d(z)
 
     x_range *= 0.5
     y_range *= 0.5
@@ -237,11 +383,6 @@ def fast_psf(
     k = 2 * np.pi * n_medium / lambda_vac
     ks = k * NA / n_medium
 
-    # M = int(np.max((bfp_sampling_n, 2 * NA**2 * np.max(np.abs(z)) /
-    #            (np.sqrt(n_medium**2 - NA**2) * lambda_vac))))
-
-    npupilsamples = 2 * bfp_sampling_n - 1
-
     dk = ks / (bfp_sampling_n - 1)
     sin_th_max = NA / n_medium
     sin_theta_range = np.zeros(bfp_sampling_n * 2 - 1)
@@ -300,16 +441,111 @@ def fast_psf(
     Einfy = Einfy_x + Einfy_y
     Einfz = Einfz_x + Einfz_y
 
-    # Make kz 3D - np.atleast_3d() prepends a dimension, and that is not what we need
-    kz = np.reshape(kz, (npupilsamples, npupilsamples, 1))
+    plane_wave_sum = plane_wave_sum_czt_factory(
+        kz,
+        dk,
+        bfp_sampling_n,
+        x_center,
+        x_range,
+        numpoints_x,
+        y_center,
+        y_range,
+        numpoints_y,
+    )
+    phase_correction_factor = (
+        -1j * focal_length * np.exp(-1j * k * focal_length) * dk**2 / (2 * np.pi)
+    )
 
-    Z = np.tile(z, ((2 * bfp_sampling_n - 1), (2 * bfp_sampling_n - 1), 1))
-    Exp = np.exp(1j * kz * Z)
+    def calculate_fields(z: np.ndarray):
+        return [E * phase_correction_factor for E in plane_wave_sum((Einfx, Einfy, Einfz), z)]
+
+    return calculate_fields, (x_center, x_range, y_center, y_range)
 
-    Einfx, Einfy, Einfz = [
-        np.tile(np.reshape(E, (npupilsamples, npupilsamples, 1)), (1, 1, z.shape[0])) * Exp
-        for E in (Einfx, Einfy, Einfz)
-    ]
+
+def plane_wave_sum_czt(
+    amplitudes,
+    kz: np.ndarray,
+    z: np.ndarray,
+    dk: float,
+    bfp_sampling_n: int,
+    x_center: float,
+    x_range: float,
+    numpoints_x: int,
+    y_center: float,
+    y_range: float,
+    numpoints_y: int,
+):
+    """Sum plane waves with wave vectors that are sampled on a regular grid in kx and ky, on a
+    regular grid in x and y and for arbitrary locations along z, by means of the chirp-z transform.
+    The plane waves are sampled in the same way as the back focal plane, see
+    `Objective.sample_back_focal_plane()`.
+
+    Parameters
+    ----------
+    amplitudes : Iterable[np.ndarray]
+        Iterable of (2 * bfp_sampling_n - 1, 2 * bfp_sampling_n - 1) arrays with the (complex)
+        amplitudes of the plane waves. Every array results in a separately summed field.
+    kz : np.ndarray
+        Array of the same shape as the amplitudes, with the z-component of the wave vector of every
+        plane wave.
+    z : np.ndarray
+        One-dimensional array with the locations along z to evaluate the fields at [m]
+    dk : float
+        Distance between two samples of the wave vector in kx and ky [1/m]
+    bfp_sampling_n : int
+        Number of samples of the back focal plane from the center to the edge
+    x_center : float
+        Center of the range of locations along x [m]
+    x_range : float
+        Half of the size of the range of locations along x [m]
+    numpoints_x : int
+        Number of points along x
+    y_center : float
+        Same as `x_center`, but for y [m]
+    y_range : float
+        Same as `x_range`, but for y [m]
+    numpoints_y : int
+        Same as `numpoints_x`, but for y
+
+    Returns
+    -------
+    list
+        A list with an array of shape (numpoints_x, numpoints_y, z.size) for every array in
+        `amplitudes`.
+    """
+    return plane_wave_sum_czt_factory(
+        kz,
+        dk,
+        bfp_sampling_n,
+        x_center,
+        x_range,
+        numpoints_x,
+        y_center,
+        y_range,
+        numpoints_y,
+    )(amplitudes, z)
+
+
+def plane_wave_sum_czt_factory(
+    kz: np.ndarray,
+    dk: float,
+    bfp_sampling_n: int,
+    x_center: float,
+    x_range: float,
+    numpoints_x: int,
+    y_center: float,
+    y_range: float,
+    numpoints_y: int,
+):
+    """Set up the chirp-z transforms of `plane_wave_sum_czt()` once, and return a function
+    `f(amplitudes, z)` that sums the plane waves with the given amplitudes at the locations `z`. The
+    set up does not depend on `z`, such that the returned function can be called repeatedly for
+    different locations along z, for example one plane at a time. See `plane_wave_sum_czt()` for
+    the parameters."""
+    npupilsamples = 2 * bfp_sampling_n - 1
+
+    # Make kz 3D - np.atleast_3d() prepends a dimension, and that is not what we need
+    kz = np.reshape(kz, (npupilsamples, npupilsamples, 1))
 
     # Set up the factors for the chirp z transform
     ax = np.exp(-1j * dk * (x_range - x_center))
@@ -321,43 +557,27 @@ def fast_psf(
     # symmetric around point (0,0). Therefore, fix the phases after the
     # transform such that the real and imaginary parts of the fields are what
     # they need to be
-    phase_fix_x = np.reshape(
+    phase_fix_step1 = np.reshape(
         (ax * wx ** -(np.arange(numpoints_x))) ** (bfp_sampling_n - 1),
         (numpoints_x, 1, 1),
     )
-    phase_fix_step1 = np.tile(phase_fix_x, (1, npupilsamples, Z.shape[2]))
-
-    phase_fix_y = np.reshape(
+    phase_fix_step2 = np.reshape(
         (ay * wy ** -(np.arange(numpoints_y))) ** (bfp_sampling_n - 1),
         (numpoints_y, 1, 1),
     )
 
-    phase_fix_step2 = np.tile(phase_fix_y, (1, numpoints_x, Z.shape[2]))
-
-    # We break the czt into two steps, as there is an overlap in processing that
-    # needs to be done for every polarization. Therefore we can save a bit of
-    # overhead by storing the results that can be reused.
-    precalc_step1 = czt.init_czt(Einfx, numpoints_x, wx, ax)
-    Ex = np.transpose(czt.exec_czt(Einfx, precalc_step1) * phase_fix_step1, (1, 0, 2))
-    precalc_step2 = czt.init_czt(Ex, numpoints_y, wy, ay)
-    Ex = np.transpose(czt.exec_czt(Ex, precalc_step2) * phase_fix_step2, (1, 0, 2))
-    Ey = np.transpose(czt.exec_czt(Einfy, precalc_step1) * phase_fix_step1, (1, 0, 2))
-    Ey = np.transpose(czt.exec_czt(Ey, precalc_step2) * phase_fix_step2, (1, 0, 2))
-
-    Ez = np.transpose(czt.exec_czt(Einfz, precalc_step1) * phase_fix_step1, (1, 0, 2))
-    Ez = np.transpose(czt.exec_czt(Ez, precalc_step2) * phase_fix_step2, (1, 0, 2))
-
-    Ex, Ey, Ez = [
-        E * -1j * focal_length * np.exp(-1j * k * focal_length) * dk**2 / (2 * np.pi)
-        for E in (Ex, Ey, Ez)
-    ]
-
-    retval = (np.squeeze(Ex), np.squeeze(Ey), np.squeeze(Ez))
-
-    if return_grid:
-        xrange_v = np.linspace(-x_range + x_center, x_range + x_center, numpoints_x)
-        yrange_v = np.linspace(-y_range + y_center, y_range + y_center, numpoints_y)
-        X, Y, Z = np.meshgrid(xrange_v, yrange_v, np.squeeze(z), indexing="ij")
-        retval += (np.squeeze(X), np.squeeze(Y), np.squeeze(Z))
-
-    return retval
+    # The auxiliary vectors of the chirp z transforms only depend on the length of the transformed
+    # axis, and are shared by all polarizations and locations along z.
+    precalc_step1 = czt.init_czt(kz, numpoints_x, wx, ax)
+    precalc_step2 = czt.init_czt(np.empty((npupilsamples, 1)), numpoints_y, wy, ay)
+
+    def plane_wave_sum(amplitudes, z: np.ndarray):
+        Exp = np.exp(1j * kz * np.reshape(z, (1, 1, -1)))
+        fields = []
+        for E in amplitudes:
+            E = np.reshape(E, (npupilsamples, npupilsamples, 1)) * Exp
+            E = np.transpose(czt.exec_czt(E, precalc_step1) * phase_fix_step1, (1, 0, 2))
+            fields.append(np.transpose(czt.exec_czt(E, precalc_step2) * phase_fix_step2, (1, 0, 2)))
+        return fields
+
+    return plane_wave_sum
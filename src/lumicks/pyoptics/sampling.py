@@ -0,0 +1,125 @@
+"""Sampling of the back focal plane of an objective"""
+
+import logging
+from typing import Union
+
+import numpy as np
+
+# Extra samples on top of the minimum sampling of the back focal plane, which accounts for the size
+# of the focal spot around the requested locations
+_MARGIN = 4
+# Lower bound of the automatically chosen sampling of the back focal plane
+_MIN_BFP_SAMPLING_N = 11
+
+
+def minimum_bfp_sampling_n(
+    lambda_vac: float,
+    n_medium: float,
+    NA: float,
+    lateral_extent: float,
+    axial_extent: float,
+) -> int:
+    """Return the number of samples of the back focal plane, from the center to the edge, that is
+    required to calculate a focused field without aliasing, at locations up to a distance of
+    `lateral_extent` from the optical axis (along x or y), and up to a distance of `axial_extent`
+    from the focal plane.
+
+    Sampling the back focal plane with a spacing :math:`\\Delta k` makes the focused field periodic
+    in x and y, with period :math:`2 \\pi / \\Delta k = \\lambda (N - 1) / NA`. A plane wave at the
+    edge of the aperture travels laterally by :math:`|z| \\tan(\\theta_{max})` at a distance
+    :math:`|z|` from the focus, which is also the condition that the phase of neighbouring plane
+    waves differs by less than :math:`\\pi` [1]_. Therefore, the requirement is
+
+    .. math::
+        N - 1 \\geq \\frac{2 NA}{\\lambda} (\\rho_{max} + |z|_{max} \\tan(\\theta_{max}))
+
+    to which a margin is added for the size of the focal spot itself.
+
+    Parameters
+    ----------
+    lambda_vac : float
+        Wavelength of the light in vacuum [m]
+    n_medium : float
+        Refractive index of the medium into which the light is focused [-]
+    NA : float
+        Numerical Aperture of the objective [-]
+    lateral_extent : float
+        Largest distance from the optical axis along x or y [m]
+    axial_extent : float
+        Largest distance from the focal plane [m]
+
+    Returns
+    -------
+    int
+        The number of samples
+
+    Raises
+    ------
+    ValueError
+        Raised if `axial_extent` is not zero and `NA` is equal to `n_medium`, as a plane wave at
+        the edge of the aperture travels along the focal plane in that case
+
+    ..  [1] Novotny, L., & Hecht, B. (2012). Principles of Nano-Optics (2nd ed.).
+            Cambridge: Cambridge University Press. doi:10.1017/CBO9780511794193
+    """
+    extent = abs(lateral_extent)
+    if axial_extent != 0:
+        if NA >= n_medium:
+            raise ValueError(
+                "The sampling of the back focal plane cannot be determined outside of the focal "
+                "plane for NA = n_medium"
+            )
+        extent += abs(axial_extent) * NA / ((n_medium - NA) * (n_medium + NA)) ** 0.5
+    minimum = 2 * NA / lambda_vac * extent
+    return max(int(np.ceil(minimum)) + 1 + _MARGIN, _MIN_BFP_SAMPLING_N)
+
+
+def resolve_bfp_sampling_n(
+    bfp_sampling_n: Union[int, str],
+    lambda_vac: float,
+    n_medium: float,
+    NA: float,
+    lateral_extent: float,
+    axial_extent: float,
+) -> int:
+    """Return `bfp_sampling_n` if it is an integer, and the result of `minimum_bfp_sampling_n()` if
+    it is "auto". A warning is logged if an integer is lower than the result of
+    `minimum_bfp_sampling_n()`, as the fields are likely aliased in that case.
+
+    Raises
+    ------
+    ValueError
+        Raised if `bfp_sampling_n` is a string other than "auto", or if it is "auto" and the
+        minimum cannot be determined, see `minimum_bfp_sampling_n()`
+    """
+    if isinstance(bfp_sampling_n, str):
+        if bfp_sampling_n != "auto":
+            raise ValueError(f"Invalid value for bfp_sampling_n: {bfp_sampling_n}")
+        return minimum_bfp_sampling_n(lambda_vac, n_medium, NA, lateral_extent, axial_extent)
+    if axial_extent != 0 and NA >= n_medium:
+        return int(bfp_sampling_n)
+    minimum = minimum_bfp_sampling_n(lambda_vac, n_medium, NA, lateral_extent, axial_extent)
+    if bfp_sampling_n < minimum:
+        logging.warning(
+            f"bfp_sampling_n = {bfp_sampling_n} is lower than the minimum of {minimum} for the "
+            "requested locations, the fields may be aliased"
+        )
+    return int(bfp_sampling_n)
+
+
+def refined_bfp_sampling_n(bfp_sampling_n: int) -> int:
+    """Return the number of samples of the back focal plane after one step of refinement. The number
+    of intervals from the center to the edge is doubled, such that every sample of
+    `bfp_sampling_n` is also a sample of the refined sampling."""
+    return 2 * bfp_sampling_n - 1
+
+
+def new_samples_mask(bfp_sampling_n: int) -> np.ndarray:
+    """Return a mask for the square grid of samples of the back focal plane with `bfp_sampling_n`
+    samples from the center to the edge, which is True for the samples that are not part of the
+    grid before the last refinement, see `refined_bfp_sampling_n()`."""
+    if bfp_sampling_n % 2 == 0:
+        raise ValueError("The sampling of the back focal plane is not the result of a refinement")
+    # The sampling is symmetric around the center, at index bfp_sampling_n - 1, which is even
+    previous = np.arange(2 * bfp_sampling_n - 1) % 2 == 0
+    return np.logical_not(np.logical_and.outer(previous, previous))
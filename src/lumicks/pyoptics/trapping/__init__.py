@@ -1,15 +1,28 @@
 from numba import config
 
 from ..objective import Objective
+from .azimuthal_harmonics import AzimuthalFieldHarmonics
 from .bead import Bead
+from .field_output import open_fields
 from .interface import (
+    OBSERVABLES,
     absorbed_power_focus,
+    field_factory,
+    field_response_factory,
     fields_focus,
     fields_focus_gaussian,
+    fields_focus_harmonics,
+    fields_focus_spherical,
+    fields_focus_z_slices,
     fields_plane_wave,
     force_factory,
     forces_focus,
+    memory_estimate_focus,
+    observables_factory,
+    observables_response_factory,
+    power_factory,
     scattered_power_focus,
 )
+from .memory import MemoryEstimate, get_max_memory, set_max_memory
 
 config.THREADING_LAYER = "threadsafe"
@@ -0,0 +1,110 @@
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+
+class AzimuthalFieldHarmonics:
+    """
+    Azimuthal harmonics of the fields of a bead on the optical axis, as a function of the radial
+    distance to the optical axis `rho` and the axial location `z`. A field component F is
+    represented as::
+
+        F(rho, phi, z) = sum_m F_m(rho, z) exp(1j * m * phi)
+
+    with -max_harmonic <= m <= max_harmonic. This representation is exact for beams whose
+    polarization and amplitude only contain azimuthal harmonics up to a low order, such as linearly
+    or circularly polarized beams with a rotationally symmetric amplitude profile, focused on a
+    bead on the optical axis.
+
+    Instances are created by `trapping.fields_focus_harmonics()`.
+    """
+
+    def __init__(self, rho: np.ndarray, z: np.ndarray, harmonics: np.ndarray, max_harmonic: int):
+        """Initialize the AzimuthalFieldHarmonics class
+
+        Parameters
+        ----------
+        rho : np.ndarray
+            One-dimensional array of radial distances to the optical axis, in meters.
+        z : np.ndarray
+            One-dimensional array of locations along the optical axis, in meters.
+        harmonics : np.ndarray
+            Array of shape (num_fields, 2 * max_harmonic + 1, rho.size, z.size), with the azimuthal
+            harmonics of the field components. The harmonic orders are ordered as -max_harmonic ...
+            max_harmonic.
+        max_harmonic : int
+            The highest azimuthal order in the representation.
+        """
+        self.rho = rho
+        self.z = z
+        self.harmonics = harmonics
+        self.max_harmonic = max_harmonic
+
+    @property
+    def orders(self) -> np.ndarray:
+        """Return the azimuthal orders m of the harmonics"""
+        return np.arange(-self.max_harmonic, self.max_harmonic + 1)
+
+    @property
+    def num_fields(self) -> int:
+        """Return the number of field components (3 for the electric field, 6 if the magnetic field
+        is included)"""
+        return self.harmonics.shape[0]
+
+    def evaluate(self, phi):
+        """Resynthesize the fields at the azimuthal angles `phi`.
+
+        Parameters
+        ----------
+        phi : Union[float, np.ndarray]
+            Azimuthal angle(s) in radians, with respect to the positive x axis.
+
+        Returns
+        -------
+        tuple
+            Tuple with an array for every field component (Ex, Ey, Ez[, Hx, Hy, Hz]), of shape
+            (rho.size, phi.size, z.size). Dimensions of size one are removed.
+        """
+        phi = np.atleast_1d(phi).astype(np.float64)
+        exp_m_phi = np.exp(1j * np.outer(self.orders, phi))
+        fields = np.einsum("fmrz,mp->frpz", self.harmonics, exp_m_phi)
+        return tuple(np.squeeze(field) for field in fields)
+
+    def to_grid(self, x, y):
+        """Resynthesize the fields on the three-dimensional grid formed by `x`, `y` and the
+        locations `z` of the harmonics. The harmonics are interpolated along rho with a cubic
+        spline, therefore the accuracy depends on the sampling of rho. All locations need to be
+        within the range of rho, and rho needs to be strictly increasing.
+
+        Parameters
+        ----------
+        x : Union[float, np.ndarray]
+            Locations along x, in meters.
+        y : Union[float, np.ndarray]
+            Locations along y, in meters.
+
+        Returns
+        -------
+        tuple
+            Tuple with an array for every field component (Ex, Ey, Ez[, Hx, Hy, Hz]), of shape
+            (x.size, y.size, z.size). Dimensions of size one are removed.
+
+        Raises
+        ------
+        ValueError
+            Raised if rho is not strictly increasing with at least two values, or if a location on
+            the grid is outside of the range of rho.
+        """
+        if self.rho.size < 2 or np.any(np.diff(self.rho) <= 0):
+            raise ValueError("rho needs to be strictly increasing, with at least two values")
+        x, y = [np.atleast_1d(coord).astype(np.float64) for coord in (x, y)]
+        X, Y = np.meshgrid(x, y, indexing="ij")
+        rho = np.hypot(X, Y).reshape(-1)
+        phi = np.arctan2(Y, X).reshape(-1)
+        if rho.max() > self.rho.max() * (1 + 1e-12) or rho.min() < self.rho.min() * (1 - 1e-12):
+            raise ValueError("The grid extends outside of the range of rho of the harmonics")
+
+        interpolated = CubicSpline(self.rho, self.harmonics, axis=2)(rho)
+        exp_m_phi = np.exp(1j * np.outer(self.orders, phi))
+        fields = np.einsum("fmpz,mp->fpz", interpolated, exp_m_phi)
+        shape = (x.size, y.size, self.z.size)
+        return tuple(np.squeeze(field.reshape(shape)) for field in fields)
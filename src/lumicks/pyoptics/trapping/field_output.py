@@ -0,0 +1,144 @@
+import hashlib
+import json
+from os import PathLike
+from pathlib import Path
+from typing import Tuple, Union
+
+import numpy as np
+
+_METADATA_FILE = "fields.json"
+_COMPLETED_FILE = "completed.npy"
+
+
+def _fingerprint(coordinates: Tuple[np.ndarray, ...], parameters: dict) -> str:
+    """Return a hash of the coordinates and parameters of a calculation"""
+    digest = hashlib.sha256()
+    for coordinate in coordinates:
+        digest.update(np.ascontiguousarray(coordinate, dtype=np.float64).tobytes())
+    digest.update(json.dumps(parameters, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class FieldOutput:
+    """Output of field components, or quantities derived from them, to memory-mapped `.npy` files
+    in a directory, with one file per component, which are filled in chunk by chunk. The points
+    that have been written are kept track of on disk, such that a calculation that was interrupted
+    can be resumed: chunks of which all points have been written are skipped.
+
+    The directory contains a file with the parameters of the calculation. If the directory already
+    contains the output of a calculation with different coordinates or parameters, a ValueError is
+    raised. The input field of the objective cannot be compared, and it is up to the caller to use
+    the same input field when resuming a calculation.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, PathLike],
+        shape: Tuple[int, ...],
+        components: Tuple[str, ...],
+        coordinates: Tuple[np.ndarray, ...],
+        parameters: dict,
+        dtype: str = "complex128",
+    ):
+        self._path = Path(path)
+        metadata = {
+            "shape": list(shape),
+            "components": list(components),
+            "dtype": np.dtype(dtype).name,
+            "fingerprint": _fingerprint(coordinates, parameters),
+            "parameters": parameters,
+        }
+        metadata_file = self._path / _METADATA_FILE
+        if metadata_file.exists():
+            with open(metadata_file) as f:
+                existing = json.load(f)
+            if {key: existing.get(key) for key in metadata} != metadata:
+                raise ValueError(
+                    f"The output in {self._path} belongs to a calculation with different "
+                    "coordinates or parameters"
+                )
+            mode = "r+"
+        else:
+            self._path.mkdir(parents=True, exist_ok=True)
+            mode = "w+"
+
+        self._fields = tuple(
+            np.lib.format.open_memmap(
+                self._path / f"{component}.npy", mode=mode, dtype=dtype, shape=shape
+            )
+            for component in components
+        )
+        self._completed = np.lib.format.open_memmap(
+            self._path / _COMPLETED_FILE, mode=mode, dtype=bool, shape=shape
+        )
+        if mode == "w+":
+            self._completed[...] = False
+            self._completed.flush()
+            # Write the metadata last, such that a directory with metadata is always complete
+            with open(metadata_file, "w") as f:
+                json.dump(metadata, f, indent=2)
+
+    @property
+    def fields(self) -> Tuple[np.memmap, ...]:
+        """Memory-mapped arrays of the field components"""
+        return self._fields
+
+    @property
+    def complete(self) -> bool:
+        """True if all points have been written"""
+        return bool(np.all(self._completed))
+
+    def is_complete(self, index) -> bool:
+        """Return True if all points at `index` have been written"""
+        return bool(np.all(self._completed[index]))
+
+    def mark_complete(self, index):
+        """Flush the field components to disk, and mark the points at `index` as written"""
+        for field in self._fields:
+            field.flush()
+        self._completed[index] = True
+        self._completed.flush()
+
+
+def open_fields(path: Union[str, PathLike], mmap_mode: str = "r", allow_incomplete: bool = False):
+    """Open the fields that were written to a directory by `fields_focus()`,
+    `fields_focus_gaussian()` or `fields_plane_wave()` with the option `output`, as memory-mapped
+    arrays. The data is only read from disk when it is accessed.
+
+    Parameters
+    ----------
+    path : Union[str, PathLike]
+        Directory with the fields
+    mmap_mode : str, optional
+        Mode with which the files are opened, see `numpy.load()`. By default "r" (read only).
+    allow_incomplete : bool, optional
+        If False (default), raise a ValueError if the calculation of the fields was not completed.
+        If True, return the fields anyway. Points that have not been calculated contain arbitrary
+        values.
+
+    Returns
+    -------
+    tuple
+        The tuple (Ex, Ey, Ez), or (Ex, Ey, Ez, Hx, Hy, Hz) if the magnetic field was calculated, as
+        memory-mapped arrays. If derived quantities were calculated, the arrays of these quantities
+        are returned instead. Dimensions of size one are removed, such that the arrays have the same
+        shape as the arrays that are returned by the function that calculated them.
+
+    Raises
+    ------
+    ValueError
+        Raised if the directory does not contain fields, or if the calculation was not completed and
+        `allow_incomplete` is False.
+    """
+    path = Path(path)
+    metadata_file = path / _METADATA_FILE
+    if not metadata_file.exists():
+        raise ValueError(f"The directory {path} does not contain fields")
+    with open(metadata_file) as f:
+        metadata = json.load(f)
+    if not allow_incomplete and not np.all(np.load(path / _COMPLETED_FILE, mmap_mode="r")):
+        raise ValueError(f"The calculation of the fields in {path} was not completed")
+    return tuple(
+        np.squeeze(np.load(path / f"{component}.npy", mmap_mode=mmap_mode))
+        for component in metadata["components"]
+    )
@@ -1,22 +1,104 @@
-from dataclasses import fields
+from dataclasses import dataclass, fields
 from typing import Optional, Tuple
 
 import numpy as np
 from numba.core.config import NUMBA_NUM_THREADS
 
+from ..farfield_data import FarfieldData, PlaneWaves
 from ..objective import Objective
 from .bead import Bead
-from .legendre_data import calculate_legendre
+from .incident_field import incident_field_factory, incident_plane_wave_sum_factory
+from .legendre_data import calculate_legendre_tables
 from .local_coordinates import (
     ExternalBeadCoordinates,
+    FarZoneBeadCoordinates,
     InternalBeadCoordinates,
     LocalBeadCoordinates,
+    NearZoneBeadCoordinates,
 )
-from .numba_implementation import external_coordinates_loop, internal_coordinates_loop
-from .radial_data import calculate_external as calculate_external_radial_data
-from .radial_data import calculate_internal as calculate_internal_radial_data
+from .numba_implementation import (
+    combined_coordinates_loop,
+    combined_coordinates_loop_over_points,
+    combined_plane_wave_responses,
+    far_zone_coordinates_loop,
+    positions_loop,
+)
+from .radial_data import calculate_far_zone as calculate_far_zone_radial_data
+from .radial_data import far_zone_radius, lazy_radial_tables
 from .thread_limiter import thread_limiter
 
+PARALLEL_AXES = ("auto", "plane_waves", "positions", "points")
+# Size above which the output that is replicated per thread, when the loop over the plane waves is
+# executed in parallel, is considered too large
+_MAX_REPLICATED_BYTES = 32 * 2**20
+# Maximum size of the table with the response of the bead to every plane wave, which is required to
+# execute the loop over the bead positions in parallel
+_MAX_RESPONSE_TABLE_BYTES = 256 * 2**20
+
+
+@dataclass(frozen=True)
+class FocusPlaneWaves:
+    """The plane waves of a focus, and everything derived from them that does not depend on the
+    coordinates at which the fields of a bead are calculated. See `focus_plane_waves()`.
+
+    Attributes
+    ----------
+    farfield_data : FarfieldData
+        The far field of the objective
+    plane_waves : PlaneWaves
+        The plane waves in the aperture of the objective
+    kernel_arguments : dict
+        The plane waves as keyword arguments for the kernels, see `plane_wave_arguments()`
+    r_far_zone : float
+        The radius of the far zone for the scattered field, or infinity
+    incident_plane_wave_sum : callable
+        The closure from `incident_plane_wave_sum_factory()`
+    """
+
+    farfield_data: FarfieldData
+    plane_waves: PlaneWaves
+    kernel_arguments: dict
+    r_far_zone: float
+    incident_plane_wave_sum: callable
+
+
+def focus_plane_waves(
+    objective: Objective,
+    bead: Bead,
+    n_orders: int,
+    bfp_sampling_n: int,
+    f_input_field: callable,
+    far_zone_tolerance: Optional[float] = None,
+    farfield_data: Optional[FarfieldData] = None,
+) -> FocusPlaneWaves:
+    """Sample the back focal plane, unless `farfield_data` is given, and set up the plane waves, the
+    far zone and the chirp-z transforms of the incident field once. The result can be passed to
+    `combined_field_factory()` for several sets of coordinates with the same bead and focus, such as
+    one plane at a time. See `combined_field_factory()` for the arguments."""
+    if farfield_data is None:
+        bfp_coords, bfp_fields = objective.sample_back_focal_plane(
+            f_input_field=f_input_field, bfp_sampling_n=bfp_sampling_n
+        )
+        farfield_data = objective.back_focal_plane_to_farfield(
+            bfp_coords, bfp_fields, bead.lambda_vac
+        )
+    plane_waves = farfield_data.plane_waves()
+    r_far_zone = (
+        np.inf
+        if far_zone_tolerance is None
+        else far_zone_radius(bead.k, bead.ab_coeffs(n_orders), far_zone_tolerance)
+    )
+    dk = bead.k * objective.NA / bead.n_medium / (bfp_sampling_n - 1)
+    return FocusPlaneWaves(
+        farfield_data=farfield_data,
+        plane_waves=plane_waves,
+        kernel_arguments=plane_wave_arguments(plane_waves),
+        r_far_zone=r_far_zone,
+        incident_plane_wave_sum=incident_plane_wave_sum_factory(
+            farfield_data, bfp_sampling_n, dk, bead.n_medium
+        ),
+    )
+
 
 def focus_field_factory(
     objective: Objective,
@@ -26,45 +108,123 @@ def focus_field_factory(
     f_input_field: callable,
     local_coordinates: LocalBeadCoordinates,
     internal: bool,
+    far_zone_tolerance: Optional[float] = None,
+    farfield_data: Optional[FarfieldData] = None,
 ):
-
-    n_orders = n_orders
-    bfp_sampling_n = bfp_sampling_n
-    bfp_coords, bfp_fields = objective.sample_back_focal_plane(
-        f_input_field=f_input_field, bfp_sampling_n=bfp_sampling_n
+    """Create a closure that calculates the fields of a bead in a focus, for the coordinates in
+    `local_coordinates` that are inside (`internal` is True) or outside (`internal` is False) of the
+    bead. The fields at the other coordinates are zero. See `combined_field_factory()` for the
+    other arguments and the closure."""
+    return combined_field_factory(
+        objective,
+        bead,
+        n_orders,
+        bfp_sampling_n,
+        f_input_field,
+        local_coordinates,
+        far_zone_tolerance=far_zone_tolerance,
+        farfield_data=farfield_data,
+        internal=internal,
     )
 
-    farfield_data = objective.back_focal_plane_to_farfield(bfp_coords, bfp_fields, bead.lambda_vac)
-    farfield_as_dict = {
-        f.name: getattr(farfield_data, f.name)
-        for f in fields(farfield_data)
-        if f.name not in ("kp")
-    }
-    local_coordinates = (
-        InternalBeadCoordinates(local_coordinates)
-        if internal
-        else ExternalBeadCoordinates(local_coordinates)
-    )
-    r = local_coordinates.r
-    radial_data = (
-        calculate_internal_radial_data(bead.k1, r, n_orders)
-        if internal
-        else calculate_external_radial_data(bead.k, r, n_orders)
-    )
-    radial_as_dict = {f.name: getattr(radial_data, f.name) for f in fields(radial_data)}
 
-    legendre_data, legendre_data_dtheta = calculate_legendre(
-        local_coordinates, farfield_data, n_orders
-    )
+def combined_field_factory(
+    objective: Objective,
+    bead: Bead,
+    n_orders: int,
+    bfp_sampling_n: int,
+    f_input_field: callable,
+    local_coordinates: LocalBeadCoordinates,
+    far_zone_tolerance: Optional[float] = None,
+    farfield_data: Optional[FarfieldData] = None,
+    internal: Optional[bool] = None,
+    focus: Optional[FocusPlaneWaves] = None,
+):
+    """Create a closure that calculates the fields of a bead in a focus, for all coordinates in
+    `local_coordinates`, both inside and outside of the bead. The back focal plane is sampled once,
+    the Legendre functions are calculated in a single pass, and the fields inside and outside of
+    the bead are calculated by a single kernel. If `internal` is True or False, only the fields
+    inside or outside of the bead are calculated, and the fields at the other coordinates are zero.
+
+    If `far_zone_tolerance` is not None, the scattered fields at coordinates outside of the bead
+    that are sufficiently far away from the bead are calculated with the asymptotic form of the
+    spherical Hankel functions, see `radial_data.far_zone_radius()`.
+
+    If the total field is requested and the coordinates are a regular grid, the incident field is
+    calculated with the chirp-z transform, and the kernels only calculate the scattered field.
+
+    The far field of the objective can be passed in as `farfield_data`, to reuse it for several sets
+    of coordinates. In that case, `f_input_field` is not used, and `farfield_data` has to be the
+    result of sampling `f_input_field` with `bfp_sampling_n` samples. Likewise, the result of
+    `focus_plane_waves()` for the same arguments can be passed as `focus`, to also reuse the plane
+    waves, the radius of the far zone and the set up of the chirp-z transforms. In that case,
+    `far_zone_tolerance` and `farfield_data` are not used either, and only the tables that depend on
+    the coordinates are calculated.
+
+    The closure writes the fields of all regions directly into a single array with the components
+    along the first axis, see `stacked_field_buffer()`, which is `out` if that is given. It returns
+    `out`, the array if `stacked` is True, and the tuple of the components otherwise."""
+    if focus is None:
+        focus = focus_plane_waves(
+            objective,
+            bead,
+            n_orders,
+            bfp_sampling_n,
+            f_input_field,
+            None if internal else far_zone_tolerance,
+            farfield_data,
+        )
+    plane_waves = focus.plane_waves
+    farfield_as_dict = focus.kernel_arguments
     coeffs = bead.cd_coeffs(n_orders) if internal else bead.ab_coeffs(n_orders)
-    n_bead = bead.n_bead
+    r_far_zone = np.inf if internal else focus.r_far_zone
+    if internal is None:
+        near_zone_coordinates = NearZoneBeadCoordinates(local_coordinates, r_far_zone)
+    elif internal:
+        near_zone_coordinates = InternalBeadCoordinates(local_coordinates)
+    else:
+        near_zone_coordinates = ExternalBeadCoordinates(local_coordinates, r_far_zone)
+    far_zone_coordinates = FarZoneBeadCoordinates(local_coordinates, r_far_zone)
+
+    r = near_zone_coordinates.r
+    local_coords = near_zone_coordinates.xyz_stacked
+    k0r = bead.k * r
+    outside = r > bead.bead_diameter / 2
+    legendre_data, legendre_data_dtheta = calculate_legendre_tables(
+        near_zone_coordinates, plane_waves, n_orders
+    )
+    get_radial_tables = lazy_radial_tables(bead, r, n_orders)
+
+    if np.isfinite(r_far_zone):
+        r_far = far_zone_coordinates.r
+        far_zone_legendre_data = calculate_legendre_tables(
+            far_zone_coordinates, plane_waves, n_orders
+        )
+        far_zone_radial_data = calculate_far_zone_radial_data(bead.k, r_far)
+        far_zone_radial_as_dict = {
+            f.name: getattr(far_zone_radial_data, f.name) for f in fields(far_zone_radial_data)
+        }
     n_medium = bead.n_medium
 
     ks = bead.k * objective.NA / bead.n_medium
     dk = ks / (bfp_sampling_n - 1)
-    phase_correction_factor = (-1j * objective.focal_length) * (
-        np.exp(-1j * bead.k * objective.focal_length) * dk**2 / (2 * np.pi)
+    phase_correction_factor = plane_wave_phase_correction_factor(objective, bead, bfp_sampling_n)
+    incident_field = (
+        None
+        if internal
+        else incident_field_factory(
+            focus.farfield_data,
+            bfp_sampling_n,
+            dk,
+            n_medium,
+            phase_correction_factor,
+            local_coordinates,
+            focus.incident_plane_wave_sum,
+        )
     )
+    # Adding the incident field to the scattered field is done by the kernels if it cannot be done
+    # by `incident_field`
+    kernel_total_field = incident_field is None
 
     def calculate_field(
         bead_center: Tuple[float, float, float],
@@ -72,78 +232,408 @@ def focus_field_factory(
         calculate_magnetic_field: bool = False,
         calculate_total_field: bool = True,
         num_threads: Optional[int] = None,
+        parallel_axis: str = "auto",
+        out: Optional[np.ndarray] = None,
+        stacked: bool = False,
     ):
-        local_coords = local_coordinates.xyz_stacked
-        region = np.reshape(local_coordinates.region, local_coordinates.coordinate_shape)
+        regions = [np.reshape(near_zone_coordinates.region, local_coordinates.coordinate_shape)]
         bead_center = np.atleast_2d(bead_center)
         if len(bead_center.shape) > 2:
             raise ValueError("Invalid argument for bead_center")
         num_threads = 1 if num_threads is None else min(max(1, int(num_threads)), NUMBA_NUM_THREADS)
-        # Always provide a (dummy) 2D numpy array to satisfy Numba (can't deal with None it seems),
-        # but keep it small in case the parameter isn't used
+        radial_E, radial_H = get_radial_tables(calculate_electric_field, calculate_magnetic_field)
         with thread_limiter(num_threads):
-            # It's ugly but at least Numba compiles the loop
-            E_field, H_field = (
-                internal_coordinates_loop(
-                    bead_center,
-                    coeffs,
-                    n_bead,
-                    **radial_as_dict,
-                    **farfield_as_dict,
-                    legendre_data=legendre_data,
-                    legendre_data_dtheta=legendre_data_dtheta,
-                    r=r,
-                    local_coords=local_coords,
-                    calculate_electric=calculate_electric_field,
-                    calculate_magnetic=calculate_magnetic_field,
-                    n_threads=num_threads,
-                )
-                if internal
-                else external_coordinates_loop(
+            storage = [
+                _near_zone_fields(
                     bead_center,
-                    coeffs,
+                    radial_E,
+                    radial_H,
+                    k0r,
+                    outside,
                     n_medium,
-                    **radial_as_dict,
                     **farfield_as_dict,
                     legendre_data=legendre_data,
                     legendre_data_dtheta=legendre_data_dtheta,
                     r=r,
                     local_coords=local_coords,
-                    total=calculate_total_field,
+                    total=calculate_total_field and kernel_total_field,
                     calculate_electric=calculate_electric_field,
                     calculate_magnetic=calculate_magnetic_field,
                     n_threads=num_threads,
+                    parallel_axis=parallel_axis,
                 )
-            )
+            ]
 
-        E, H = [
-            (
-                [
-                    np.zeros(
-                        (len(bead_center), *local_coordinates.coordinate_shape), dtype="complex128"
+            if np.isfinite(r_far_zone):
+                storage.append(
+                    far_zone_coordinates_loop(
+                        bead_center,
+                        coeffs,
+                        n_medium,
+                        **far_zone_radial_as_dict,
+                        **farfield_as_dict,
+                        legendre_data=far_zone_legendre_data[0],
+                        legendre_data_dtheta=far_zone_legendre_data[1],
+                        r=r_far,
+                        local_coords=far_zone_coordinates.xyz_stacked,
+                        total=calculate_total_field and kernel_total_field,
+                        calculate_electric=calculate_electric_field,
+                        calculate_magnetic=calculate_magnetic_field,
+                        n_threads=num_threads,
                     )
-                    for _ in range(3)
-                ]
-                if calculate
-                else None
+                )
+                regions.append(
+                    np.reshape(far_zone_coordinates.region, local_coordinates.coordinate_shape)
+                )
+
+        calculate = (calculate_electric_field, calculate_magnetic_field)
+        fields = stacked_field_buffer(
+            out, 3 * sum(calculate), len(bead_center), local_coordinates.coordinate_shape
+        )
+        if out is not None and sum(np.count_nonzero(region) for region in regions) < np.prod(
+            local_coordinates.coordinate_shape
+        ):
+            fields[...] = 0
+        rows = _field_rows(*calculate)
+        for region, region_storage in zip(regions, storage):
+            for field_rows, field_storage in zip(rows, region_storage):
+                if field_rows is not None:
+                    field_storage *= phase_correction_factor
+                    fields[field_rows][..., region] = np.moveaxis(field_storage, 1, 0)
+
+        if calculate_total_field and not kernel_total_field:
+            outside_bead = np.reshape(
+                local_coordinates._region_outside_bead, local_coordinates.coordinate_shape
+            )
+            incident_fields = incident_field(
+                bead_center, calculate_electric_field, calculate_magnetic_field
+            )
+            for field_rows, incident in zip(rows, incident_fields):
+                if field_rows is not None:
+                    fields[field_rows][..., outside_bead] += np.moveaxis(incident, 1, 0)[
+                        ..., outside_bead
+                    ]
+
+        return _field_result(fields, out, stacked)
+
+    return calculate_field
+
+
+def stacked_field_buffer(
+    out: Optional[np.ndarray],
+    n_components: int,
+    n_positions: int,
+    coordinate_shape: Tuple[int, ...],
+) -> np.ndarray:
+    """Return an array for `n_components` field components at `n_positions` bead positions and the
+    locations with shape `coordinate_shape`, with the shape (n_components, n_positions,
+    *coordinate_shape). If `out` is None, a new array is allocated and filled with zeros. Otherwise,
+    the array is a view of `out`, which has to be complex-valued and have that shape, or that shape
+    without the dimensions of size one, with the components along the first or the last axis.
+
+    Raises
+    ------
+    ValueError
+        Raised if `out` is not complex-valued or does not have a valid shape
+    """
+    shape = (n_components, n_positions, *coordinate_shape)
+    if out is None:
+        return np.zeros(shape, dtype="complex128")
+    if not np.iscomplexobj(out):
+        raise ValueError("The output array has to be complex-valued")
+    squeezed = tuple(size for size in shape[1:] if size != 1)
+    if out.shape in (shape, (n_components, *squeezed)):
+        fields = out
+    elif out.shape in ((*shape[1:], n_components), (*squeezed, n_components)):
+        fields = np.moveaxis(out, -1, 0)
+    else:
+        raise ValueError(
+            f"The output array has shape {out.shape}, but the fields have shape "
+            f"{(n_components, *squeezed)}"
+        )
+    # Only adds or removes dimensions of size one, which is always a view
+    return fields.reshape(shape)
+
+
+def _field_rows(calculate_electric_field: bool, calculate_magnetic_field: bool):
+    """Return the rows of the electric and the magnetic field in the array of
+    `stacked_field_buffer()`, or None for a field that is not calculated"""
+    E_rows = slice(0, 3) if calculate_electric_field else None
+    H_rows = slice(3 * calculate_electric_field, 3 * calculate_electric_field + 3)
+    return E_rows, H_rows if calculate_magnetic_field else None
+
+
+def _field_result(fields: np.ndarray, out: Optional[np.ndarray], stacked: bool):
+    """Return `out` if it is not None, the array `fields` with the components along the first axis
+    if `stacked` is True, and the tuple of the components otherwise. Dimensions of size one are
+    removed."""
+    if out is not None:
+        return out
+    if stacked:
+        return np.squeeze(fields)
+    return tuple(np.squeeze(component) for component in fields)
+
+
+def _parallel_axis(
+    n_threads: int, n_positions: int, n_plane_waves: int, n_points: int, n_fields: int
+) -> str:
+    """Choose the axis of the calculation that is executed in parallel. The loop over the plane
+    waves is used if that does not replicate a large output per thread. Otherwise, the loop over the
+    bead positions is used if there are enough positions to keep all threads busy and the table with
+    the response per plane wave fits in memory, and the loop over the points if not."""
+    bytes_per_output = 3 * n_points * n_fields * np.dtype("complex128").itemsize
+    if n_threads == 1 or n_threads * n_positions * bytes_per_output <= _MAX_REPLICATED_BYTES:
+        return "plane_waves"
+    if n_positions >= n_threads and n_plane_waves * bytes_per_output <= _MAX_RESPONSE_TABLE_BYTES:
+        return "positions"
+    return "points"
+
+
+def _near_zone_fields(
+    bead_center,
+    radial_E,
+    radial_H,
+    k0r,
+    outside,
+    n_medium,
+    cos_theta,
+    sin_theta,
+    cos_phi,
+    sin_phi,
+    kx,
+    ky,
+    kz,
+    Einf_theta,
+    Einf_phi,
+    legendre_data,
+    legendre_data_dtheta,
+    r,
+    local_coords,
+    total: bool,
+    calculate_electric: bool,
+    calculate_magnetic: bool,
+    n_threads: int,
+    parallel_axis: str = "auto",
+):
+    """Sum the response of the bead to all plane waves in the aperture, with the loop over either
+    the plane waves, the bead positions or the points executed in parallel. If `parallel_axis` is
+    "auto", the axis is chosen by `_parallel_axis`. Returns the electric and magnetic field as
+    arrays of shape (len(bead_center), 3, r.size)."""
+    if parallel_axis not in PARALLEL_AXES:
+        raise ValueError(
+            f"Invalid value for parallel_axis: {parallel_axis}, use one of {PARALLEL_AXES}"
+        )
+    if parallel_axis == "auto":
+        parallel_axis = _parallel_axis(
+            n_threads,
+            len(bead_center),
+            kz.size,
+            r.size,
+            int(calculate_electric) + int(calculate_magnetic),
+        )
+    plane_wave_data = {
+        "cos_theta": cos_theta,
+        "sin_theta": sin_theta,
+        "cos_phi": cos_phi,
+        "sin_phi": sin_phi,
+        "kz": kz,
+        "Einf_theta": Einf_theta,
+        "Einf_phi": Einf_phi,
+        "legendre_data": legendre_data,
+        "legendre_data_dtheta": legendre_data_dtheta,
+        "r": r,
+        "local_coords": local_coords,
+        "total": total,
+        "calculate_electric": calculate_electric,
+        "calculate_magnetic": calculate_magnetic,
+    }
+    if parallel_axis == "positions":
+        responses = combined_plane_wave_responses(
+            radial_E, radial_H, k0r, outside, n_medium, **plane_wave_data
+        )
+        return tuple(
+            (positions_loop(bead_center, kx, ky, kz, response) if calculate else response)
+            for calculate, response in zip((calculate_electric, calculate_magnetic), responses)
+        )
+
+    loop = (
+        combined_coordinates_loop
+        if parallel_axis == "plane_waves"
+        else combined_coordinates_loop_over_points
+    )
+    return loop(
+        bead_center,
+        radial_E,
+        radial_H,
+        k0r,
+        outside,
+        n_medium,
+        kx=kx,
+        ky=ky,
+        **plane_wave_data,
+        n_threads=n_threads,
+    )
+
+
+def plane_wave_responses(
+    objective: Objective,
+    bead: Bead,
+    n_orders: int,
+    bfp_sampling_n: int,
+    local_coordinates: LocalBeadCoordinates,
+    calculate_total_field: bool = True,
+    calculate_electric_field: bool = True,
+    calculate_magnetic_field: bool = False,
+    num_threads: Optional[int] = None,
+):
+    """Calculate the response of a bead at the origin to every plane wave in the aperture, for a
+    unit amplitude of the polarization along theta and along phi, at all coordinates in
+    `local_coordinates`. The fields of a bead in a focus are linear in the far field amplitudes
+    `Einf_theta` and `Einf_phi` of the plane waves, and are therefore a weighted sum of these
+    responses, see `plane_wave_response_factory()`.
+
+    The responses take 2 x 3 x 16 bytes per plane wave, point and field (electric and/or magnetic),
+    and are therefore only suitable for a modest number of points, or a modest number of plane
+    waves.
+
+    Returns
+    -------
+    geometry : PlaneWaves
+        The plane waves in the aperture, without input field
+    responses_E, responses_H : Optional[np.ndarray]
+        The responses of the electric and magnetic field, or None if they are not requested, with
+        shape (2 x number of plane waves, 3, number of points). The first half of the responses is
+        for the polarization along theta, the second half for the polarization along phi.
+    """
+    bfp_coords, bfp_fields = objective.sample_back_focal_plane(None, bfp_sampling_n)
+    geometry = objective.back_focal_plane_to_farfield(
+        bfp_coords, bfp_fields, bead.lambda_vac
+    ).plane_waves()
+
+    coordinates = NearZoneBeadCoordinates(local_coordinates)
+    r = coordinates.r
+    legendre_data, legendre_data_dtheta = calculate_legendre_tables(coordinates, geometry, n_orders)
+    radial_E, radial_H = lazy_radial_tables(bead, r, n_orders)(
+        calculate_electric_field, calculate_magnetic_field
+    )
+    unit_amplitude = geometry.weights.astype("complex128")
+    no_amplitude = np.zeros_like(unit_amplitude)
+    num_threads = 1 if num_threads is None else min(max(1, int(num_threads)), NUMBA_NUM_THREADS)
+    with thread_limiter(num_threads):
+        responses = [
+            combined_plane_wave_responses(
+                radial_E,
+                radial_H,
+                bead.k * r,
+                r > bead.bead_diameter / 2,
+                bead.n_medium,
+                cos_theta=geometry.cos_theta,
+                sin_theta=geometry.sin_theta,
+                cos_phi=geometry.cos_phi,
+                sin_phi=geometry.sin_phi,
+                kz=geometry.kz,
+                Einf_theta=Einf_theta,
+                Einf_phi=Einf_phi,
+                legendre_data=legendre_data,
+                legendre_data_dtheta=legendre_data_dtheta,
+                r=r,
+                local_coords=coordinates.xyz_stacked,
+                total=calculate_total_field,
+                calculate_electric=calculate_electric_field,
+                calculate_magnetic=calculate_magnetic_field,
+            )
+            for Einf_theta, Einf_phi in (
+                (unit_amplitude, no_amplitude),
+                (no_amplitude, unit_amplitude),
             )
-            for calculate in (calculate_electric_field, calculate_magnetic_field)
         ]
-        for field, storage in zip((E, H), (E_field, H_field)):
-            if field is not None:
-                storage *= phase_correction_factor
-                for pos_idx in range(len(bead_center)):
-                    for idx, component in enumerate(field):
-                        component[pos_idx, region] = storage[pos_idx, idx, :]
-
-        ret_val = tuple()
-        if calculate_electric_field:
-            Ex, Ey, Ez = [np.squeeze(component) for component in E]
-            ret_val = (Ex, Ey, Ez)
-
-        if calculate_magnetic_field:
-            Hx, Hy, Hz = [np.squeeze(component) for component in H]
-            ret_val += (Hx, Hy, Hz)
-        return ret_val
+    responses_E, responses_H = [
+        np.concatenate([response[idx] for response in responses]) if calculate else None
+        for idx, calculate in enumerate((calculate_electric_field, calculate_magnetic_field))
+    ]
+    return geometry, responses_E, responses_H
+
+
+def plane_wave_response_factory(
+    objective: Objective,
+    bead: Bead,
+    n_orders: int,
+    bfp_sampling_n: int,
+    local_coordinates: LocalBeadCoordinates,
+    calculate_total_field: bool = True,
+    calculate_electric_field: bool = True,
+    calculate_magnetic_field: bool = False,
+    num_threads: Optional[int] = None,
+):
+    """Create a closure that calculates the fields of a bead in a focus, for all coordinates in
+    `local_coordinates`, for any input field. The response of the bead to every plane wave in the
+    aperture is calculated once with `plane_wave_responses()`, and the fields for an input field
+    and a set of bead positions are a weighted sum of these responses: a single matrix product.
+
+    The closure takes the far field data of an input field, sampled with `bfp_sampling_n` samples,
+    and an array of bead positions with shape (N, 3), and returns the electric and magnetic fields
+    with the shape (N, 3, number of points), or None if they are not requested."""
+    geometry, *responses = plane_wave_responses(
+        objective,
+        bead,
+        n_orders,
+        bfp_sampling_n,
+        local_coordinates,
+        calculate_total_field,
+        calculate_electric_field,
+        calculate_magnetic_field,
+        num_threads,
+    )
+    kx, ky, kz, rows, cols = geometry.kx, geometry.ky, geometry.kz, geometry.rows, geometry.cols
+    # Flatten the components and points, such that a field is a single matrix product with the
+    # weights of the plane waves
+    flat_responses = [
+        None if response is None else response.reshape(2 * geometry.size, -1)
+        for response in responses
+    ]
+    phase_correction_factor = plane_wave_phase_correction_factor(objective, bead, bfp_sampling_n)
+
+    def calculate_field(farfield_data: FarfieldData, bead_center: np.ndarray):
+        if farfield_data.aperture.shape != geometry.grid_shape:
+            raise ValueError(
+                "The far field data has to be sampled with the same number of samples of the back "
+                "focal plane as the responses"
+            )
+        amplitudes = np.concatenate(
+            (farfield_data.Einf_theta[rows, cols], farfield_data.Einf_phi[rows, cols])
+        )
+        x0, y0, z0 = np.atleast_2d(bead_center).T
+        phases = np.exp(1j * (np.outer(x0, kx) + np.outer(y0, ky) + np.outer(z0, kz)))
+        weights = np.tile(phases, 2) * (amplitudes * phase_correction_factor)
+        return tuple(
+            None if response is None else (weights @ response).reshape(len(x0), 3, -1)
+            for response in flat_responses
+        )
 
     return calculate_field
+
+
+def plane_wave_arguments(plane_waves: PlaneWaves):
+    """Return the properties of the plane waves as keyword arguments for the kernels, with the
+    quadrature weights applied to the amplitudes"""
+    Einf_theta, Einf_phi = plane_waves.weighted_amplitudes()
+    return dict(
+        cos_theta=plane_waves.cos_theta,
+        sin_theta=plane_waves.sin_theta,
+        cos_phi=plane_waves.cos_phi,
+        sin_phi=plane_waves.sin_phi,
+        kx=plane_waves.kx,
+        ky=plane_waves.ky,
+        kz=plane_waves.kz,
+        Einf_theta=Einf_theta,
+        Einf_phi=Einf_phi,
+    )
+
+
+def plane_wave_phase_correction_factor(objective: Objective, bead: Bead, bfp_sampling_n: int):
+    """Return the factor with which the sum of the plane waves is multiplied to obtain the focused
+    field, which includes the area of a sample of the back focal plane"""
+    dk = bead.k * objective.NA / bead.n_medium / (bfp_sampling_n - 1)
+    return (-1j * objective.focal_length) * (
+        np.exp(-1j * bead.k * objective.focal_length) * dk**2 / (2 * np.pi)
+    )
@@ -0,0 +1,168 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.constants import mu_0 as MU0
+from scipy.constants import speed_of_light as C
+
+from ..farfield_data import FarfieldData
+from ..psf.fast import plane_wave_sum_czt_factory
+from .local_coordinates import LocalBeadCoordinates
+
+
+def incident_plane_wave_sum_factory(
+    farfield_data: FarfieldData,
+    bfp_sampling_n: int,
+    dk: float,
+    n_medium: float,
+):
+    """Create a closure that sums the incident plane waves of `farfield_data` on a grid that is
+    regularly spaced along x and y, by means of the chirp-z transform, see
+    `plane_wave_sum_czt_factory()`. The amplitudes of the plane waves are calculated once, and the
+    chirp-z transforms are reused for as long as the lateral extent of the grid does not change,
+    such as for consecutive planes of constant z.
+
+    The closure takes the x- and y-axis of the grid, the z-coordinates, the position of the bead and
+    the fields that are requested, and returns the list of the requested field components, without
+    the phase correction factor."""
+    kx, ky, kz = farfield_data.kx, farfield_data.ky, farfield_data.kz
+    k = np.hypot(np.hypot(kx, ky), kz)
+    # Amplitudes of the plane waves, divided by kz to match the kernels in `numba_implementation`
+    E_amplitudes = [E / kz for E in farfield_data.transform_to_xyz()]
+    Ex, Ey, Ez = E_amplitudes
+    # H = n_medium / (c * mu_0) * (k / |k|) x E, for every plane wave
+    H_amplitudes = [
+        component * n_medium / (C * MU0)
+        for component in ((ky * Ez - kz * Ey) / k, (kz * Ex - kx * Ez) / k, (kx * Ey - ky * Ex) / k)
+    ]
+    # The chirp-z transforms for the most recent lateral extent of the grid
+    czt = {}
+
+    def _axis_range(axis: np.ndarray, center: float):
+        if axis.size == 1:
+            return axis[0] + center, 0.0
+        return 0.5 * (axis[0] + axis[-1]) + center, 0.5 * (axis[-1] - axis[0])
+
+    def plane_wave_sum(
+        x: np.ndarray,
+        y: np.ndarray,
+        z: np.ndarray,
+        bead_center: Tuple[float, float, float],
+        calculate_electric_field: bool = True,
+        calculate_magnetic_field: bool = False,
+    ):
+        x0, y0, z0 = bead_center
+        extent = (*_axis_range(x, x0), x.size, *_axis_range(y, y0), y.size)
+        if extent not in czt:
+            czt.clear()
+            czt[extent] = plane_wave_sum_czt_factory(kz, dk, bfp_sampling_n, *extent)
+        amplitudes = (E_amplitudes if calculate_electric_field else []) + (
+            H_amplitudes if calculate_magnetic_field else []
+        )
+        return czt[extent](amplitudes, z + z0)
+
+    return plane_wave_sum
+
+
+def incident_field_factory(
+    farfield_data: FarfieldData,
+    bfp_sampling_n: int,
+    dk: float,
+    n_medium: float,
+    phase_correction_factor: complex,
+    local_coordinates: LocalBeadCoordinates,
+    plane_wave_sum: Optional[callable] = None,
+):
+    """Create a closure that calculates the incident (focused) field on the grid of
+    `local_coordinates`, by means of the chirp-z transform. This is equivalent to, but much faster
+    than, summing the incident plane waves at every point in the grid.
+
+    The closure from `incident_plane_wave_sum_factory()` for the same arguments can be passed as
+    `plane_wave_sum`, to share its set up between several grids.
+
+    Returns None if `local_coordinates` are not a grid that is regularly spaced along x and y, as
+    required by the chirp-z transform.
+    """
+    axes = local_coordinates.regular_grid_axes
+    if axes is None:
+        return None
+    x, y, z = axes
+    if plane_wave_sum is None:
+        plane_wave_sum = incident_plane_wave_sum_factory(
+            farfield_data, bfp_sampling_n, dk, n_medium
+        )
+
+    def calculate_incident_field(
+        bead_center: np.ndarray,
+        calculate_electric_field: bool = True,
+        calculate_magnetic_field: bool = False,
+    ):
+        """Return the incident electric and/or magnetic field at the grid points of the local
+        coordinates, for every bead center in `bead_center`. The fields have the shape
+        (len(bead_center), 3, *coordinate_shape), or are None if they are not requested."""
+        n_fields = int(calculate_electric_field) + int(calculate_magnetic_field)
+        storage = np.empty(
+            (n_fields, len(bead_center), 3, x.size, y.size, z.size), dtype="complex128"
+        )
+        for pos_idx, position in enumerate(bead_center):
+            fields = plane_wave_sum(
+                x, y, z, position, calculate_electric_field, calculate_magnetic_field
+            )
+            for idx, field in enumerate(fields):
+                storage[idx // 3, pos_idx, idx % 3] = field
+        storage *= phase_correction_factor
+        shape = (len(bead_center), 3, *local_coordinates.coordinate_shape)
+        E = storage[0].reshape(shape) if calculate_electric_field else None
+        H = storage[-1].reshape(shape) if calculate_magnetic_field else None
+        return E, H
+
+    return calculate_incident_field
+
+
+def incident_field_at_points_factory(
+    farfield_data: FarfieldData,
+    n_medium: float,
+    phase_correction_factor: complex,
+    local_coordinates: LocalBeadCoordinates,
+):
+    """Create a closure that calculates the incident (focused) field at the points of
+    `local_coordinates`, which need not be a grid, by summing the plane waves in the aperture. The
+    phase factors of the plane waves at the points are calculated once, such that the field for a
+    bead position is a single matrix product. This is intended for a modest number of points, such
+    as the points of an integration scheme on a sphere around the bead."""
+    plane_waves = farfield_data.plane_waves()
+    kx, ky, kz = plane_waves.kx, plane_waves.ky, plane_waves.kz
+    k = np.hypot(np.hypot(kx, ky), kz)
+    Ex, Ey, Ez = [E * (plane_waves.weights / kz) for E in plane_waves.transform_to_xyz()]
+    H_factor = n_medium / (C * MU0)
+    amplitudes = np.stack(
+        (
+            Ex,
+            Ey,
+            Ez,
+            (ky * Ez - kz * Ey) / k * H_factor,
+            (kz * Ex - kx * Ez) / k * H_factor,
+            (kx * Ey - ky * Ex) / k * H_factor,
+        )
+    )
+    x, y, z = local_coordinates.xyz_stacked
+    # Phase factors of the plane waves at the points, with shape (number of plane waves, points)
+    phases = np.exp(1j * (np.outer(kx, x) + np.outer(ky, y) + np.outer(kz, z)))
+
+    def calculate_incident_field(
+        bead_center: np.ndarray,
+        calculate_electric_field: bool = True,
+        calculate_magnetic_field: bool = False,
+    ):
+        """Return the incident electric and/or magnetic field at the points of the local
+        coordinates, for every bead center in `bead_center`. The fields have the shape
+        (len(bead_center), 3, number of points), or are None if they are not requested."""
+        rows = slice(0 if calculate_electric_field else 3, 6 if calculate_magnetic_field else 3)
+        storage = np.empty((len(bead_center), rows.stop - rows.start, x.size), dtype="complex128")
+        for pos_idx, (x0, y0, z0) in enumerate(bead_center):
+            bead_phase = np.exp(1j * (kx * x0 + ky * y0 + kz * z0)) * phase_correction_factor
+            storage[pos_idx] = (amplitudes[rows] * bead_phase) @ phases
+        E = storage[:, :3] if calculate_electric_field else None
+        H = storage[:, -3:] if calculate_magnetic_field else None
+        return E, H
+
+    return calculate_incident_field
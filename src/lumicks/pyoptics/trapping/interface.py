@@ -1,17 +1,55 @@
+import hashlib
 import logging
-from typing import Optional, Tuple
+from dataclasses import replace
+from os import PathLike
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
 
 import numpy as np
 from scipy.constants import epsilon_0 as EPS0
 from scipy.constants import mu_0 as MU0
 from scipy.constants import speed_of_light as _C
 
+from ..farfield_data import FarfieldData
 from ..mathutils.lebedev_laikov import get_integration_locations, get_nearest_order
-from ..objective import Objective
+from ..objective import BackFocalPlaneFields, Objective
+from ..sampling import new_samples_mask, refined_bfp_sampling_n, resolve_bfp_sampling_n
+from .azimuthal_harmonics import AzimuthalFieldHarmonics
 from .bead import Bead
-from .focused_field_calculation import focus_field_factory
+from .field_output import FieldOutput
+from .focused_field_calculation import (
+    combined_field_factory,
+    focus_field_factory,
+    focus_plane_waves,
+    plane_wave_phase_correction_factor,
+    plane_wave_response_factory,
+    plane_wave_responses,
+    stacked_field_buffer,
+)
+from .incident_field import incident_field_at_points_factory
 from .local_coordinates import LocalBeadCoordinates
-from .plane_wave_field_calculation import plane_wave_field_factory
+from .memory import MemoryEstimate, estimate_memory
+from .mie_power import multipole_power_factory
+from .plane_wave_field_calculation import combined_plane_wave_field_factory
+from .quantities import check_quantities, output_names, reduce_fields, requires_magnetic_field
+from .spherical_field_calculation import spherical_field_factory
+from .symmetry import MIRROR_AXES, component_sign, input_field_parity, is_symmetric
+
+OBSERVABLES = ("force", "torque", "absorbed_power", "scattered_power")
+# Highest available order of the Lebedev-Laikov integration scheme
+_MAX_INTEGRATION_ORDER = 131
+# Integration orders that were chosen adaptively, for every combination of bead, objective and input
+# field, see `observables_factory()`. The least recently used orders are evicted beyond
+# `_MAX_CACHED_INTEGRATION_ORDERS` entries.
+_integration_order_cache = {}
+_MAX_CACHED_INTEGRATION_ORDERS = 256
+# Maximum number of refinements of the sampling of the back focal plane, see `fields_focus()`
+_MAX_BFP_REFINEMENTS = 3
+# Maximum number of locations on which the refinement of the sampling of the back focal plane is
+# decided, if the locations are processed in chunks, see `fields_focus()`
+_BFP_REFINEMENT_PROBE_POINTS = 10_000
+# Sampling of the back focal plane with which the symmetry of the input field is detected, if the
+# sampling of the calculation is not known yet, see `fields_focus()`
+_SYMMETRY_BFP_SAMPLING_N = 21
 
 
 def fields_focus_gaussian(
@@ -30,6 +68,13 @@ def fields_focus_gaussian(
     magnetic_field=False,
     verbose=False,
     grid=True,
+    far_zone_tolerance=None,
+    max_memory: Optional[int] = None,
+    output: Optional[Union[str, PathLike]] = None,
+    quantities: Optional[Union[str, Tuple[str, ...]]] = None,
+    bfp_sampling_tolerance: Optional[float] = None,
+    pruning_tolerance: Optional[float] = None,
+    symmetry: Optional[Union[str, Dict[str, int]]] = None,
 ):
     """
     Calculate the three-dimensional electromagnetic field of a bead the focus of a of a Gaussian
@@ -61,7 +106,7 @@ def fields_focus_gaussian(
         center in 3D space, in meters
     bfp_sampling_n : (Default value = 31) Number of discrete steps with
         which the back focal plane is sampled, from the center to the edge. The total number of
-        plane waves scales with the square of bfp_sampling_n
+        plane waves scales with the square of bfp_sampling_n. Can be "auto", see `fields_focus()`
     num_orders : number of order that should be included in the
         calculation the Mie solution. If it is `None` (default), the code will use the
         `number_of_orders()` method to calculate a sufficient number.
@@ -82,6 +127,21 @@ def fields_focus_gaussian(
         the numpy.meshgrid output. If False, interpret the x, y and z vectors as the exact locations
         where the field needs to be evaluated. In that case, all vectors need to be of the same
         length.
+    far_zone_tolerance: float, optional
+        See `fields_focus()`. Default is None.
+    max_memory: int, optional
+        See `fields_focus()`. Default is None.
+    output: Union[str, PathLike], optional
+        See `fields_focus()`. Default is None.
+    quantities: Union[str, Tuple[str, ...]], optional
+        See `fields_focus()`. Default is None.
+    bfp_sampling_tolerance: float, optional
+        See `fields_focus()`. Default is None.
+    pruning_tolerance: float, optional
+        See `fields_focus()`. Default is None.
+    symmetry: Optional[Union[str, Dict[str, int]]]
+        See `fields_focus()`. The input field is polarized along x, and has the parities
+        {"x": -1, "y": 1}. Default is None.
 
     Returns
     -------
@@ -136,6 +196,13 @@ def fields_focus_gaussian(
         magnetic_field=magnetic_field,
         verbose=verbose,
         grid=grid,
+        far_zone_tolerance=far_zone_tolerance,
+        max_memory=max_memory,
+        output=output,
+        quantities=quantities,
+        bfp_sampling_tolerance=bfp_sampling_tolerance,
+        pruning_tolerance=pruning_tolerance,
+        symmetry=symmetry,
     )
 
 
@@ -154,6 +221,15 @@ def fields_focus(
     magnetic_field=False,
     verbose=False,
     grid=True,
+    far_zone_tolerance: Optional[float] = None,
+    max_memory: Optional[int] = None,
+    output: Optional[Union[str, PathLike]] = None,
+    quantities: Optional[Union[str, Tuple[str, ...]]] = None,
+    bfp_sampling_tolerance: Optional[float] = None,
+    pruning_tolerance: Optional[float] = None,
+    mask: Optional[Union[np.ndarray, Callable]] = None,
+    fill_value: complex = np.nan,
+    symmetry: Optional[Union[str, Dict[str, int]]] = None,
 ):
     """
     Calculate the three-dimensional electromagnetic field of a bead in the focus of an arbitrary
@@ -196,10 +272,13 @@ def fields_focus(
     bead_center : Tuple[float, float, float]
         Tuple of three floating point numbers determining the x, y and z position of the bead center
         in 3D space, in meters
-    bfp_sampling_n : int
+    bfp_sampling_n : Union[int, str]
         Number of discrete steps with which the back focal plane is sampled, from the center to the
         edge. The total number of plane waves scales with the square of bfp_sampling_n, by default
-        31.
+        31. If "auto", the smallest number of samples is chosen for which the focused field is not
+        aliased at the locations x, y and z and across the bead, see
+        `sampling.minimum_bfp_sampling_n()`. A warning is logged if the number of samples is below
+        that minimum.
     num_orders: int
         Number of orders that should be included in the calculation the Mie solution. If it is None
         (default), the code will use the Bead.number_of_orders() method to calculate a sufficient
@@ -221,11 +300,84 @@ def fields_focus(
         the numpy.meshgrid output. If False, interpret the x, y and z vectors as the exact locations
         where the field needs to be evaluated. In that case, all vectors need to be of the same
         length.
+    far_zone_tolerance: Optional[float]
+        If None (default), the scattered field is evaluated exactly at every location. Otherwise,
+        the scattered field at locations far away from the bead is evaluated with the large-argument
+        asymptotic form of the spherical Hankel functions, and without its radial component. The
+        distance from which on this approximation is used is based on the highest significant order
+        of the scattering coefficients, such that the estimated relative error of the scattered
+        field is less than `far_zone_tolerance` at every location. Close to directions in which the
+        transverse scattered field vanishes, the error is relative to the largest scattered field at
+        the same distance from the bead instead. See `radial_data.far_zone_radius()`. This saves
+        memory and calculation time for locations that are many wavelengths away from the bead.
+    max_memory: Optional[int]
+        Memory budget for the calculation, in bytes. If the estimated peak memory consumption (see
+        `memory_estimate_focus()`) exceeds the budget, the locations are processed in chunks that
+        fit the budget, and the fields are assembled chunk by chunk. If None (default), the budget
+        that is set with `set_max_memory()` is used, and if that is None as well, all locations
+        are processed at once.
+    output: Optional[Union[str, PathLike]]
+        If None (default), the fields are returned as arrays in memory. Otherwise, the path of a
+        directory to which every field component is written as a memory-mapped `.npy` file, chunk
+        by chunk. The memory-mapped arrays are returned, and the returned fields are not counted
+        against `max_memory`. If the directory contains the output of an interrupted calculation
+        with the same coordinates and parameters, the calculation is resumed, and the chunks that
+        were completed are skipped. The input field cannot be compared and has to be the same as
+        well. The fields can be opened again with `open_fields()`.
+    quantities: Optional[Union[str, Tuple[str, ...]]]
+        If None (default), return the field components. Otherwise, the name or a tuple of names of
+        quantities that are derived from the fields, and which are returned instead of the field
+        components, as real-valued arrays: "intensity" (:math:`|E|^2`, in V²/m²), "energy_density"
+        (the time-averaged electromagnetic energy density, in J/m³) and "poynting" (the three
+        components Sx, Sy and Sz of the time-averaged Poynting vector, in W/m²). The quantities are
+        derived chunk by chunk, such that the complex fields of all locations are never kept at
+        once. The magnetic field is calculated if a quantity requires it, and `magnetic_field` is
+        ignored.
+    bfp_sampling_tolerance: Optional[float]
+        If None (default), the back focal plane is sampled with `bfp_sampling_n` samples. Otherwise,
+        the sampling is refined by doubling the number of intervals between the center and the edge
+        of the back focal plane, until the largest change of the fields is less than
+        `bfp_sampling_tolerance` relative to the largest magnitude of the fields, but at most
+        three times. The refined sampling contains the previous samples, and only the
+        contributions of the new plane waves are calculated in every step. If the locations are
+        processed in chunks (see `max_memory` and `output`), the sampling is refined once, on at
+        most 10,000 locations that are evenly spread over all locations, and all chunks are
+        calculated with the resulting sampling.
+    pruning_tolerance: Optional[float]
+        If None (default), all plane waves in the aperture are used. Otherwise, the plane waves and
+        polarization channels with the least power are dropped, as long as the dropped power is at
+        most `pruning_tolerance` times the total power, see `FarfieldData.pruned()`. The fraction
+        that is kept and an upper bound of the relative error of the fields are logged at the INFO
+        level. This speeds up the calculation for beams that underfill the aperture.
+    mask: Optional[Union[np.ndarray, Callable]]
+        If None (default), the fields are calculated at every location. Otherwise, a boolean array
+        that can be broadcast to the shape of the locations, (x.size, y.size, z.size) if `grid` is
+        True and (x.size,) otherwise, or a function `mask(X, Y, Z)` that returns such an array for
+        the coordinates of the locations. The fields are only calculated at the locations where the
+        mask is True, for example in a shell around the bead or in the footprint of a detector, and
+        the grid is kept for the incident field. The other locations are set to `fill_value`.
+    fill_value: complex
+        Value of the fields, or of the quantities, at the locations that are excluded by `mask`.
+        By default NaN.
+    symmetry: Optional[Union[str, Dict[str, int]]]
+        If None (default), the fields are calculated at every location. Otherwise, the mirror
+        symmetry of the fields along x and/or y is used to calculate the fields on only half or a
+        quarter of the grid, and the fields at the mirrored locations follow from the parity of
+        every component, see `symmetry.component_sign()`. This requires that the bead center is in
+        the mirror plane, that the coordinates along the mirrored axis are symmetric around zero,
+        and that the input field is symmetric, see `symmetry.input_field_parity()`. For example, an
+        x-polarized Gaussian beam has parity -1 along x and +1 along y. The symmetry is either
+        declared as a dictionary with the parity of the input field, +1 or -1, for "x" and/or "y",
+        or is "auto", to use the symmetry along every axis for which the requirements are met.
+        "auto" does nothing if `grid` is False or `output` is not None.
 
     Raises
     ------
     ValueError: raised when the immersion medium of the bead does not match the medium of the
-    objective.
+    objective, when the calculation does not fit in the memory budget, even when processing a
+    single location at a time, when `output` contains the fields of a different calculation, or
+    when `bfp_sampling_n`, `bfp_sampling_tolerance`, `pruning_tolerance` or `mask` is invalid, or
+    when a declared `symmetry` is invalid or does not apply to the grid and the bead center.
 
     Returns
     -------
@@ -248,6 +400,9 @@ def fields_focus(
         y coordinates of the sampling grid
     Z : np.ndarray
         z coordinates of the sampling grid. These values are only returned if return_grid is True
+
+    If `quantities` is not None, the arrays of the quantities are returned in place of the fields,
+    in the order in which the quantities are given, followed by X, Y and Z if return_grid is True.
     """
     if bead.n_medium != objective.n_medium:
         raise ValueError("The immersion medium of the bead and the objective have to be the same")
@@ -258,169 +413,1438 @@ def fields_focus(
 
     # Enforce floats to ensure Numba has all floats when doing @ / np.matmul
     x, y, z = [np.atleast_1d(coord).astype(np.float64) for coord in (x, y, z)]
-    # TODO: warning criteria for undersampling/aliasing
-    # M = int(np.max((31, 2 * NA**2 * np.max(np.abs(z)) /
-    #        (np.sqrt(self.n_medium**2 - NA**2) * self.lambda_vac))))
-    # if M > bfp_sampling_n:
-    #    print('bfp_sampling_n lower than recommendation for convergence')
+    parities = _field_symmetry(
+        symmetry, f_input_field, objective, bead_center, x, y, grid, bfp_sampling_n, output
+    )
+    if parities:
+        # Calculate the fields on the part of the grid with the mirrored coordinates >= 0 (or <= 0
+        # for descending coordinates), and the locations that are mirrored onto a masked location
+        start = [
+            coord.size // 2 if axis in parities else 0 for coord, axis in zip((x, y), MIRROR_AXES)
+        ]
+        mask = _evaluation_mask(mask, x, y, z, grid)
+        reduced_mask = mask
+        if mask is not None:
+            for axis_idx, axis in enumerate(MIRROR_AXES):
+                if axis in parities:
+                    reduced_mask = np.logical_or(reduced_mask, np.flip(reduced_mask, axis_idx))
+            reduced_mask = reduced_mask[start[0] :, start[1] :]
+        logging.info(
+            f"Calculating the fields on 1/{2 ** len(parities)} of the grid, with the mirror "
+            f"symmetry along {' and '.join(parities)}"
+        )
+        reduced = fields_focus(
+            f_input_field,
+            objective,
+            bead,
+            bead_center,
+            x[start[0] :],
+            y[start[1] :],
+            z,
+            bfp_sampling_n=bfp_sampling_n,
+            num_orders=num_orders,
+            total_field=total_field,
+            magnetic_field=magnetic_field,
+            verbose=verbose,
+            far_zone_tolerance=far_zone_tolerance,
+            max_memory=max_memory,
+            quantities=quantities,
+            bfp_sampling_tolerance=bfp_sampling_tolerance,
+            pruning_tolerance=pruning_tolerance,
+            mask=reduced_mask,
+            fill_value=fill_value,
+        )
+        _, components, _, _ = _output_components(quantities, magnetic_field)
+        ret = _mirrored_fields(
+            reduced, components, parities, (x.size, y.size, z.size), start, mask, fill_value
+        )
+        logging.getLogger().setLevel(loglevel)
+        if return_grid:
+            ret += _grid_views(x, y, z)
+        return ret
+
+    bfp_sampling_n = _resolve_bfp_sampling_n(bfp_sampling_n, objective, bead, bead_center, x, y, z)
+    if bfp_sampling_tolerance is not None and bfp_sampling_tolerance <= 0:
+        raise ValueError("The tolerance of the sampling of the back focal plane has to be positive")
+    _check_pruning_tolerance(pruning_tolerance)
+    mask = _evaluation_mask(mask, x, y, z, grid)
+    final_sampling_n = bfp_sampling_n
+    if bfp_sampling_tolerance is not None:
+        for _ in range(_MAX_BFP_REFINEMENTS):
+            final_sampling_n = refined_bfp_sampling_n(final_sampling_n)
 
     n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
-    local_coordinates = LocalBeadCoordinates(x, y, z, bead.bead_diameter, bead_center, grid=grid)
+    n_points = x.size * y.size * z.size if grid else x.size
+    quantities, components, dtype, calculate_magnetic_field = _output_components(
+        quantities, magnetic_field
+    )
+    estimate = _memory_estimate(
+        objective,
+        bead,
+        n_points,
+        1,
+        final_sampling_n,
+        n_orders,
+        calculate_magnetic_field,
+        1,
+        max_memory,
+        grid_shape=(x.size, y.size, z.size) if grid else None,
+        output_in_memory=output is None,
+        output_bytes_per_point=len(components) * np.dtype(dtype).itemsize,
+    )
+    field_output = _field_output(
+        output,
+        x,
+        y,
+        z,
+        grid,
+        components,
+        dtype,
+        {
+            "function": "fields_focus",
+            "bead": repr(bead),
+            "objective": repr(objective),
+            "bead_center": [float(c) for c in bead_center],
+            "bfp_sampling_n": int(bfp_sampling_n),
+            "bfp_sampling_tolerance": (
+                None if bfp_sampling_tolerance is None else float(bfp_sampling_tolerance)
+            ),
+            "pruning_tolerance": None if pruning_tolerance is None else float(pruning_tolerance),
+            "num_orders": int(n_orders),
+            "total_field": bool(total_field),
+            "quantities": quantities,
+            "far_zone_tolerance": (
+                None if far_zone_tolerance is None else float(far_zone_tolerance)
+            ),
+            "mask": None if mask is None else hashlib.sha256(np.packbits(mask)).hexdigest(),
+            "fill_value": None if mask is None else repr(complex(fill_value)),
+        },
+    )
 
-    logging.info("Calculating auxiliary data for external fields")
-    field_fun = focus_field_factory(
-        objective=objective,
-        bead=bead,
-        n_orders=n_orders,
-        bfp_sampling_n=bfp_sampling_n,
-        f_input_field=f_input_field,
-        local_coordinates=local_coordinates,
-        internal=False,
+    def fields_with_sampling(
+        local_coordinates: LocalBeadCoordinates,
+        bfp_sampling_n: int,
+        farfield_data: Optional[FarfieldData] = None,
+    ):
+        logging.info("Calculating auxiliary data")
+        if farfield_data is None and pruning_tolerance is not None:
+            farfield_data = _pruned_farfield(
+                _sample_farfield(f_input_field, objective, bead.lambda_vac, bfp_sampling_n),
+                pruning_tolerance,
+            )
+        field_fun = combined_field_factory(
+            objective=objective,
+            bead=bead,
+            n_orders=n_orders,
+            bfp_sampling_n=bfp_sampling_n,
+            f_input_field=f_input_field,
+            local_coordinates=local_coordinates,
+            far_zone_tolerance=far_zone_tolerance,
+            farfield_data=farfield_data,
+        )
+        logging.info("Calculating fields")
+        return field_fun(bead_center, True, calculate_magnetic_field, total_field)
+
+    def refined_fields(local_coordinates: LocalBeadCoordinates):
+        return _refine_bfp_sampling(
+            lambda *args: fields_with_sampling(local_coordinates, *args),
+            f_input_field,
+            objective,
+            bead.lambda_vac,
+            bfp_sampling_n,
+            bfp_sampling_tolerance,
+            pruning_tolerance,
+        )
+
+    # The sampling with which the chunks are calculated. If the sampling is refined and the
+    # locations are processed in chunks, the refinement is decided once, such that all chunks are
+    # calculated with the same sampling.
+    chunk_sampling_n = bfp_sampling_n
+    refine_in_chunk = bfp_sampling_tolerance is not None
+    if refine_in_chunk and estimate.num_chunks > 1:
+        probe = LocalBeadCoordinates(
+            *_probe_locations(
+                x, y, z, grid, mask, min(estimate.points_per_chunk, _BFP_REFINEMENT_PROBE_POINTS)
+            ),
+            bead.bead_diameter,
+            bead_center,
+            grid=False,
+        )
+        logging.info(f"Refining bfp_sampling_n on {probe.coordinate_shape[0]} locations")
+        _, chunk_sampling_n = refined_fields(probe)
+        refine_in_chunk = False
+
+    def fields_in_chunk(x, y, z, grid, mask=mask):
+        local_coordinates = LocalBeadCoordinates(
+            x, y, z, bead.bead_diameter, bead_center, grid=grid, mask=mask
+        )
+        if refine_in_chunk:
+            fields, _ = refined_fields(local_coordinates)
+        else:
+            fields = fields_with_sampling(local_coordinates, chunk_sampling_n)
+        ret = _reduce_to_quantities(quantities, fields, local_coordinates, bead)
+        if mask is not None:
+            for values in ret:
+                values[np.logical_not(np.reshape(mask, values.shape))] = fill_value
+        return ret
+
+    if estimate.num_chunks == 1 and field_output is None:
+        ret = fields_in_chunk(x, y, z, grid)
+    else:
+        ret = _fields_in_chunks(
+            fields_in_chunk,
+            x,
+            y,
+            z,
+            grid,
+            estimate.points_per_chunk,
+            estimate.num_chunks,
+            len(components),
+            dtype,
+            field_output,
+            mask,
+            fill_value,
+        )
+
+    logging.getLogger().setLevel(loglevel)
+
+    if return_grid:
+        ret += _grid_views(x, y, z)
+
+    return ret
+
+
+def fields_focus_z_slices(
+    f_input_field,
+    objective: Objective,
+    bead: Bead,
+    bead_center=(0.0, 0.0, 0.0),
+    x=0.0,
+    y=0.0,
+    z=0.0,
+    bfp_sampling_n=31,
+    num_orders=None,
+    total_field=True,
+    magnetic_field=False,
+    far_zone_tolerance: Optional[float] = None,
+) -> Iterator[Tuple]:
+    """
+    Calculate the electromagnetic field of a bead in the focus of an arbitrary input beam in the
+    same way as `fields_focus()`, on a grid defined by x, y and z, but one plane of constant z at a
+    time. The back focal plane is sampled, and the plane waves and the chirp-z transforms of the
+    incident field are set up, once. The Legendre and radial functions are calculated for the
+    points in a single plane only, such that the memory consumption does not depend on the number
+    of planes.
+
+    Parameters
+    ----------
+    f_input_field : callable
+        Function with the input field in the back focal plane, see `fields_focus()`.
+    objective : Objective
+        Instance of the Objective class
+    bead : Bead
+        Instance of the Bead class
+    bead_center : Tuple[float, float, float]
+        Tuple of three floating point numbers determining the x, y and z position of the bead center
+        in 3D space, in meters
+    x : np.ndarray
+        Array of x locations for evaluation, in meters
+    y : np.ndarray
+        Array of y locations for evaluation, in meters
+    z : np.ndarray
+        Array of z locations of the planes, in meters
+    bfp_sampling_n : Union[int, str]
+        Number of discrete steps with which the back focal plane is sampled, from the center to the
+        edge, by default 31. Can be "auto", see `fields_focus()`.
+    num_orders: int
+        Number of orders that should be included in the calculation the Mie solution. If it is None
+        (default), the code will use the Bead.number_of_orders() method to calculate a sufficient
+        number.
+    total_field : bool
+        If True (default), return the total field of incident and scattered electromagnetic field,
+        see `fields_focus()`.
+    magnetic_field: bool
+        If True, return the magnetic fields as well. Default is False.
+    far_zone_tolerance: Optional[float]
+        See `fields_focus()`. Default is None.
+
+    Returns
+    -------
+    Iterator[Tuple]
+        A generator that yields the tuple (z, Ex, Ey, Ez), or (z, Ex, Ey, Ez, Hx, Hy, Hz) if
+        `magnetic_field` is True, for every location in `z`, in order. The fields are the same as
+        those that `fields_focus()` returns for that plane, with the shape (x.size, y.size), and
+        dimensions of size one removed.
+
+    Raises
+    ------
+    ValueError: raised when the immersion medium of the bead does not match the medium of the
+    objective.
+    """
+    if bead.n_medium != objective.n_medium:
+        raise ValueError("The immersion medium of the bead and the objective have to be the same")
+
+    x, y, z = [np.atleast_1d(coord).astype(np.float64) for coord in (x, y, z)]
+    bfp_sampling_n = _resolve_bfp_sampling_n(bfp_sampling_n, objective, bead, bead_center, x, y, z)
+    n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
+    # The plane waves, the far zone and the chirp-z transforms are the same for every plane
+    focus = focus_plane_waves(
+        objective, bead, n_orders, bfp_sampling_n, f_input_field, far_zone_tolerance
+    )
+
+    def slices():
+        for z_plane in z:
+            local_coordinates = LocalBeadCoordinates(
+                x, y, np.atleast_1d(z_plane), bead.bead_diameter, bead_center, grid=True
+            )
+            field_fun = combined_field_factory(
+                objective=objective,
+                bead=bead,
+                n_orders=n_orders,
+                bfp_sampling_n=bfp_sampling_n,
+                f_input_field=f_input_field,
+                local_coordinates=local_coordinates,
+                focus=focus,
+            )
+            yield (z_plane, *field_fun(bead_center, True, magnetic_field, total_field))
+
+    return slices()
+
+
+def memory_estimate_focus(
+    objective: Objective,
+    bead: Bead,
+    x=0.0,
+    y=0.0,
+    z=0.0,
+    bfp_sampling_n=31,
+    num_orders=None,
+    magnetic_field=False,
+    grid=True,
+    max_memory: Optional[int] = None,
+    num_positions: Optional[int] = None,
+    num_threads: int = 1,
+) -> MemoryEstimate:
+    """
+    Estimate the peak memory consumption of a calculation of the fields of a bead in a focus, and
+    the chunks in which the calculation is executed to fit in a memory budget, without doing the
+    calculation. This allows for sizing jobs before they are run.
+
+    Parameters
+    ----------
+    objective : Objective
+        Instance of the Objective class
+    bead : Bead
+        Instance of the Bead class
+    x : np.ndarray
+        Array of x locations for evaluation, in meters
+    y : np.ndarray
+        Array of y locations for evaluation, in meters
+    z : np.ndarray
+        Array of z locations for evaluation, in meters
+    bfp_sampling_n : int
+        Number of discrete steps with which the back focal plane is sampled, from the center to the
+        edge, by default 31.
+    num_orders: int
+        Number of orders that should be included in the calculation the Mie solution. If it is None
+        (default), the code will use the Bead.number_of_orders() method to calculate a sufficient
+        number.
+    magnetic_field: bool
+        If True, the magnetic field is calculated as well. Default is False.
+    grid: bool
+        Interpretation of x, y and z, see `fields_focus()`. Default is True.
+    max_memory: Optional[int]
+        Memory budget in bytes. If None (default), the budget that is set with `set_max_memory()` is
+        used.
+    num_positions: Optional[int]
+        If None (default), estimate the memory of `fields_focus()`, which processes the locations
+        in chunks. Otherwise, estimate the memory of the function returned by `field_factory()` for
+        `num_positions` bead positions, which processes the bead positions in chunks.
+    num_threads: int
+        Number of threads that is used for the calculation. Default is 1.
+
+    Returns
+    -------
+    MemoryEstimate
+        The estimated memory consumption, in bytes, and the size and number of chunks.
+
+    Raises
+    ------
+    ValueError
+        Raised when the calculation does not fit in the memory budget.
+    """
+    n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
+    x, y, z = [np.atleast_1d(coord) for coord in (x, y, z)]
+    n_points = x.size * y.size * z.size if grid else x.size
+    chunk_points = num_positions is None
+    return _memory_estimate(
+        objective,
+        bead,
+        n_points,
+        1 if chunk_points else num_positions,
+        bfp_sampling_n,
+        n_orders,
+        magnetic_field,
+        num_threads,
+        max_memory,
+        chunk_points=chunk_points,
+        grid_shape=(x.size, y.size, z.size) if grid else None,
     )
-    logging.info("Calculating external fields")
-    external_fields = field_fun(bead_center, True, magnetic_field, total_field)
 
-    logging.info("Calculating auxiliary data for internal fields")
-    field_fun = focus_field_factory(
+
+def fields_focus_spherical(
+    f_input_field,
+    objective: Objective,
+    bead: Bead,
+    r,
+    theta,
+    phi,
+    bead_center=(0.0, 0.0, 0.0),
+    bfp_sampling_n=31,
+    num_orders=None,
+    return_grid=False,
+    total_field=True,
+    magnetic_field=False,
+    verbose=False,
+    num_threads: Optional[int] = None,
+):
+    """
+    Calculate the electromagnetic field of a bead in the focus of an arbitrary input beam, on a
+    spherical grid around the bead. The grid consists of all combinations of the radii `r`, the
+    polar angles `theta` and the azimuthal angles `phi`, in a coordinate system centered on the
+    bead. This is useful for, e.g., detection spheres or evaluating the fields on (shells around)
+    the surface of the bead.
+
+    The radial dependence of the fields is calculated once per radius, and the angular dependence
+    once per direction. This is considerably faster than `fields_focus()` for the same number of
+    points.
+
+    Parameters
+    ----------
+    f_input_field : callable
+        Function with signature `f(aperture, x_bfp, y_bfp, r_bfp, r_max, bfp_sampling_n)`. See
+        `fields_focus()` for details.
+    objective : Objective
+        Instance of the Objective class
+    bead : Bead
+        Instance of the Bead class
+    r : np.ndarray
+        Array of distances to the center of the bead, in meters. Fields at distances less than or
+        equal to the radius of the bead are internal fields.
+    theta : np.ndarray
+        Array of polar angles, in radians, with respect to the positive z axis.
+    phi : np.ndarray
+        Array of azimuthal angles, in radians, with respect to the positive x axis.
+    bead_center : Tuple[float, float, float]
+        Tuple of three floating point numbers determining the x, y and z position of the bead center
+        in 3D space, in meters
+    bfp_sampling_n : int
+        Number of discrete steps with which the back focal plane is sampled, from the center to the
+        edge. The total number of plane waves scales with the square of bfp_sampling_n, by default
+        31.
+    num_orders: int
+        Number of orders that should be included in the calculation the Mie solution. If it is None
+        (default), the code will use the Bead.number_of_orders() method to calculate a sufficient
+        number.
+    return_grid : bool
+        Return the sampling grid in the matrices R, Theta and Phi, by default False
+    total_field : bool
+        If True, return the total field of incident and scattered electromagnetic field (default).
+        If False, then only return the scattered field outside the bead. Inside the bead, the full
+        field is always returned.
+    magnetic_field: bool
+        If True, return the magnetic fields as well. If false (default), do not return the magnetic
+        fields.
+    verbose: bool
+        If True, print statements on the progress of the calculation. Default is False
+    num_threads: Optional[int]
+        The number of threads to use for the calculation. Default is None, which uses one thread.
+
+    Raises
+    ------
+    ValueError: raised when the immersion medium of the bead does not match the medium of the
+    objective.
+
+    Returns
+    -------
+    Ex : np.ndarray
+        The electric field along x, as a function of (r, theta, phi)
+    Ey : np.ndarray
+        The electric field along y, as a function of (r, theta, phi)
+    Ez : np.ndarray
+        The electric field along z, as a function of (r, theta, phi)
+    Hx : np.ndarray
+        The magnetic field along x, as a function of (r, theta, phi)
+    Hy : np.ndarray
+        The magnetic field along y, as a function of (r, theta, phi)
+    Hz : np.ndarray
+        The magnetic field along z, as a function of (r, theta, phi). These values are only returned
+        when magnetic_field is True
+    R : np.ndarray
+        Radial coordinates of the sampling grid
+    Theta : np.ndarray
+        Polar angles of the sampling grid
+    Phi : np.ndarray
+        Azimuthal angles of the sampling grid. These values are only returned if return_grid is
+        True
+    """
+    if bead.n_medium != objective.n_medium:
+        raise ValueError("The immersion medium of the bead and the objective have to be the same")
+
+    loglevel = logging.getLogger().getEffectiveLevel()
+    if verbose:
+        logging.getLogger().setLevel(logging.INFO)
+
+    r, theta, phi = [np.atleast_1d(coord).astype(np.float64) for coord in (r, theta, phi)]
+    if np.any(r < 0):
+        raise ValueError("The radial coordinates need to be positive")
+
+    n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
+
+    logging.info("Calculating auxiliary data for the spherical grid")
+    field_fun = spherical_field_factory(
         objective=objective,
         bead=bead,
         n_orders=n_orders,
         bfp_sampling_n=bfp_sampling_n,
         f_input_field=f_input_field,
-        local_coordinates=local_coordinates,
-        internal=True,
+        r=r,
+        theta=theta,
+        phi=phi,
     )
+    logging.info("Calculating fields")
+    ret = field_fun(bead_center, True, magnetic_field, total_field, num_threads)
+
+    logging.getLogger().setLevel(loglevel)
 
-    logging.info("Calculating internal fields")
-    internal_fields = field_fun(bead_center, True, magnetic_field)
+    if return_grid:
+        grid = np.meshgrid(r, theta, phi, indexing="ij")
+        ret += tuple(np.squeeze(axis) for axis in grid)
 
-    for external, internal in zip(external_fields, internal_fields):
-        external += internal
-    ret = external_fields
+    return ret
 
-    logging.getLogger().setLevel(loglevel)
 
-    if return_grid:
-        grid = np.meshgrid(x, y, z, indexing="ij")
-        X, Y, Z = (np.squeeze(axis) for axis in grid)
-        ret += (X, Y, Z)
+def fields_focus_harmonics(
+    f_input_field,
+    objective: Objective,
+    bead: Bead,
+    rho,
+    z,
+    bead_z: float = 0.0,
+    bfp_sampling_n=31,
+    num_orders=None,
+    max_harmonic: int = 2,
+    total_field=True,
+    magnetic_field=False,
+    verbose=False,
+    far_zone_tolerance: Optional[float] = None,
+):
+    """
+    Calculate the azimuthal harmonics of the electromagnetic field of a bead on the optical axis,
+    in the focus of an input beam whose fields only contain low azimuthal harmonics. Examples of
+    such beams are linearly or circularly polarized beams with a rotationally symmetric amplitude
+    profile, such as the Gaussian beam in `fields_focus_gaussian()`. The harmonics are calculated on
+    a two-dimensional (rho, z) half-plane, from which the fields can be resynthesized at any
+    azimuthal angle or on a full three-dimensional grid. Compared to evaluating the fields on a
+    three-dimensional grid with `fields_focus()`, this reduces the number of evaluations from
+    O(N^3) to O(N^2).
+
+    The fields are evaluated at `2 * max_harmonic + 1` equally spaced azimuthal angles for every
+    (rho, z), and transformed to harmonics with a discrete Fourier transform. Harmonics with an
+    order higher than `max_harmonic` alias onto lower orders. For a linearly or circularly polarized
+    input beam, the Cartesian field components only contain orders up to two. Note that the
+    sampling of the back focal plane with a square grid breaks the rotational symmetry somewhat,
+    which results in (small) higher harmonics, see `bfp_sampling_n`.
+
+    Parameters
+    ----------
+    f_input_field : callable
+        Function with signature `f(aperture, x_bfp, y_bfp, r_bfp, r_max, bfp_sampling_n)`. See
+        `fields_focus()` for details.
+    objective : Objective
+        Instance of the Objective class
+    bead : Bead
+        Instance of the Bead class
+    rho : np.ndarray
+        Array of radial distances to the optical axis, in meters. Must be non-negative.
+    z : np.ndarray
+        Array of locations along the optical axis, in meters.
+    bead_z : float, optional
+        Location of the bead center on the optical axis, in meters. By default 0.0
+    bfp_sampling_n : int, optional
+        Number of discrete steps with which the back focal plane is sampled, from the center to the
+        edge, by default 31.
+    num_orders : int, optional
+        Number of orders that should be included in the calculation the Mie solution. If it is None
+        (default), the code will use the Bead.number_of_orders() method to calculate a sufficient
+        number.
+    max_harmonic : int, optional
+        Highest azimuthal order to calculate, by default 2.
+    total_field : bool, optional
+        If True, return the total field of incident and scattered electromagnetic field (default).
+        If False, then only return the scattered field outside the bead. Inside the bead, the full
+        field is always returned.
+    magnetic_field : bool, optional
+        If True, include the magnetic fields as well. If false (default), only the electric field is
+        calculated.
+    verbose : bool, optional
+        If True, print statements on the progress of the calculation. Default is False
+    far_zone_tolerance : Optional[float], optional
+        See `fields_focus()`. Default is None.
+
+    Returns
+    -------
+    AzimuthalFieldHarmonics
+        Object containing the harmonics of the fields, which can resynthesize the fields at any
+        azimuthal angle with `AzimuthalFieldHarmonics.evaluate()`, or on a three-dimensional grid
+        with `AzimuthalFieldHarmonics.to_grid()`.
+
+    Raises
+    ------
+    ValueError
+        Raised if `max_harmonic` is negative or if `rho` contains negative values.
+    """
+    max_harmonic = int(max_harmonic)
+    if max_harmonic < 0:
+        raise ValueError("max_harmonic needs to be zero or larger")
+    rho, z = [np.atleast_1d(coord).astype(np.float64) for coord in (rho, z)]
+    if np.any(rho < 0):
+        raise ValueError("rho needs to be non-negative")
+
+    num_phi = 2 * max_harmonic + 1
+    phi = 2 * np.pi * np.arange(num_phi) / num_phi
+    Rho, Phi, Z = np.meshgrid(rho, phi, z, indexing="ij")
+
+    fields = fields_focus(
+        f_input_field,
+        objective,
+        bead,
+        bead_center=(0.0, 0.0, bead_z),
+        x=(Rho * np.cos(Phi)).reshape(-1),
+        y=(Rho * np.sin(Phi)).reshape(-1),
+        z=Z.reshape(-1),
+        bfp_sampling_n=bfp_sampling_n,
+        num_orders=num_orders,
+        total_field=total_field,
+        magnetic_field=magnetic_field,
+        verbose=verbose,
+        grid=False,
+        far_zone_tolerance=far_zone_tolerance,
+    )
+    fields = np.stack([field.reshape(Rho.shape) for field in fields])
+
+    # Discrete Fourier transform along phi, and reorder as m = -max_harmonic ... max_harmonic
+    harmonics = np.fft.fftshift(np.fft.fft(fields, axis=2) / num_phi, axes=2)
+    harmonics = np.transpose(harmonics, (0, 2, 1, 3))
+
+    return AzimuthalFieldHarmonics(rho, z, harmonics, max_harmonic)
+
+
+def fields_plane_wave(
+    bead: Bead,
+    x,
+    y,
+    z,
+    theta=0,
+    phi=0,
+    polarization=(1, 0),
+    num_orders=None,
+    return_grid=False,
+    total_field=True,
+    magnetic_field=False,
+    verbose=False,
+    grid=True,
+    max_memory: Optional[int] = None,
+    output: Optional[Union[str, PathLike]] = None,
+    quantities: Optional[Union[str, Tuple[str, ...]]] = None,
+):
+    """
+    Calculate the electromagnetic field of a bead, subject to excitation
+    by a plane wave. The plane wave can be at an angle theta and phi, and
+    have a polarization state that is the combination of the (complex)
+    amplitudes of a theta-polarization state and phi-polarized state. If
+    theta == 0 and phi == 0, the theta polarization points along +x axis and
+    the wave travels into the +z direction.
+
+    Parameters
+    ----------
+    bead: instance of the Bead class
+    x : array of x locations for evaluation, in meters
+    y : array of y locations for evaluation, in meters
+    z : array of z locations for evaluation, in meters
+    theta : angle with the negative optical axis (-z)
+    phi : angle with the positive x axis
+    num_orders : number of order that should be included in the calculation
+            the Mie solution. If it is None (default), the code will use the
+            number_of_orders() method to calculate a sufficient number.
+    return_grid : (Default value = False) return the sampling grid in the
+        matrices X, Y and Z
+    total_field : If True, return the total field of incident and scattered
+        electromagnetic field (default). If False, then only return the
+        scattered field outside the bead. Inside the bead, the full field is
+        always returned.
+    magnetic_field : If True, return the magnetic fields as well. If false
+        (default), do not return the magnetic fields.
+    verbose : If True, print statements on the progress of the calculation.
+        Default is False
+    grid : If True (default), interpret the vectors or scalars x, y and z as
+        the input for the numpy.meshgrid function, and calculate the fields
+        at the locations that are the result of the numpy.meshgrid output.
+        If False, interpret the x, y and z vectors as the exact locations
+        where the field needs to be evaluated. In that case, all vectors
+        need to be of the same length.
+    max_memory : Memory budget for the calculation in bytes, see
+        `fields_focus()`. Default is None.
+    output : Directory to write the fields to as memory-mapped arrays, see
+        `fields_focus()`. Default is None.
+    quantities : Name or tuple of names of the quantities to return instead
+        of the fields, see `fields_focus()`. Default is None.
+
+    Returns
+    -------
+    Ex : the electric field along x, as a function of (x, y, z)
+    Ey : the electric field along y, as a function of (x, y, z)
+    Ez : the electric field along z, as a function of (x, y, z)
+    Hx : the magnetic field along x, as a function of (x, y, z)
+    Hy : the magnetic field along y, as a function of (x, y, z)
+    Hz : the magnetic field along z, as a function of (x, y, z)
+        These values are only returned when magnetic_field is True
+    X : x coordinates of the sampling grid
+    Y : y coordinates of the sampling grid
+    Z : z coordinates of the sampling grid
+        These values are only returned if return_grid is True
+
+    If `quantities` is not None, the arrays of the quantities are returned in
+    place of the fields, followed by X, Y and Z if return_grid is True.
+    """
+    loglevel = logging.getLogger().getEffectiveLevel()
+    if verbose:
+        logging.getLogger().setLevel(logging.INFO)
+
+    # Enforce floats to ensure Numba gets the same type in @ / np.matmul
+    x, y, z = [np.atleast_1d(c).astype(np.float64) for c in (x, y, z)]
+
+    n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
+    quantities, components, dtype, calculate_magnetic_field = _output_components(
+        quantities, magnetic_field
+    )
+    estimate = _memory_estimate(
+        None,
+        bead,
+        x.size * y.size * z.size if grid else x.size,
+        1,
+        1,
+        n_orders,
+        calculate_magnetic_field,
+        1,
+        max_memory,
+        grid_shape=(x.size, y.size, z.size) if grid else None,
+        output_in_memory=output is None,
+        output_bytes_per_point=len(components) * np.dtype(dtype).itemsize,
+    )
+    field_output = _field_output(
+        output,
+        x,
+        y,
+        z,
+        grid,
+        components,
+        dtype,
+        {
+            "function": "fields_plane_wave",
+            "bead": repr(bead),
+            "theta": float(theta),
+            "phi": float(phi),
+            "polarization": [str(complex(p)) for p in polarization],
+            "num_orders": int(n_orders),
+            "total_field": bool(total_field),
+            "quantities": quantities,
+        },
+    )
+
+    def fields_in_chunk(x, y, z, grid):
+        local_coordinates = LocalBeadCoordinates(x, y, z, bead.bead_diameter, grid=grid)
+        logging.info("Calculating auxiliary data")
+        field_fun = combined_plane_wave_field_factory(
+            bead=bead,
+            n_orders=n_orders,
+            theta=theta,
+            phi=phi,
+            local_coordinates=local_coordinates,
+        )
+        logging.info("Calculating fields")
+        fields = field_fun(polarization, True, calculate_magnetic_field, total_field)
+        return _reduce_to_quantities(quantities, fields, local_coordinates, bead)
+
+    if estimate.num_chunks == 1 and field_output is None:
+        ret = fields_in_chunk(x, y, z, grid)
+    else:
+        ret = _fields_in_chunks(
+            fields_in_chunk,
+            x,
+            y,
+            z,
+            grid,
+            estimate.points_per_chunk,
+            estimate.num_chunks,
+            len(components),
+            dtype,
+            field_output,
+        )
+
+    logging.getLogger().setLevel(loglevel)
+
+    if return_grid:
+        ret += _grid_views(x, y, z)
+
+    return ret
+
+
+def field_factory(
+    f_input_field,
+    objective: Objective,
+    bead: Bead,
+    x=0.0,
+    y=0.0,
+    z=0.0,
+    bfp_sampling_n: int = 31,
+    num_orders: int = None,
+    grid: bool = True,
+    far_zone_tolerance: Optional[float] = None,
+    max_memory: Optional[int] = None,
+    pruning_tolerance: Optional[float] = None,
+):
+    """Create and return a function suitable to calculate the electromagnetic field of a bead in a
+    focus, in the co-moving frame of the bead. The locations `x`, `y` and `z` are relative to the
+    center of the bead. Items that can be precalculated, such as the sampling of the back focal
+    plane, the Legendre functions and the radial functions, are stored for rapid subsequent
+    calculations of the fields for different bead positions.
+
+    Parameters
+    ----------
+    f_input_field : callable
+        A callable with the signature `f(aperture, x_bfp, y_bfp, r_bfp, r_max, bfp_sampling_n)`.
+        See `fields_focus()` for details.
+    objective : Objective
+        instance of the Objective class
+    bead : Bead
+        instance of the Bead class
+    x : np.ndarray
+        Array of x locations for evaluation, relative to the bead center, in meters
+    y : np.ndarray
+        Array of y locations for evaluation, relative to the bead center, in meters
+    z : np.ndarray
+        Array of z locations for evaluation, relative to the bead center, in meters
+    bfp_sampling_n : int, optional
+        Number of discrete steps with which the back focal plane is sampled, from the center to the
+        edge. The total number of plane waves scales with the square of bfp_sampling_n, by default
+        31
+    num_orders : int, optional
+        Number of orders that should be included in the calculation the Mie solution. If it is None
+        (default), the code will use the Bead.number_of_orders() method to calculate a sufficient
+        number.
+    grid: bool
+        If True (default), interpret the vectors or scalars x, y and z as the input for the
+        numpy.meshgrid function. If False, interpret the x, y and z vectors as the exact locations
+        where the field needs to be evaluated. See `fields_focus()`.
+    far_zone_tolerance: Optional[float]
+        See `fields_focus()`. Default is None.
+    max_memory: Optional[int]
+        Memory budget for a calculation with the returned function, in bytes. If the estimated peak
+        memory consumption for all bead positions (see `memory_estimate_focus()`) exceeds the
+        budget, the bead positions are processed in chunks that fit the budget. If None (default),
+        the budget that is set with `set_max_memory()` at the time of the calculation is used.
+    pruning_tolerance: Optional[float]
+        If not None, drop the plane waves and polarization channels of the input beam with the
+        least power, up to a fraction `pruning_tolerance` of the total power, see `fields_focus()`.
+        By default None.
+
+    Returns
+    -------
+    callable
+        Returns a callable with the signature `f(bead_center, total_field: bool = True,
+        magnetic_field: bool = False, num_threads: Optional[int] = None, generator: bool = False,
+        out: Optional[np.ndarray] = None, stacked: bool = False)`.
+        The parameter `bead_center` is either a single bead location (x, y, z), or an array of
+        shape (N, 3) with N bead locations, in meters. The parameters `total_field` and
+        `magnetic_field` have the same meaning as for `fields_focus()`. The parameter
+        `num_threads` is the number of threads to use for the calculation. It is limited by
+        `numba.config.NUMBA_NUM_THREADS`.
+
+        If `generator` is False (default), the return value is the tuple (Ex, Ey, Ez), or (Ex, Ey,
+        Ez, Hx, Hy, Hz) if `magnetic_field` is True. Every field component has the shape (N,
+        *shape), where `shape` is the shape of the (grid of) locations. Dimensions of size one are
+        removed. If `generator` is True, the return value is a generator that calculates and yields
+        such a tuple for every bead location in turn, which limits the memory consumption for a
+        large number of bead locations.
+
+        If `stacked` is True, the return value is a single array with the field components along
+        the first axis, that is, with the shape (3, N, *shape), or (6, N, *shape) if
+        `magnetic_field` is True, again without the dimensions of size one. If `out` is given,
+        the fields are written directly into it, and it is returned. It is a preallocated
+        complex-valued array, such as a memory-mapped array, with the shape of the stacked fields,
+        or with the components along the last axis instead, (N, *shape, 3) or (N, *shape, 6). The
+        fields are written into the (stacked) result per chunk of bead positions, without
+        intermediate arrays per field component. `out` cannot be combined with `generator`.
+
+    Raises
+    ------
+    ValueError
+        Raised if the medium surrounding the bead does not match the immersion medium of the
+        objective. The returned function raises a ValueError if the calculation does not fit in
+        the memory budget, even when processing a single bead position at a time, or if `out` is
+        not a complex-valued array with a valid shape.
+    """
+    if bead.n_medium != objective.n_medium:
+        raise ValueError("The immersion medium of the bead and the objective have to be the same")
+
+    n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
+    x, y, z = [np.atleast_1d(coord).astype(np.float64) for coord in (x, y, z)]
+    local_coordinates = LocalBeadCoordinates(
+        x, y, z, bead.bead_diameter, (0.0, 0.0, 0.0), grid=grid
+    )
+    farfield_data = None
+    if pruning_tolerance is not None:
+        _check_pruning_tolerance(pruning_tolerance)
+        farfield_data = _pruned_farfield(
+            _sample_farfield(f_input_field, objective, bead.lambda_vac, bfp_sampling_n),
+            pruning_tolerance,
+        )
+    fields_func = combined_field_factory(
+        objective=objective,
+        bead=bead,
+        n_orders=n_orders,
+        bfp_sampling_n=bfp_sampling_n,
+        f_input_field=f_input_field,
+        local_coordinates=local_coordinates,
+        far_zone_tolerance=far_zone_tolerance,
+        farfield_data=farfield_data,
+    )
+
+    def fields_at(bead_center, total_field, magnetic_field, num_threads, out=None, stacked=False):
+        estimate = _memory_estimate(
+            objective,
+            bead,
+            int(np.prod(local_coordinates.coordinate_shape)),
+            len(bead_center),
+            bfp_sampling_n,
+            n_orders,
+            magnetic_field,
+            1 if num_threads is None else num_threads,
+            max_memory,
+            chunk_points=False,
+        )
+        if estimate.num_chunks == 1:
+            return fields_func(
+                bead_center,
+                True,
+                magnetic_field,
+                total_field,
+                num_threads,
+                out=out,
+                stacked=stacked,
+            )
+
+        fields = stacked_field_buffer(
+            out, 6 if magnetic_field else 3, len(bead_center), local_coordinates.coordinate_shape
+        )
+        step = estimate.positions_per_chunk
+        for start in range(0, len(bead_center), step):
+            fields_func(
+                bead_center[start : start + step],
+                True,
+                magnetic_field,
+                total_field,
+                num_threads,
+                out=fields[:, start : start + step],
+            )
+        if out is not None:
+            return out
+        return np.squeeze(fields) if stacked else tuple(np.squeeze(field) for field in fields)
+
+    def frames(bead_center, total_field, magnetic_field, num_threads) -> Iterator[Tuple]:
+        # `fields_at` expects an (N, 3) array of bead positions
+        for position in bead_center:
+            yield fields_at(position[np.newaxis], total_field, magnetic_field, num_threads)
+
+    def calculate_fields(
+        bead_center,
+        total_field: bool = True,
+        magnetic_field: bool = False,
+        num_threads: Optional[int] = None,
+        generator: bool = False,
+        out: Optional[np.ndarray] = None,
+        stacked: bool = False,
+    ):
+        bead_center = np.atleast_2d(bead_center).astype(np.float64)
+        if bead_center.ndim > 2 or bead_center.shape[1] != 3:
+            raise ValueError("Invalid argument for bead_center")
+        if generator:
+            if out is not None:
+                raise ValueError("An output array cannot be combined with a generator")
+            return frames(bead_center, total_field, magnetic_field, num_threads)
+        return fields_at(bead_center, total_field, magnetic_field, num_threads, out, stacked)
+
+    return calculate_fields
+
+
+def field_response_factory(
+    objective: Objective,
+    bead: Bead,
+    x=0.0,
+    y=0.0,
+    z=0.0,
+    bfp_sampling_n: int = 31,
+    num_orders: int = None,
+    grid: bool = True,
+    total_field: bool = True,
+    magnetic_field: bool = False,
+    num_threads: Optional[int] = None,
+):
+    """Create and return a function that calculates the electromagnetic field of a bead in a focus,
+    in the co-moving frame of the bead, for any input field. The fields are linear in the far field
+    of the objective. Therefore, the response of the bead to every plane wave in the aperture, for
+    both polarizations, is calculated once at the locations `x`, `y` and `z`. The fields for an
+    input field then follow from a single weighted sum of these responses, which is much faster than
+    `field_factory()` when many input fields are evaluated for the same bead and locations, such as
+    for different polarizations, aberrations or holograms.
+
+    The responses take 96 bytes per plane wave and location, and twice as much if `magnetic_field`
+    is True. The number of plane waves is about pi * bfp_sampling_n**2. This is therefore intended
+    for a modest number of locations.
+
+    Parameters
+    ----------
+    objective : Objective
+        instance of the Objective class
+    bead : Bead
+        instance of the Bead class
+    x : np.ndarray
+        Array of x locations for evaluation, relative to the bead center, in meters
+    y : np.ndarray
+        Array of y locations for evaluation, relative to the bead center, in meters
+    z : np.ndarray
+        Array of z locations for evaluation, relative to the bead center, in meters
+    bfp_sampling_n : int, optional
+        Number of discrete steps with which the back focal plane is sampled, from the center to the
+        edge. The total number of plane waves scales with the square of bfp_sampling_n, by default
+        31
+    num_orders : int, optional
+        Number of orders that should be included in the calculation the Mie solution. If it is None
+        (default), the code will use the Bead.number_of_orders() method to calculate a sufficient
+        number.
+    grid: bool
+        If True (default), interpret the vectors or scalars x, y and z as the input for the
+        numpy.meshgrid function. If False, interpret the x, y and z vectors as the exact locations
+        where the field needs to be evaluated. See `fields_focus()`.
+    total_field : bool
+        If True (default), the total field is calculated, otherwise the scattered field. See
+        `fields_focus()`.
+    magnetic_field: bool
+        If True, calculate the magnetic fields as well. Default is False.
+    num_threads: Optional[int]
+        The number of threads to use for the calculation of the responses. It is limited by
+        `numba.config.NUMBA_NUM_THREADS`. Default is None, which uses a single thread.
+
+    Returns
+    -------
+    callable
+        Returns a callable with the signature `f(input_field, bead_center=(0.0, 0.0, 0.0))`. The
+        parameter `input_field` is either a callable with the signature `f(aperture, x_bfp, y_bfp,
+        r_bfp, r_max, bfp_sampling_n)` (see `fields_focus()`), a tuple `(Ex_bfp, Ey_bfp)` of
+        arrays with the fields in the back focal plane at the samples of the back focal plane (see
+        `Objective.sample_back_focal_plane()`), where one of the two may be None, or an instance of
+        `FarfieldData` (see `Objective.back_focal_plane_to_farfield()`). In all cases, the back
+        focal plane has to be sampled with `bfp_sampling_n` samples. The parameter `bead_center`
+        is either a single bead location (x, y, z), or an array of shape (N, 3) with N bead
+        locations, in meters.
+
+        The return value is the tuple (Ex, Ey, Ez), or (Ex, Ey, Ez, Hx, Hy, Hz) if
+        `magnetic_field` is True. Every field component has the shape (N, *shape), where `shape`
+        is the shape of the (grid of) locations. Dimensions of size one are removed.
+
+    Raises
+    ------
+    ValueError
+        Raised if the medium surrounding the bead does not match the immersion medium of the
+        objective. The returned function raises a ValueError if the input field is not sampled with
+        `bfp_sampling_n` samples.
+    """
+    if bead.n_medium != objective.n_medium:
+        raise ValueError("The immersion medium of the bead and the objective have to be the same")
+
+    n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
+    x, y, z = [np.atleast_1d(coord).astype(np.float64) for coord in (x, y, z)]
+    local_coordinates = LocalBeadCoordinates(
+        x, y, z, bead.bead_diameter, (0.0, 0.0, 0.0), grid=grid
+    )
+    fields_func = plane_wave_response_factory(
+        objective,
+        bead,
+        n_orders,
+        bfp_sampling_n,
+        local_coordinates,
+        calculate_total_field=total_field,
+        calculate_magnetic_field=magnetic_field,
+        num_threads=num_threads,
+    )
+
+    def calculate_fields(input_field, bead_center=(0.0, 0.0, 0.0)):
+        bead_center = np.atleast_2d(bead_center).astype(np.float64)
+        if bead_center.ndim > 2 or bead_center.shape[1] != 3:
+            raise ValueError("Invalid argument for bead_center")
+        farfield_data = _input_farfield(input_field, objective, bead.lambda_vac, bfp_sampling_n)
+        shape = (len(bead_center), *local_coordinates.coordinate_shape)
+        return tuple(
+            np.squeeze(np.reshape(field[:, axis], shape))
+            for field in fields_func(farfield_data, bead_center)
+            if field is not None
+            for axis in range(3)
+        )
+
+    return calculate_fields
+
+
+def observables_factory(
+    f_input_field,
+    objective: Objective,
+    bead: Bead,
+    bfp_sampling_n: int = 31,
+    num_orders: int = None,
+    integration_orders: Union[int, str, None] = None,
+    integration_tolerance: float = 1e-4,
+    pruning_tolerance: Optional[float] = None,
+):
+    """Create and return a function that calculates the force and torque on a bead, and the power
+    that is absorbed and scattered by the bead, in the focus of an arbitrary input beam. All of
+    these follow from the fields on a sphere around the bead, which are evaluated once per call for
+    any combination of the observables. Items that can be precalculated are stored for rapid
+    subsequent calculations at different bead positions.
+
+    The fields are integrated over a sphere with a radius of 0.51 times the bead diameter, following
+    a Lebedev-Laikov integration scheme. The force and torque follow from the time-averaged Maxwell
+    stress tensor, and include the transfer of both spin and orbital angular momentum. The
+    scattered power follows from the Poynting vector of the scattered field, and the absorbed power
+    from the Poynting vector of the total field.
+
+    Parameters
+    ----------
+    f_input_field : callable
+        A callable with the signature `f(aperture, x_bfp, y_bfp, r_bfp, r_max, bfp_sampling_n)`,
+        see `force_factory()`.
+    objective : Objective
+        instance of the Objective class
+    bead : Bead
+        instance of the Bead class
+    bfp_sampling_n : int, optional
+        Number of discrete steps with which the back focal plane is sampled, from the center to the
+        edge. The total number of plane waves scales with the square of bfp_sampling_n, by default
+        31
+    num_orders : int, optional
+        Number of orders that should be included in the calculation the Mie solution. If it is None
+        (default), the code will use the Bead.number_of_orders() method to calculate a sufficient
+        number.
+    integration_orders : Union[int, str, None], optional
+        The order of the integration, following a Lebedev-Laikov integration scheme, see
+        `force_factory()`. If it is "auto", the order is chosen adaptively by the first call of the
+        returned callable: the observables at the requested bead positions are calculated at
+        successive orders, and the first order that differs by less than `integration_tolerance`
+        from the next order is used. The order is cached for the combination of bead, objective
+        and input field, and reused by subsequent calls and other functions with the same
+        combination. The cache holds the orders of the 256 most recently used combinations.
+    integration_tolerance : float, optional
+        Relative tolerance of the adaptive integration order, by default 1e-4. The differences of
+        the force, the torque and the powers are relative to their largest value over the bead
+        positions, but at least the momentum (n P / c) and angular momentum (P / omega) carried by
+        the power P that is absorbed and scattered, respectively, such that observables that vanish
+        do not prevent convergence. Only used if `integration_orders` is "auto".
+    pruning_tolerance : Optional[float], optional
+        If not None, drop the plane waves and polarization channels of the input beam with the
+        least power, up to a fraction `pruning_tolerance` of the total power, see `fields_focus()`.
+        By default None.
+
+    Returns
+    -------
+    callable
+        Returns a callable with the signature `f(bead_center: Tuple[float, float, float],
+        observables: Union[str, Tuple[str, ...]] = OBSERVABLES, num_threads: Optional[int] = None)
+        -> Dict[str, np.ndarray]`. The parameter `bead_center` is the bead location in space, in
+        meters, or an array with shape (N, 3) of N bead locations. The parameter `observables` is
+        the name, or a tuple of names, of the observables to calculate: "force" (in Newton),
+        "torque" (in Newton meter, with respect to the center of the bead), "absorbed_power" and
+        "scattered_power" (in Watt). The parameter `num_threads` is the number of threads to use
+        for the calculation. It is limited by `numba.config.NUMBA_NUM_THREADS`.
+
+        The return value of a function call is a dictionary with the requested observables. The
+        force and torque have the shape (3,) for a single bead location, and (N, 3) for N bead
+        locations, and the powers are a scalar or have the shape (N,), respectively.
+
+    Raises
+    ------
+    ValueError
+        Raised if the medium surrounding the bead does not match the immersion medium of the
+        objective, if `integration_orders` is a string other than "auto", or, by the returned
+        callable, if an unknown observable is requested.
+    """
+    if bead.n_medium != objective.n_medium:
+        raise ValueError("The immersion medium of the bead and the objective have to be the same")
+
+    n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
+    farfield_data = _sample_farfield(f_input_field, objective, bead.lambda_vac, bfp_sampling_n)
+    if pruning_tolerance is not None:
+        _check_pruning_tolerance(pruning_tolerance)
+        farfield_data = _pruned_farfield(farfield_data, pruning_tolerance)
+
+    def make_evaluator(order: int):
+        return _sphere_observables_factory(
+            objective, bead, n_orders, bfp_sampling_n, farfield_data, order
+        )
+
+    # Only the evaluator of the integration order that is in use is kept
+    evaluators = {}
+
+    def evaluator(order: int):
+        if order not in evaluators:
+            evaluators.clear()
+            evaluators[order] = make_evaluator(order)
+        return evaluators[order]
+
+    adaptive = isinstance(integration_orders, str)
+    if adaptive:
+        if integration_orders != "auto":
+            raise ValueError(f"Invalid value for integration_orders: {integration_orders}")
+        if integration_tolerance <= 0:
+            raise ValueError("The integration tolerance needs to be strictly positive")
+        cache_key = (
+            repr(bead),
+            repr(objective),
+            int(bfp_sampling_n),
+            n_orders,
+            float(integration_tolerance),
+            _farfield_fingerprint(farfield_data),
+        )
+    else:
+        integration_order = _integration_order(n_orders, integration_orders)
+
+    def observables_at(
+        bead_center: Tuple[float, float, float],
+        observables: Union[str, Tuple[str, ...]] = OBSERVABLES,
+        num_threads: Optional[int] = None,
+    ):
+        observables = (observables,) if isinstance(observables, str) else tuple(observables)
+        for observable in observables:
+            if observable not in OBSERVABLES:
+                raise ValueError(
+                    f"Unknown observable {observable}, use one or more of {OBSERVABLES}"
+                )
+        bead_center = np.atleast_2d(bead_center).astype(np.float64)
+        order = integration_order if not adaptive else _cached_integration_order(cache_key)
+        if order is not None:
+            result = evaluator(order)(bead_center, observables, num_threads)
+        else:
+            # The search already calculated the observables at the order that it chose
+            order, chosen_evaluator, result = _adaptive_integration_order(
+                make_evaluator,
+                bead,
+                bead_center,
+                get_nearest_order(max(n_orders // 2, 1)),
+                integration_tolerance,
+                num_threads,
+            )
+            evaluators.clear()
+            evaluators[order] = chosen_evaluator
+            _cache_integration_order(cache_key, order)
+        return {observable: np.squeeze(result[observable])[()] for observable in observables}
+
+    return observables_at
+
+
+def observables_response_factory(
+    objective: Objective,
+    bead: Bead,
+    bfp_sampling_n: int = 31,
+    num_orders: int = None,
+    integration_orders: Optional[int] = None,
+    num_threads: Optional[int] = None,
+):
+    """Create and return a function that calculates the force and torque on a bead, and the power
+    that is absorbed and scattered by the bead, in the focus of any input beam. The fields on the
+    sphere around the bead are linear in the far field of the objective, and are calculated as a
+    weighted sum of the responses of the bead to every plane wave in the aperture, for both
+    polarizations, which are calculated once, see `field_response_factory()`. The observables follow
+    from these fields as in `observables_factory()`, which is faster for a single input field.
+
+    Parameters
+    ----------
+    objective : Objective
+        instance of the Objective class
+    bead : Bead
+        instance of the Bead class
+    bfp_sampling_n : int, optional
+        Number of discrete steps with which the back focal plane is sampled, from the center to the
+        edge. The total number of plane waves scales with the square of bfp_sampling_n, by default
+        31
+    num_orders : int, optional
+        Number of orders that should be included in the calculation the Mie solution. If it is None
+        (default), the code will use the Bead.number_of_orders() method to calculate a sufficient
+        number.
+    integration_orders : Optional[int], optional
+        The order of the integration, following a Lebedev-Laikov integration scheme, see
+        `force_factory()`. The adaptive order of `observables_factory()` is not available, as it
+        depends on the input field.
+    num_threads: Optional[int]
+        The number of threads to use for the calculation of the responses. It is limited by
+        `numba.config.NUMBA_NUM_THREADS`. Default is None, which uses a single thread.
+
+    Returns
+    -------
+    callable
+        Returns a callable with the signature `f(input_field, bead_center=(0.0, 0.0, 0.0),
+        observables: Union[str, Tuple[str, ...]] = OBSERVABLES) -> Dict[str, np.ndarray]`. The
+        parameter `input_field` is a callable, a tuple of arrays or far field data, see
+        `field_response_factory()`. The parameters `bead_center` and `observables` and the return
+        value are the same as for the callable that `observables_factory()` returns.
+
+    Raises
+    ------
+    ValueError
+        Raised if the medium surrounding the bead does not match the immersion medium of the
+        objective, or, by the returned callable, if an unknown observable is requested or the input
+        field is not sampled with `bfp_sampling_n` samples.
+    """
+    if bead.n_medium != objective.n_medium:
+        raise ValueError("The immersion medium of the bead and the objective have to be the same")
+
+    n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
+    integration_order = _integration_order(n_orders, integration_orders)
+    x, y, z, w = [
+        np.asarray(c, dtype=np.float64) for c in get_integration_locations(integration_order)
+    ]
+    radius = bead.bead_diameter * 0.51
+    local_coordinates = LocalBeadCoordinates(
+        x * radius, y * radius, z * radius, bead.bead_diameter, (0.0, 0.0, 0.0), grid=False
+    )
+    scattered_fields_func, total_fields_func = [
+        plane_wave_response_factory(
+            objective,
+            bead,
+            n_orders,
+            bfp_sampling_n,
+            local_coordinates,
+            calculate_total_field=total,
+            calculate_magnetic_field=True,
+            num_threads=num_threads,
+        )
+        for total in (False, True)
+    ]
+    normals = np.stack((x, y, z))
+
+    def observables_for(
+        input_field,
+        bead_center: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+        observables: Union[str, Tuple[str, ...]] = OBSERVABLES,
+    ):
+        observables = (observables,) if isinstance(observables, str) else tuple(observables)
+        for observable in observables:
+            if observable not in OBSERVABLES:
+                raise ValueError(
+                    f"Unknown observable {observable}, use one or more of {OBSERVABLES}"
+                )
+        bead_center = np.atleast_2d(bead_center).astype(np.float64)
+        farfield_data = _input_farfield(input_field, objective, bead.lambda_vac, bfp_sampling_n)
+        result = _observables_on_sphere(
+            observables,
+            scattered_fields_func(farfield_data, bead_center),
+            lambda: total_fields_func(farfield_data, bead_center),
+            normals,
+            w,
+            radius,
+            bead.n_medium,
+        )
+        return {observable: np.squeeze(result[observable])[()] for observable in observables}
 
-    return ret
+    return observables_for
 
 
-def fields_plane_wave(
+def power_factory(
+    f_input_field,
+    objective: Objective,
     bead: Bead,
-    x,
-    y,
-    z,
-    theta=0,
-    phi=0,
-    polarization=(1, 0),
-    num_orders=None,
-    return_grid=False,
-    total_field=True,
-    magnetic_field=False,
-    verbose=False,
-    grid=True,
+    bfp_sampling_n: int = 31,
+    num_orders: int = None,
 ):
-    """
-    Calculate the electromagnetic field of a bead, subject to excitation
-    by a plane wave. The plane wave can be at an angle theta and phi, and
-    have a polarization state that is the combination of the (complex)
-    amplitudes of a theta-polarization state and phi-polarized state. If
-    theta == 0 and phi == 0, the theta polarization points along +x axis and
-    the wave travels into the +z direction.
+    """Create and return a function that calculates the power that is extinguished, scattered and
+    absorbed by a bead in the focus of an arbitrary input beam, in closed form.
+
+    The focused field is expanded in electric and magnetic multipoles around the bead, from the
+    plane waves in the aperture of the objective, and the powers follow from the amplitudes of the
+    multipoles and the Mie coefficients of the bead. This is the generalization of the extinction
+    and scattering cross sections of a bead in a plane wave to an arbitrary beam. No fields are
+    evaluated, and no integration over a sphere around the bead is necessary, such that the powers
+    for many bead positions are calculated much faster than with `absorbed_power_focus()`,
+    `scattered_power_focus()` or `observables_factory()`. The multipole amplitudes of the plane
+    waves are calculated once, and the amplitudes at a bead position follow from a single matrix
+    product.
 
     Parameters
     ----------
-    bead: instance of the Bead class
-    x : array of x locations for evaluation, in meters
-    y : array of y locations for evaluation, in meters
-    z : array of z locations for evaluation, in meters
-    theta : angle with the negative optical axis (-z)
-    phi : angle with the positive x axis
-    num_orders : number of order that should be included in the calculation
-            the Mie solution. If it is None (default), the code will use the
-            number_of_orders() method to calculate a sufficient number.
-    return_grid : (Default value = False) return the sampling grid in the
-        matrices X, Y and Z
-    total_field : If True, return the total field of incident and scattered
-        electromagnetic field (default). If False, then only return the
-        scattered field outside the bead. Inside the bead, the full field is
-        always returned.
-    magnetic_field : If True, return the magnetic fields as well. If false
-        (default), do not return the magnetic fields.
-    verbose : If True, print statements on the progress of the calculation.
-        Default is False
-    grid : If True (default), interpret the vectors or scalars x, y and z as
-        the input for the numpy.meshgrid function, and calculate the fields
-        at the locations that are the result of the numpy.meshgrid output.
-        If False, interpret the x, y and z vectors as the exact locations
-        where the field needs to be evaluated. In that case, all vectors
-        need to be of the same length.
+    f_input_field : callable
+        A callable with the signature `f(aperture, x_bfp, y_bfp, r_bfp, r_max, bfp_sampling_n)`,
+        see `force_factory()`.
+    objective : Objective
+        instance of the Objective class
+    bead : Bead
+        instance of the Bead class
+    bfp_sampling_n : int, optional
+        Number of discrete steps with which the back focal plane is sampled, from the center to the
+        edge. The total number of plane waves scales with the square of bfp_sampling_n, by default
+        31
+    num_orders : int, optional
+        Number of orders that should be included in the calculation the Mie solution. If it is None
+        (default), the code will use the Bead.number_of_orders() method to calculate a sufficient
+        number.
 
     Returns
     -------
-    Ex : the electric field along x, as a function of (x, y, z)
-    Ey : the electric field along y, as a function of (x, y, z)
-    Ez : the electric field along z, as a function of (x, y, z)
-    Hx : the magnetic field along x, as a function of (x, y, z)
-    Hy : the magnetic field along y, as a function of (x, y, z)
-    Hz : the magnetic field along z, as a function of (x, y, z)
-        These values are only returned when magnetic_field is True
-    X : x coordinates of the sampling grid
-    Y : y coordinates of the sampling grid
-    Z : z coordinates of the sampling grid
-        These values are only returned if return_grid is True
-    """
-    loglevel = logging.getLogger().getEffectiveLevel()
-    if verbose:
-        logging.getLogger().setLevel(logging.INFO)
+    callable
+        Returns a callable with the signature `f(bead_center: Tuple[float, float, float]) ->
+        Dict[str, np.ndarray]`. The parameter `bead_center` is the bead location in space, in
+        meters, or an array with shape (N, 3) of N bead locations. The return value is a dictionary
+        with the "extinguished_power", "scattered_power" and "absorbed_power", in Watt, as scalars
+        for a single bead location or arrays with shape (N,) for N bead locations.
 
-    # Enforce floats to ensure Numba gets the same type in @ / np.matmul
-    x, y, z = [np.atleast_1d(c).astype(np.float64) for c in (x, y, z)]
+    Raises
+    ------
+    ValueError
+        Raised if the medium surrounding the bead does not match the immersion medium of the
+        objective.
+    """
+    if bead.n_medium != objective.n_medium:
+        raise ValueError("The immersion medium of the bead and the objective have to be the same")
 
     n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
-    local_coordinates = LocalBeadCoordinates(x, y, z, bead.bead_diameter, grid=grid)
-
-    logging.info("Calculating auxiliary data for external fields")
-    field_fun = plane_wave_field_factory(
-        bead=bead,
-        n_orders=n_orders,
-        theta=theta,
-        phi=phi,
-        local_coordinates=local_coordinates,
-        internal=False,
+    bfp_coords, bfp_fields = objective.sample_back_focal_plane(
+        f_input_field=f_input_field, bfp_sampling_n=bfp_sampling_n
     )
-    logging.info("Calculating external fields")
-    external_fields = field_fun(polarization, True, magnetic_field, total_field)
-
-    logging.info("Calculating auxiliary data for internal fields")
-    field_fun = plane_wave_field_factory(
-        bead=bead,
-        n_orders=n_orders,
-        theta=theta,
-        phi=phi,
-        local_coordinates=local_coordinates,
-        internal=True,
+    farfield_data = objective.back_focal_plane_to_farfield(bfp_coords, bfp_fields, bead.lambda_vac)
+    phase_correction_factor = plane_wave_phase_correction_factor(objective, bead, bfp_sampling_n)
+    calculate_power = multipole_power_factory(
+        farfield_data, bead, n_orders, phase_correction_factor
     )
-    logging.info("Calculating internal fields")
-    internal_fields = field_fun(polarization, True, magnetic_field)
-
-    for external, internal in zip(external_fields, internal_fields):
-        external += internal
-    ret = external_fields
-
-    logging.getLogger().setLevel(loglevel)
 
-    if return_grid:
-        X, Y, Z = np.meshgrid(x, y, z, indexing="ij")
-        X = np.squeeze(X)
-        Y = np.squeeze(Y)
-        Z = np.squeeze(Z)
-        ret += (X, Y, Z)
+    def power_at(bead_center: Tuple[float, float, float]):
+        bead_center = np.atleast_2d(bead_center).astype(np.float64)
+        if bead_center.ndim > 2 or bead_center.shape[1] != 3:
+            raise ValueError("Invalid argument for bead_center")
+        powers = calculate_power(bead_center)
+        return {
+            name: np.squeeze(power)[()]
+            for name, power in zip(
+                ("extinguished_power", "scattered_power", "absorbed_power"), powers
+            )
+        }
 
-    return ret
+    return power_at
 
 
 def force_factory(
@@ -429,7 +1853,10 @@ def force_factory(
     bead: Bead,
     bfp_sampling_n: int = 31,
     num_orders: int = None,
-    integration_orders: int = None,
+    integration_orders: Union[int, str, None] = None,
+    integration_tolerance: float = 1e-4,
+    gradients: bool = False,
+    pruning_tolerance: Optional[float] = None,
 ):
     """Create and return a function suitable to calculate the force on a bead. Items that can be
     precalculated are stored for rapid subsequent calculations of the force on the bead for
@@ -471,6 +1898,21 @@ def force_factory(
         given, the code will determine an order based on the number of orders in the Mie solution.
         If the integration order is provided, that order or the nearest higher order is used when
         the provided order does not match one of the available orders.
+        If it is "auto", the order is chosen adaptively, see `observables_factory()`.
+    integration_tolerance : float, optional
+        Relative tolerance of the adaptive integration order, by default 1e-4. Only used if
+        `integration_orders` is "auto".
+    gradients : bool, optional
+        If False (default), the returned callable returns the force. If True, it returns a
+        dictionary with the force, the trap stiffness, and the gradients of both with respect to
+        the input field in the back focal plane, see below. The gradients are calculated from the
+        response of the bead to every plane wave in the aperture (see `field_response_factory()`),
+        at about the cost of a single evaluation of the force. The adaptive integration order is
+        not available in that case.
+    pruning_tolerance : Optional[float], optional
+        If not None, drop the plane waves and polarization channels of the input beam with the
+        least power, up to a fraction `pruning_tolerance` of the total power, see `fields_focus()`.
+        By default None.
 
     Returns
     -------
@@ -484,83 +1926,69 @@ def force_factory(
         The return value of a function call is the force on the bead at the specifed location, in
         Newton, in the x-, y- and z-direction.
 
+        If `gradients` is True, the callable has the signature `f(bead_center)`, without
+        `num_threads`: the responses of the bead to the plane waves are calculated when the
+        callable is created, and a call only evaluates matrix products. The return value is a
+        dictionary with the items "force", "stiffness" (:math:`-\\partial F_x / \\partial x`,
+        :math:`-\\partial F_y / \\partial y` and :math:`-\\partial F_z / \\partial z`, in N/m),
+        "force_gradient" and "stiffness_gradient".
+        The gradients have the shape (3, 2, 2 * bfp_sampling_n - 1, 2 * bfp_sampling_n - 1): for
+        every direction of the force or stiffness, the gradient with respect to the field along x
+        and along y at the samples of the back focal plane (see
+        `Objective.sample_back_focal_plane()`). The gradient G of a quantity f is defined such that
+        a small change dE of the fields in the back focal plane changes f by :math:`\\mathrm{Re}
+        \\sum G^* dE`. That is, the real and imaginary part of G are the derivatives of f with
+        respect to the real and imaginary part of the field. The gradients are zero outside of the
+        aperture. The parameter `bead_center` can also be an array with shape (N, 3), in which
+        case all items have an additional first dimension of size N.
+
     Raises
     ------
     ValueError
         Raised if the medium surrounding the bead does not match the immersion medium of the
-        objective.
+        objective, or if `gradients` is True and `integration_orders` is "auto".
     """
-    if bead.n_medium != objective.n_medium:
-        raise ValueError("The immersion medium of the bead and the objective have to be the same")
-
-    n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
+    if gradients:
+        if bead.n_medium != objective.n_medium:
+            raise ValueError(
+                "The immersion medium of the bead and the objective have to be the same"
+            )
+        if isinstance(integration_orders, str):
+            raise ValueError("The integration order cannot be chosen adaptively for gradients")
+        n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
+        farfield_data = _sample_farfield(f_input_field, objective, bead.lambda_vac, bfp_sampling_n)
+        if pruning_tolerance is not None:
+            _check_pruning_tolerance(pruning_tolerance)
+            farfield_data = _pruned_farfield(farfield_data, pruning_tolerance)
+        calculate_gradients = _force_gradient_factory(
+            objective,
+            bead,
+            n_orders,
+            bfp_sampling_n,
+            farfield_data,
+            _integration_order(n_orders, integration_orders),
+        )
 
-    # Get an integration order that is one level higher than the one matching n_orders if no
-    # integration order is specified
-    integration_orders = (
-        get_nearest_order(get_nearest_order(n_orders) + 1)
-        if integration_orders is None
-        else get_nearest_order(np.amax((1, int(integration_orders))))
-    )
-    x, y, z, w = [np.asarray(c) for c in get_integration_locations(integration_orders)]
+        def force_and_gradients(bead_center: Tuple[float, float, float]):
+            single = np.ndim(bead_center) == 1
+            result = calculate_gradients(np.atleast_2d(bead_center).astype(np.float64))
+            return {name: value[0] if single else value for name, value in result.items()}
 
-    xb, yb, zb = [c * bead.bead_diameter * 0.51 for c in (x, y, z)]
+        return force_and_gradients
 
-    local_coordinates = LocalBeadCoordinates(
-        xb, yb, zb, bead.bead_diameter, (0.0, 0.0, 0.0), grid=False
-    )
-    external_fields_func = focus_field_factory(
+    observables = observables_factory(
+        f_input_field,
         objective,
         bead,
-        n_orders,
-        bfp_sampling_n,
-        f_input_field,
-        local_coordinates,
-        False,
+        bfp_sampling_n=bfp_sampling_n,
+        num_orders=num_orders,
+        integration_orders=integration_orders,
+        integration_tolerance=integration_tolerance,
+        pruning_tolerance=pruning_tolerance,
     )
-    _eps = EPS0 * bead.n_medium**2
-    _mu = MU0
-
-    # Normal vectors with weight factor incorporated
-    nw = w[:, np.newaxis] * np.concatenate([np.atleast_2d(ax) for ax in (x, y, z)], axis=0).T
 
     def force_on_bead(bead_center: Tuple[float, float, float], num_threads: Optional[int] = None):
-        bead_center = np.atleast_2d(bead_center)
-        Ex, Ey, Ez, Hx, Hy, Hz = external_fields_func(bead_center, True, True, True, num_threads)
-
-        Te11 = np.atleast_2d(_eps * 0.5 * (np.abs(Ex) ** 2 - np.abs(Ey) ** 2 - np.abs(Ez) ** 2))
-        Te22 = np.atleast_2d(_eps * 0.5 * (np.abs(Ey) ** 2 - np.abs(Ex) ** 2 - np.abs(Ez) ** 2))
-        Te33 = np.atleast_2d(_eps * 0.5 * (np.abs(Ez) ** 2 - np.abs(Ey) ** 2 - np.abs(Ex) ** 2))
-
-        Te12 = np.atleast_2d(_eps * np.real(Ex * np.conj(Ey)))
-        Te13 = np.atleast_2d(_eps * np.real(Ex * np.conj(Ez)))
-        Te23 = np.atleast_2d(_eps * np.real(Ey * np.conj(Ez)))
-
-        Th11 = np.atleast_2d(_mu * 0.5 * (np.abs(Hx) ** 2 - np.abs(Hy) ** 2 - np.abs(Hz) ** 2))
-        Th22 = np.atleast_2d(_mu * 0.5 * (np.abs(Hy) ** 2 - np.abs(Hx) ** 2 - np.abs(Hz) ** 2))
-        Th33 = np.atleast_2d(_mu * 0.5 * (np.abs(Hz) ** 2 - np.abs(Hy) ** 2 - np.abs(Hx) ** 2))
-
-        Th12 = np.atleast_2d(_mu * np.real(Hx * np.conj(Hy)))
-        Th13 = np.atleast_2d(_mu * np.real(Hx * np.conj(Hz)))
-        Th23 = np.atleast_2d(_mu * np.real(Hy * np.conj(Hz)))
-
-        T = np.empty((len(bead_center), x.size, 3, 3))
-        T[..., 0, 0] = Te11 + Th11
-        T[..., 0, 1] = Te12 + Th12
-        T[..., 0, 2] = Te13 + Th13
-        T[..., 1, 0] = Te12 + Th12
-        T[..., 1, 1] = Te22 + Th22
-        T[..., 1, 2] = Te23 + Th23
-        T[..., 2, 0] = Te13 + Th13
-        T[..., 2, 1] = Te23 + Th23
-        T[..., 2, 2] = Te33 + Th33
-
-        # T is [num_bead_positions, num_coords_around_bead, 3, 3] large, nw is [num_coords, 3] large
-        # F is the 3D force on the bead at each position `num_bead_positions`.
-        F = np.matmul(T, nw[np.newaxis, ..., np.newaxis])[..., 0].sum(axis=1)
-
-        # Note: factor 1/2 incorporated as 2 pi instead of 4 pi
-        return np.squeeze(F) * (bead.bead_diameter * 0.51) ** 2 * 2 * np.pi
+        return observables(bead_center, "force", num_threads)["force"]
 
     return force_on_bead
 
@@ -573,6 +2001,7 @@ def forces_focus(
     bfp_sampling_n=31,
     num_orders=None,
     integration_orders=None,
+    integration_tolerance=1e-4,
 ):
     """
     Calculate the forces on a bead in the focus of an arbitrary input
@@ -615,6 +2044,11 @@ def forces_focus(
         in the calculation the Mie solution. If it is None (default), the
         code will use the number_of_orders() method to calculate a
         sufficient number.
+    integration_orders : order of the Lebedev-Laikov integration over a
+        sphere around the bead, or "auto" to choose it adaptively, see
+        `force_factory()` and `observables_factory()`.
+    integration_tolerance : (Default value = 1e-4) relative tolerance of the
+        adaptive integration order.
 
     Returns
     -------
@@ -628,6 +2062,7 @@ def forces_focus(
         bfp_sampling_n=bfp_sampling_n,
         num_orders=num_orders,
         integration_orders=integration_orders,
+        integration_tolerance=integration_tolerance,
     )
     return force_fun(bead_center)
 
@@ -640,6 +2075,7 @@ def absorbed_power_focus(
     bfp_sampling_n=31,
     num_orders=None,
     integration_orders=None,
+    integration_tolerance=1e-4,
     verbose=False,
 ):
     """
@@ -687,57 +2123,31 @@ def absorbed_power_focus(
         in the calculation the Mie solution. If it is None (default), the
         code will use the number_of_orders() method to calculate a
         sufficient number.
+    integration_orders : order of the Lebedev-Laikov integration over a
+        sphere around the bead, or "auto" to choose it adaptively, see
+        `force_factory()` and `observables_factory()`.
+    integration_tolerance : (Default value = 1e-4) relative tolerance of the
+        adaptive integration order.
 
     Returns
     -------
     Pabs : the absorbed power in Watts.
     """
-
-    n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
-
-    if integration_orders is None:
-        # Go to the next higher available order of integration than should
-        # be strictly necessary
-        order = get_nearest_order(get_nearest_order(n_orders) + 1)
-        x, y, z, w = get_integration_locations(order)
-    else:
-        x, y, z, w = get_integration_locations(
-            get_nearest_order(np.amax((1, int(integration_orders))))
-        )
-
-    # Enforce floats to ensure Numba has all floats when doing @ / np.matmul
-    x, y, z, w = [np.asarray(coord).astype(np.float64) for coord in (x, y, z, w)]
-
-    xb, yb, zb = [
-        ax * bead.bead_diameter * 0.51 + bead_center[idx] for idx, ax in enumerate((x, y, z))
-    ]
-
-    Ex, Ey, Ez, Hx, Hy, Hz = fields_focus(
+    loglevel = logging.getLogger().getEffectiveLevel()
+    if verbose:
+        logging.getLogger().setLevel(logging.INFO)
+    observables = observables_factory(
         f_input_field,
         objective,
         bead,
-        bead_center,
-        xb,
-        yb,
-        zb,
-        bfp_sampling_n,
-        num_orders,
-        return_grid=False,
-        total_field=True,
-        magnetic_field=True,
-        verbose=verbose,
-        grid=False,
+        bfp_sampling_n=bfp_sampling_n,
+        num_orders=num_orders,
+        integration_orders=integration_orders,
+        integration_tolerance=integration_tolerance,
     )
-
-    # Note: factor 1/2 incorporated later as 2 pi instead of 4 pi
-    Px = (np.conj(Hz) * Ey - np.conj(Hy) * Ez).real
-    Py = (np.conj(Hx) * Ez - np.conj(Hz) * Ex).real
-    Pz = (np.conj(Hy) * Ex - np.conj(Hx) * Ey).real
-
-    # Integral of - dot(P, n) over spherical surface
-    Pabs = -np.sum((Px * x + Py * y + Pz * z) * w)
-
-    return Pabs * (bead.bead_diameter * 0.51) ** 2 * 2 * np.pi
+    power = observables(bead_center, "absorbed_power")["absorbed_power"]
+    logging.getLogger().setLevel(loglevel)
+    return power
 
 
 def scattered_power_focus(
@@ -748,6 +2158,7 @@ def scattered_power_focus(
     bfp_sampling_n=31,
     num_orders=None,
     integration_orders=None,
+    integration_tolerance=1e-4,
     verbose=False,
 ):
     """
@@ -792,54 +2203,804 @@ def scattered_power_focus(
         num_orders: number of order that should be included in the calculation
         the Mie solution. If it is None (default), the code will use the
         number_of_orders() method to calculate a sufficient number.
+    integration_orders : order of the Lebedev-Laikov integration over a
+        sphere around the bead, or "auto" to choose it adaptively, see
+        `force_factory()` and `observables_factory()`.
+    integration_tolerance : (Default value = 1e-4) relative tolerance of the
+        adaptive integration order.
 
     Returns
     -------
     Psca : the scattered power in Watts.
     """
+    loglevel = logging.getLogger().getEffectiveLevel()
+    if verbose:
+        logging.getLogger().setLevel(logging.INFO)
+    observables = observables_factory(
+        f_input_field,
+        objective,
+        bead,
+        bfp_sampling_n=bfp_sampling_n,
+        num_orders=num_orders,
+        integration_orders=integration_orders,
+        integration_tolerance=integration_tolerance,
+    )
+    power = observables(bead_center, "scattered_power")["scattered_power"]
+    logging.getLogger().setLevel(loglevel)
+    return power
 
-    n_orders = bead.number_of_orders if num_orders is None else max(int(num_orders), 1)
 
-    if integration_orders is None:
-        # Go to the next higher available order of integration than should
-        # be strictly necessary
-        order = get_nearest_order(get_nearest_order(n_orders) + 1)
-        x, y, z, w = get_integration_locations(order)
+def _sphere_observables_factory(
+    objective: Objective,
+    bead: Bead,
+    n_orders: int,
+    bfp_sampling_n: int,
+    farfield_data: FarfieldData,
+    integration_order: int,
+):
+    """Create a closure that calculates observables from the fields on a sphere around the bead,
+    sampled with the Lebedev-Laikov scheme of order `integration_order`, see
+    `observables_factory()`. The closure returns a dictionary with the observables for every bead
+    position, without removing dimensions."""
+    x, y, z, w = [
+        np.asarray(c, dtype=np.float64) for c in get_integration_locations(integration_order)
+    ]
+    radius = bead.bead_diameter * 0.51
+
+    local_coordinates = LocalBeadCoordinates(
+        x * radius, y * radius, z * radius, bead.bead_diameter, (0.0, 0.0, 0.0), grid=False
+    )
+    scattered_fields_func = focus_field_factory(
+        objective,
+        bead,
+        n_orders,
+        bfp_sampling_n,
+        None,
+        local_coordinates,
+        False,
+        farfield_data=farfield_data,
+    )
+    phase_correction_factor = plane_wave_phase_correction_factor(objective, bead, bfp_sampling_n)
+    incident_fields_func = incident_field_at_points_factory(
+        farfield_data, bead.n_medium, phase_correction_factor, local_coordinates
+    )
+    # Outward normal vectors, shape (3, number of points)
+    normals = np.stack((x, y, z))
+
+    def observables_at(
+        bead_center: np.ndarray, observables: Tuple[str, ...], num_threads: Optional[int]
+    ):
+        scattered = [
+            np.reshape(component, (len(bead_center), 3, x.size))
+            for component in _stack_fields(
+                scattered_fields_func(bead_center, True, True, False, num_threads)
+            )
+        ]
+
+        def total_fields():
+            incident = incident_fields_func(bead_center, True, True)
+            return [s + i for s, i in zip(scattered, incident)]
+
+        return _observables_on_sphere(
+            observables, scattered, total_fields, normals, w, radius, bead.n_medium
+        )
+
+    return observables_at
+
+
+def _observables_on_sphere(
+    observables: Tuple[str, ...],
+    scattered: Tuple[np.ndarray, np.ndarray],
+    total_fields,
+    normals: np.ndarray,
+    weights: np.ndarray,
+    radius: float,
+    n_medium: float,
+):
+    """Return a dictionary with the observables that follow from the scattered fields `scattered`,
+    a tuple (E, H) of arrays with shape (N, 3, number of points), on a sphere with radius `radius`
+    around the bead, for N bead positions. The total fields are only calculated, with
+    `total_fields()`, if any of the observables requires them."""
+    result = {}
+    if "scattered_power" in observables:
+        result["scattered_power"] = _power_through_sphere(*scattered, normals, weights, radius)
+    if any(observable != "scattered_power" for observable in observables):
+        E, H = total_fields()
+        if "absorbed_power" in observables:
+            result["absorbed_power"] = -_power_through_sphere(E, H, normals, weights, radius)
+        if "force" in observables or "torque" in observables:
+            # Maxwell stress tensor times the normal, shape (N, 3, number of points)
+            Tn = _stress_tensor_times_normal(E, H, n_medium, normals)
+            # Note: factor 1/2 of the time average incorporated as 2 pi instead of 4 pi
+            if "force" in observables:
+                result["force"] = np.sum(Tn * weights, axis=-1) * radius**2 * 2 * np.pi
+            if "torque" in observables:
+                torque = np.cross(normals, Tn, axis=-2)
+                result["torque"] = np.sum(torque * weights, axis=-1) * radius**3 * 2 * np.pi
+    return result
+
+
+def _input_farfield(input_field, objective: Objective, lambda_vac: float, bfp_sampling_n: int):
+    """Return the far field data of `input_field`, which is a callable with the input field in the
+    back focal plane, a tuple `(Ex_bfp, Ey_bfp)` of arrays with the input field at the samples of
+    the back focal plane, or far field data, see `field_response_factory()`."""
+    if isinstance(input_field, FarfieldData):
+        farfield_data = input_field
     else:
-        x, y, z, w = get_integration_locations(
-            get_nearest_order(np.amax((1, int(integration_orders))))
+        if callable(input_field):
+            bfp_coords, bfp_fields = objective.sample_back_focal_plane(input_field, bfp_sampling_n)
+        else:
+            bfp_coords, _ = objective.sample_back_focal_plane(None, bfp_sampling_n)
+            Ex_bfp, Ey_bfp = input_field
+            for field in (Ex_bfp, Ey_bfp):
+                if field is not None and np.shape(field) != bfp_coords.aperture.shape:
+                    raise ValueError(
+                        f"The fields in the back focal plane need to have the shape "
+                        f"{bfp_coords.aperture.shape} for bfp_sampling_n = {bfp_sampling_n}"
+                    )
+            bfp_fields = BackFocalPlaneFields(Ex=Ex_bfp, Ey=Ey_bfp)
+        farfield_data = objective.back_focal_plane_to_farfield(bfp_coords, bfp_fields, lambda_vac)
+    if farfield_data.aperture.shape != (2 * bfp_sampling_n - 1,) * 2:
+        raise ValueError(
+            f"The far field data has to be sampled with bfp_sampling_n = {bfp_sampling_n}"
         )
+    return farfield_data
 
-    # Enforce floats to ensure Numba has all floats when doing @ / np.matmul
-    x, y, z, w = [np.asarray(coord).astype(np.float64) for coord in (x, y, z, w)]
 
-    xb, yb, zb = [
-        ax * bead.bead_diameter * 0.51 + bead_center[idx] for idx, ax in enumerate((x, y, z))
+def _integration_order(n_orders: int, integration_orders: Optional[int]) -> int:
+    """Return the available Lebedev-Laikov integration order for `integration_orders`. If it is
+    None, return an integration order that is one level higher than the one matching n_orders."""
+    if integration_orders is None:
+        return get_nearest_order(get_nearest_order(n_orders) + 1)
+    return get_nearest_order(np.amax((1, int(integration_orders))))
+
+
+def _force_gradient_factory(
+    objective: Objective,
+    bead: Bead,
+    n_orders: int,
+    bfp_sampling_n: int,
+    farfield_data: FarfieldData,
+    integration_order: int,
+):
+    """Create a closure that calculates the force on the bead, the stiffness, and the gradients of
+    both with respect to the input field in the back focal plane, see `force_factory()`.
+
+    The force follows from the Maxwell stress tensor, which is quadratic in the fields on the
+    sphere around the bead, :math:`F_c = \\frac{1}{2} \\mathrm{Re} \\sum_p W_p Q_c(E, E)`, with
+    :math:`Q_c(U, V) = \\sum_k U_k A_{ck}(V)` and
+
+    .. math::
+        A_{ck}(V) = \\epsilon (\\delta_{ck} (V \\cdot n)^* + n_k V_c^* - n_c V_k^*)
+
+    plus the same term for the magnetic field with :math:`\\mu_0`. The fields are a weighted sum
+    of the responses :math:`R_j` to the plane waves with amplitudes :math:`a_j`, see
+    `plane_wave_responses()`. Therefore, a change of the amplitudes changes the force by
+    :math:`\\delta F_c = \\mathrm{Re} \\sum_j \\delta a_j \\sum_{k,p} W_p R_{jkp} A_{ck}(E)`, which
+    costs a single matrix product. The stiffness :math:`\\kappa_c = -\\partial F_c / \\partial
+    x_c` follows in the same way from the derivative of the fields with respect to the bead
+    position, :math:`E'_c = \\sum_j i k_{cj} a_j R_j`."""
+    x, y, z, w = [
+        np.asarray(c, dtype=np.float64) for c in get_integration_locations(integration_order)
     ]
+    radius = bead.bead_diameter * 0.51
+    local_coordinates = LocalBeadCoordinates(
+        x * radius, y * radius, z * radius, bead.bead_diameter, (0.0, 0.0, 0.0), grid=False
+    )
+    geometry, responses_E, responses_H = plane_wave_responses(
+        objective, bead, n_orders, bfp_sampling_n, local_coordinates, True, True, True
+    )
+    n_plane_waves, rows, cols = geometry.size, geometry.rows, geometry.cols
+    responses = [response.reshape(2 * n_plane_waves, -1) for response in (responses_E, responses_H)]
+    k_vectors = np.stack((geometry.kx, geometry.ky, geometry.kz))
+    amplitudes = np.concatenate(
+        (farfield_data.Einf_theta[rows, cols], farfield_data.Einf_phi[rows, cols])
+    )
+    phase_correction_factor = plane_wave_phase_correction_factor(objective, bead, bfp_sampling_n)
+    normals = np.stack((x, y, z))
+    integration_weights = w * radius**2 * 2 * np.pi
+    material = (EPS0 * bead.n_medium**2, MU0)
+    # Derivatives of the far field amplitudes along theta and phi with respect to the fields in the
+    # back focal plane along x and y, see `Objective.back_focal_plane_to_farfield()`
+    scale = np.sqrt(objective.n_bfp / objective.n_medium * geometry.cos_theta)
+    cos_phi, sin_phi = geometry.cos_phi, geometry.sin_phi
+
+    def linear_forms(fields):
+        """Return A(E) and A(H), with shape (3, 3, number of points), times the weights of the
+        integration, for the fields E and H with shape (3, number of points)"""
+        forms = []
+        for field, constant in zip(fields, material):
+            field_n = np.sum(field * normals, axis=0)
+            forms.append(
+                constant
+                * integration_weights
+                * (
+                    np.eye(3)[:, :, None] * np.conj(field_n)
+                    + normals[None, :, :] * np.conj(field)[:, None, :]
+                    - normals[:, None, :] * np.conj(field)[None, :, :]
+                )
+            )
+        return forms
+
+    def to_back_focal_plane(gradient):
+        """Convert the derivatives with respect to the amplitudes, with shape (2 x number of plane
+        waves, 3), to gradients with respect to the fields in the back focal plane, with shape (3,
+        2, *aperture.shape)"""
+        theta, phi = gradient[:n_plane_waves].T, gradient[n_plane_waves:].T
+        return geometry.to_grid(
+            np.conj(
+                scale
+                * np.stack((cos_phi * theta - sin_phi * phi, sin_phi * theta + cos_phi * phi), 1)
+            )
+        )
 
-    Ex, Ey, Ez, Hx, Hy, Hz = fields_focus(
-        f_input_field,
-        objective,
-        bead,
-        bead_center,
-        xb,
-        yb,
-        zb,
+    def calculate(bead_center: np.ndarray):
+        results = {
+            "force": np.empty((len(bead_center), 3)),
+            "stiffness": np.empty((len(bead_center), 3)),
+            "force_gradient": np.empty(
+                (len(bead_center), 3, 2, *geometry.grid_shape), dtype="complex128"
+            ),
+        }
+        results["stiffness_gradient"] = np.empty_like(results["force_gradient"])
+        for idx, position in enumerate(bead_center):
+            weights = np.tile(np.exp(1j * (position @ k_vectors)), 2) * phase_correction_factor
+            fields = [(weights * amplitudes) @ response for response in responses]
+            fields = [field.reshape(3, -1) for field in fields]
+            # Derivatives of the fields with respect to the bead position, shape (3, 3, points)
+            derivatives = [
+                (np.tile(1j * k_vectors, 2) * (weights * amplitudes)) @ response
+                for response in responses
+            ]
+            derivatives = [derivative.reshape(3, 3, -1) for derivative in derivatives]
+
+            forms = linear_forms(fields)
+            Tn = _stress_tensor_times_normal(
+                fields[0][None], fields[1][None], bead.n_medium, normals
+            )
+            results["force"][idx] = np.sum(Tn[0] * integration_weights, axis=-1)
+            force_gradient = sum(
+                response @ form.reshape(3, -1).T for response, form in zip(responses, forms)
+            )
+            stiffness_gradient = np.tile(1j * k_vectors, 2).T * force_gradient
+            for axis in range(3):
+                results["stiffness"][idx, axis] = -np.real(
+                    sum(
+                        np.sum(derivative[axis] * form[axis])
+                        for derivative, form in zip(derivatives, forms)
+                    )
+                )
+                derivative_forms = linear_forms([derivative[axis] for derivative in derivatives])
+                stiffness_gradient[:, axis] += sum(
+                    response @ form[axis].reshape(-1)
+                    for response, form in zip(responses, derivative_forms)
+                )
+            weights = weights[:, None]
+            results["force_gradient"][idx] = to_back_focal_plane(weights * force_gradient)
+            results["stiffness_gradient"][idx] = to_back_focal_plane(-weights * stiffness_gradient)
+        return results
+
+    return calculate
+
+
+def _adaptive_integration_order(
+    make_evaluator: callable,
+    bead: Bead,
+    bead_center: np.ndarray,
+    start_order: int,
+    tolerance: float,
+    num_threads: Optional[int],
+) -> Tuple[int, callable, Dict[str, np.ndarray]]:
+    """Return the lowest Lebedev-Laikov integration order, starting at `start_order`, for which all
+    observables at `bead_center` differ by less than `tolerance` from those at the next higher
+    order. The callable `make_evaluator(order)` returns the closure of
+    `_sphere_observables_factory()` for that order. If no order meets the tolerance, the highest
+    order is used. The closure for the chosen order and all observables at `bead_center` for that
+    order are returned as well. Only the closures of two successive orders are kept at a time."""
+    orders = [get_nearest_order(start_order)]
+    while orders[-1] < _MAX_INTEGRATION_ORDER:
+        orders.append(get_nearest_order(orders[-1] + 1))
+    omega = 2 * np.pi * _C / bead.lambda_vac
+    previous_evaluator = make_evaluator(orders[0])
+    previous = previous_evaluator(bead_center, OBSERVABLES, num_threads)
+    for order, next_order in zip(orders[:-1], orders[1:]):
+        current_evaluator = make_evaluator(next_order)
+        current = current_evaluator(bead_center, OBSERVABLES, num_threads)
+        power = np.max(np.abs(current["absorbed_power"]) + np.abs(current["scattered_power"]))
+        floors = {
+            "force": bead.n_medium * power / _C,
+            "torque": power / omega,
+            "absorbed_power": power,
+            "scattered_power": power,
+        }
+        error = 0.0
+        for observable, floor in floors.items():
+            difference = np.reshape(
+                previous[observable] - current[observable], (len(bead_center), -1)
+            )
+            values = np.reshape(current[observable], (len(bead_center), -1))
+            scale = max(np.max(np.linalg.norm(values, axis=1)), floor)
+            if scale > 0:
+                error = max(error, np.max(np.linalg.norm(difference, axis=1)) / scale)
+        logging.info(f"Integration order {order}: estimated relative error {error:.3g}")
+        if error <= tolerance:
+            return order, previous_evaluator, previous
+        previous_evaluator, previous = current_evaluator, current
+    return orders[-1], previous_evaluator, previous
+
+
+def _cached_integration_order(cache_key: tuple) -> Optional[int]:
+    """Return the adaptively chosen integration order for `cache_key`, or None if there is none, and
+    mark it as the most recently used one"""
+    order = _integration_order_cache.pop(cache_key, None)
+    if order is not None:
+        _integration_order_cache[cache_key] = order
+    return order
+
+
+def _cache_integration_order(cache_key: tuple, order: int):
+    """Store the adaptively chosen integration order for `cache_key`, and evict the least recently
+    used orders beyond `_MAX_CACHED_INTEGRATION_ORDERS` entries"""
+    _integration_order_cache.pop(cache_key, None)
+    _integration_order_cache[cache_key] = order
+    while len(_integration_order_cache) > _MAX_CACHED_INTEGRATION_ORDERS:
+        del _integration_order_cache[next(iter(_integration_order_cache))]
+
+
+def _farfield_fingerprint(farfield_data: FarfieldData) -> str:
+    """Return a hash of the far field of an objective, which identifies the input beam"""
+    digest = hashlib.sha256()
+    for field in (farfield_data.Einf_theta, farfield_data.Einf_phi):
+        digest.update(np.ascontiguousarray(field, dtype=np.complex128).tobytes())
+    return digest.hexdigest()
+
+
+def _sample_farfield(f_input_field, objective: Objective, lambda_vac: float, bfp_sampling_n: int):
+    """Sample the input field in the back focal plane and return the far field"""
+    bfp_coords, bfp_fields = objective.sample_back_focal_plane(f_input_field, bfp_sampling_n)
+    return objective.back_focal_plane_to_farfield(bfp_coords, bfp_fields, lambda_vac)
+
+
+def _check_pruning_tolerance(pruning_tolerance: Optional[float]):
+    if pruning_tolerance is not None and pruning_tolerance < 0:
+        raise ValueError("The pruning tolerance needs to be positive or zero")
+
+
+def _pruned_farfield(farfield_data: FarfieldData, pruning_tolerance: float) -> FarfieldData:
+    """Return the far field without the plane waves and polarization channels that carry a
+    fraction of at most `pruning_tolerance` of the power, see `FarfieldData.pruned()`, and log
+    what is kept"""
+    farfield_data, summary = farfield_data.pruned(pruning_tolerance)
+    logging.info(
+        f"Pruning kept {summary.kept_plane_waves} of {summary.total_plane_waves} plane waves and "
+        f"{summary.kept_channels} of {summary.total_channels} polarization channels, dropped "
+        f"power {summary.dropped_power:.3g}, relative error of the fields at most "
+        f"{summary.error_bound:.3g}"
+    )
+    return farfield_data
+
+
+def _resolve_bfp_sampling_n(
+    bfp_sampling_n: Union[int, str],
+    objective: Objective,
+    bead: Bead,
+    bead_center: Tuple[float, float, float],
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+) -> int:
+    """Return the sampling of the back focal plane for a calculation of the fields at the locations
+    x, y and z, with `bfp_sampling_n` being an integer or "auto", see `fields_focus()`. The field
+    has to be free of aliasing at the locations and across the bead, as the bead scatters the
+    incident field at its surface."""
+    radius = bead.bead_diameter / 2
+    lateral_extent = max(
+        np.max(np.abs(x)),
+        np.max(np.abs(y)),
+        abs(bead_center[0]) + radius,
+        abs(bead_center[1]) + radius,
+    )
+    axial_extent = max(np.max(np.abs(z)), abs(bead_center[2]) + radius)
+    return resolve_bfp_sampling_n(
         bfp_sampling_n,
-        num_orders,
-        return_grid=False,
-        total_field=False,
-        magnetic_field=True,
-        verbose=verbose,
-        grid=False,
+        bead.lambda_vac,
+        objective.n_medium,
+        objective.NA,
+        lateral_extent,
+        axial_extent,
+    )
+
+
+def _refine_bfp_sampling(
+    fields_with_sampling,
+    f_input_field,
+    objective: Objective,
+    lambda_vac: float,
+    bfp_sampling_n: int,
+    tolerance: float,
+    pruning_tolerance: Optional[float] = None,
+):
+    """Calculate fields with `fields_with_sampling(bfp_sampling_n, farfield_data)`, and refine the
+    sampling of the back focal plane until the fields change less than `tolerance`, relative to
+    their largest magnitude. Returns the fields and the final sampling.
+
+    Every refinement doubles the number of intervals between the center and the edge of the back
+    focal plane, which keeps the previous samples. The fields are a sum over the plane waves
+    weighted by the area of a sample, which is a quarter of the previous area. Therefore, the
+    refined fields are a quarter of the previous fields, plus the fields of the new plane waves
+    only. The latter are calculated by passing far field data in which the previous samples are
+    masked. If `pruning_tolerance` is not None, the refined far field is pruned before the previous
+    samples are masked, such that the pruning is relative to the total power, as it is without
+    refinement."""
+    fields = fields_with_sampling(bfp_sampling_n, None)
+    for _ in range(_MAX_BFP_REFINEMENTS):
+        bfp_sampling_n = refined_bfp_sampling_n(bfp_sampling_n)
+        farfield_data = _sample_farfield(f_input_field, objective, lambda_vac, bfp_sampling_n)
+        if pruning_tolerance is not None:
+            farfield_data = _pruned_farfield(farfield_data, pruning_tolerance)
+        new_samples = new_samples_mask(bfp_sampling_n)
+        farfield_data = replace(
+            farfield_data,
+            aperture=farfield_data.aperture & new_samples,
+            Einf_theta=farfield_data.Einf_theta * new_samples,
+            Einf_phi=farfield_data.Einf_phi * new_samples,
+        )
+        new_fields = fields_with_sampling(bfp_sampling_n, farfield_data)
+        refined = tuple(field / 4 + new_field for field, new_field in zip(fields, new_fields))
+        change = max(np.max(np.abs(r - f), initial=0.0) for r, f in zip(refined, fields))
+        magnitude = max(np.max(np.abs(field), initial=0.0) for field in refined)
+        relative_change = change / magnitude if magnitude > 0 else (np.inf if change > 0 else 0.0)
+        fields = refined
+        logging.info(
+            f"Refined bfp_sampling_n to {bfp_sampling_n}, relative change {relative_change}"
+        )
+        if relative_change <= tolerance:
+            return fields, bfp_sampling_n
+    logging.warning(
+        f"The fields did not converge to a relative tolerance of {tolerance} with bfp_sampling_n "
+        f"= {bfp_sampling_n}"
+    )
+    return fields, bfp_sampling_n
+
+
+def _probe_locations(
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+    grid: bool,
+    mask: Optional[np.ndarray],
+    max_locations: int,
+):
+    """Return the coordinates x, y and z of at most `max_locations` locations, which are evenly
+    spread over the locations defined by x, y, z and grid that are in `mask`, if it is not None"""
+    shape = (x.size, y.size, z.size) if grid else (x.size,)
+    n_locations = int(np.prod(shape)) if mask is None else int(np.count_nonzero(mask))
+    step = max(-(-n_locations // max(max_locations, 1)), 1)
+    if mask is None:
+        indices = np.arange(0, n_locations, step)
+    else:
+        indices = np.flatnonzero(mask)[::step]
+    if grid:
+        ix, iy, iz = np.unravel_index(indices, shape)
+        return x[ix], y[iy], z[iz]
+    return x[indices], y[indices], z[indices]
+
+
+def _stack_fields(fields: Tuple[np.ndarray, ...]):
+    """Return the electric and magnetic field components (Ex, Ey, Ez, Hx, Hy, Hz) as two arrays
+    with the components along the second-to-last axis."""
+    return np.stack(fields[:3], axis=-2), np.stack(fields[3:], axis=-2)
+
+
+def _power_through_sphere(
+    E: np.ndarray, H: np.ndarray, normals: np.ndarray, weights: np.ndarray, radius: float
+):
+    """Integrate the time-averaged Poynting vector of the fields E and H, with shape (N, 3, number
+    of points), over a sphere with outward normals `normals` and integration weights `weights`"""
+    S = np.real(np.cross(E, np.conj(H), axis=-2))
+    # Note: factor 1/2 of the time average incorporated as 2 pi instead of 4 pi
+    return np.sum(np.sum(S * normals, axis=-2) * weights, axis=-1) * radius**2 * 2 * np.pi
+
+
+def _stress_tensor_times_normal(E: np.ndarray, H: np.ndarray, n_medium: float, normals: np.ndarray):
+    """Return the product of the Maxwell stress tensor of the fields E and H, with shape (N, 3,
+    number of points), and the normals, without the factor 1/2 of the time average"""
+    eps = EPS0 * n_medium**2
+    E_n = np.sum(E * normals, axis=-2, keepdims=True)
+    H_n = np.sum(H * normals, axis=-2, keepdims=True)
+    energy = eps * np.sum(np.abs(E) ** 2, axis=-2) + MU0 * np.sum(np.abs(H) ** 2, axis=-2)
+    return (
+        eps * np.real(E * np.conj(E_n))
+        + MU0 * np.real(H * np.conj(H_n))
+        - 0.5 * energy[:, None] * normals
+    )
+
+
+def _memory_estimate(
+    objective: Optional[Objective],
+    bead: Bead,
+    n_points: int,
+    n_positions: int,
+    bfp_sampling_n: int,
+    n_orders: int,
+    magnetic_field: bool,
+    num_threads: int,
+    max_memory: Optional[int],
+    chunk_points: bool = True,
+    grid_shape: Optional[Tuple[int, int, int]] = None,
+    output_in_memory: bool = True,
+    output_bytes_per_point: Optional[int] = None,
+) -> MemoryEstimate:
+    """Return the memory estimate for a calculation of the fields in a focus, or of a single plane
+    wave if `objective` is None, see `estimate_memory()`. If the locations are a grid of shape
+    `grid_shape`, chunks of locations are rounded down to whole planes of constant x, if a plane
+    fits in a chunk. See `_fields_in_chunks()`."""
+    if objective is None:
+        n_plane_waves = 1
+    else:
+        aperture = objective.sample_back_focal_plane(None, bfp_sampling_n)[0].aperture
+        n_plane_waves = np.count_nonzero(aperture)
+    estimate = estimate_memory(
+        n_points=n_points,
+        n_positions=n_positions,
+        n_plane_waves=n_plane_waves,
+        n_orders=n_orders,
+        n_fields=2 if magnetic_field else 1,
+        n_threads=num_threads,
+        max_memory=max_memory,
+        chunk_points=chunk_points,
+        output_in_memory=output_in_memory,
+        output_bytes_per_point=output_bytes_per_point,
+    )
+    if grid_shape is not None and chunk_points and estimate.num_chunks > 1:
+        points_per_plane = grid_shape[1] * grid_shape[2]
+        planes_per_chunk = estimate.points_per_chunk // points_per_plane
+        if planes_per_chunk > 0:
+            estimate = replace(
+                estimate,
+                points_per_chunk=planes_per_chunk * points_per_plane,
+                num_chunks=-(-grid_shape[0] // planes_per_chunk),
+            )
+    return estimate
+
+
+def _output_components(quantities: Optional[Tuple[str, ...]], magnetic_field: bool):
+    """Return the validated quantities, the names and type of the arrays that are returned, and
+    whether the magnetic field needs to be calculated, for a calculation of the fields (if
+    `quantities` is None) or of quantities derived from the fields."""
+    if quantities is None:
+        components = ("Ex", "Ey", "Ez") + (("Hx", "Hy", "Hz") if magnetic_field else ())
+        return None, components, "complex128", magnetic_field
+    quantities = check_quantities(quantities)
+    return quantities, output_names(quantities), "float64", requires_magnetic_field(quantities)
+
+
+def _reduce_to_quantities(
+    quantities: Optional[Tuple[str, ...]],
+    fields: Tuple[np.ndarray, ...],
+    local_coordinates: LocalBeadCoordinates,
+    bead: Bead,
+):
+    """Return `fields` if `quantities` is None, and otherwise the quantities derived from the
+    fields at the locations in `local_coordinates`."""
+    if quantities is None:
+        return fields
+    shape = local_coordinates.coordinate_shape
+    epsilon_r = np.where(
+        np.reshape(local_coordinates._region_inside_bead, shape),
+        bead.n_bead**2,
+        bead.n_medium**2,
+    )
+    fields = [np.reshape(field, shape) for field in fields]
+    return tuple(np.squeeze(q) for q in reduce_fields(quantities, fields, epsilon_r))
+
+
+def _field_output(
+    output: Optional[Union[str, PathLike]],
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+    grid: bool,
+    components: Tuple[str, ...],
+    dtype: str,
+    parameters: dict,
+) -> Optional[FieldOutput]:
+    """Return a FieldOutput in the directory `output` for the arrays `components` at the locations
+    defined by x, y, z and grid, or None if `output` is None."""
+    if output is None:
+        return None
+    shape = (x.size, y.size, z.size) if grid else (x.size,)
+    return FieldOutput(
+        output, shape, components, (x, y, z), {**parameters, "grid": grid}, dtype=dtype
     )
 
-    # Note: factor 1/2 incorporated later as 2 pi instead of 4 pi
-    Px = (np.conj(Hz) * Ey - np.conj(Hy) * Ez).real
-    Py = (np.conj(Hx) * Ez - np.conj(Hz) * Ex).real
-    Pz = (np.conj(Hy) * Ex - np.conj(Hx) * Ey).real
 
-    # integral of dot(P, n) over spherical surface:
-    Psca = np.sum((Px * x + Py * y + Pz * z) * w)
+def _evaluation_mask(
+    mask: Optional[Union[np.ndarray, Callable]],
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+    grid: bool,
+) -> Optional[np.ndarray]:
+    """Return `mask`, or the result of `mask(X, Y, Z)` if it is callable, as a boolean array with
+    the shape of the locations defined by x, y, z and grid, or None if `mask` is None."""
+    if mask is None:
+        return None
+    shape = (x.size, y.size, z.size) if grid else (x.size,)
+    if callable(mask):
+        coordinates = (
+            np.broadcast_arrays(x[:, None, None], y[None, :, None], z[None, None, :])
+            if grid
+            else (x, y, z)
+        )
+        mask = mask(*coordinates)
+    mask = np.asarray(mask)
+    if mask.dtype != bool:
+        raise ValueError("The mask has to be a boolean array")
+    try:
+        return np.broadcast_to(mask, shape)
+    except ValueError:
+        raise ValueError(
+            f"A mask with shape {mask.shape} does not match the locations, with shape {shape}"
+        ) from None
+
+
+def _field_symmetry(
+    symmetry: Optional[Union[str, Dict[str, int]]],
+    f_input_field,
+    objective: Objective,
+    bead_center: Tuple[float, float, float],
+    x: np.ndarray,
+    y: np.ndarray,
+    grid: bool,
+    bfp_sampling_n: Union[int, str],
+    output: Optional[Union[str, PathLike]],
+) -> Dict[str, int]:
+    """Return the parity of the input field for every axis along which the mirror symmetry of the
+    fields is used, see `fields_focus()`. The result is empty if no symmetry is used."""
+    if symmetry is None:
+        return {}
+
+    def applies(axis: str):
+        axis_idx = MIRROR_AXES.index(axis)
+        return bead_center[axis_idx] == 0 and is_symmetric((x, y)[axis_idx])
+
+    if isinstance(symmetry, str):
+        if symmetry != "auto":
+            raise ValueError(f"Invalid value for symmetry: {symmetry}")
+        if not grid or output is not None:
+            return {}
+        parities = input_field_parity(
+            f_input_field,
+            objective,
+            _SYMMETRY_BFP_SAMPLING_N if isinstance(bfp_sampling_n, str) else int(bfp_sampling_n),
+        )
+        return {
+            axis: parity
+            for axis, parity in parities.items()
+            if applies(axis) and (x, y)[MIRROR_AXES.index(axis)].size > 1
+        }
+
+    parities = dict(symmetry)
+    if not parities or any(
+        axis not in MIRROR_AXES or parity not in (1, -1) for axis, parity in parities.items()
+    ):
+        raise ValueError(
+            'The symmetry has to be "auto" or a dictionary with the parity, 1 or -1, for "x" '
+            'and/or "y"'
+        )
+    if not grid or output is not None:
+        raise ValueError("A symmetry can only be used for a grid, and without output")
+    for axis in parities:
+        if not applies(axis):
+            raise ValueError(
+                f"The fields are not symmetric along {axis}: the bead center has to be in the "
+                "mirror plane, and the coordinates have to be symmetric around zero"
+            )
+    return parities
+
+
+def _mirrored_fields(
+    reduced: Tuple[np.ndarray, ...],
+    components: Tuple[str, ...],
+    parities: Dict[str, int],
+    shape: Tuple[int, int, int],
+    start: Tuple[int, int],
+    mask: Optional[np.ndarray],
+    fill_value: complex,
+):
+    """Return the arrays `components` on the grid with shape `shape`, from the arrays `reduced` on
+    the part of the grid that starts at the indices `start` along x and y, by mirroring them along
+    the axes in `parities`. The locations that are excluded by `mask` are set to `fill_value`."""
+    ret = tuple()
+    for values, name in zip(reduced, components):
+        full = np.empty(shape, dtype=values.dtype)
+        full[start[0] :, start[1] :] = np.reshape(values, full[start[0] :, start[1] :].shape)
+        # Mirror along y for the rows that are calculated, then along x for all rows
+        for axis_idx in (1, 0):
+            axis = MIRROR_AXES[axis_idx]
+            n_mirrored = start[axis_idx]
+            if axis not in parities or n_mirrored == 0:
+                continue
+            rows = slice(start[0], None) if axis_idx == 1 else slice(None)
+            source = np.flip(full[rows], axis_idx)
+            target = full[rows]
+            index = (slice(None),) * axis_idx + (slice(0, n_mirrored),)
+            target[index] = component_sign(name, axis, parities[axis]) * source[index]
+        if mask is not None:
+            full[np.logical_not(mask)] = fill_value
+        ret += (np.squeeze(full),)
+    return ret
+
 
-    return Psca * (bead.bead_diameter * 0.51) ** 2 * 2 * np.pi
+def _grid_views(x: np.ndarray, y: np.ndarray, z: np.ndarray):
+    """Return the grid of the coordinates x, y and z, as `np.meshgrid(x, y, z, indexing="ij")`
+    would, but as read-only broadcast views of the axes, with the dimensions of size one removed"""
+    X, Y, Z = np.broadcast_arrays(x[:, None, None], y[None, :, None], z[None, None, :])
+    return tuple(np.squeeze(axis) for axis in (X, Y, Z))
+
+
+def _fields_in_chunks(
+    fields_in_chunk: callable,
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+    grid: bool,
+    points_per_chunk: int,
+    num_chunks: int,
+    n_components: int,
+    dtype: str,
+    output: Optional[FieldOutput] = None,
+    mask: Optional[np.ndarray] = None,
+    fill_value: complex = np.nan,
+):
+    """Calculate the fields at the locations defined by x, y, z and grid in chunks of at most
+    `points_per_chunk` locations, with `fields_in_chunk(x, y, z, grid)`, and assemble the
+    `n_components` resulting arrays of type `dtype`. The number of chunks `num_chunks` is only used
+    for reporting progress.
+    A grid is divided along x if a single plane of constant x fits in a chunk, such that every chunk
+    is a regular grid, and into arbitrary locations otherwise. If `output` is not None, the fields
+    are written to its memory-mapped arrays, and chunks that were written before are skipped.
+    If `mask` is not None, the part of the mask of every chunk is passed to `fields_in_chunk` as
+    the keyword argument `mask`, and chunks without any location in the mask are set to
+    `fill_value` without calculating them."""
+    shape = (x.size, y.size, z.size) if grid else (x.size,)
+    fields = (
+        [np.empty(shape, dtype=dtype) for _ in range(n_components)]
+        if output is None
+        else output.fields
+    )
+    points_per_plane = y.size * z.size
+
+    def chunks():
+        # Yield the index into the fields, the locations and whether the locations are a grid
+        if grid and points_per_chunk >= points_per_plane:
+            step = points_per_chunk // points_per_plane
+            for start in range(0, x.size, step):
+                yield (slice(start, start + step),), (x[start : start + step], y, z), True
+        else:
+            coordinates = LocalBeadCoordinates(x, y, z, 0.0, grid=grid)
+            for block, locations in coordinates.point_blocks(points_per_chunk):
+                index = np.unravel_index(np.arange(block.start, block.stop), shape)
+                yield index, tuple(locations), False
+
+    for chunk_idx, (index, locations, chunk_grid) in enumerate(chunks()):
+        if output is not None and output.is_complete(index):
+            logging.info(f"Skipping chunk {chunk_idx + 1} of {num_chunks}, already calculated")
+            continue
+        logging.info(f"Processing chunk {chunk_idx + 1} of {num_chunks}")
+        if mask is None:
+            chunk_fields = fields_in_chunk(*locations, chunk_grid)
+        elif np.any(mask[index]):
+            chunk_fields = fields_in_chunk(*locations, chunk_grid, mask=mask[index])
+        else:
+            chunk_fields = None
+        for field_idx, field in enumerate(fields):
+            if chunk_fields is None:
+                field[index] = fill_value
+            else:
+                field[index] = np.reshape(chunk_fields[field_idx], field[index].shape)
+        if output is not None:
+            output.mark_complete(index)
+
+    return tuple(np.squeeze(field) for field in fields)
@@ -1,9 +1,7 @@
-from dataclasses import fields
-
 import numpy as np
 from numba import njit, prange
 
-from ..farfield_data import FarfieldData
+from ..farfield_data import PlaneWaves
 from ..mathutils.associated_legendre import (
     associated_legendre_dtheta,
     associated_legendre_over_sin_theta,
@@ -15,7 +13,6 @@ from .local_coordinates import Coordinates
 def _loop_over_rotations(
     local_coords_stacked: np.ndarray,
     radii: np.ndarray,
-    aperture: np.ndarray,
     cos_theta: np.ndarray,
     sin_theta: np.ndarray,
     cos_phi: np.ndarray,
@@ -25,38 +22,30 @@ def _loop_over_rotations(
     Find all possible values of cos(theta), where theta is the angle of a coordinate with the z
     axis. Do this by looping over all possible rotations of the local coordinate system, as dictated
     by the plane waves in the focus, and calculating cos(theta) for every coordinate and every
-    rotation.
+    rotation. The angles of the plane waves are one-dimensional arrays, see `PlaneWaves`.
     """
-    rows, cols = np.nonzero(aperture)
-
-    # Weird construct to work around tuple unpacking bug in Numba
-    # https://github.com/numba/numba/issues/8772
-    shape = (aperture.shape[0], aperture.shape[1], radii.size)
-    local_cos_theta = np.zeros(shape)
+    local_cos_theta = np.zeros((cos_theta.size, radii.size))
 
     index = radii == 0
-    for r, c in zip(rows, cols):
+    for pw in prange(cos_theta.size):
         # Rotate the coordinate system such that the x-polarization on the
         # bead coincides with theta polarization in global space
         # however, cos(theta) is the same for phi polarization!
-        # >>> A = (_R_th(cos_theta_bfp[p,m], sin_theta[p,m]) @
-        # >>>     _R_phi(cos_phi[p,m], -sin_phi[p,m]))
+        # >>> A = (_R_th(cos_theta[pw], sin_theta[pw]) @
+        # >>>     _R_phi(cos_phi[pw], -sin_phi[pw]))
         # >>> coords = A @ local_coords_stacked
         # >>> z = coords[2, :]
 
         # The following line is equal to z = coords[2, :] after doing the transform with A
         z = (
-            local_coords_stacked[2, :] * cos_theta[r, c]
-            - (
-                local_coords_stacked[0, :] * cos_phi[r, c]
-                + local_coords_stacked[1, :] * sin_phi[r, c]
-            )
-            * sin_theta[r, c]
+            local_coords_stacked[2, :] * cos_theta[pw]
+            - (local_coords_stacked[0, :] * cos_phi[pw] + local_coords_stacked[1, :] * sin_phi[pw])
+            * sin_theta[pw]
         )
 
         # Retrieve an array of all values of cos(theta)
-        local_cos_theta[r, c, :] = z / radii  # cos(theta)
-        local_cos_theta[r, c, index] = 1
+        local_cos_theta[pw, :] = z / radii  # cos(theta)
+        local_cos_theta[pw, index] = 1
 
     return local_cos_theta
 
@@ -91,22 +80,22 @@ def _alp_sin_theta_with_parity(
 
 def calculate_legendre(
     coordinates: Coordinates,
-    farfield_data: FarfieldData,
+    plane_waves: PlaneWaves,
     n_orders: int,
 ):
     """
     Calculate the value of the Associated Legendre Functions of order `n_orders` and degree 1 for
     the unique values of cos(theta). These values are found by rotating all local coordinates (x, y,
     z) over all possible angles, as defined by the plane waves coming from the back focal plane.
+    The indices into the tables have the shape (number of plane waves, number of coordinates).
     """
 
     # Unpack data class members to a dict for Numba
-    farfield_args = {
-        field.name: getattr(farfield_data, field.name)
-        for field in fields(farfield_data)
-        if field.name in ("aperture", "cos_theta", "sin_theta", "cos_phi", "sin_phi")
+    angles = {
+        name: getattr(plane_waves, name)
+        for name in ("cos_theta", "sin_theta", "cos_phi", "sin_phi")
     }
-    local_cos_theta = _loop_over_rotations(coordinates.xyz_stacked, coordinates.r, **farfield_args)
+    local_cos_theta = _loop_over_rotations(coordinates.xyz_stacked, coordinates.r, **angles)
 
     shape = local_cos_theta.shape
     local_cos_theta = np.reshape(local_cos_theta, local_cos_theta.size)
@@ -134,3 +123,22 @@ def calculate_legendre(
     alp_dtheta = np.empty_like(alp_sin_theta)
     associated_legendre_dtheta(unique_cos_theta, alp_sin_theta, alp_dtheta)
     return (alp_sin_theta, inverse), (alp_dtheta, inverse)
+
+
+def calculate_legendre_tables(
+    coordinates: Coordinates,
+    plane_waves: PlaneWaves,
+    n_orders: int,
+):
+    """
+    Same as `calculate_legendre()`, but the tables with the values of the Associated Legendre
+    Functions have the shape (number of unique values of cos(theta), n_orders), such that the
+    values for all orders of a single cos(theta) are contiguous in memory.
+    """
+    (alp_sin_theta, inverse), (alp_dtheta, _) = calculate_legendre(
+        coordinates, plane_waves, n_orders
+    )
+    alp_sin_theta, alp_dtheta = [
+        np.ascontiguousarray(table.T) for table in (alp_sin_theta, alp_dtheta)
+    ]
+    return (alp_sin_theta, inverse), (alp_dtheta, inverse)
@@ -30,137 +30,274 @@ class Coordinates:
 class LocalBeadCoordinates(Coordinates):
     __slots__ = (
         "_bead_diameter",
-        "_outside_bead",
-        "_inside_bead",
-        "_x_local",
-        "_y_local",
-        "_z_local",
-        "_r",
+        "_axes",
+        "_points",
         "_xyz_shape",
+        "_mask",
+        "_cache",
     )
 
-    def __init__(self, x, y, z, bead_diameter, bead_center=(0, 0, 0), grid=True):
-        """Set up local coordinate system around bead"""
+    def __init__(self, x, y, z, bead_diameter, bead_center=(0, 0, 0), grid=True, mask=None):
+        """Set up local coordinate system around bead. The coordinates of a grid are kept as the
+        separate (local) x, y and z axes, and the coordinates of every point, their distance to the
+        bead center and the regions inside and outside of the bead are only calculated when they
+        are first needed, and then cached.
+
+        If `mask` is not None, it is a boolean array with a value for every point, in the order of
+        `xyz_stacked`, and only the points for which it is True are part of the regions inside and
+        outside of the bead. The grid structure is kept, and the other points are never stacked."""
 
         self._bead_diameter = bead_diameter
-        # Set up a meshgrid, or take the list of x, y and z points as
-        # coordinates
+        self._cache = {}
         if grid:
-            X, Y, Z = np.meshgrid(x, y, z, indexing="ij")
+            # Keep the (local) axes of a grid, such that algorithms that require a regular grid can
+            # use them.
+            self._axes = tuple(
+                np.reshape(axis, -1) - center for axis, center in zip((x, y, z), bead_center)
+            )
+            self._points = None
+            self._xyz_shape = tuple(axis.size for axis in self._axes)
         else:
             assert x.size == y.size == z.size, "x, y and z need to be of the same length"
-            X = np.atleast_3d(x)
-            Y = np.atleast_3d(y)
-            Z = np.atleast_3d(z)
+            self._axes = None
+            self._points = tuple(
+                np.reshape(coord, -1) - center for coord, center in zip((x, y, z), bead_center)
+            )
+            # Store for rearranging the coordinates to original format
+            self._xyz_shape = np.atleast_3d(x).shape
+        self._mask = None
+        if mask is not None:
+            self._mask = np.reshape(np.asarray(mask, dtype=bool), -1)
+            assert self._mask.size == np.prod(self._xyz_shape), "mask needs a value for every point"
+
+    def _cached(self, key, calculate):
+        if key not in self._cache:
+            self._cache[key] = calculate()
+        return self._cache[key]
+
+    def _broadcast_axes(self):
+        """Return the local x, y and z coordinates of a grid as broadcast views with the shape of
+        the grid, without copying them"""
+        x, y, z = self._axes
+        return np.broadcast_arrays(x[:, None, None], y[None, :, None], z[None, None, :])
 
-        # Store for rearranging the coordinates to original format
-        self._xyz_shape = X.shape
+    @property
+    def _r(self):
+        """Distance of every point to the center of the bead, as a flat array"""
 
-        # Local coordinate system around the bead and make it a vector
-        self._x_local = X.reshape((1, -1)) - bead_center[0]
-        self._y_local = Y.reshape((1, -1)) - bead_center[1]
-        self._z_local = Z.reshape((1, -1)) - bead_center[2]
+        def distance():
+            x, y, z = self._broadcast_axes() if self._axes is not None else self._points
+            return np.hypot(np.hypot(x, y), z).reshape(-1)
 
-        # Calculate the distance of a coordinate to the center of the bead
-        self._r = np.hypot(np.hypot(self._x_local, self._y_local), self._z_local)
-        self._outside_bead = self._r > bead_diameter / 2
-        self._inside_bead = self._r <= bead_diameter / 2
+        return self._cached("r", distance)
 
     def get_xyz_stacked(self, location: CoordLocation):
         if location == CoordLocation.INSIDE_BEAD:
-            return np.vstack((self._x_inside, self._y_inside, self._z_inside))
-        if location == CoordLocation.OUTSIDE_BEAD:
-            return np.vstack((self._x_outside, self._y_outside, self._z_outside))
-        if location == CoordLocation.EVERYWHERE:
-            return np.vstack((self._x_local, self._y_local, self._z_local))
+            region = self._region_inside_bead
+        elif location == CoordLocation.OUTSIDE_BEAD:
+            region = self._region_outside_bead
+        elif location == CoordLocation.EVERYWHERE:
+            return self._cached(location, self._stack_all)
         else:
             raise ValueError("Unsupported location for coordinates given")
+        return self._cached(location, lambda: self.get_xyz_stacked_in_region(region))
+
+    def _stack_all(self):
+        if self._axes is None:
+            return np.vstack(self._points)
+        xyz = np.empty((3, int(np.prod(self._xyz_shape))))
+        for row, axis in zip(xyz, self._broadcast_axes()):
+            row.reshape(self._xyz_shape)[...] = axis
+        return xyz
+
+    def get_xyz_stacked_in_region(self, region: np.ndarray):
+        """Return the stacked (x, y, z) coordinates of all points for which `region` is True"""
+        if self._axes is None or CoordLocation.EVERYWHERE in self._cache:
+            return self.xyz_stacked[:, np.reshape(region, -1)]
+        # Gather the points of the region from the axes, without stacking all points first
+        index = np.unravel_index(np.flatnonzero(region), self._xyz_shape)
+        return np.vstack([axis[idx] for axis, idx in zip(self._axes, index)])
+
+    def point_blocks(self, points_per_block: int):
+        """Yield the stacked (x, y, z) coordinates of consecutive blocks of at most
+        `points_per_block` points, in the order of `xyz_stacked`, with the slice of the points of
+        every block. The blocks are generated from the axes of a grid when they are requested, such
+        that the coordinates of all points are never stacked at once."""
+        n_points = int(np.prod(self._xyz_shape))
+        for start in range(0, n_points, points_per_block):
+            block = slice(start, min(start + points_per_block, n_points))
+            if self._axes is None:
+                yield block, np.vstack([coord[block] for coord in self._points])
+            else:
+                index = np.unravel_index(np.arange(block.start, block.stop), self._xyz_shape)
+                yield block, np.vstack([axis[idx] for axis, idx in zip(self._axes, index)])
 
     @property
     def _r_inside(self):
-        return self._r[self._inside_bead]
+        return self._r[self._region_inside_bead]
 
     @property
     def _r_outside(self):
-        return self._r[self._outside_bead]
+        return self._r[self._region_outside_bead]
+
+    def _masked(self, region: np.ndarray):
+        return region if self._mask is None else np.logical_and(region, self._mask)
 
     @property
-    def _x_inside(self):
-        return self._x_local[self._inside_bead]
+    def _region_inside_bead(self):
+        return self._cached("inside", lambda: self._masked(self._r <= self._bead_diameter / 2))
 
     @property
-    def _y_inside(self):
-        return self._y_local[self._inside_bead]
+    def _region_outside_bead(self):
+        return self._cached("outside", lambda: self._masked(self._r > self._bead_diameter / 2))
 
     @property
-    def _z_inside(self):
-        return self._z_local[self._inside_bead]
+    def is_masked(self):
+        """True if only the points of a mask are part of the regions inside and outside of the
+        bead"""
+        return self._mask is not None
 
     @property
-    def _x_outside(self):
-        return self._x_local[self._outside_bead]
+    def coordinate_shape(self):
+        return self._xyz_shape
 
     @property
-    def _y_outside(self):
-        return self._y_local[self._outside_bead]
+    def xyz_stacked(self):
+        return self.get_xyz_stacked(CoordLocation.EVERYWHERE)
 
     @property
-    def _z_outside(self):
-        return self._z_local[self._outside_bead]
+    def regular_grid_axes(self):
+        """Return the local x, y and z axes of the grid if the coordinates are a grid that is
+        regularly spaced along x and along y, with ascending values. Return None otherwise. The
+        spacing along z is not restricted."""
+        if self._axes is None:
+            return None
+        for axis in self._axes[:2]:
+            if axis.size > 1:
+                step = np.diff(axis)
+                if step[0] <= 0 or not np.allclose(step, step[0], rtol=1e-9, atol=0):
+                    return None
+        return self._axes
+
+
+class InternalBeadCoordinates(Coordinates):
+    def __init__(self, local_coordinates: LocalBeadCoordinates) -> None:
+        self._local_coordinates = local_coordinates
 
     @property
-    def _region_inside_bead(self):
-        return self._inside_bead
+    def xyz_stacked(self):
+        return self._local_coordinates.get_xyz_stacked(CoordLocation.INSIDE_BEAD)
 
     @property
-    def _region_outside_bead(self):
-        return self._outside_bead
+    def r(self):
+        return self._local_coordinates._r_inside
+
+    @property
+    def region(self):
+        return self._local_coordinates._region_inside_bead
 
     @property
     def coordinate_shape(self):
-        return self._xyz_shape
+        return self._local_coordinates.coordinate_shape
+
+
+class ExternalBeadCoordinates(Coordinates):
+    def __init__(
+        self, local_coordinates: LocalBeadCoordinates, far_zone_radius: float = np.inf
+    ) -> None:
+        """Coordinates outside of the bead. If `far_zone_radius` is finite, only the coordinates
+        that are outside of the bead and closer to the bead center than `far_zone_radius` are
+        included. The remaining coordinates are available as `FarZoneBeadCoordinates`."""
+        self._local_coordinates = local_coordinates
+        self._far_zone_radius = far_zone_radius
 
     @property
     def xyz_stacked(self):
-        return self.get_xyz_stacked(CoordLocation.EVERYWHERE)
+        if np.isinf(self._far_zone_radius):
+            return self._local_coordinates.get_xyz_stacked(CoordLocation.OUTSIDE_BEAD)
+        return self._local_coordinates.get_xyz_stacked_in_region(self.region)
 
+    @property
+    def r(self):
+        if np.isinf(self._far_zone_radius):
+            return self._local_coordinates._r_outside
+        return self._local_coordinates._r[self.region]
 
-class InternalBeadCoordinates(Coordinates):
-    def __init__(self, local_coordinates: LocalBeadCoordinates) -> None:
+    @property
+    def region(self):
+        if np.isinf(self._far_zone_radius):
+            return self._local_coordinates._region_outside_bead
+        return np.logical_and(
+            self._local_coordinates._region_outside_bead,
+            self._local_coordinates._r <= self._far_zone_radius,
+        )
+
+    @property
+    def coordinate_shape(self):
+        return self._local_coordinates.coordinate_shape
+
+
+class NearZoneBeadCoordinates(Coordinates):
+    def __init__(
+        self, local_coordinates: LocalBeadCoordinates, far_zone_radius: float = np.inf
+    ) -> None:
+        """Coordinates inside of the bead, and outside of the bead up to `far_zone_radius`. These
+        are the complement of `FarZoneBeadCoordinates` with the same `far_zone_radius`."""
         self._local_coordinates = local_coordinates
+        self._far_zone_radius = far_zone_radius
+
+    def _all_points(self):
+        return np.isinf(self._far_zone_radius) and not self._local_coordinates.is_masked
 
     @property
     def xyz_stacked(self):
-        return self._local_coordinates.get_xyz_stacked(CoordLocation.INSIDE_BEAD)
+        if self._all_points():
+            return self._local_coordinates.get_xyz_stacked(CoordLocation.EVERYWHERE)
+        return self._local_coordinates.get_xyz_stacked_in_region(self.region)
 
     @property
     def r(self):
-        return self._local_coordinates._r_inside
+        if self._all_points():
+            return self._local_coordinates._r.reshape(-1)
+        return self._local_coordinates._r[self.region]
 
     @property
     def region(self):
-        return self._local_coordinates._region_inside_bead
+        return np.logical_or(
+            self._local_coordinates._region_inside_bead,
+            np.logical_and(
+                self._local_coordinates._region_outside_bead,
+                self._local_coordinates._r <= self._far_zone_radius,
+            ),
+        )
 
     @property
     def coordinate_shape(self):
         return self._local_coordinates.coordinate_shape
 
 
-class ExternalBeadCoordinates(Coordinates):
-    def __init__(self, local_coordinates: LocalBeadCoordinates) -> None:
+class FarZoneBeadCoordinates(Coordinates):
+    def __init__(self, local_coordinates: LocalBeadCoordinates, far_zone_radius: float) -> None:
+        """Coordinates outside of the bead that are further away from the bead center than
+        `far_zone_radius`. These are the complement of `ExternalBeadCoordinates` with the same
+        `far_zone_radius`."""
         self._local_coordinates = local_coordinates
+        self._far_zone_radius = far_zone_radius
 
     @property
     def xyz_stacked(self):
-        return self._local_coordinates.get_xyz_stacked(CoordLocation.OUTSIDE_BEAD)
+        return self._local_coordinates.get_xyz_stacked_in_region(self.region)
 
     @property
     def r(self):
-        return self._local_coordinates._r_outside
+        return self._local_coordinates._r[self.region]
 
     @property
     def region(self):
-        return self._local_coordinates._region_outside_bead
+        return np.logical_and(
+            self._local_coordinates._region_outside_bead,
+            self._local_coordinates._r > self._far_zone_radius,
+        )
 
     @property
     def coordinate_shape(self):
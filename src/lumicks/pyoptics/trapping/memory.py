@@ -0,0 +1,198 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from .focused_field_calculation import _parallel_axis
+
+_COMPLEX = np.dtype("complex128").itemsize
+_FLOAT = np.dtype("float64").itemsize
+
+# Global memory budget in bytes for the calculation of fields, see `set_max_memory()`
+_max_memory = None
+
+
+def set_max_memory(max_memory: Optional[int]):
+    """Set the default memory budget, in bytes, for calculations of the fields of a bead in a
+    focus. The budget is used by `fields_focus()` and `field_factory()` if their parameter
+    `max_memory` is None. Use None (the initial value) to disable the budget.
+
+    Parameters
+    ----------
+    max_memory : Optional[int]
+        Memory budget in bytes, or None.
+    """
+    global _max_memory
+    if max_memory is not None and max_memory <= 0:
+        raise ValueError("The memory budget needs to be strictly positive")
+    _max_memory = None if max_memory is None else int(max_memory)
+
+
+def get_max_memory() -> Optional[int]:
+    """Return the default memory budget in bytes, as set by `set_max_memory()`, or None if there is
+    no budget."""
+    return _max_memory
+
+
+@dataclass(frozen=True)
+class MemoryEstimate:
+    """Estimate of the peak memory consumption, in bytes, of a calculation of the fields of a bead
+    in a focus, and the chunks in which the calculation is executed.
+
+    The estimates of `coordinates`, `legendre`, `radial` and `kernel` are for a single chunk, as
+    these are released after a chunk is processed. The estimate of `output` is the size of the
+    returned fields, which are assembled chunk by chunk. The estimate of the Legendre functions is
+    an upper bound, as it assumes that no two points and plane waves share the same polar angle.
+
+    Attributes
+    ----------
+    coordinates : int
+        Memory for the coordinates of the points, and derived quantities
+    legendre : int
+        Memory for the polar angles of the points for every plane wave, and the Legendre functions
+    radial : int
+        Memory for the tables of radial functions
+    kernel : int
+        Memory for the intermediate field storage of the kernels and the incident field
+    output : int
+        Memory for the returned fields
+    points_per_chunk : int
+        Number of points that are processed at once
+    positions_per_chunk : int
+        Number of bead positions that are processed at once
+    num_chunks : int
+        Total number of chunks
+    """
+
+    coordinates: int
+    legendre: int
+    radial: int
+    kernel: int
+    output: int
+    points_per_chunk: int
+    positions_per_chunk: int
+    num_chunks: int
+
+    @property
+    def peak(self) -> int:
+        """Estimated peak memory consumption in bytes"""
+        return self.coordinates + self.legendre + self.radial + self.kernel + self.output
+
+
+def _chunk_estimate(
+    n_points: int,
+    n_positions: int,
+    n_plane_waves: int,
+    n_orders: int,
+    n_fields: int,
+    n_threads: int,
+):
+    """Estimate the memory for the coordinates, Legendre functions, radial functions and kernel
+    storage, for a chunk of `n_points` points and `n_positions` bead positions."""
+    coordinates = 12 * _FLOAT * n_points
+    # The polar angles and their inverse index for every plane wave in the aperture are kept, and
+    # temporarily sorted and copied by `np.unique()`. The Legendre functions and their derivatives
+    # are copied once to change the memory layout.
+    legendre = (
+        _FLOAT
+        * n_points
+        * (n_plane_waves + max(3 * n_plane_waves, 4 * n_orders * (n_plane_waves + 1)))
+    )
+    radial = n_fields * 3 * n_orders * _COMPLEX * n_points
+    field_size = n_fields * 3 * _COMPLEX * n_points
+    parallel_axis = _parallel_axis(n_threads, n_positions, n_plane_waves, n_points, n_fields)
+    copies = {"plane_waves": n_threads + 1, "positions": 1, "points": 1}[parallel_axis]
+    # The kernel storage, the incident field and the result of the chunk
+    kernel = field_size * (n_positions * (copies + 2))
+    if parallel_axis == "positions":
+        kernel += field_size * n_plane_waves
+    return coordinates, legendre, radial, kernel
+
+
+def estimate_memory(
+    n_points: int,
+    n_positions: int,
+    n_plane_waves: int,
+    n_orders: int,
+    n_fields: int = 1,
+    n_threads: int = 1,
+    max_memory: Optional[int] = None,
+    chunk_points: bool = True,
+    output_in_memory: bool = True,
+    output_bytes_per_point: Optional[int] = None,
+) -> MemoryEstimate:
+    """Estimate the peak memory consumption of a calculation of the fields of a bead in a focus,
+    and, if there is a memory budget, the chunk size that keeps the calculation within that budget.
+
+    Parameters
+    ----------
+    n_points : int
+        Number of points at which the fields are evaluated
+    n_positions : int
+        Number of bead positions
+    n_plane_waves : int
+        Number of plane waves in the aperture of the objective
+    n_orders : int
+        Number of orders of the Mie solution
+    n_fields : int
+        Number of fields, 1 for the electric field only and 2 for the electric and magnetic field
+    n_threads : int
+        Number of threads
+    max_memory : Optional[int]
+        Memory budget in bytes. If None, the global budget of `set_max_memory()` is used, and if
+        that is None as well, the calculation is done in a single chunk.
+    chunk_points : bool
+        If True (default), the points are divided into chunks, and otherwise the bead positions.
+    output_in_memory : bool
+        If True (default), the returned fields are kept in memory. If False, the fields are written
+        to disk chunk by chunk, and are not included in the estimate.
+    output_bytes_per_point : Optional[int]
+        Size in bytes of the output for a single point and bead position. If None (default), the
+        size of the complex field components is used.
+
+    Returns
+    -------
+    MemoryEstimate
+        The estimate of the memory consumption, for the chunk size that is used.
+
+    Raises
+    ------
+    ValueError
+        Raised if the calculation does not fit in the memory budget, even when processing a single
+        point or bead position at a time.
+    """
+    max_memory = _max_memory if max_memory is None else max_memory
+    if output_bytes_per_point is None:
+        output_bytes_per_point = n_fields * 3 * _COMPLEX
+    output = output_bytes_per_point * n_points * n_positions if output_in_memory else 0
+
+    def chunk(size: int):
+        points, positions = (size, n_positions) if chunk_points else (n_points, size)
+        return _chunk_estimate(points, positions, n_plane_waves, n_orders, n_fields, n_threads)
+
+    total = n_points if chunk_points else n_positions
+    size = total
+    if max_memory is not None and sum(chunk(total)) + output > max_memory:
+        # The estimate grows monotonically with the chunk size, find the largest chunk that fits
+        if sum(chunk(1)) + output > max_memory:
+            raise ValueError(
+                f"The calculation requires at least {sum(chunk(1)) + output} bytes, which exceeds "
+                f"the memory budget of {max_memory} bytes"
+            )
+        low, high = 1, total
+        while high - low > 1:
+            mid = (low + high) // 2
+            low, high = (mid, high) if sum(chunk(mid)) + output <= max_memory else (low, mid)
+        size = low
+
+    coordinates, legendre, radial, kernel = chunk(size)
+    return MemoryEstimate(
+        coordinates=int(coordinates),
+        legendre=int(legendre),
+        radial=int(radial),
+        kernel=int(kernel),
+        output=int(output),
+        points_per_chunk=int(size if chunk_points else n_points),
+        positions_per_chunk=int(n_positions if chunk_points else size),
+        num_chunks=int(-(-total // size)) if total > 0 else 1,
+    )
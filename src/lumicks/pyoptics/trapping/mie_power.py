@@ -0,0 +1,120 @@
+import numpy as np
+from scipy.constants import epsilon_0 as EPS0
+from scipy.constants import speed_of_light as C
+
+from ..farfield_data import FarfieldData
+from ..mathutils.associated_legendre import normalized_legendre_pi_tau
+from .bead import Bead
+
+# Maximum number of bead positions for which the multipole amplitudes are calculated at once
+_POSITIONS_PER_BATCH = 256
+
+
+def multipole_amplitudes(
+    farfield_data: FarfieldData, n_orders: int, phase_correction_factor: complex
+):
+    """Calculate the contribution of every plane wave in the aperture to the amplitudes of the
+    electric and magnetic multipoles of the focused field, expanded around the focus.
+
+    A plane wave with a (transverse) electric field :math:`\\mathbf{e} e^{i \\mathbf{k} \\cdot
+    \\mathbf{r}}` is expanded in vector spherical harmonics :math:`\\mathbf{X}_{nm}`, where the
+    magnetic multipole of degree n and order m has the amplitude :math:`4 \\pi
+    \\mathbf{X}^*_{nm}(\\hat{\\mathbf{k}}) \\cdot \\mathbf{e}` and the electric multipole the
+    amplitude :math:`4 \\pi \\mathbf{X}^*_{nm}(\\hat{\\mathbf{k}}) \\cdot (\\hat{\\mathbf{k}}
+    \\times \\mathbf{e})`, up to a factor that only depends on n. The focused field is the sum of
+    the plane waves in the aperture, and its amplitudes are the sum of those of the plane waves.
+
+    Returns
+    -------
+    amplitudes_E : np.ndarray
+        Array with shape (number of plane waves, n_orders * (n_orders + 2)) with the amplitudes of
+        the electric multipoles, ordered by degree n and then by order m = -n..n.
+    amplitudes_M : np.ndarray
+        Same as `amplitudes_E`, for the magnetic multipoles.
+    degree : np.ndarray
+        The degree n of every column of the amplitudes.
+    """
+    plane_waves = farfield_data.plane_waves()
+    kx, ky, kz = plane_waves.kx, plane_waves.ky, plane_waves.kz
+    k = np.hypot(np.hypot(kx, ky), kz)
+    # Field of every plane wave, matching the amplitudes in `incident_field`
+    e = np.stack(plane_waves.transform_to_xyz()) * (
+        plane_waves.weights / kz * phase_correction_factor
+    )
+    # Spherical coordinates of the direction of propagation, and the unit vectors along theta and
+    # phi in that direction
+    cos_theta = kz / k
+    sin_theta = np.hypot(kx, ky) / k
+    phi = np.arctan2(ky, kx)
+    cos_phi, sin_phi = np.cos(phi), np.sin(phi)
+    theta_hat = np.stack((cos_theta * cos_phi, cos_theta * sin_phi, -sin_theta))
+    phi_hat = np.stack((-sin_phi, cos_phi, np.zeros_like(phi)))
+    e_theta = np.sum(e * theta_hat, axis=0)
+    e_phi = np.sum(e * phi_hat, axis=0)
+
+    pi_nm, tau_nm = normalized_legendre_pi_tau(n_orders, cos_theta, sin_theta)
+    n_coeffs = n_orders * (n_orders + 2)
+    amplitudes_E = np.empty((kz.size, n_coeffs), dtype="complex128")
+    amplitudes_M = np.empty_like(amplitudes_E)
+    degree = np.empty(n_coeffs, dtype=int)
+    column = 0
+    for n in range(1, n_orders + 1):
+        norm = 4 * np.pi / np.sqrt(n * (n + 1))
+        for m in range(-n, n + 1):
+            # P_n^-m = (-1)^m P_n^m for the normalized associated Legendre functions
+            sign = (-1) ** m if m < 0 else 1
+            pi = -sign * pi_nm[n - 1, -m] if m < 0 else pi_nm[n - 1, m]
+            tau = sign * tau_nm[n - 1, abs(m)]
+            phase = np.exp(-1j * m * phi) * norm
+            # X*_nm = [-pi theta_hat + 1j * tau phi_hat] exp(-1j m phi) / sqrt(n (n + 1)), and
+            # k_hat x e has the components (-e_phi, e_theta) along (theta_hat, phi_hat)
+            amplitudes_M[:, column] = (-pi * e_theta + 1j * tau * e_phi) * phase
+            amplitudes_E[:, column] = (pi * e_phi + 1j * tau * e_theta) * phase
+            degree[column] = n
+            column += 1
+    return amplitudes_E, amplitudes_M, degree
+
+
+def multipole_power_factory(
+    farfield_data: FarfieldData, bead: Bead, n_orders: int, phase_correction_factor: complex
+):
+    """Create a closure that calculates the extinguished, scattered and absorbed power of a bead
+    in a focus from the multipole amplitudes of the focused field at the bead position and the Mie
+    coefficients of the bead.
+
+    The powers are the generalization of the extinction and scattering cross sections of a bead in
+    a plane wave (see `Bead.extinction_eff()` and `Bead.scattering_eff()`) to an arbitrary beam:
+
+    .. math::
+        P_{sca} = \\frac{n \\epsilon_0 c}{2 k^2} \\sum_{n,m} |a_n|^2 |p^E_{nm}|^2 + |b_n|^2
+        |p^M_{nm}|^2
+
+    and :math:`P_{ext}` is the same sum with :math:`\\mathrm{Re}(a_n)` and
+    :math:`\\mathrm{Re}(b_n)`. The absorbed power is the difference of the two."""
+    amplitudes_E, amplitudes_M, degree = multipole_amplitudes(
+        farfield_data, n_orders, phase_correction_factor
+    )
+    plane_waves = farfield_data.plane_waves()
+    kx, ky, kz = plane_waves.kx, plane_waves.ky, plane_waves.kz
+    an, bn = bead.ab_coeffs(n_orders)
+    an, bn = an[degree - 1], bn[degree - 1]
+    factor = bead.n_medium * EPS0 * C / (2 * bead.k**2)
+
+    def calculate_power(bead_center: np.ndarray):
+        """Return the extinguished, scattered and absorbed power for every bead position in
+        `bead_center`, with shape (N, 3), as arrays with shape (N,)"""
+        extinguished = np.empty(len(bead_center))
+        scattered = np.empty(len(bead_center))
+        for start in range(0, len(bead_center), _POSITIONS_PER_BATCH):
+            x0, y0, z0 = bead_center[start : start + _POSITIONS_PER_BATCH].T
+            phases = np.exp(1j * (np.outer(x0, kx) + np.outer(y0, ky) + np.outer(z0, kz)))
+            intensity_E = np.abs(phases @ amplitudes_E) ** 2
+            intensity_M = np.abs(phases @ amplitudes_M) ** 2
+            batch = slice(start, start + len(x0))
+            extinguished[batch] = (intensity_E @ an.real + intensity_M @ bn.real) * factor
+            scattered[batch] = (intensity_E @ np.abs(an) ** 2 + intensity_M @ np.abs(bn) ** 2) * (
+                factor
+            )
+        return extinguished, scattered, extinguished - scattered
+
+    return calculate_power
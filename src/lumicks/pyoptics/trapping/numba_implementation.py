@@ -8,14 +8,11 @@ from scipy.constants import speed_of_light as C
 
 
 @njit(cache=True, parallel=True)
-def external_coordinates_loop(
+def far_zone_coordinates_loop(
     bead_center,
     coeffs,
     n_medium,
-    krH,
-    dkrH_dkr,
     k0r,
-    aperture,
     cos_theta,
     sin_theta,
     cos_phi,
@@ -34,146 +31,273 @@ def external_coordinates_loop(
     calculate_magnetic: bool,
     n_threads: int,
 ):
+    """Same as `combined_coordinates_loop`, but for coordinates in the far zone of the bead. The
+    spherical Hankel functions are replaced by their asymptotic form, and the radial component of
+    the scattered field is neglected (see `_far_zone_order_sums`). Therefore, only the Legendre data
+    for the transverse components are required, as tables of shape (number of unique values of
+    cos(theta), n_orders), see `calculate_legendre_tables`."""
     an, bn = coeffs
     n_orders = len(an)
+    n_positions = len(bead_center)
+    n_points = r.size
     dummy = np.zeros((1, 1, 1, 1), dtype="complex128")
-    field_storage_E = (
-        np.zeros((n_threads, len(bead_center), 3, r.size), dtype="complex128")
-        if calculate_electric
-        else dummy
-    )
-    field_storage_H = np.zeros_like(field_storage_E) if calculate_magnetic else dummy
-
-    # Skip points outside aperture
-    rows, cols = np.nonzero(aperture)
-    if r.size > 0:
-        for loop_idx in prange(rows.size):
-            row, col = rows[loop_idx], cols[loop_idx]
+    field_storage_E, field_storage_H = [
+        (
+            np.zeros((n_threads, n_positions, 3, n_points), dtype="complex128")
+            if calculate
+            else dummy
+        )
+        for calculate in (calculate_electric, calculate_magnetic)
+    ]
+    # Scratch buffers, one per thread
+    rotations = np.empty((n_threads, 2, 3, 3))
+    phasors = np.empty((n_threads, 2, n_positions), dtype="complex128")
+    impedance = n_medium / (C * MU0)
+    alp_sin_table, alp_deriv_table = legendre_data[0], legendre_data_dtheta[0]
+    # Prefactors per order, including the phase factors of the asymptotic form of the Hankel functions
+    L = np.arange(1, n_orders + 1)
+    C2 = 1j * (2 * L + 1) / (L * (L + 1))
+    an_far_zone, bn_far_zone = C2 * an, C2 * bn
+
+    if n_points > 0:
+        for loop_idx in prange(kz.size):
             t_id = get_thread_id()
-            matrices = [
-                _R_th_R_phi(
-                    cos_theta[row, col],
-                    sin_theta[row, col],
-                    cos_phi[row, col],
-                    -sin_phi[row, col],
-                ),
-                _R_pol_R_th_R_phi(
-                    cos_theta[row, col],
-                    sin_theta[row, col],
-                    cos_phi[row, col],
-                    -sin_phi[row, col],
-                ),
-            ]
-            local_cos_theta = np.empty(r.size)
-            local_sin_theta = np.empty_like(local_cos_theta)
-            alp_sin_expanded = np.empty((n_orders, r.size))
-            alp_expanded = np.empty_like(alp_sin_expanded)
-            alp_deriv_expanded = np.empty_like(alp_sin_expanded)
-
-            E0 = [Einf_theta[row, col], Einf_phi[row, col]]
+            A = rotations[t_id]
+            _rotation_matrices(
+                cos_theta[loop_idx], sin_theta[loop_idx], cos_phi[loop_idx], -sin_phi[loop_idx], A
+            )
+            phasor = phasors[t_id]
+            _phasors(
+                bead_center,
+                kx[loop_idx],
+                ky[loop_idx],
+                kz[loop_idx],
+                Einf_theta[loop_idx],
+                Einf_phi[loop_idx],
+                phasor,
+            )
+            alp_sin_indices = legendre_data[1][loop_idx]
+            alp_deriv_indices = legendre_data_dtheta[1][loop_idx]
+            # Polarization channels that are pruned from the far field are skipped
+            channels = (Einf_theta[loop_idx] != 0, Einf_phi[loop_idx] != 0)
+
+            for point in range(n_points):
+                x0, y0, z0 = local_coords[0, point], local_coords[1, point], local_coords[2, point]
+                sums = _far_zone_order_sums(
+                    A,
+                    x0,
+                    y0,
+                    z0,
+                    r[point],
+                    k0r[point],
+                    an_far_zone,
+                    bn_far_zone,
+                    alp_sin_table[alp_sin_indices[point]],
+                    alp_deriv_table[alp_deriv_indices[point]],
+                    impedance,
+                    calculate_electric,
+                    calculate_magnetic,
+                )
+                incident = 0j
+                if total:
+                    incident = np.exp(1j * k0r[point] * sums[0])
+
+                for polarization in range(2):
+                    if not channels[polarization]:
+                        continue
+                    R = A[polarization]
+                    cosP, sinP = _azimuth(R, x0, y0, z0)
+                    E_x, E_y, E_z, H_x, H_y, H_z = _rotated_response(
+                        cosP, sinP, sums, incident, impedance
+                    )
+                    for ax in range(3):
+                        E_ax = R[0, ax] * E_x + R[1, ax] * E_y + R[2, ax] * E_z
+                        H_ax = R[0, ax] * H_x + R[1, ax] * H_y + R[2, ax] * H_z
+                        for idx in range(n_positions):
+                            factor = phasor[polarization, idx]
+                            if calculate_electric:
+                                field_storage_E[t_id, idx, ax, point] += E_ax * factor
+                            if calculate_magnetic:
+                                field_storage_H[t_id, idx, ax, point] += H_ax * factor
 
-            for polarization in range(2):
-                A = matrices[polarization]
-                coords = A @ local_coords
-                x = coords[0, :]
-                y = coords[1, :]
-                z = coords[2, :]
-                if polarization == 0:
-                    local_cos_theta[:] = z / r
-                    np.clip(local_cos_theta, a_max=1, a_min=-1, out=local_cos_theta)
-
-                    # Expand the legendre derivatives from the unique version of cos(theta)
-                    local_sin_theta[:] = ((1 + local_cos_theta) * (1 - local_cos_theta)) ** 0.5
-                    indices = legendre_data[1][row, col]
-                    alp_sin_expanded[:] = legendre_data[0][:, indices]
-                    alp_expanded[:] = alp_sin_expanded * local_sin_theta
-                    indices = legendre_data_dtheta[1][row, col]
-                    alp_deriv_expanded[:] = legendre_data_dtheta[0][:, indices]
-
-                rho_l = np.hypot(x, y)
-                cosP = x / rho_l
-                sinP = y / rho_l
-                where = rho_l == 0
-                cosP[where] = 1
-                sinP[where] = 0
+    return np.sum(field_storage_E, axis=0), np.sum(field_storage_H, axis=0)
 
-                if calculate_electric:
-                    plane_wave_response = _scattered_electric_field(
-                        an,
-                        bn,
-                        krH,
-                        dkrH_dkr,
-                        k0r,
-                        alp_expanded,
-                        alp_sin_expanded,
-                        alp_deriv_expanded,
-                        local_cos_theta,
-                        local_sin_theta,
-                        cosP,
-                        sinP,
-                        total,
-                    )
 
-                    plane_wave_response_xyz = A.T.astype("complex128") @ plane_wave_response
-
-                    for idx in range(len(bead_center)):
-                        field_storage_E[t_id, idx] += plane_wave_response_xyz * (
-                            E0[polarization]
-                            * np.exp(
-                                1j
-                                * (
-                                    kx[row, col] * bead_center[idx][0]
-                                    + ky[row, col] * bead_center[idx][1]
-                                    + kz[row, col] * bead_center[idx][2]
-                                )
-                            )
-                            / kz[row, col]
+@njit(cache=True, parallel=True)
+def spherical_coordinates_loop(
+    bead_center,
+    radial_E,
+    radial_H,
+    k0r,
+    outside,
+    directions,
+    n_orders,
+    n_medium,
+    cos_theta,
+    sin_theta,
+    cos_phi,
+    sin_phi,
+    kx,
+    ky,
+    kz,
+    Einf_theta,
+    Einf_phi,
+    total: bool,
+    calculate_electric: bool,
+    calculate_magnetic: bool,
+    n_threads: int,
+):
+    """Sum the response of the bead to all plane waves, for points on a spherical grid around the
+    bead. The points are the combination of every radius `r` and every direction in `directions`.
+    The radial functions are passed in as (3, len(r), n_orders) tables `radial_E` and `radial_H`,
+    which already include the Mie coefficients for the appropriate region (inside or outside of the
+    bead). The angular functions only depend on the direction, and are calculated once for every
+    plane wave and direction. The sum over orders is a matrix product of the radial and angular
+    tables.
+
+    For every plane wave, the spherical field components are, with (P, T, S) the associated
+    Legendre polynomials, their derivative and the polynomials divided by sin(theta)::
+
+        Er = -cos(phi) * (R1 @ P), Et = -cos(phi) * (R2 @ T + R3 @ S),
+        Ep = sin(phi) * (R2 @ S + R3 @ T)
+
+    and::
+
+        Hr = -sin(phi) * (Q1 @ P), Ht = -sin(phi) * (Q2 @ T + Q3 @ S),
+        Hp = -cos(phi) * (Q2 @ S + Q3 @ T)
+
+    where R1..R3 and Q1..Q3 are the radial tables. The angular tables, the polar and azimuthal
+    angles of the directions, the sums over the orders for a single radius, the rotation matrices
+    and the phase factors for the bead positions are kept in buffers that are allocated once per
+    thread, such that the loop over the plane waves does not allocate memory. The sums over the
+    orders run over all directions at once, see `_accumulate_order_sums`, and the Cartesian
+    components follow from `_rotated_response`.
+    """
+    n_r = k0r.size
+    n_dir = directions.shape[1]
+    n_positions = len(bead_center)
+    dummy = np.zeros((1, 1, 1, 1, 1), dtype="complex128")
+    field_storage_E, field_storage_H = [
+        (
+            np.zeros((n_threads, n_positions, 3, n_r, n_dir), dtype="complex128")
+            if calculate
+            else dummy
+        )
+        for calculate in (calculate_electric, calculate_magnetic)
+    ]
+    # Scratch buffers, one per thread
+    rotations = np.empty((n_threads, 2, 3, 3))
+    phasors = np.empty((n_threads, 2, n_positions), dtype="complex128")
+    # (P, S, T) for every order and direction
+    angular = np.empty((n_threads, 3, n_orders, n_dir))
+    # cos(theta), sin(theta), and cos(phi) and sin(phi) for both polarizations, per direction
+    angles = np.empty((n_threads, 6, n_dir))
+    # Sums over the orders of the electric and magnetic field, per direction
+    order_sums = np.empty((n_threads, 6, n_dir), dtype="complex128")
+    impedance = n_medium / (C * MU0)
+
+    if n_r > 0 and n_dir > 0:
+        for loop_idx in prange(kz.size):
+            t_id = get_thread_id()
+            A = rotations[t_id]
+            _rotation_matrices(
+                cos_theta[loop_idx], sin_theta[loop_idx], cos_phi[loop_idx], -sin_phi[loop_idx], A
+            )
+            phasor = phasors[t_id]
+            _phasors(
+                bead_center,
+                kx[loop_idx],
+                ky[loop_idx],
+                kz[loop_idx],
+                Einf_theta[loop_idx],
+                Einf_phi[loop_idx],
+                phasor,
+            )
+            alp, alp_sin, alp_deriv = angular[t_id, 0], angular[t_id, 1], angular[t_id, 2]
+            local_cos_theta, local_sin_theta = angles[t_id, 0], angles[t_id, 1]
+            sums = order_sums[t_id]
+            # Polarization channels that are pruned from the far field are skipped
+            channels = (Einf_theta[loop_idx] != 0, Einf_phi[loop_idx] != 0)
+
+            for direction in range(n_dir):
+                x0, y0, z0 = (
+                    directions[0, direction],
+                    directions[1, direction],
+                    directions[2, direction],
+                )
+                # The polar angle is the same for both polarizations
+                cos_t = A[0, 2, 0] * x0 + A[0, 2, 1] * y0 + A[0, 2, 2] * z0
+                cos_t = min(max(cos_t, -1.0), 1.0)
+                local_cos_theta[direction] = cos_t
+                local_sin_theta[direction] = ((1 + cos_t) * (1 - cos_t)) ** 0.5
+                for polarization in range(2):
+                    cosP, sinP = _azimuth(A[polarization], x0, y0, z0)
+                    angles[t_id, 2 + 2 * polarization, direction] = cosP
+                    angles[t_id, 3 + 2 * polarization, direction] = sinP
+            _angular_tables(local_cos_theta, local_sin_theta, alp, alp_sin, alp_deriv)
+
+            for r_idx in range(n_r):
+                sums[:] = 0
+                for L in range(n_orders):
+                    if calculate_electric:
+                        _accumulate_order_sums(
+                            radial_E[:, r_idx, L], alp[L], alp_sin[L], alp_deriv[L], sums[:3]
+                        )
+                    if calculate_magnetic:
+                        _accumulate_order_sums(
+                            radial_H[:, r_idx, L], alp[L], alp_sin[L], alp_deriv[L], sums[3:]
                         )
 
-                if calculate_magnetic:
-                    plane_wave_response = _scattered_magnetic_field(
-                        an,
-                        bn,
-                        krH,
-                        dkrH_dkr,
-                        k0r,
-                        alp_expanded,
-                        alp_sin_expanded,
-                        alp_deriv_expanded,
-                        local_cos_theta,
-                        local_sin_theta,
-                        cosP,
-                        sinP,
-                        n_medium,
-                        total,
-                    )
-                    plane_wave_response_xyz = A.T.astype("complex128") @ plane_wave_response
-                    for idx in range(len(bead_center)):
-                        field_storage_H[t_id, idx] += plane_wave_response_xyz * (
-                            E0[polarization]
-                            * np.exp(
-                                1j
-                                * (
-                                    kx[row, col] * bead_center[idx][0]
-                                    + ky[row, col] * bead_center[idx][1]
-                                    + kz[row, col] * bead_center[idx][2]
-                                )
-                            )
-                            / kz[row, col]
+                for polarization in range(2):
+                    if not channels[polarization]:
+                        continue
+                    R = A[polarization]
+                    for direction in range(n_dir):
+                        cos_t = local_cos_theta[direction]
+                        incident = 0j
+                        if total and outside[r_idx]:
+                            incident = np.exp(1j * k0r[r_idx] * cos_t)
+                        E_x, E_y, E_z, H_x, H_y, H_z = _rotated_response(
+                            angles[t_id, 2 + 2 * polarization, direction],
+                            angles[t_id, 3 + 2 * polarization, direction],
+                            (
+                                cos_t,
+                                local_sin_theta[direction],
+                                sums[0, direction],
+                                sums[1, direction],
+                                sums[2, direction],
+                                sums[3, direction],
+                                sums[4, direction],
+                                sums[5, direction],
+                            ),
+                            incident,
+                            impedance,
                         )
+                        for ax in range(3):
+                            E_ax = R[0, ax] * E_x + R[1, ax] * E_y + R[2, ax] * E_z
+                            H_ax = R[0, ax] * H_x + R[1, ax] * H_y + R[2, ax] * H_z
+                            for idx in range(n_positions):
+                                factor = phasor[polarization, idx]
+                                if calculate_electric:
+                                    field_storage_E[t_id, idx, ax, r_idx, direction] += (
+                                        E_ax * factor
+                                    )
+                                if calculate_magnetic:
+                                    field_storage_H[t_id, idx, ax, r_idx, direction] += (
+                                        H_ax * factor
+                                    )
 
     return np.sum(field_storage_E, axis=0), np.sum(field_storage_H, axis=0)
 
 
 @njit(cache=True, parallel=True)
-def internal_coordinates_loop(
+def combined_coordinates_loop(
     bead_center,
-    coeffs,
-    n_bead,
-    sphBessel,
-    jn_over_k1r,
-    jn_1,
-    aperture,
+    radial_E,
+    radial_H,
+    k0r,
+    outside,
+    n_medium,
     cos_theta,
     sin_theta,
     cos_phi,
@@ -187,355 +311,537 @@ def internal_coordinates_loop(
     legendre_data_dtheta,
     r,
     local_coords,
+    total: bool,
     calculate_electric: bool,
     calculate_magnetic: bool,
     n_threads: int,
 ):
-    cn, dn = coeffs
-    n_orders = len(cn)
-    # plane_wave_response_xyz = np.empty((3, r.size), dtype="complex128")
-    # Mask r == 0:
-    r_eq_zero = r == 0
+    """Sum the response of the bead to all plane waves, for points both inside and outside of the
+    bead. The radial functions are passed in as (3, r.size, n_orders) tables `radial_E` and
+    `radial_H`, which include the internal field coefficients for points inside the bead and the
+    scattering coefficients for points outside of the bead (see `calculate_radial_tables`). With
+    these tables, the field of both regions has the same form, see `spherical_coordinates_loop`.
+    The Legendre functions in `legendre_data` and `legendre_data_dtheta` are tables of shape
+    (number of unique values of cos(theta), n_orders), such that the values for all orders are
+    contiguous in memory. The properties of the plane waves, such as `kx` and `Einf_theta`, are
+    one-dimensional arrays with a value per plane wave, see `PlaneWaves`, and the amplitudes
+    include the quadrature weights.
+
+    The loop over the plane waves is executed in parallel, and every thread accumulates the fields
+    in its own copy of the output. For every plane wave, the rotation of a point to the coordinate
+    system of the plane wave, the sum over the orders and the rotation back to the coordinate system
+    of the bead are done in a single loop over the points, with scalar temporaries only (see
+    `_order_sums` and `_rotated_response`). The rotation matrices and the phase factors for the
+    bead positions are kept in buffers that are allocated once per thread, such that the loop over
+    the plane waves does not allocate memory. The incident field is added to the points for which
+    `outside` is True, if `total` is True.
+
+    See also `combined_coordinates_loop_over_points` and `combined_plane_wave_responses`, which
+    parallelize over the points and enable parallelization over the bead positions, respectively.
+    """
+    n_orders = radial_E.shape[2] if calculate_electric else radial_H.shape[2]
+    n_positions = len(bead_center)
+    n_points = r.size
     dummy = np.zeros((1, 1, 1, 1), dtype="complex128")
-    field_storage_E = (
-        np.zeros((n_threads, len(bead_center), 3, r.size), dtype="complex128")
-        if calculate_electric
-        else dummy
-    )
-    field_storage_H = np.zeros_like(field_storage_E) if calculate_magnetic else dummy
-
-    # Skip points outside aperture
-    rows, cols = np.nonzero(aperture)
-    if r.size > 0:
-        for loop_idx in prange(rows.size):
-            row, col = rows[loop_idx], cols[loop_idx]
+    field_storage_E, field_storage_H = [
+        (
+            np.zeros((n_threads, n_positions, 3, n_points), dtype="complex128")
+            if calculate
+            else dummy
+        )
+        for calculate in (calculate_electric, calculate_magnetic)
+    ]
+    # Scratch buffers, one per thread
+    rotations = np.empty((n_threads, 2, 3, 3))
+    phasors = np.empty((n_threads, 2, n_positions), dtype="complex128")
+    impedance = n_medium / (C * MU0)
+    alp_sin_table, alp_deriv_table = legendre_data[0], legendre_data_dtheta[0]
+
+    if n_points > 0:
+        for loop_idx in prange(kz.size):
             t_id = get_thread_id()
-            matrices = [
-                _R_th_R_phi(
-                    cos_theta[row, col],
-                    sin_theta[row, col],
-                    cos_phi[row, col],
-                    -sin_phi[row, col],
-                ),
-                _R_pol_R_th_R_phi(
-                    cos_theta[row, col],
-                    sin_theta[row, col],
-                    cos_phi[row, col],
-                    -sin_phi[row, col],
-                ),
-            ]
-            local_cos_theta = np.empty(r.size)
-            local_sin_theta = np.empty_like(local_cos_theta)
-            alp_sin_expanded = np.empty((n_orders, r.size))
-            alp_expanded = np.empty_like(alp_sin_expanded)
-            alp_deriv_expanded = np.empty_like(alp_sin_expanded)
-
-            E0 = [Einf_theta[row, col], Einf_phi[row, col]]
-
-            for polarization in range(2):
-                A = matrices[polarization]
-                coords = A @ local_coords
-                x = coords[0, :]
-                y = coords[1, :]
-                z = coords[2, :]
-                if polarization == 0:
-                    local_cos_theta[:] = z / r
-                    local_cos_theta[r_eq_zero] = 1
-                    np.clip(local_cos_theta, a_max=1, a_min=-1, out=local_cos_theta)
-
-                    # Expand the legendre derivatives from the unique version of cos(theta)
-                    local_sin_theta[:] = ((1 + local_cos_theta) * (1 - local_cos_theta)) ** 0.5
-                    indices = legendre_data[1][row, col]
-                    alp_sin_expanded[:] = legendre_data[0][:, indices]
-                    alp_expanded[:] = alp_sin_expanded * local_sin_theta
-                    indices = legendre_data_dtheta[1][row, col]
-                    alp_deriv_expanded[:] = legendre_data_dtheta[0][:, indices]
-
-                rho_l = np.hypot(x, y)
-                cosP = x / rho_l
-                sinP = y / rho_l
-                where = rho_l == 0
-                cosP[where] = 1
-                sinP[where] = 0
-
-                if calculate_electric:
-                    plane_wave_response = _internal_electric_field(
-                        cn,
-                        dn,
-                        sphBessel,
-                        jn_over_k1r,
-                        jn_1,
-                        alp_expanded,
-                        alp_sin_expanded,
-                        alp_deriv_expanded,
-                        local_cos_theta,
-                        local_sin_theta,
-                        cosP,
-                        sinP,
+            A = rotations[t_id]
+            _rotation_matrices(
+                cos_theta[loop_idx], sin_theta[loop_idx], cos_phi[loop_idx], -sin_phi[loop_idx], A
+            )
+            phasor = phasors[t_id]
+            _phasors(
+                bead_center,
+                kx[loop_idx],
+                ky[loop_idx],
+                kz[loop_idx],
+                Einf_theta[loop_idx],
+                Einf_phi[loop_idx],
+                phasor,
+            )
+            alp_sin_indices = legendre_data[1][loop_idx]
+            alp_deriv_indices = legendre_data_dtheta[1][loop_idx]
+            # Polarization channels that are pruned from the far field are skipped
+            channels = (Einf_theta[loop_idx] != 0, Einf_phi[loop_idx] != 0)
+
+            for point in range(n_points):
+                x0, y0, z0 = local_coords[0, point], local_coords[1, point], local_coords[2, point]
+                sums = _order_sums(
+                    A,
+                    x0,
+                    y0,
+                    z0,
+                    r[point],
+                    radial_E[:, point],
+                    radial_H[:, point],
+                    alp_sin_table[alp_sin_indices[point]],
+                    alp_deriv_table[alp_deriv_indices[point]],
+                    n_orders,
+                    calculate_electric,
+                    calculate_magnetic,
+                )
+                incident = 0j
+                if total and outside[point]:
+                    incident = np.exp(1j * k0r[point] * sums[0])
+
+                for polarization in range(2):
+                    if not channels[polarization]:
+                        continue
+                    R = A[polarization]
+                    cosP, sinP = _azimuth(R, x0, y0, z0)
+                    E_x, E_y, E_z, H_x, H_y, H_z = _rotated_response(
+                        cosP, sinP, sums, incident, impedance
                     )
-                    plane_wave_response_xyz = A.T.astype("complex128") @ plane_wave_response
-
-                    for idx in range(len(bead_center)):
-                        field_storage_E[t_id, idx] += plane_wave_response_xyz * (
-                            E0[polarization]
-                            * np.exp(
-                                1j
-                                * (
-                                    kx[row, col] * bead_center[idx][0]
-                                    + ky[row, col] * bead_center[idx][1]
-                                    + kz[row, col] * bead_center[idx][2]
-                                )
-                            )
-                            / kz[row, col]
-                        )
-
-                if calculate_magnetic:
-                    plane_wave_response = _internal_magnetic_field(
-                        cn,
-                        dn,
-                        sphBessel,
-                        jn_over_k1r,
-                        jn_1,
-                        alp_expanded,
-                        alp_sin_expanded,
-                        alp_deriv_expanded,
-                        local_cos_theta,
-                        local_sin_theta,
-                        cosP,
-                        sinP,
-                        n_bead,
-                    )
-                    plane_wave_response_xyz = A.T.astype("complex128") @ plane_wave_response
-                    for idx in range(len(bead_center)):
-                        field_storage_H[t_id, idx] += plane_wave_response_xyz * (
-                            E0[polarization]
-                            * np.exp(
-                                1j
-                                * (
-                                    kx[row, col] * bead_center[idx][0]
-                                    + ky[row, col] * bead_center[idx][1]
-                                    + kz[row, col] * bead_center[idx][2]
-                                )
-                            )
-                            / kz[row, col]
-                        )
+                    # Rotate back to the coordinate system of the bead, and apply the phase factor
+                    # for every bead position to all components at once
+                    for ax in range(3):
+                        E_ax = R[0, ax] * E_x + R[1, ax] * E_y + R[2, ax] * E_z
+                        H_ax = R[0, ax] * H_x + R[1, ax] * H_y + R[2, ax] * H_z
+                        for idx in range(n_positions):
+                            factor = phasor[polarization, idx]
+                            if calculate_electric:
+                                field_storage_E[t_id, idx, ax, point] += E_ax * factor
+                            if calculate_magnetic:
+                                field_storage_H[t_id, idx, ax, point] += H_ax * factor
 
     return np.sum(field_storage_E, axis=0), np.sum(field_storage_H, axis=0)
 
 
-@njit(cache=True, parallel=False)
-def _scattered_electric_field(
-    an: np.ndarray,
-    bn: np.ndarray,
-    krh: np.ndarray,
-    dkrh_dkr: np.ndarray,
-    k0r: np.ndarray,
-    alp: np.ndarray,
-    alp_sin: np.ndarray,
-    alp_deriv: np.ndarray,
-    cos_theta: np.ndarray,
-    sin_theta: np.ndarray,
-    cos_phi: np.ndarray,
-    sin_phi: np.ndarray,
-    total_field=True,
+@njit(cache=True, parallel=True)
+def combined_coordinates_loop_over_points(
+    bead_center,
+    radial_E,
+    radial_H,
+    k0r,
+    outside,
+    n_medium,
+    cos_theta,
+    sin_theta,
+    cos_phi,
+    sin_phi,
+    kx,
+    ky,
+    kz,
+    Einf_theta,
+    Einf_phi,
+    legendre_data,
+    legendre_data_dtheta,
+    r,
+    local_coords,
+    total: bool,
+    calculate_electric: bool,
+    calculate_magnetic: bool,
+    n_threads: int,
 ):
-    """
-    Calculate the scattered electric field for plane wave excitation, at the
-    coordinates defined by r, theta and phi. Note that these are not explicitly
-    used, but are implicitly present in the evaluations of the Hankel
-    functions, Associated Legendre polynomials and derivatives.
-    """
-    # Radial, theta and phi-oriented fields
-    Er = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
-    Et = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
-    Ep = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
-
-    L = np.arange(1, stop=an.size + 1)
-    C1 = 1j ** (L + 1) * (2 * L + 1)
-    C2 = C1 / (L * (L + 1))
-    for L in range(an.size, 0, -1):
-        Er += C1[L - 1] * an[L - 1] * krh[L - 1, :] * alp[L - 1, :]
-
-        Et += C2[L - 1] * (
-            an[L - 1] * dkrh_dkr[L - 1, :] * alp_deriv[L - 1, :]
-            + 1j * bn[L - 1] * krh[L - 1, :] * alp_sin[L - 1, :]
+    """Same as `combined_coordinates_loop`, but the loop over the points is executed in parallel,
+    and every thread loops over all plane waves for its points. Every point is written by a single
+    thread, therefore the output is not replicated per thread. The rotation matrices and the phase
+    factors for all plane waves and bead positions are calculated once, up front."""
+    n_orders = radial_E.shape[2] if calculate_electric else radial_H.shape[2]
+    n_positions = len(bead_center)
+    n_points = r.size
+    dummy = np.zeros((1, 1, 1), dtype="complex128")
+    field_storage_E, field_storage_H = [
+        np.zeros((n_positions, 3, n_points), dtype="complex128") if calculate else dummy
+        for calculate in (calculate_electric, calculate_magnetic)
+    ]
+    impedance = n_medium / (C * MU0)
+    alp_sin_table, alp_deriv_table = legendre_data[0], legendre_data_dtheta[0]
+
+    n_plane_waves = kz.size
+    rotations = np.empty((n_plane_waves, 2, 3, 3))
+    phasors = np.empty((n_plane_waves, 2, n_positions), dtype="complex128")
+    for loop_idx in prange(n_plane_waves):
+        _rotation_matrices(
+            cos_theta[loop_idx],
+            sin_theta[loop_idx],
+            cos_phi[loop_idx],
+            -sin_phi[loop_idx],
+            rotations[loop_idx],
         )
-
-        Ep += C2[L - 1] * (
-            an[L - 1] * dkrh_dkr[L - 1, :] * alp_sin[L - 1, :]
-            + 1j * bn[L - 1] * krh[L - 1, :] * alp_deriv[L - 1, :]
+        _phasors(
+            bead_center,
+            kx[loop_idx],
+            ky[loop_idx],
+            kz[loop_idx],
+            Einf_theta[loop_idx],
+            Einf_phi[loop_idx],
+            phasors[loop_idx],
         )
 
-    Er *= -cos_phi / (k0r) ** 2
-    Et *= -cos_phi / (k0r)
-    Ep *= sin_phi / (k0r)
-    # Cartesian components
-    Ex = Er * sin_theta * cos_phi + Et * cos_theta * cos_phi - Ep * sin_phi
-    Ey = Er * sin_theta * sin_phi + Et * cos_theta * sin_phi + Ep * cos_phi
-    Ez = Er * cos_theta - Et * sin_theta
-    if total_field:
-        # Incident field (x-polarized)
-        Ex += np.exp(1j * k0r * cos_theta)
-    return np.concatenate((Ex, Ey, Ez), axis=0)
+    # Scratch buffers for the fields at a single point, one per thread
+    point_fields = np.empty((n_threads, 2, n_positions, 3), dtype="complex128")
+    for point in prange(n_points):
+        t_id = get_thread_id()
+        fields = point_fields[t_id]
+        fields[:] = 0
+        x0, y0, z0 = local_coords[0, point], local_coords[1, point], local_coords[2, point]
+        for loop_idx in range(n_plane_waves):
+            A = rotations[loop_idx]
+            sums = _order_sums(
+                A,
+                x0,
+                y0,
+                z0,
+                r[point],
+                radial_E[:, point],
+                radial_H[:, point],
+                alp_sin_table[legendre_data[1][loop_idx, point]],
+                alp_deriv_table[legendre_data_dtheta[1][loop_idx, point]],
+                n_orders,
+                calculate_electric,
+                calculate_magnetic,
+            )
+            incident = 0j
+            if total and outside[point]:
+                incident = np.exp(1j * k0r[point] * sums[0])
 
+            for polarization in range(2):
+                # Skip the polarization channels that are pruned from the far field
+                amplitude = Einf_theta[loop_idx] if polarization == 0 else Einf_phi[loop_idx]
+                if amplitude == 0:
+                    continue
+                R = A[polarization]
+                cosP, sinP = _azimuth(R, x0, y0, z0)
+                E_x, E_y, E_z, H_x, H_y, H_z = _rotated_response(
+                    cosP, sinP, sums, incident, impedance
+                )
+                for ax in range(3):
+                    E_ax = R[0, ax] * E_x + R[1, ax] * E_y + R[2, ax] * E_z
+                    H_ax = R[0, ax] * H_x + R[1, ax] * H_y + R[2, ax] * H_z
+                    for idx in range(n_positions):
+                        factor = phasors[loop_idx, polarization, idx]
+                        fields[0, idx, ax] += E_ax * factor
+                        fields[1, idx, ax] += H_ax * factor
+
+        for idx in range(n_positions):
+            for ax in range(3):
+                if calculate_electric:
+                    field_storage_E[idx, ax, point] = fields[0, idx, ax]
+                if calculate_magnetic:
+                    field_storage_H[idx, ax, point] = fields[1, idx, ax]
 
-@njit(cache=True)
-def _internal_electric_field(
-    cn: np.ndarray,
-    dn: np.ndarray,
-    sphBessel: np.ndarray,
-    jn_over_k1r: np.ndarray,
-    jn_1: np.ndarray,
-    alp: np.ndarray,
-    alp_sin: np.ndarray,
-    alp_deriv: np.ndarray,
-    cos_theta: np.ndarray,
-    sin_theta: np.ndarray,
-    cosP: np.ndarray,
-    sinP: np.ndarray,
-):
-    """
-    Calculate the internal electric field for plane wave excitation, at the
-    coordinates defined by r, theta and phi. Note that these are not explicitly
-    used, but are implicitly present in the evaluations of the Bessel
-    functions, Associated Legendre polynomials and derivatives.
-    """
-    # Radial, theta and phi-oriented fields
-    Er = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
-    Et = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
-    Ep = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
+    return field_storage_E, field_storage_H
 
-    for n in range(cn.size, 0, -1):
-        Er += -(1j ** (n + 1) * (2 * n + 1) * alp[n - 1, :] * dn[n - 1] * jn_over_k1r[n - 1, :])
 
-        Et += (1j**n * (2 * n + 1) / (n * (n + 1))) * (
-            cn[n - 1] * alp_sin[n - 1, :] * sphBessel[n - 1, :]
-            - 1j * dn[n - 1] * alp_deriv[n - 1, :] * (jn_1[n - 1, :] - n * jn_over_k1r[n - 1, :])
+@njit(cache=True, parallel=True)
+def combined_plane_wave_responses(
+    radial_E,
+    radial_H,
+    k0r,
+    outside,
+    n_medium,
+    cos_theta,
+    sin_theta,
+    cos_phi,
+    sin_phi,
+    kz,
+    Einf_theta,
+    Einf_phi,
+    legendre_data,
+    legendre_data_dtheta,
+    r,
+    local_coords,
+    total: bool,
+    calculate_electric: bool,
+    calculate_magnetic: bool,
+):
+    """Calculate the response of the bead to every plane wave in the aperture, for a bead at the
+    origin, without summing over the plane waves. The result is an array of shape
+    (number of plane waves, 3, r.size) for the electric and the magnetic field. The plane waves are
+    in the order of the plane wave arrays. The fields for a set of bead positions follow from a
+    matrix product of the phase factors exp(1j * (kx * x + ky * y + kz * z)) of the bead positions
+    with these responses, which can be parallelized over the bead positions without replicating the
+    output per thread. The loop over the plane waves is executed in parallel, and every plane wave
+    is written by a single thread. See `combined_coordinates_loop` for the parameters."""
+    n_orders = radial_E.shape[2] if calculate_electric else radial_H.shape[2]
+    n_points = r.size
+    impedance = n_medium / (C * MU0)
+    alp_sin_table, alp_deriv_table = legendre_data[0], legendre_data_dtheta[0]
+
+    n_plane_waves = kz.size
+    dummy = np.zeros((1, 1, 1), dtype="complex128")
+    responses_E, responses_H = [
+        np.zeros((n_plane_waves, 3, n_points), dtype="complex128") if calculate else dummy
+        for calculate in (calculate_electric, calculate_magnetic)
+    ]
+    rotations = np.empty((n_plane_waves, 2, 3, 3))
+    for loop_idx in prange(n_plane_waves):
+        A = rotations[loop_idx]
+        _rotation_matrices(
+            cos_theta[loop_idx], sin_theta[loop_idx], cos_phi[loop_idx], -sin_phi[loop_idx], A
         )
-
-        Ep += (-(1j**n) * (2 * n + 1) / (n * (n + 1))) * (
-            cn[n - 1] * alp_deriv[n - 1, :] * sphBessel[n - 1, :]
-            - 1j * dn[n - 1] * alp_sin[n - 1, :] * (jn_1[n - 1, :] - n * jn_over_k1r[n - 1, :])
+        amplitudes = (
+            Einf_theta[loop_idx] / kz[loop_idx],
+            Einf_phi[loop_idx] / kz[loop_idx],
         )
+        alp_sin_indices = legendre_data[1][loop_idx]
+        alp_deriv_indices = legendre_data_dtheta[1][loop_idx]
+        for point in range(n_points):
+            x0, y0, z0 = local_coords[0, point], local_coords[1, point], local_coords[2, point]
+            sums = _order_sums(
+                A,
+                x0,
+                y0,
+                z0,
+                r[point],
+                radial_E[:, point],
+                radial_H[:, point],
+                alp_sin_table[alp_sin_indices[point]],
+                alp_deriv_table[alp_deriv_indices[point]],
+                n_orders,
+                calculate_electric,
+                calculate_magnetic,
+            )
+            incident = 0j
+            if total and outside[point]:
+                incident = np.exp(1j * k0r[point] * sums[0])
 
-    Er *= -cosP
-    Et *= -cosP
-    Ep *= -sinP
-    # Cartesian components
-    Ex = Er * sin_theta * cosP + Et * cos_theta * cosP - Ep * sinP
-    Ey = Er * sin_theta * sinP + Et * cos_theta * sinP + Ep * cosP
-    Ez = Er * cos_theta - Et * sin_theta
-    return np.concatenate((Ex, Ey, Ez), axis=0)
+            for polarization in range(2):
+                R = A[polarization]
+                cosP, sinP = _azimuth(R, x0, y0, z0)
+                E_x, E_y, E_z, H_x, H_y, H_z = _rotated_response(
+                    cosP, sinP, sums, incident, impedance
+                )
+                for ax in range(3):
+                    if calculate_electric:
+                        responses_E[loop_idx, ax, point] += (
+                            R[0, ax] * E_x + R[1, ax] * E_y + R[2, ax] * E_z
+                        ) * amplitudes[polarization]
+                    if calculate_magnetic:
+                        responses_H[loop_idx, ax, point] += (
+                            R[0, ax] * H_x + R[1, ax] * H_y + R[2, ax] * H_z
+                        ) * amplitudes[polarization]
+
+    return responses_E, responses_H
 
 
-@njit(cache=True)
-def _scattered_magnetic_field(
-    an: np.ndarray,
-    bn: np.ndarray,
-    krh: np.ndarray,
-    dkrh_dkr: np.ndarray,
-    k0r: np.ndarray,
-    alp: np.ndarray,
-    alp_sin: np.ndarray,
-    alp_deriv: np.ndarray,
-    cos_theta: np.ndarray,
-    sin_theta: np.ndarray,
-    cosP: np.ndarray,
-    sinP: np.ndarray,
-    n_medium: float,
-    total_field=True,
-):
-    """
-    Calculate the scattered magnetic field for plane wave excitation, at the
-    coordinates defined by r, theta and phi. Note that these are not explicitly
-    used, but are implicitly present in the evaluations of the Hankel
-    functions, Associated Legendre polynomials and derivatives.
-    """
-    # Radial, theta and phi-oriented fields
-    Hr = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
-    Ht = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
-    Hp = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
-
-    L = np.arange(1, stop=an.size + 1)
-    C1 = 1j**L * (2 * L + 1)
-    C2 = C1 / (L * (L + 1))
-    for L in range(an.size, 0, -1):
-        Hr += C1[L - 1] * 1j * bn[L - 1] * krh[L - 1, :] * alp[L - 1, :]
-
-        Ht += C2[L - 1] * (
-            1j * bn[L - 1] * dkrh_dkr[L - 1, :] * alp_deriv[L - 1, :]
-            - an[L - 1] * krh[L - 1, :] * alp_sin[L - 1, :]
-        )
-
-        Hp += C2[L - 1] * (
-            1j * bn[L - 1] * dkrh_dkr[L - 1, :] * alp_sin[L - 1, :]
-            - an[L - 1] * krh[L - 1, :] * alp_deriv[L - 1, :]
+@njit(cache=True, parallel=True)
+def positions_loop(bead_center, kx, ky, kz, responses):
+    """Sum the responses of the bead to the plane waves, as calculated by
+    `combined_plane_wave_responses`, for every bead position in `bead_center`. The wave vectors
+    `kx`, `ky` and `kz` are one-dimensional arrays, in the same order as the first axis of
+    `responses`. The loop over the bead positions is executed in parallel, and every bead position
+    is written by a single thread."""
+    n_positions = len(bead_center)
+    n_plane_waves, n_components, n_points = responses.shape
+    field_storage = np.zeros((n_positions, n_components, n_points), dtype="complex128")
+    for idx in prange(n_positions):
+        field = field_storage[idx]
+        for pw in range(n_plane_waves):
+            phase = np.exp(
+                1j
+                * (
+                    kx[pw] * bead_center[idx, 0]
+                    + ky[pw] * bead_center[idx, 1]
+                    + kz[pw] * bead_center[idx, 2]
+                )
+            )
+            for ax in range(n_components):
+                for point in range(n_points):
+                    field[ax, point] += responses[pw, ax, point] * phase
+    return field_storage
+
+
+@njit(cache=True, inline="always")
+def _phasors(bead_center, kx, ky, kz, Einf_theta, Einf_phi, out):
+    """Write the amplitude and phase factor of a plane wave, for both polarizations and every bead
+    position, into `out` (shape (2, len(bead_center)))."""
+    for idx in range(len(bead_center)):
+        phase = (
+            np.exp(
+                1j
+                * (kx * bead_center[idx, 0] + ky * bead_center[idx, 1] + kz * bead_center[idx, 2])
+            )
+            / kz
         )
+        out[0, idx] = Einf_theta * phase
+        out[1, idx] = Einf_phi * phase
 
-    # Extra factor of -1 as B&H does not include the Condon–Shortley phase,
-    # but our associated Legendre polynomials do include it
-    Hr *= -sinP / (k0r) ** 2 * n_medium / (C * MU0)
-    Ht *= -sinP / (k0r) * n_medium / (C * MU0)
-    Hp *= -cosP / (k0r) * n_medium / (C * MU0)
-
-    # Cartesian components
-    Hx = Hr * sin_theta * cosP + Ht * cos_theta * cosP - Hp * sinP
-    Hy = Hr * sin_theta * sinP + Ht * cos_theta * sinP + Hp * cosP
-    Hz = Hr * cos_theta - Ht * sin_theta
-    if total_field:
-        # Incident field (E field x-polarized)
-        Hy += np.exp(1j * k0r * cos_theta) * n_medium / (C * MU0)
-    return np.concatenate((Hx, Hy, Hz), axis=0)
 
-
-@njit(cache=True)
-def _internal_magnetic_field(
-    cn: np.ndarray,
-    dn: np.ndarray,
-    sphBessel: np.ndarray,
-    jn_over_k1r: np.ndarray,
-    jn_1: np.ndarray,
-    alp: np.ndarray,
-    alp_sin: np.ndarray,
-    alp_deriv: np.ndarray,
-    cos_theta: np.ndarray,
-    sin_theta: np.ndarray,
-    cosP: np.ndarray,
-    sinP: np.ndarray,
-    n_bead: np.complex128,
+@njit(cache=True, inline="always")
+def _order_sums(
+    A,
+    x0,
+    y0,
+    z0,
+    r,
+    radial_E,
+    radial_H,
+    alp_sin,
+    alp_deriv,
+    n_orders,
+    calculate_electric,
+    calculate_magnetic,
 ):
+    """Calculate the polar angle of the point (x0, y0, z0) in the coordinate system of a plane wave
+    with rotation matrices `A`, and the sums over the orders of the radial tables and the Legendre
+    functions of the electric and magnetic field at that point, in a single pass. The sums only
+    depend on the polar angle, which is the same for both polarizations.
+
+    Returns
+    -------
+    tuple
+        (cos(theta), sin(theta), E_r, E_t, E_p, H_r, H_t, H_p), where the last six values are the
+        radial, polar and azimuthal sums, excluding the factors that depend on the azimuthal angle.
     """
-    Calculate the internal magnetic field for plane wave excitation, at the
-    coordinates defined by r, theta and phi. Note that these are not explicitly
-    used, but are implicitly present in the evaluations of the Bessel
-    functions, Associated Legendre polynomials and derivatives.
-    """
-    # Radial, theta and phi-oriented fields
-    Hr = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
-    Ht = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
-    Hp = np.zeros((1, cos_theta.shape[0]), dtype="complex128")
+    local_cos_theta = 1.0
+    if r > 0:
+        local_cos_theta = (A[0, 2, 0] * x0 + A[0, 2, 1] * y0 + A[0, 2, 2] * z0) / r
+        local_cos_theta = min(max(local_cos_theta, -1.0), 1.0)
+    local_sin_theta = ((1 + local_cos_theta) * (1 - local_cos_theta)) ** 0.5
+
+    E_r, E_t, E_p = 0j, 0j, 0j
+    H_r, H_t, H_p = 0j, 0j, 0j
+    for L in range(n_orders):
+        if calculate_electric:
+            E_r += radial_E[0, L] * alp_sin[L]
+            E_t += radial_E[1, L] * alp_deriv[L] + radial_E[2, L] * alp_sin[L]
+            E_p += radial_E[1, L] * alp_sin[L] + radial_E[2, L] * alp_deriv[L]
+        if calculate_magnetic:
+            H_r += radial_H[0, L] * alp_sin[L]
+            H_t += radial_H[1, L] * alp_deriv[L] + radial_H[2, L] * alp_sin[L]
+            H_p += radial_H[1, L] * alp_sin[L] + radial_H[2, L] * alp_deriv[L]
+    return (
+        local_cos_theta,
+        local_sin_theta,
+        E_r * local_sin_theta,
+        E_t,
+        E_p,
+        H_r * local_sin_theta,
+        H_t,
+        H_p,
+    )
 
-    for n in range(cn.size, 0, -1):
-        Hr += 1j ** (n + 1) * (2 * n + 1) * alp[n - 1, :] * cn[n - 1] * jn_over_k1r[n - 1, :]
 
-        Ht += (1j**n * (2 * n + 1) / (n * (n + 1))) * (
-            dn[n - 1] * alp_sin[n - 1, :] * sphBessel[n - 1, :]
-            - 1j * cn[n - 1] * alp_deriv[n - 1, :] * (jn_1[n - 1, :] - n * jn_over_k1r[n - 1, :])
-        )
+@njit(cache=True, inline="always")
+def _azimuth(R, x0, y0, z0):
+    """Return the cosine and sine of the azimuthal angle of the point (x0, y0, z0) in the
+    coordinate system of a plane wave with polarization given by the rotation matrix `R`."""
+    x = R[0, 0] * x0 + R[0, 1] * y0 + R[0, 2] * z0
+    y = R[1, 0] * x0 + R[1, 1] * y0 + R[1, 2] * z0
+    rho_l = (x**2 + y**2) ** 0.5
+    if rho_l > 0:
+        return x / rho_l, y / rho_l
+    return 1.0, 0.0
+
+
+@njit(cache=True, inline="always")
+def _rotated_response(cosP, sinP, sums, incident, impedance):
+    """Calculate the Cartesian components of the electric and magnetic field at a point with
+    azimuthal angle given by `cosP` and `sinP` (see `_azimuth`), in the coordinate system of a
+    plane wave, from the sums over the orders of `_order_sums`. The incident field is x-polarized
+    in the rotated coordinate system, and is added with amplitude `incident`."""
+    local_cos_theta, local_sin_theta, E_r, E_t, E_p, H_r, H_t, H_p = sums
+    # Factors to go from spherical to Cartesian components, for the radial and polar components
+    r_x, r_y, r_z = local_sin_theta * cosP, local_sin_theta * sinP, local_cos_theta
+    t_x, t_y, t_z = local_cos_theta * cosP, local_cos_theta * sinP, -local_sin_theta
+
+    f_r, f_t, f_p = -cosP * E_r, -cosP * E_t, sinP * E_p
+    E_x = f_r * r_x + f_t * t_x - f_p * sinP + incident
+    E_y = f_r * r_y + f_t * t_y + f_p * cosP
+    E_z = f_r * r_z + f_t * t_z
+    f_r, f_t, f_p = -sinP * H_r, -sinP * H_t, -cosP * H_p
+    H_x = f_r * r_x + f_t * t_x - f_p * sinP
+    H_y = f_r * r_y + f_t * t_y + f_p * cosP + incident * impedance
+    H_z = f_r * r_z + f_t * t_z
+    return E_x, E_y, E_z, H_x, H_y, H_z
 
-        Hp += (-(1j**n) * (2 * n + 1) / (n * (n + 1))) * (
-            dn[n - 1] * alp_deriv[n - 1, :] * sphBessel[n - 1, :]
-            - 1j * cn[n - 1] * alp_sin[n - 1, :] * (jn_1[n - 1, :] - n * jn_over_k1r[n - 1, :])
-        )
 
-    Hr *= sinP * n_bead / (C * MU0)
-    Ht *= -sinP * n_bead / (C * MU0)
-    Hp *= cosP * n_bead / (C * MU0)
-    # Cartesian components
-    Hx = Hr * sin_theta * cosP + Ht * cos_theta * cosP - Hp * sinP
-    Hy = Hr * sin_theta * sinP + Ht * cos_theta * sinP + Hp * cosP
-    Hz = Hr * cos_theta - Ht * sin_theta
-    return np.concatenate((Hx, Hy, Hz), axis=0)
+@njit(cache=True)
+def _angular_tables(cos_theta, sin_theta, alp, alp_sin, alp_deriv):
+    """Calculate the associated Legendre polynomials :math:`P_n^1(\\cos\\theta)`, divided by
+    :math:`\\sin\\theta` and the derivative to :math:`\\theta`, for all orders n = 1 ...
+    alp.shape[0], by upward recurrence. The results are written into `alp`, `alp_sin` and
+    `alp_deriv`, with the orders along the first axis, respectively. The polynomials include the
+    Condon-Shortley phase, consistent with `associated_legendre_over_sin_theta()` and
+    `associated_legendre_dtheta()`."""
+    for idx in range(cos_theta.size):
+        x = cos_theta[idx]
+        pi_prev, pi_curr = 0.0, 1.0
+        for n in range(1, alp.shape[0] + 1):
+            if n > 1:
+                pi_prev, pi_curr = pi_curr, ((2 * n - 1) * x * pi_curr - n * pi_prev) / (n - 1)
+            alp_sin[n - 1, idx] = -pi_curr
+            alp[n - 1, idx] = -pi_curr * sin_theta[idx]
+            alp_deriv[n - 1, idx] = -(n * x * pi_curr - (n + 1) * pi_prev)
+
+
+@njit(cache=True, inline="always")
+def _accumulate_order_sums(radial, alp, alp_sin, alp_deriv, sums):
+    """Add the terms of a single order to the sums over the orders of the radial, polar and
+    azimuthal components in `sums` (shape (3, number of directions)), for all directions at once.
+    `radial` holds the three radial functions of the order, and `alp`, `alp_sin` and `alp_deriv`
+    the angular functions of the order per direction, see `_angular_tables`."""
+    R1, R2, R3 = radial[0], radial[1], radial[2]
+    for idx in range(alp.size):
+        sums[0, idx] += R1 * alp[idx]
+        sums[1, idx] += R2 * alp_deriv[idx] + R3 * alp_sin[idx]
+        sums[2, idx] += R2 * alp_sin[idx] + R3 * alp_deriv[idx]
+
+
+@njit(cache=True, inline="always")
+def _far_zone_order_sums(
+    A,
+    x0,
+    y0,
+    z0,
+    r,
+    k0r,
+    an,
+    bn,
+    alp_sin,
+    alp_deriv,
+    impedance,
+    calculate_electric,
+    calculate_magnetic,
+):
+    """Same as `_order_sums`, but for a point in the far zone of the bead. With
+    :math:`kr h_n(kr) \\approx (-i)^{n+1} e^{ikr}` and :math:`d[kr h_n(kr)]/d(kr) \\approx
+    (-i)^n e^{ikr}`, the radial dependence factors out of the sum over orders. The radial component
+    of the scattered field decays as :math:`1/(kr)^2` and is neglected. The scattering coefficients
+    `an` and `bn` include the factors that depend on the order, and the sums of the magnetic field
+    include the impedance `impedance` of the medium."""
+    local_cos_theta = (A[0, 2, 0] * x0 + A[0, 2, 1] * y0 + A[0, 2, 2] * z0) / r
+    local_cos_theta = min(max(local_cos_theta, -1.0), 1.0)
+    local_sin_theta = ((1 + local_cos_theta) * (1 - local_cos_theta)) ** 0.5
+
+    E_t, E_p = 0j, 0j
+    H_t, H_p = 0j, 0j
+    # Sum from the highest order down, such that the small terms are added first
+    for L in range(an.size - 1, -1, -1):
+        if calculate_electric:
+            E_t += an[L] * alp_deriv[L] + bn[L] * alp_sin[L]
+            E_p += an[L] * alp_sin[L] + bn[L] * alp_deriv[L]
+        if calculate_magnetic:
+            H_t += bn[L] * alp_deriv[L] + an[L] * alp_sin[L]
+            H_p += bn[L] * alp_sin[L] + an[L] * alp_deriv[L]
+    radial = np.exp(1j * k0r) / k0r
+    return (
+        local_cos_theta,
+        local_sin_theta,
+        0j,
+        E_t * radial,
+        E_p * radial,
+        0j,
+        H_t * radial * impedance,
+        H_p * radial * impedance,
+    )
 
 
 @njit
@@ -597,3 +903,40 @@ def _R_pol_R_th_R_phi(cos_theta: float, sin_theta: float, cos_phi: float, sin_ph
             [-cos_phi * sin_theta, sin_phi * sin_theta, cos_theta],
         ]
     )
+
+
+@njit(cache=True)
+def _rotation_matrices(
+    cos_theta: float, sin_theta: float, cos_phi: float, sin_phi: float, out: np.ndarray
+):
+    """Write the rotation matrices of `_R_th_R_phi` and `_R_pol_R_th_R_phi` into `out[0]` and
+    `out[1]`, respectively, without allocating memory.
+
+    Parameters
+    ----------
+    cos_theta : float
+        Cosine of theta, with theta in radians
+    sin_theta : float
+        Sine of theta, with theta in radians
+    cos_phi : float
+        Cosine of phi, with phi in radians
+    sin_phi : float
+        Sine of phi, with phi in radians
+    out : np.ndarray
+        Array of shape (2, 3, 3) that receives the matrices
+    """
+    out[0, 0, 0] = cos_phi * cos_theta
+    out[0, 0, 1] = -cos_theta * sin_phi
+    out[0, 0, 2] = sin_theta
+    out[0, 1, 0] = sin_phi
+    out[0, 1, 1] = cos_phi
+    out[0, 1, 2] = 0.0
+    out[0, 2, 0] = -cos_phi * sin_theta
+    out[0, 2, 1] = sin_phi * sin_theta
+    out[0, 2, 2] = cos_theta
+    # R_pol flips the polarization: the first row is the second row of R_theta @ R_phi, the second
+    # row is the negated first row
+    for col in range(3):
+        out[1, 0, col] = out[0, 1, col]
+        out[1, 1, col] = -out[0, 0, col]
+        out[1, 2, col] = out[0, 2, col]
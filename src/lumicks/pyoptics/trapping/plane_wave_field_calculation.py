@@ -1,19 +1,20 @@
-from dataclasses import fields
 from typing import Tuple
 
 import numpy as np
 
 from ..farfield_data import FarfieldData
 from .bead import Bead
-from .legendre_data import calculate_legendre
+from .focused_field_calculation import plane_wave_arguments
+from .legendre_data import calculate_legendre_tables
 from .local_coordinates import (
+    Coordinates,
     ExternalBeadCoordinates,
     InternalBeadCoordinates,
     LocalBeadCoordinates,
+    NearZoneBeadCoordinates,
 )
-from .numba_implementation import external_coordinates_loop, internal_coordinates_loop
-from .radial_data import calculate_external as calculate_external_radial_data
-from .radial_data import calculate_internal as calculate_internal_radial_data
+from .numba_implementation import combined_coordinates_loop
+from .radial_data import lazy_radial_tables
 from .thread_limiter import thread_limiter
 
 
@@ -53,25 +54,45 @@ def plane_wave_field_factory(
     local_coordinates: LocalBeadCoordinates,
     internal: bool,
 ):
-    local_coordinates = (
+    """Create a closure that calculates the fields of a bead illuminated by a plane wave, for the
+    coordinates in `local_coordinates` that are inside (`internal` is True) or outside (`internal`
+    is False) of the bead."""
+    coordinates = (
         InternalBeadCoordinates(local_coordinates)
         if internal
         else ExternalBeadCoordinates(local_coordinates)
     )
-    farfield_data = _set_farfield(theta=theta, phi=phi, polarization=[0, 0], k=bead.k)
-    r = local_coordinates.r
-    radial_data = (
-        calculate_internal_radial_data(bead.k1, r, n_orders)
-        if internal
-        else calculate_external_radial_data(bead.k, r, n_orders)
+    return _plane_wave_field_factory(bead, n_orders, theta, phi, coordinates)
+
+
+def combined_plane_wave_field_factory(
+    bead: Bead,
+    n_orders: int,
+    theta: float,
+    phi: float,
+    local_coordinates: LocalBeadCoordinates,
+):
+    """Create a closure that calculates the fields of a bead illuminated by a plane wave, for all
+    coordinates in `local_coordinates`, both inside and outside of the bead, with a single kernel.
+    This is equivalent to adding the results of two closures from `plane_wave_field_factory()`, with
+    `internal` True and False."""
+    return _plane_wave_field_factory(
+        bead, n_orders, theta, phi, NearZoneBeadCoordinates(local_coordinates)
     )
-    radial_as_dict = {f.name: getattr(radial_data, f.name) for f in fields(radial_data)}
 
-    legendre_data, legendre_data_dtheta = calculate_legendre(
-        local_coordinates, farfield_data, n_orders
+
+def _plane_wave_field_factory(
+    bead: Bead, n_orders: int, theta: float, phi: float, coordinates: Coordinates
+):
+    farfield_data = _set_farfield(theta=theta, phi=phi, polarization=[0, 0], k=bead.k)
+    r = coordinates.r
+    local_coords = coordinates.xyz_stacked
+    k0r = bead.k * r
+    outside = r > bead.bead_diameter / 2
+    legendre_data, legendre_data_dtheta = calculate_legendre_tables(
+        coordinates, farfield_data.plane_waves(), n_orders
     )
-    coeffs = bead.cd_coeffs(n_orders) if internal else bead.ab_coeffs(n_orders)
-    n_bead = bead.n_bead
+    get_radial_tables = lazy_radial_tables(bead, r, n_orders)
     n_medium = bead.n_medium
 
     def calculate_field(
@@ -81,56 +102,37 @@ def plane_wave_field_factory(
         calculate_total_field: bool = True,
     ):
         farfield_data = _set_farfield(theta=theta, phi=phi, polarization=polarization, k=bead.k)
-        farfield_as_dict = {
-            f.name: getattr(farfield_data, f.name)
-            for f in fields(farfield_data)
-            if f.name not in ("kp")
-        }
-        local_coords = local_coordinates.xyz_stacked
-        region = np.reshape(local_coordinates.region, local_coordinates.coordinate_shape)
+        farfield_as_dict = plane_wave_arguments(farfield_data.plane_waves())
+        region = np.reshape(coordinates.region, coordinates.coordinate_shape)
+        radial_E, radial_H = get_radial_tables(calculate_electric_field, calculate_magnetic_field)
 
         # Since we're not stacking plane waves, there's no need for multi-threading
         n_threads = 1
         with thread_limiter(n_threads):
-            # The function `do_loop` doesn't actually loop over anything here, as it's just a single
-            # plane wave. But we re-use the code that can assemble the plane-wave response for a set of
-            # plane waves from any angle to assemble the field for a single one.
-            E_field, H_field = (
-                internal_coordinates_loop(
-                    np.atleast_2d((0.0, 0.0, 0.0)),
-                    coeffs,
-                    n_bead,
-                    **radial_as_dict,
-                    **farfield_as_dict,
-                    legendre_data=legendre_data,
-                    legendre_data_dtheta=legendre_data_dtheta,
-                    r=r,
-                    local_coords=local_coords,
-                    calculate_electric=calculate_electric_field,
-                    calculate_magnetic=calculate_magnetic_field,
-                    n_threads=n_threads,
-                )
-                if internal
-                else external_coordinates_loop(
-                    np.atleast_2d((0.0, 0.0, 0.0)),
-                    coeffs,
-                    n_medium,
-                    **radial_as_dict,
-                    **farfield_as_dict,
-                    legendre_data=legendre_data,
-                    legendre_data_dtheta=legendre_data_dtheta,
-                    r=r,
-                    local_coords=local_coords,
-                    total=calculate_total_field,
-                    calculate_electric=calculate_electric_field,
-                    calculate_magnetic=calculate_magnetic_field,
-                    n_threads=n_threads,
-                )
+            # The kernel doesn't actually loop over anything here, as it's just a single plane wave.
+            # But we re-use the code that can assemble the plane-wave response for a set of plane
+            # waves from any angle to assemble the field for a single one.
+            E_field, H_field = combined_coordinates_loop(
+                np.atleast_2d((0.0, 0.0, 0.0)),
+                radial_E,
+                radial_H,
+                k0r,
+                outside,
+                n_medium,
+                **farfield_as_dict,
+                legendre_data=legendre_data,
+                legendre_data_dtheta=legendre_data_dtheta,
+                r=r,
+                local_coords=local_coords,
+                total=calculate_total_field,
+                calculate_electric=calculate_electric_field,
+                calculate_magnetic=calculate_magnetic_field,
+                n_threads=n_threads,
             )
 
         E, H = [
             (
-                [np.zeros(local_coordinates.coordinate_shape, dtype="complex128") for _ in range(3)]
+                [np.zeros(coordinates.coordinate_shape, dtype="complex128") for _ in range(3)]
                 if calculate
                 else None
             )
@@ -0,0 +1,80 @@
+from typing import Iterable, Tuple
+
+import numpy as np
+from scipy.constants import epsilon_0 as EPS0
+from scipy.constants import mu_0 as MU0
+
+# Names of the quantities that can be derived from the fields, and the names of the arrays that are
+# returned for every quantity
+QUANTITIES = {
+    "intensity": ("intensity",),
+    "energy_density": ("energy_density",),
+    "poynting": ("Sx", "Sy", "Sz"),
+}
+_MAGNETIC = ("energy_density", "poynting")
+
+
+def check_quantities(quantities: Iterable[str]) -> Tuple[str, ...]:
+    """Return `quantities` as a tuple, and raise a ValueError if it is empty or contains a name
+    that is not in `QUANTITIES`."""
+    quantities = (quantities,) if isinstance(quantities, str) else tuple(quantities)
+    if len(quantities) == 0:
+        raise ValueError("At least one quantity is required")
+    for quantity in quantities:
+        if quantity not in QUANTITIES:
+            raise ValueError(
+                f"Unknown quantity {quantity}, use one or more of {tuple(QUANTITIES.keys())}"
+            )
+    return quantities
+
+
+def requires_magnetic_field(quantities: Tuple[str, ...]) -> bool:
+    """Return True if any of `quantities` depends on the magnetic field"""
+    return any(quantity in _MAGNETIC for quantity in quantities)
+
+
+def output_names(quantities: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Return the names of the arrays that are returned for `quantities`, in order"""
+    return sum((QUANTITIES[quantity] for quantity in quantities), ())
+
+
+def reduce_fields(quantities: Tuple[str, ...], fields: Tuple[np.ndarray, ...], epsilon_r):
+    """Calculate the real-valued `quantities` from the complex field components `fields`, which
+    are (Ex, Ey, Ez) or (Ex, Ey, Ez, Hx, Hy, Hz). The relative permittivity `epsilon_r` is a scalar
+    or an array that broadcasts against the fields, and is only used for the energy density.
+
+    The intensity is :math:`|E|^2`, in V²/m². The time-averaged energy density is
+    :math:`(\\epsilon_0 \\mathrm{Re}(\\epsilon_r) |E|^2 + \\mu_0 |H|^2) / 4`, in J/m³, and the
+    time-averaged Poynting vector is :math:`\\mathrm{Re}(E \\times H^*) / 2`, in W/m².
+
+    Returns
+    -------
+    tuple
+        The arrays of the quantities, in the order of `output_names(quantities)`.
+    """
+    E = fields[:3]
+    H = fields[3:]
+    intensity = None
+
+    def electric_intensity():
+        nonlocal intensity
+        if intensity is None:
+            intensity = sum(np.abs(component) ** 2 for component in E)
+        return intensity
+
+    result = tuple()
+    for quantity in quantities:
+        if quantity == "intensity":
+            result += (electric_intensity(),)
+        elif quantity == "energy_density":
+            magnetic = sum(np.abs(component) ** 2 for component in H)
+            result += (0.25 * (EPS0 * np.real(epsilon_r) * electric_intensity() + MU0 * magnetic),)
+        elif quantity == "poynting":
+            Ex, Ey, Ez = E
+            Hx, Hy, Hz = [np.conj(component) for component in H]
+            result += (
+                0.5 * np.real(Ey * Hz - Ez * Hy),
+                0.5 * np.real(Ez * Hx - Ex * Hz),
+                0.5 * np.real(Ex * Hy - Ey * Hx),
+            )
+    return result
@@ -2,6 +2,10 @@ from dataclasses import dataclass
 
 import numpy as np
 import scipy.special as sp
+from scipy.constants import mu_0 as MU0
+from scipy.constants import speed_of_light as C
+
+from .bead import Bead
 
 
 @dataclass
@@ -28,6 +32,67 @@ class InternalRadialData:
     jn_1: np.ndarray
 
 
+@dataclass
+class FarZoneRadialData:
+    """
+    Data class that holds the radial coordinate for points in the far zone of the bead. In the far
+    zone, the spherical Hankel functions are replaced by their large-argument asymptotic form
+    :math:`h_n(kr) \\approx (-i)^{n+1} e^{ikr}/(kr)`, and no tables of the Hankel functions are
+    required.
+    """
+
+    k0r: np.ndarray
+
+
+def far_zone_radius(k: float, coeffs: tuple, tolerance: float):
+    """
+    Return the distance to the bead center beyond which the asymptotic form of the spherical Hankel
+    functions, and neglecting the radial component of the scattered field, results in a relative
+    error of the scattered field that is less than `tolerance` at every point.
+
+    Both the first correction term of the asymptotic expansion of :math:`h_n(kr)` and the ratio
+    between the radial and transverse components of the scattered field of order :math:`n` are
+    proportional to :math:`n (n + 1)/(kr)`, and grow with the order. Therefore, the radius is based
+    on the highest order :math:`n_{max}` of which the scattering coefficients
+    :math:`|a_n| + |b_n|` are at least `tolerance` times the largest ones, with an estimated error
+    of :math:`2 n_{max} (n_{max} + 1)/(kr)` for every order up to :math:`n_{max}`.
+
+    The error is relative to the magnitude of the scattered field at the same point. Close to a
+    direction in which the transverse scattered field vanishes, the neglected radial component
+    dominates, and the error is only bounded relative to the largest scattered field at the same
+    distance from the bead.
+
+    Parameters
+    ----------
+    k : float
+        Wave number in the medium surrounding the bead, in 1/m
+    coeffs : tuple
+        Tuple of the scattering coefficients (an, bn)
+    tolerance : float
+        Maximum relative error. Has to be strictly positive.
+
+    Returns
+    -------
+    float
+        The radius of the far zone, in meters.
+    """
+    if tolerance <= 0:
+        raise ValueError("The far zone tolerance needs to be strictly positive")
+    an, bn = coeffs
+    magnitude = np.abs(an) + np.abs(bn)
+    if np.max(magnitude, initial=0.0) == 0:
+        return np.inf
+    n_max = np.flatnonzero(magnitude >= tolerance * np.max(magnitude))[-1] + 1
+    return 2 * n_max * (n_max + 1) / (k * tolerance)
+
+
+def calculate_far_zone(k: float, radii: np.ndarray):
+    """
+    Precompute the radial data for coordinates in the far zone. Only `k0r` is required.
+    """
+    return FarZoneRadialData(k * radii)
+
+
 def calculate_external(k: float, radii: np.ndarray, n_orders: int):
     """
     Precompute the spherical Hankel functions and derivatives that only depend
@@ -86,3 +151,83 @@ def calculate_internal(k1: float, radii: np.ndarray, n_orders: int):
     jn_over_k1r[0, k1r == 0] = 1 / 3
 
     return InternalRadialData(sphBessel, jn_over_k1r, jn_1)
+
+
+def calculate_radial_tables(
+    bead: Bead, r: np.ndarray, n_orders: int, electric: bool = True, magnetic: bool = True
+):
+    """Calculate the radial tables for the electric and magnetic field for every radius in `r`, as
+    required by `spherical_coordinates_loop` and `combined_coordinates_loop`. For radii inside the
+    bead, the tables are based on the internal field coefficients, and on the scattering
+    coefficients otherwise. The tables have the shape (3, r.size, n_orders). If `electric` or
+    `magnetic` is False, the corresponding table is not calculated and a table of zeros with shape
+    (3, 1, 1) is returned instead, to keep the types consistent for Numba.
+    """
+    outside = r > bead.bead_diameter / 2
+    inside = np.logical_not(outside)
+    L = np.arange(1, n_orders + 1)
+    C1_E = 1j ** (L + 1) * (2 * L + 1)
+    C1_H = 1j**L * (2 * L + 1)
+    C2_E = C1_E / (L * (L + 1))
+    C2_H = C1_H / (L * (L + 1))
+    radial_E, radial_H = [
+        np.zeros((3, r.size, n_orders) if calculate else (3, 1, 1), dtype="complex128")
+        for calculate in (electric, magnetic)
+    ]
+
+    if np.any(outside):
+        an, bn = bead.ab_coeffs(n_orders)
+        radial_data = calculate_external(bead.k, r[outside], n_orders)
+        k0r = radial_data.k0r[:, np.newaxis]
+        krH, dkrH_dkr = radial_data.krH.T, radial_data.dkrH_dkr.T
+        Z = bead.n_medium / (C * MU0)
+        if electric:
+            radial_E[0, outside] = C1_E * an * krH / k0r**2
+            radial_E[1, outside] = C2_E * an * dkrH_dkr / k0r
+            radial_E[2, outside] = C2_E * 1j * bn * krH / k0r
+        if magnetic:
+            radial_H[0, outside] = Z * C1_H * 1j * bn * krH / k0r**2
+            radial_H[1, outside] = Z * C2_H * 1j * bn * dkrH_dkr / k0r
+            radial_H[2, outside] = -Z * C2_H * an * krH / k0r
+
+    if np.any(inside):
+        cn, dn = bead.cd_coeffs(n_orders)
+        radial_data = calculate_internal(bead.k1, r[inside], n_orders)
+        jn, jn_over_k1r, jn_1 = (
+            radial_data.sphBessel.T,
+            radial_data.jn_over_k1r.T,
+            radial_data.jn_1.T,
+        )
+        Z = bead.n_bead / (C * MU0)
+        C1_int = 1j ** (L + 1) * (2 * L + 1)
+        C2_int = 1j**L * (2 * L + 1) / (L * (L + 1))
+        d_jn = jn_1 - L * jn_over_k1r
+        if electric:
+            radial_E[0, inside] = -C1_int * dn * jn_over_k1r
+            radial_E[1, inside] = C2_int * -1j * dn * d_jn
+            radial_E[2, inside] = C2_int * cn * jn
+        if magnetic:
+            radial_H[0, inside] = -Z * C1_int * cn * jn_over_k1r
+            radial_H[1, inside] = Z * C2_int * -1j * cn * d_jn
+            radial_H[2, inside] = Z * C2_int * dn * jn
+
+    return radial_E, radial_H, outside
+
+
+def lazy_radial_tables(bead: Bead, r: np.ndarray, n_orders: int):
+    """Return a function with the signature `f(electric: bool, magnetic: bool)` that returns the
+    radial tables `(radial_E, radial_H)` of `calculate_radial_tables()`. A table is only calculated
+    the first time it is requested, as the tables take considerable memory. A table that is not
+    requested is replaced by a table of zeros with shape (3, 1, 1)."""
+    tables = {}
+
+    def get_radial_tables(electric: bool, magnetic: bool):
+        for name, calculate in (("E", electric), ("H", magnetic)):
+            if calculate and name not in tables:
+                tables[name] = calculate_radial_tables(
+                    bead, r, n_orders, electric=name == "E", magnetic=name == "H"
+                )[0 if name == "E" else 1]
+        dummy = np.zeros((3, 1, 1), dtype="complex128")
+        return (tables["E"] if electric else dummy, tables["H"] if magnetic else dummy)
+
+    return get_radial_tables
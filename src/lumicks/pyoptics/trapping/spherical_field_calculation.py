@@ -0,0 +1,89 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from numba.core.config import NUMBA_NUM_THREADS
+
+from ..objective import Objective
+from .bead import Bead
+from .focused_field_calculation import plane_wave_arguments, plane_wave_phase_correction_factor
+from .numba_implementation import spherical_coordinates_loop
+from .radial_data import calculate_radial_tables
+from .thread_limiter import thread_limiter
+
+
+def spherical_field_factory(
+    objective: Objective,
+    bead: Bead,
+    n_orders: int,
+    bfp_sampling_n: int,
+    f_input_field: callable,
+    r: np.ndarray,
+    theta: np.ndarray,
+    phi: np.ndarray,
+):
+    """Create a closure that calculates the fields of a bead in a focus, on a spherical grid in (r,
+    theta, phi) around the center of the bead. The radial functions are calculated once per radius,
+    and the angular functions once per direction and plane wave."""
+    bfp_coords, bfp_fields = objective.sample_back_focal_plane(
+        f_input_field=f_input_field, bfp_sampling_n=bfp_sampling_n
+    )
+    farfield_data = objective.back_focal_plane_to_farfield(bfp_coords, bfp_fields, bead.lambda_vac)
+    farfield_as_dict = plane_wave_arguments(farfield_data.plane_waves())
+
+    radial_E, radial_H, outside = calculate_radial_tables(bead, r, n_orders)
+    k0r = bead.k * r
+
+    Theta, Phi = np.meshgrid(theta, phi, indexing="ij")
+    sin_theta = np.sin(Theta).reshape(-1)
+    directions = np.vstack(
+        (
+            sin_theta * np.cos(Phi).reshape(-1),
+            sin_theta * np.sin(Phi).reshape(-1),
+            np.cos(Theta).reshape(-1),
+        )
+    )
+    shape = (r.size, theta.size, phi.size)
+
+    phase_correction_factor = plane_wave_phase_correction_factor(objective, bead, bfp_sampling_n)
+
+    def calculate_field(
+        bead_center: Tuple[float, float, float],
+        calculate_electric_field: bool = True,
+        calculate_magnetic_field: bool = False,
+        calculate_total_field: bool = True,
+        num_threads: Optional[int] = None,
+    ):
+        bead_center = np.atleast_2d(bead_center).astype(np.float64)
+        if len(bead_center.shape) > 2:
+            raise ValueError("Invalid argument for bead_center")
+        num_threads = 1 if num_threads is None else min(max(1, int(num_threads)), NUMBA_NUM_THREADS)
+        with thread_limiter(num_threads):
+            E_field, H_field = spherical_coordinates_loop(
+                bead_center,
+                radial_E,
+                radial_H,
+                k0r,
+                outside,
+                directions,
+                n_orders,
+                bead.n_medium,
+                **farfield_as_dict,
+                total=calculate_total_field,
+                calculate_electric=calculate_electric_field,
+                calculate_magnetic=calculate_magnetic_field,
+                n_threads=num_threads,
+            )
+
+        ret_val = tuple()
+        for calculate, storage in zip(
+            (calculate_electric_field, calculate_magnetic_field), (E_field, H_field)
+        ):
+            if calculate:
+                storage *= phase_correction_factor
+                ret_val += tuple(
+                    np.squeeze(storage[:, idx].reshape((len(bead_center), *shape)))
+                    for idx in range(3)
+                )
+        return ret_val
+
+    return calculate_field
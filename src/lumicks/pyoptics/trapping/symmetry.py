@@ -0,0 +1,68 @@
+"""Mirror symmetries of the fields of a bead in a focus"""
+
+from typing import Dict
+
+import numpy as np
+
+from ..objective import Objective
+
+# Axes that can be mirrored. The focus is not symmetric along z
+MIRROR_AXES = ("x", "y")
+# Tolerance, relative to the largest field component, for the detection of a symmetry
+_PARITY_TOLERANCE = 1e-12
+
+
+def input_field_parity(f_input_field, objective: Objective, bfp_sampling_n: int) -> Dict[str, int]:
+    """Return the parity, +1 or -1, of the input field under a mirror operation along x and along
+    y. The mirror operation along x transforms the fields in the back focal plane into
+    :math:`(-E_x(-x, y), E_y(-x, y))`, and the input field has parity p if the result is p times
+    the input field. Axes along which the input field has no parity are omitted.
+
+    If the bead center is in the mirror plane, the fields of the bead in the focus have the same
+    symmetry, see `component_sign()`."""
+    coords, fields = objective.sample_back_focal_plane(f_input_field, bfp_sampling_n)
+    shape = coords.aperture.shape
+    Ex, Ey = [
+        np.zeros(shape) if field is None else np.broadcast_to(field, shape) * coords.aperture
+        for field in fields
+    ]
+    atol = _PARITY_TOLERANCE * max(np.max(np.abs(Ex)), np.max(np.abs(Ey)))
+    parities = {}
+    # The back focal plane is sampled symmetrically, with x along the first and y along the second
+    # axis
+    for axis_idx, (axis, signs) in enumerate(zip(MIRROR_AXES, ((-1, 1), (1, -1)))):
+        mirrored = [sign * np.flip(field, axis_idx) for sign, field in zip(signs, (Ex, Ey))]
+        for parity in (1, -1):
+            if all(
+                np.allclose(mirrored_field, parity * field, rtol=0, atol=atol)
+                for mirrored_field, field in zip(mirrored, (Ex, Ey))
+            ):
+                parities[axis] = parity
+                break
+    return parities
+
+
+def component_sign(name: str, axis: str, parity: int) -> int:
+    """Return the sign s with which the component `name` at a location r is related to the same
+    component at the mirrored location M r, F(r) = s F(M r), for an input field with parity
+    `parity` under the mirror operation M along `axis`.
+
+    The electric field is a vector, and transforms as :math:`p M \\mathbf{E}(M \\mathbf{r})`. The
+    magnetic field is a pseudovector, which transforms with an additional minus sign. The Poynting
+    vector is a vector with parity +1, regardless of p, and the intensity and the energy density
+    are invariant."""
+    if len(name) != 2 or name[0] not in "EHS":
+        return 1
+    sign = -1 if name[1] == axis else 1
+    if name[0] == "E":
+        return parity * sign
+    if name[0] == "H":
+        return -parity * sign
+    return sign
+
+
+def is_symmetric(coordinates: np.ndarray) -> bool:
+    """Return True if `coordinates` are symmetric around zero, that is, if coordinate i is equal to
+    minus coordinate n - 1 - i"""
+    atol = 1e-12 * np.max(np.abs(coordinates))
+    return bool(np.allclose(coordinates, -coordinates[::-1], rtol=0, atol=atol))
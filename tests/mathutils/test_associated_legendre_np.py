@@ -1,11 +1,13 @@
 import numpy as np
 import numpy.polynomial as npp
 import pytest
+import scipy.special as sp
 
 from lumicks.pyoptics.mathutils.associated_legendre import (
     associated_legendre,
     associated_legendre_dtheta,
     associated_legendre_over_sin_theta,
+    normalized_legendre_pi_tau,
 )
 
 
@@ -88,3 +90,32 @@ def test_legendre_dtheta(max_order):
     associated_legendre_dtheta(x, alp_sin, alp_dtheta)
 
     np.testing.assert_allclose(alp_dtheta_ref, alp_dtheta)
+
+
+@pytest.mark.parametrize("n_max", [1, 5, 20])
+def test_normalized_legendre_pi_tau(n_max):
+    theta = np.linspace(0.01, np.pi - 0.01, 25)
+    pi_nm, tau_nm = normalized_legendre_pi_tau(n_max, np.cos(theta), np.sin(theta))
+    h = 1e-6
+
+    def normalized_legendre(n, m, theta):
+        norm = np.sqrt((2 * n + 1) / (4 * np.pi) * sp.factorial(n - m) / sp.factorial(n + m))
+        return norm * sp.lpmv(m, n, np.cos(theta))
+
+    for n in range(1, n_max + 1):
+        for m in range(n + 1):
+            P = normalized_legendre(n, m, theta)
+            dP = normalized_legendre(n, m, theta + h) - normalized_legendre(n, m, theta - h)
+            np.testing.assert_allclose(pi_nm[n - 1, m], m * P / np.sin(theta), atol=1e-10)
+            np.testing.assert_allclose(tau_nm[n - 1, m], dP / (2 * h), atol=1e-6 * n)
+        np.testing.assert_equal(pi_nm[n - 1, n + 1 :], 0)
+
+
+def test_normalized_legendre_pi_tau_poles():
+    theta = np.array([0.0, 1e-10, np.pi - 1e-10, np.pi])
+    pi_nm, tau_nm = normalized_legendre_pi_tau(10, np.cos(theta), np.sin(theta))
+    assert np.all(np.isfinite(pi_nm)) and np.all(np.isfinite(tau_nm))
+    np.testing.assert_allclose(pi_nm[..., 0], pi_nm[..., 1], atol=1e-7)
+    np.testing.assert_allclose(pi_nm[..., 3], pi_nm[..., 2], atol=1e-7)
+    np.testing.assert_allclose(tau_nm[..., 0], tau_nm[..., 1], atol=1e-7)
+    np.testing.assert_allclose(tau_nm[..., 3], tau_nm[..., 2], atol=1e-7)
@@ -0,0 +1,39 @@
+"""Test that the automatic sampling of the back focal plane of the PSF functions uses the minimum
+sampling for the requested locations"""
+
+import numpy as np
+
+from lumicks.pyoptics.psf.direct import direct_psf
+from lumicks.pyoptics.psf.fast import fast_psf, fast_psf_z_slices
+from lumicks.pyoptics.sampling import minimum_bfp_sampling_n
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.5j * amplitude)
+
+
+args = (input_field, 1064e-9, 1.0, 1.33, 4.43e-3, 1.2)
+z = np.linspace(-1e-6, 2e-6, 4)
+minimum = minimum_bfp_sampling_n(1064e-9, 1.33, 1.2, 1.5e-6, 2e-6)
+
+
+def test_fast_psf_auto():
+    ranges = ((-1e-6, 1.5e-6), 11, (-0.5e-6, 0.5e-6), 5)
+    reference = fast_psf(*args, *ranges, z, bfp_sampling_n=minimum)
+    for field, reference_field in zip(
+        fast_psf(*args, *ranges, z, bfp_sampling_n="auto"), reference
+    ):
+        np.testing.assert_equal(field, reference_field)
+    for idx, (_, *fields) in enumerate(fast_psf_z_slices(*args, *ranges, z, bfp_sampling_n="auto")):
+        for field, reference_field in zip(fields, reference):
+            np.testing.assert_allclose(field, reference_field[..., idx], rtol=1e-12, atol=0)
+
+
+def test_direct_psf_auto():
+    x = np.linspace(-1e-6, 1.5e-6, 6)
+    reference = direct_psf(*args, x, 0.0, z, bfp_sampling_n=minimum)
+    for field, reference_field in zip(
+        direct_psf(*args, x, 0.0, z, bfp_sampling_n="auto"), reference
+    ):
+        np.testing.assert_equal(field, reference_field)
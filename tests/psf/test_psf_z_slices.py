@@ -0,0 +1,32 @@
+"""Test that the z-slice generator of fast_psf yields the same fields as fast_psf"""
+
+import numpy as np
+import pytest
+
+from lumicks.pyoptics.psf.fast import fast_psf, fast_psf_z_slices
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.5j * amplitude)
+
+
+@pytest.mark.parametrize(
+    "x_range, numpoints_x, y_range, numpoints_y",
+    [((-1e-6, 1.5e-6), 21, (-0.5e-6, 0.5e-6), 11), (0.2e-6, 1, (-1e-6, 1e-6), 15)],
+)
+def test_z_slices(x_range, numpoints_x, y_range, numpoints_y):
+    args = (input_field, 1064e-9, 1.0, 1.33, 4.43e-3, 1.2, x_range, numpoints_x, y_range)
+    z = np.linspace(-1e-6, 1e-6, 5)
+    Ex, Ey, Ez = fast_psf(*args, numpoints_y, z, bfp_sampling_n=31)
+    slices = list(fast_psf_z_slices(*args, numpoints_y, z, bfp_sampling_n=31))
+    assert len(slices) == z.size
+    for idx, (z_plane, *fields) in enumerate(slices):
+        assert z_plane == z[idx]
+        for field, reference in zip(fields, (Ex, Ey, Ez)):
+            np.testing.assert_allclose(field, reference[..., idx], rtol=1e-12, atol=0)
+
+
+def test_z_slices_checks_arguments():
+    with pytest.raises(ValueError, match="numpoints_x needs to be >= 1"):
+        fast_psf_z_slices(input_field, 1, 1, 1, 1, 1, (-1, 1), -1, (-1, 1), 2, 0)
@@ -0,0 +1,124 @@
+import gc
+import weakref
+
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+import lumicks.pyoptics.trapping.interface as interface
+
+bead = trp.Bead(1e-6, 1.57 + 0.01j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+bead_centers = np.array([[0.3e-6, 0.1e-6, 0.4e-6], [0.0, 0.0, 0.2e-6]])
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, None)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(interface, "_integration_order_cache", {})
+
+
+def factory(**kwargs):
+    return trp.observables_factory(input_field, objective, bead, bfp_sampling_n=11, **kwargs)
+
+
+def test_adaptive_order_meets_tolerance():
+    tolerance = 1e-4
+    result = factory(integration_orders="auto", integration_tolerance=tolerance)(bead_centers)
+    (order,) = interface._integration_order_cache.values()
+    fixed = factory(integration_orders=order)(bead_centers)
+    reference = factory(integration_orders=59)(bead_centers)
+    scale = {
+        "force": np.max(np.linalg.norm(reference["force"], axis=1)),
+        "torque": np.max(np.linalg.norm(reference["torque"], axis=1)),
+        "absorbed_power": np.max(reference["absorbed_power"]),
+        "scattered_power": np.max(reference["scattered_power"]),
+    }
+    for observable in trp.OBSERVABLES:
+        np.testing.assert_equal(result[observable], fixed[observable])
+        np.testing.assert_allclose(
+            result[observable],
+            reference[observable],
+            rtol=0,
+            atol=10 * tolerance * scale[observable],
+        )
+
+
+def test_tolerance_determines_order():
+    orders = []
+    for tolerance in (1e-2, 1e-8):
+        factory(integration_orders="auto", integration_tolerance=tolerance)(bead_centers[0])
+        orders.append(interface._integration_order_cache.popitem()[1])
+    assert orders[0] < orders[1]
+
+
+def test_order_is_cached(monkeypatch):
+    factory(integration_orders="auto")(bead_centers[0], "force")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The integration order should have been cached")
+
+    monkeypatch.setattr(interface, "_adaptive_integration_order", fail)
+    factory(integration_orders="auto")(bead_centers, "scattered_power")
+    trp.force_factory(input_field, objective, bead, bfp_sampling_n=11, integration_orders="auto")(
+        bead_centers[1]
+    )
+    with pytest.raises(AssertionError, match="cached"):
+        factory(integration_orders="auto", integration_tolerance=1e-3)(bead_centers[0])
+
+
+def test_search_evaluates_every_order_once(monkeypatch):
+    calls = []
+    evaluators = {}
+    sphere_observables_factory = interface._sphere_observables_factory
+
+    def counting_factory(*args):
+        order = args[-1]
+        evaluate = sphere_observables_factory(*args)
+
+        def counting_evaluator(*args):
+            calls.append(order)
+            return evaluate(*args)
+
+        evaluators[order] = weakref.ref(counting_evaluator)
+        return counting_evaluator
+
+    monkeypatch.setattr(interface, "_sphere_observables_factory", counting_factory)
+    observables = factory(integration_orders="auto")
+    result = observables(bead_centers)
+    (order,) = interface._integration_order_cache.values()
+    assert len(calls) == len(set(calls)) > 1
+    assert order in calls
+
+    # Only the evaluator of the chosen order is kept alive
+    gc.collect()
+    assert [o for o, evaluator in evaluators.items() if evaluator() is not None] == [order]
+
+    np.testing.assert_equal(observables(bead_centers)["force"], result["force"])
+    assert calls[-1] == order and len(calls) == len(set(calls)) + 1
+
+
+def test_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(interface, "_MAX_CACHED_INTEGRATION_ORDERS", 2)
+    interface._cache_integration_order("a", 5)
+    interface._cache_integration_order("b", 7)
+    assert interface._cached_integration_order("a") == 5
+    interface._cache_integration_order("c", 9)
+    assert interface._integration_order_cache == {"a": 5, "c": 9}
+    assert interface._cached_integration_order("b") is None
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"integration_orders": "adaptive"}, "Invalid value for integration_orders"),
+        ({"integration_orders": "auto", "integration_tolerance": 0}, "strictly positive"),
+    ],
+)
+def test_invalid_arguments(kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        factory(**kwargs)
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+
+bead = trp.Bead(1e-6, 1.6, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+w0 = 4e-3
+bead_z = 0.1e-6
+
+
+def linear_polarization(_, x_bfp, y_bfp, *args):
+    return (np.exp(-(x_bfp**2 + y_bfp**2) / w0**2), None)
+
+
+def circular_polarization(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / w0**2)
+    return (amplitude, 1j * amplitude)
+
+
+def reference(f_input, rho, phi, z):
+    R, P, Z = np.meshgrid(rho, phi, z, indexing="ij")
+    return trp.fields_focus(
+        f_input,
+        objective,
+        bead,
+        (0, 0, bead_z),
+        (R * np.cos(P)).reshape(-1),
+        (R * np.sin(P)).reshape(-1),
+        Z.reshape(-1),
+        bfp_sampling_n=31,
+        magnetic_field=True,
+        grid=False,
+    )
+
+
+def max_field_amplitudes(fields):
+    """Return the largest amplitude of the electric field, and of the magnetic field if present,
+    for every field component"""
+    max_E = max(np.abs(field).max() for field in fields[:3])
+    max_H = max((np.abs(field).max() for field in fields[3:]), default=0.0)
+    return (max_E,) * 3 + (max_H,) * (len(fields) - 3)
+
+
+@pytest.mark.parametrize("f_input", [linear_polarization, circular_polarization])
+def test_harmonics_resynthesis(f_input):
+    rho = np.linspace(0, 1.5e-6, 7)
+    z = np.array([-0.7e-6, 0.0, 0.6e-6])
+    harmonics = trp.fields_focus_harmonics(
+        f_input, objective, bead, rho, z, bead_z=bead_z, bfp_sampling_n=31, magnetic_field=True
+    )
+    assert harmonics.harmonics.shape == (6, 5, rho.size, z.size)
+    np.testing.assert_equal(harmonics.orders, [-2, -1, 0, 1, 2])
+
+    # At the sampled azimuthal angles, the resynthesis is exact
+    phi = 2 * np.pi * np.arange(5) / 5
+    for field, ref in zip(harmonics.evaluate(phi), reference(f_input, rho, phi, z)):
+        np.testing.assert_allclose(
+            field.reshape(-1), ref, rtol=1e-10, atol=1e-10 * np.abs(ref).max()
+        )
+
+    # In between, the error is caused by the (small) harmonics due to the square sampling of the
+    # back focal plane
+    phi = np.array([0.3, 1.1, 2.5])
+    refs = reference(f_input, rho, phi, z)
+    for field, ref, max_ref in zip(harmonics.evaluate(phi), refs, max_field_amplitudes(refs)):
+        np.testing.assert_allclose(field.reshape(-1), ref, rtol=0, atol=1e-2 * max_ref)
+
+
+def test_harmonics_to_grid():
+    rho = np.linspace(0, 1.5e-6, 31)
+    z = np.array([-0.5e-6, 0.7e-6])
+    harmonics = trp.fields_focus_harmonics(
+        linear_polarization, objective, bead, rho, z, bead_z=bead_z, bfp_sampling_n=31
+    )
+    x = np.linspace(-1e-6, 1e-6, 7)
+    fields = harmonics.to_grid(x, x)
+    refs = trp.fields_focus(
+        linear_polarization, objective, bead, (0, 0, bead_z), x, x, z, bfp_sampling_n=31
+    )
+    for field, ref, max_ref in zip(fields, refs, max_field_amplitudes(refs)):
+        assert field.shape == (x.size, x.size, z.size)
+        np.testing.assert_allclose(field, ref, rtol=0, atol=1e-2 * max_ref)
+
+    with pytest.raises(ValueError, match="outside of the range of rho"):
+        harmonics.to_grid(np.array([2e-6]), 0.0)
+
+
+def test_harmonics_errors():
+    with pytest.raises(ValueError, match="max_harmonic needs to be zero or larger"):
+        trp.fields_focus_harmonics(linear_polarization, objective, bead, 0.0, 0.0, max_harmonic=-1)
+    with pytest.raises(ValueError, match="rho needs to be non-negative"):
+        trp.fields_focus_harmonics(linear_polarization, objective, bead, -1e-7, 0.0)
+
+
+def test_harmonics_to_grid_needs_increasing_rho():
+    harmonics = trp.fields_focus_harmonics(
+        linear_polarization, objective, bead, [1e-6, 0.0], 0.0, bfp_sampling_n=5
+    )
+    with pytest.raises(ValueError, match="rho needs to be strictly increasing"):
+        harmonics.to_grid(0.0, 0.0)
@@ -0,0 +1,162 @@
+import logging
+
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+import lumicks.pyoptics.trapping.interface as interface
+from lumicks.pyoptics.sampling import (
+    minimum_bfp_sampling_n,
+    new_samples_mask,
+    refined_bfp_sampling_n,
+    resolve_bfp_sampling_n,
+)
+
+bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+bead_center = (0.1e-6, 0.0, 0.2e-6)
+x = np.linspace(-1e-6, 1e-6, 5)
+z = np.array([-0.5e-6, 0.4e-6])
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.3j * amplitude)
+
+
+def focus(bfp_sampling_n, **kwargs):
+    return trp.fields_focus(
+        input_field,
+        objective,
+        bead,
+        bead_center=bead_center,
+        x=x,
+        y=0.0,
+        z=z,
+        bfp_sampling_n=bfp_sampling_n,
+        **kwargs,
+    )
+
+
+def test_minimum_bfp_sampling_n():
+    args = (1064e-9, 1.33, 1.2)
+    assert minimum_bfp_sampling_n(*args, 0.0, 0.0) == 11
+    # The field is periodic with a period of lambda * (N - 1) / NA along x and y
+    lateral = minimum_bfp_sampling_n(*args, 50e-6, 0.0)
+    assert (lateral - 5) * 1064e-9 / 1.2 >= 2 * 50e-6 > (lateral - 6) * 1064e-9 / 1.2
+    # Along z, the extent is scaled by the tangent of the maximum angle
+    tan_theta_max = 1.2 / (1.33**2 - 1.2**2) ** 0.5
+    assert minimum_bfp_sampling_n(*args, 0.0, 50e-6) == minimum_bfp_sampling_n(
+        *args, 50e-6 * tan_theta_max, 0.0
+    )
+    assert minimum_bfp_sampling_n(*args, -50e-6, -20e-6) == minimum_bfp_sampling_n(
+        *args, 50e-6, 20e-6
+    )
+
+
+def test_resolve_bfp_sampling_n(caplog):
+    args = (1064e-9, 1.33, 1.2, 10e-6, 0.0)
+    assert resolve_bfp_sampling_n("auto", *args) == minimum_bfp_sampling_n(*args)
+    with caplog.at_level(logging.WARNING):
+        assert resolve_bfp_sampling_n(100, *args) == 100
+        assert not caplog.records
+        assert resolve_bfp_sampling_n(11, *args) == 11
+    assert "aliased" in caplog.text
+    with pytest.raises(ValueError, match="Invalid value for bfp_sampling_n"):
+        resolve_bfp_sampling_n("fine", *args)
+
+
+def test_new_samples_mask():
+    bfp_sampling_n = refined_bfp_sampling_n(11)
+    assert bfp_sampling_n == 21
+    mask = new_samples_mask(bfp_sampling_n)
+    assert mask.shape == (41, 41)
+    assert np.count_nonzero(~mask) == 21**2
+    # The previous samples are every other sample, including the center
+    sin_theta = objective.sine_theta_range(bfp_sampling_n)
+    np.testing.assert_equal(sin_theta[~mask[:, 0]], objective.sine_theta_range(11))
+    with pytest.raises(ValueError, match="not the result of a refinement"):
+        new_samples_mask(20)
+
+
+def test_auto():
+    auto = focus("auto")
+    minimum = minimum_bfp_sampling_n(1064e-9, 1.33, 1.2, 1e-6, 0.7e-6)
+    for field, reference in zip(auto, focus(minimum)):
+        np.testing.assert_equal(field, reference)
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_refinement_reuses_samples(chunked):
+    """One refinement step gives the same fields as a direct calculation with the refined
+    sampling, as only the new plane waves are added to the previous fields"""
+    reference = focus(21, magnetic_field=True)
+    max_memory = None
+    if chunked:
+        full = trp.memory_estimate_focus(
+            objective, bead, x, 0.0, z, bfp_sampling_n=41, magnetic_field=True
+        )
+        max_memory = (full.peak - full.output) * 2 // x.size
+    refined = focus(11, bfp_sampling_tolerance=1.0, magnetic_field=True, max_memory=max_memory)
+    atol = 1e-12 * max(np.max(np.abs(field)) for field in reference)
+    for field, reference_field in zip(refined, reference):
+        np.testing.assert_allclose(field, reference_field, rtol=0, atol=atol)
+
+
+def test_refinement_not_converged(monkeypatch, caplog):
+    monkeypatch.setattr(interface, "_MAX_BFP_REFINEMENTS", 2)
+    with caplog.at_level(logging.WARNING):
+        refined = focus(11, bfp_sampling_tolerance=1e-12)
+    assert "did not converge" in caplog.text
+    atol = 1e-12 * max(np.max(np.abs(field)) for field in refined)
+    for field, reference in zip(refined, focus(41)):
+        np.testing.assert_allclose(field, reference, rtol=0, atol=atol)
+
+
+@pytest.mark.parametrize("bfp_sampling_n, tolerance", [("fine", None), (11, 0.0)])
+def test_invalid_arguments(bfp_sampling_n, tolerance):
+    with pytest.raises(ValueError, match="Invalid value for bfp_sampling_n|has to be positive"):
+        focus(bfp_sampling_n, bfp_sampling_tolerance=tolerance)
+
+
+def test_refinement_logs_relative_change(caplog):
+    with caplog.at_level(logging.INFO):
+        focus(11, bfp_sampling_tolerance=1.0)
+    (message,) = [r.message for r in caplog.records if "relative change" in r.message]
+    coarse, refined = focus(11), focus(21)
+    change = max(np.max(np.abs(r - c)) for r, c in zip(refined, coarse))
+    magnitude = max(np.max(np.abs(r)) for r in refined)
+    np.testing.assert_allclose(float(message.split()[-1]), change / magnitude, rtol=1e-6)
+
+
+def test_chunks_use_the_same_refined_sampling(caplog):
+    full = trp.memory_estimate_focus(objective, bead, x, 0.0, z, bfp_sampling_n=81)
+    max_memory = (full.peak - full.output) * 2 // x.size
+    with caplog.at_level(logging.INFO):
+        refined = focus(11, bfp_sampling_tolerance=1e-3, max_memory=max_memory)
+    assert "Processing chunk 2" in caplog.text
+    messages = [r.message for r in caplog.records if r.message.startswith("Refined")]
+    # The sampling is refined once, for all chunks
+    assert 0 < len(messages) <= interface._MAX_BFP_REFINEMENTS
+    bfp_sampling_n = int(messages[-1].split()[3].rstrip(","))
+    reference = focus(bfp_sampling_n)
+    atol = 1e-12 * max(np.max(np.abs(field)) for field in reference)
+    for field, reference_field in zip(refined, reference):
+        np.testing.assert_allclose(field, reference_field, rtol=0, atol=atol)
+
+
+def test_refinement_prunes_the_refined_farfield(monkeypatch):
+    pruned_apertures = []
+    pruned_farfield = interface._pruned_farfield
+
+    def recording_pruned_farfield(farfield_data, pruning_tolerance):
+        pruned_apertures.append(np.count_nonzero(farfield_data.aperture))
+        return pruned_farfield(farfield_data, pruning_tolerance)
+
+    monkeypatch.setattr(interface, "_pruned_farfield", recording_pruned_farfield)
+    focus(11, bfp_sampling_tolerance=1.0, pruning_tolerance=1e-3)
+    # The far field is pruned with all samples of the refined sampling, not only the new ones
+    assert pruned_apertures == [
+        np.count_nonzero(interface._sample_farfield(input_field, objective, 1064e-9, n).aperture)
+        for n in (11, 21)
+    ]
@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+from lumicks.pyoptics.trapping.focused_field_calculation import (
+    _parallel_axis,
+    combined_field_factory,
+    focus_field_factory,
+)
+from lumicks.pyoptics.trapping.local_coordinates import LocalBeadCoordinates
+from lumicks.pyoptics.trapping.numba_implementation import (
+    _R_pol_R_th_R_phi,
+    _R_th_R_phi,
+    _rotation_matrices,
+)
+from lumicks.pyoptics.trapping.plane_wave_field_calculation import (
+    combined_plane_wave_field_factory,
+    plane_wave_field_factory,
+)
+
+bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+n_orders = bead.number_of_orders
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.3j * amplitude)
+
+
+coordinates = {
+    "grid": (
+        np.linspace(-2e-6, 2e-6, 11),
+        np.linspace(-1e-6, 1e-6, 7),
+        np.array([-0.1e-6, 0.0, 0.5e-6]),
+        True,
+    ),
+    "points": (
+        np.array([0.0, 0.2e-6, 0.5e-6, 3e-6]),
+        np.array([0.0, 0.1e-6, 0.0, 1e-6]),
+        np.array([0.0, 0.0, 0.0, -2e-6]),
+        False,
+    ),
+}
+
+
+@pytest.mark.parametrize("coords", ["grid", "points"])
+@pytest.mark.parametrize("far_zone_tolerance", [None, 1e-2])
+@pytest.mark.parametrize("total_field", [True, False])
+def test_combined_focus_fields(coords, far_zone_tolerance, total_field):
+    x, y, z, grid = coordinates[coords]
+    local_coordinates = LocalBeadCoordinates(x, y, z, bead.bead_diameter, grid=grid)
+    external, internal = [
+        focus_field_factory(
+            objective,
+            bead,
+            n_orders,
+            9,
+            input_field,
+            local_coordinates,
+            internal,
+            None if internal else far_zone_tolerance,
+        )
+        for internal in (False, True)
+    ]
+    combined = combined_field_factory(
+        objective, bead, n_orders, 9, input_field, local_coordinates, far_zone_tolerance
+    )
+    bead_center = [[0.1e-6, 0.2e-6, -0.1e-6], [0.0, 0.0, 0.0]]
+    fields = combined(bead_center, True, True, total_field)
+    for field, field_ext, field_int in zip(
+        fields,
+        external(bead_center, True, True, total_field),
+        internal(bead_center, True, True, total_field),
+    ):
+        ref = field_ext + field_int
+        np.testing.assert_allclose(field, ref, rtol=1e-12, atol=1e-12 * np.abs(ref).max())
+
+    # Only the electric or magnetic field
+    for field, ref in zip(combined(bead_center, True, False, total_field), fields[:3]):
+        np.testing.assert_equal(field, ref)
+    for field, ref in zip(combined(bead_center, False, True, total_field), fields[3:]):
+        np.testing.assert_equal(field, ref)
+
+
+@pytest.mark.parametrize("total_field", [True, False])
+def test_combined_plane_wave_fields(total_field):
+    x = np.linspace(-1e-6, 1e-6, 9)
+    local_coordinates = LocalBeadCoordinates(x, x, x, bead.bead_diameter)
+    external, internal = [
+        plane_wave_field_factory(bead, n_orders, 0.3, 1.1, local_coordinates, internal)
+        for internal in (False, True)
+    ]
+    combined = combined_plane_wave_field_factory(bead, n_orders, 0.3, 1.1, local_coordinates)
+    polarization = (1.0, 0.5j)
+    for field, field_ext, field_int in zip(
+        combined(polarization, True, True, total_field),
+        external(polarization, True, True, total_field),
+        internal(polarization, True, True, total_field),
+    ):
+        ref = field_ext + field_int
+        np.testing.assert_allclose(field, ref, rtol=1e-12, atol=1e-12 * np.abs(ref).max())
+
+
+@pytest.mark.parametrize("theta, phi", [(0.0, 0.0), (0.3, 1.1), (1.2, -2.5), (np.pi / 2, np.pi)])
+def test_rotation_matrices(theta, phi):
+    args = (np.cos(theta), np.sin(theta), np.cos(phi), np.sin(phi))
+    out = np.empty((2, 3, 3))
+    _rotation_matrices(*args, out)
+    np.testing.assert_equal(out[0], _R_th_R_phi(*args))
+    np.testing.assert_equal(out[1], _R_pol_R_th_R_phi(*args))
+
+
+@pytest.mark.parametrize("parallel_axis", ["positions", "points"])
+@pytest.mark.parametrize("fields", [(True, True), (True, False), (False, True)])
+def test_parallel_axes(parallel_axis, fields):
+    x, y, z, grid = coordinates["grid"]
+    local_coordinates = LocalBeadCoordinates(x, y, z, bead.bead_diameter, grid=grid)
+    field_fun = combined_field_factory(objective, bead, n_orders, 9, input_field, local_coordinates)
+    bead_center = np.array([[0.1e-6, 0.0, -0.2e-6], [0.0, 0.3e-6, 0.1e-6], [0.0, 0.0, 0.0]])
+    reference = field_fun(bead_center, *fields, True, 1, parallel_axis="plane_waves")
+    result = field_fun(bead_center, *fields, True, 1, parallel_axis=parallel_axis)
+    assert len(result) == len(reference)
+    for component, reference_component in zip(result, reference):
+        np.testing.assert_allclose(
+            component, reference_component, rtol=0, atol=1e-12 * np.max(np.abs(reference_component))
+        )
+
+
+def test_parallel_axis_choice():
+    # A single thread never replicates the output
+    assert _parallel_axis(1, 1000, 1000, 10**6, 2) == "plane_waves"
+    assert _parallel_axis(8, 10, 1000, 1000, 2) == "plane_waves"
+    assert _parallel_axis(8, 1000, 100, 10**4, 2) == "positions"
+    assert _parallel_axis(8, 2, 1000, 10**6, 2) == "points"
+    assert _parallel_axis(8, 1000, 10**4, 10**6, 2) == "points"
+
+
+def test_invalid_parallel_axis():
+    x, y, z, grid = coordinates["points"]
+    local_coordinates = LocalBeadCoordinates(x, y, z, bead.bead_diameter, grid=grid)
+    field_fun = combined_field_factory(objective, bead, n_orders, 9, input_field, local_coordinates)
+    with pytest.raises(ValueError, match="Invalid value for parallel_axis"):
+        field_fun((0, 0, 0), parallel_axis="orders")
@@ -0,0 +1,81 @@
+"""Test the asymptotic evaluation of the scattered fields far away from the bead against the exact
+evaluation"""
+
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+from lumicks.pyoptics.trapping.radial_data import far_zone_radius
+
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+directions = np.random.default_rng(0).normal(size=(3, 40))
+directions /= np.linalg.norm(directions, axis=0)
+# Distances relative to the far zone radius: the first one is in the near zone
+relative_distances = [0.5, 1.01, 1.5, 3.0]
+
+
+@pytest.mark.parametrize(
+    "bead_diameter, n_bead, tolerance",
+    [
+        (1e-6, 1.6, 1e-2),
+        (1e-6, 1.6, 1e-3),
+        (4e-6, 1.6, 1e-2),
+        (0.2e-6, 1.6, 1e-2),
+        (0.2e-6, 1.6, 1e-3),
+        (0.5e-6, 0.2 + 3.0j, 1e-2),
+    ],
+)
+def test_far_zone_fields(bead_diameter, n_bead, tolerance):
+    bead = trp.Bead(bead_diameter, n_bead, 1.33, 1064e-9)
+    r_far = far_zone_radius(bead.k, bead.ab_coeffs(), tolerance)
+
+    # Shells of points around the bead, in random directions
+    x, y, z = np.concatenate([directions * r_far * distance for distance in relative_distances], 1)
+    kwargs = {
+        "x": x,
+        "y": y,
+        "z": z,
+        "grid": False,
+        "bfp_sampling_n": 5,
+        "total_field": False,
+        "magnetic_field": True,
+    }
+    fields = trp.fields_focus_gaussian(1.0, 1.0, objective, bead, **kwargs)
+    fields_far_zone = trp.fields_focus_gaussian(
+        1.0, 1.0, objective, bead, far_zone_tolerance=tolerance, **kwargs
+    )
+    for components in (slice(0, 3), slice(3, 6)):
+        field = np.stack(fields[components]).reshape(3, len(relative_distances), -1)
+        field_far_zone = np.stack(fields_far_zone[components]).reshape(field.shape)
+        magnitude = np.linalg.norm(field, axis=0)
+        error = np.linalg.norm(field_far_zone - field, axis=0)
+
+        # The near zone is evaluated exactly
+        np.testing.assert_allclose(field_far_zone[:, 0], field[:, 0], rtol=1e-12)
+
+        # In the far zone, the error is less than the tolerance relative to the local field,
+        # except close to directions where the transverse field vanishes, where the field is less than
+        # a fifth of the largest field on the shell. There, the error is less than the tolerance
+        # relative to the largest field on the shell.
+        far_zone_magnitude, far_zone_error = magnitude[1:], error[1:]
+        assert np.all(far_zone_error <= tolerance * np.max(far_zone_magnitude, axis=1)[:, None])
+        significant = far_zone_magnitude >= 0.2 * np.max(far_zone_magnitude, axis=1)[:, None]
+        assert np.all(far_zone_error[significant] <= tolerance * far_zone_magnitude[significant])
+
+
+def test_far_zone_radius():
+    bead = trp.Bead(1e-6, 1.6, 1.33, 1064e-9)
+    an, bn = bead.ab_coeffs()
+    magnitude = np.abs(an) + np.abs(bn)
+    n_max = np.flatnonzero(magnitude >= 1e-2 * np.max(magnitude))[-1] + 1
+    assert n_max < an.size
+    np.testing.assert_allclose(
+        far_zone_radius(bead.k, (an, bn), 1e-2), 2 * n_max * (n_max + 1) / (bead.k * 1e-2)
+    )
+    assert far_zone_radius(bead.k, (np.zeros(3), np.zeros(3)), 1e-2) == np.inf
+
+
+def test_far_zone_tolerance_value_error():
+    bead = trp.Bead()
+    with pytest.raises(ValueError, match="The far zone tolerance needs to be strictly positive"):
+        far_zone_radius(bead.k, bead.ab_coeffs(), 0.0)
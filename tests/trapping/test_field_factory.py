@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+
+bead = trp.Bead(1e-6, 1.5, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.5j * amplitude)
+
+
+bead_centers = np.array([[0.0, 0.0, 0.0], [0.2e-6, -0.1e-6, 0.3e-6], [-0.4e-6, 0.1e-6, -0.2e-6]])
+
+
+@pytest.mark.parametrize("grid", [True, False])
+@pytest.mark.parametrize("total_field", [True, False])
+def test_field_factory_matches_fields_focus(grid, total_field):
+    if grid:
+        x, y, z = np.linspace(-1e-6, 1e-6, 7), np.linspace(-0.8e-6, 0.8e-6, 5), [-0.6e-6, 0.1e-6]
+    else:
+        x, y, z = [np.linspace(-1e-6, 1e-6, 7) * scale for scale in (1.0, -0.8, 0.6)]
+    x, y, z = [np.asarray(coord) for coord in (x, y, z)]
+    fields_func = trp.field_factory(
+        input_field, objective, bead, x, y, z, bfp_sampling_n=9, grid=grid
+    )
+    fields = fields_func(bead_centers, total_field=total_field, magnetic_field=True)
+    for idx, bead_center in enumerate(bead_centers):
+        ref = trp.fields_focus(
+            input_field,
+            objective,
+            bead,
+            bead_center,
+            x + bead_center[0],
+            y + bead_center[1],
+            z + bead_center[2],
+            bfp_sampling_n=9,
+            total_field=total_field,
+            magnetic_field=True,
+            grid=grid,
+        )
+        for field, ref_field in zip(fields, ref):
+            np.testing.assert_allclose(
+                field[idx], ref_field, rtol=1e-8, atol=1e-10 * np.abs(ref_field).max()
+            )
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_field_factory_generator(chunked):
+    x = np.linspace(-1e-6, 1e-6, 5)
+    max_memory = None
+    if chunked:
+        full = trp.memory_estimate_focus(
+            objective, bead, x, x, 0.0, bfp_sampling_n=9, num_positions=len(bead_centers)
+        )
+        max_memory = full.peak - full.kernel // 2
+    fields_func = trp.field_factory(
+        input_field, objective, bead, x, x, 0.0, bfp_sampling_n=9, max_memory=max_memory
+    )
+    fields = fields_func(bead_centers)
+    frames = fields_func(bead_centers, generator=True)
+    for idx, frame in enumerate(frames):
+        assert len(frame) == 3
+        for component, frame_component in zip(fields, frame):
+            np.testing.assert_equal(frame_component, component[idx])
+    assert idx == len(bead_centers) - 1
+
+    # A single bead location
+    for component, frame_component in zip(fields, fields_func(bead_centers[1])):
+        np.testing.assert_equal(frame_component, component[1])
+
+
+def test_field_factory_errors():
+    with pytest.raises(ValueError, match="The immersion medium of the bead and the objective"):
+        trp.field_factory(input_field, objective, trp.Bead(1e-6, 1.5, 1.0, 1064e-9))
+    fields_func = trp.field_factory(input_field, objective, bead, bfp_sampling_n=5)
+    with pytest.raises(ValueError, match="Invalid argument for bead_center"):
+        fields_func([[0.0, 0.0]])
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_field_factory_stacked_and_out(chunked):
+    x, y = np.linspace(-1e-6, 1e-6, 5), np.linspace(-0.8e-6, 0.8e-6, 3)
+    fields_func = trp.field_factory(input_field, objective, bead, x, y, 0.0, bfp_sampling_n=9)
+    max_memory = None
+    if chunked:
+        full = trp.memory_estimate_focus(
+            objective,
+            bead,
+            x,
+            y,
+            0.0,
+            bfp_sampling_n=9,
+            magnetic_field=True,
+            num_positions=len(bead_centers),
+        )
+        max_memory = full.peak - full.kernel // 2
+    chunked_func = trp.field_factory(
+        input_field, objective, bead, x, y, 0.0, bfp_sampling_n=9, max_memory=max_memory
+    )
+    reference = fields_func(bead_centers, magnetic_field=True)
+
+    stacked = chunked_func(bead_centers, magnetic_field=True, stacked=True)
+    assert stacked.shape == (6, len(bead_centers), x.size, y.size)
+    np.testing.assert_equal(stacked, np.stack(reference))
+
+    out = np.full((6, len(bead_centers), x.size, y.size, 1), np.nan, dtype="complex128")
+    assert chunked_func(bead_centers, magnetic_field=True, out=out) is out
+    np.testing.assert_equal(out.squeeze(), np.stack(reference))
+
+    out = np.full((len(bead_centers), x.size, y.size, 3), np.nan, dtype="complex64")
+    assert chunked_func(bead_centers, out=out) is out
+    np.testing.assert_allclose(
+        np.moveaxis(out, -1, 0), np.stack(reference[:3]), rtol=1e-6, atol=1e-6 * np.abs(out).max()
+    )
+
+
+def test_field_factory_out_memmap(tmp_path):
+    x = np.linspace(-1e-6, 1e-6, 5)
+    fields_func = trp.field_factory(input_field, objective, bead, x, x, 0.0, bfp_sampling_n=9)
+    out = np.lib.format.open_memmap(
+        tmp_path / "fields.npy", mode="w+", dtype="complex128", shape=(3, x.size, x.size)
+    )
+    fields_func(bead_centers[1], out=out)
+    out.flush()
+    np.testing.assert_equal(
+        np.load(tmp_path / "fields.npy"), np.stack(fields_func(bead_centers[1]))
+    )
+
+
+def test_field_factory_invalid_out():
+    fields_func = trp.field_factory(input_field, objective, bead, [0.0, 1e-7], bfp_sampling_n=5)
+    with pytest.raises(ValueError, match="complex-valued"):
+        fields_func(bead_centers, out=np.empty((3, 3, 2)))
+    with pytest.raises(ValueError, match="has shape"):
+        fields_func(bead_centers, out=np.empty((3, 2, 2), dtype="complex128"))
+    with pytest.raises(ValueError, match="generator"):
+        fields_func(bead_centers, generator=True, out=np.empty((3, 3, 2), dtype="complex128"))
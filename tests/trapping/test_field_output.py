@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+import lumicks.pyoptics.trapping.interface as interface
+
+bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+x = np.linspace(-2e-6, 2e-6, 9)
+y = np.linspace(-1e-6, 1e-6, 5)
+z = np.array([0.0, 0.3e-6])
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.3j * amplitude)
+
+
+def focus_fields(**kwargs):
+    return trp.fields_focus(
+        input_field,
+        objective,
+        bead,
+        bead_center=(0.1e-6, 0.0, 0.0),
+        x=x,
+        y=y,
+        z=z,
+        bfp_sampling_n=9,
+        magnetic_field=True,
+        **kwargs,
+    )
+
+
+def chunk_budget(planes_per_chunk):
+    full = trp.memory_estimate_focus(
+        objective, bead, x, y, z, bfp_sampling_n=9, magnetic_field=True
+    )
+    return (full.peak - full.output) * planes_per_chunk // x.size
+
+
+@pytest.mark.parametrize("planes_per_chunk", [None, 2])
+def test_focus_output(tmp_path, planes_per_chunk):
+    reference = focus_fields()
+    budget = None if planes_per_chunk is None else chunk_budget(planes_per_chunk)
+    result = focus_fields(output=tmp_path / "fields", max_memory=budget)
+    reopened = trp.open_fields(tmp_path / "fields")
+    assert len(result) == len(reopened) == 6
+    for component, reopened_component, reference_component in zip(result, reopened, reference):
+        assert isinstance(reopened_component, np.memmap)
+        np.testing.assert_equal(reopened_component, component)
+        np.testing.assert_allclose(
+            component, reference_component, rtol=0, atol=1e-12 * np.max(np.abs(reference_component))
+        )
+
+
+def test_resume(tmp_path, monkeypatch):
+    path = tmp_path / "fields"
+    reference = focus_fields(output=path, max_memory=chunk_budget(2))
+    reference = [np.array(component) for component in reference]
+
+    # Mimic an interrupted calculation, of which the last two chunks were not written
+    completed = np.load(path / "completed.npy", mmap_mode="r+")
+    completed[6:] = False
+    completed.flush()
+    del completed
+    with pytest.raises(ValueError, match="was not completed"):
+        trp.open_fields(path)
+    for component in trp.open_fields(path, mmap_mode="r+", allow_incomplete=True):
+        component[6:] = 0
+        component.flush()
+
+    calls = []
+    factory = interface.combined_field_factory
+
+    def counting_factory(**kwargs):
+        calls.append(kwargs["local_coordinates"])
+        return factory(**kwargs)
+
+    monkeypatch.setattr(interface, "combined_field_factory", counting_factory)
+    result = focus_fields(output=path, max_memory=chunk_budget(2))
+    assert len(calls) == 2
+    for component, reference_component in zip(result, reference):
+        np.testing.assert_equal(component, reference_component)
+
+
+def test_different_calculation(tmp_path):
+    focus_fields(output=tmp_path)
+    with pytest.raises(ValueError, match="different coordinates or parameters"):
+        focus_fields(output=tmp_path, total_field=False)
+
+
+def test_open_without_fields(tmp_path):
+    with pytest.raises(ValueError, match="does not contain fields"):
+        trp.open_fields(tmp_path)
+
+
+@pytest.mark.parametrize("grid", [True, False])
+def test_plane_wave_output(tmp_path, grid):
+    coordinates = (x, y, z) if grid else (x, x[::-1], np.linspace(0, 1e-6, x.size))
+    kwargs = dict(theta=0.4, phi=1.0, polarization=(1, 0.5j), magnetic_field=True, grid=grid)
+    reference = trp.fields_plane_wave(bead, *coordinates, **kwargs, num_orders=10)
+    # Budget for chunks of three points
+    n_points = np.prod([c.size for c in coordinates]) if grid else x.size
+    full = interface._memory_estimate(None, bead, n_points, 1, 1, 10, True, 1, None)
+    budget = (full.peak - full.output) * 3 // n_points
+    result = trp.fields_plane_wave(
+        bead, *coordinates, **kwargs, num_orders=10, max_memory=budget, output=tmp_path
+    )
+    for component, reference_component in zip(result, reference):
+        assert component.shape == reference_component.shape
+        np.testing.assert_allclose(
+            component, reference_component, rtol=0, atol=1e-12 * np.max(np.abs(reference_component))
+        )
@@ -0,0 +1,111 @@
+from dataclasses import astuple
+
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+
+bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+bead_centers = np.array([[0.1e-6, 0.0, 0.2e-6], [0.0, 0.2e-6, 0.0]])
+x = np.linspace(-1e-6, 1e-6, 7)
+z = np.array([-0.5e-6, 0.4e-6])
+
+
+def input_field(polarization, w0=4e-3):
+    def f(_, x_bfp, y_bfp, *args):
+        amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / w0**2)
+        return (amplitude * polarization[0], amplitude * polarization[1])
+
+    return f
+
+
+def assert_fields_close(actual, desired):
+    assert len(actual) == len(desired)
+    # Compare with the largest electric or magnetic field, as some components vanish by symmetry
+    for start in range(0, len(desired), 3):
+        atol = 1e-12 * max(np.max(np.abs(field)) for field in desired[start : start + 3])
+        for field, reference in zip(actual[start : start + 3], desired[start : start + 3]):
+            assert field.shape == reference.shape
+            np.testing.assert_allclose(field, reference, rtol=0, atol=atol)
+
+
+@pytest.fixture(scope="module")
+def fields_for():
+    return trp.field_response_factory(
+        objective, bead, x=x, y=0.0, z=z, bfp_sampling_n=11, magnetic_field=True
+    )
+
+
+@pytest.mark.parametrize("polarization, w0", [((1, 0), 4e-3), ((1, 1j), 4e-3), ((0, 1), 2e-3)])
+def test_field_response(fields_for, polarization, w0):
+    f_input_field = input_field(polarization, w0)
+    reference = trp.field_factory(
+        f_input_field, objective, bead, x=x, y=0.0, z=z, bfp_sampling_n=11
+    )
+    assert_fields_close(
+        fields_for(f_input_field, bead_centers), reference(bead_centers, magnetic_field=True)
+    )
+    assert_fields_close(fields_for(f_input_field), reference((0.0, 0.0, 0.0), magnetic_field=True))
+
+
+def test_input_field_types(fields_for):
+    f_input_field = input_field((1, 0.5j))
+    bfp_coords, bfp_fields = objective.sample_back_focal_plane(f_input_field, 11)
+    farfield_data = objective.back_focal_plane_to_farfield(bfp_coords, bfp_fields, bead.lambda_vac)
+    reference = fields_for(f_input_field, bead_centers)
+    for same_input in ((bfp_fields.Ex, bfp_fields.Ey), farfield_data):
+        for field, reference_field in zip(fields_for(same_input, bead_centers), reference):
+            np.testing.assert_equal(field, reference_field)
+    Ex, _ = input_field((1, 0))(*astuple(bfp_coords))
+    assert_fields_close(fields_for((Ex, None)), fields_for(input_field((1, 0))))
+
+
+def test_scattered_field():
+    f_input_field = input_field((1, 0))
+    scattered = trp.field_response_factory(
+        objective, bead, x=x, y=0.0, z=z, bfp_sampling_n=11, total_field=False
+    )
+    reference = trp.field_factory(
+        f_input_field, objective, bead, x=x, y=0.0, z=z, bfp_sampling_n=11
+    )
+    assert_fields_close(
+        scattered(f_input_field, bead_centers), reference(bead_centers, total_field=False)
+    )
+
+
+def test_observables_response():
+    observables_for = trp.observables_response_factory(objective, bead, bfp_sampling_n=11)
+    for polarization in ((1, 0), (1, 1j)):
+        f_input_field = input_field(polarization)
+        reference = trp.observables_factory(f_input_field, objective, bead, bfp_sampling_n=11)
+        result = observables_for(f_input_field, bead_centers)
+        expected = reference(bead_centers)
+        assert tuple(result.keys()) == trp.OBSERVABLES
+        for observable in trp.OBSERVABLES:
+            np.testing.assert_allclose(
+                result[observable],
+                expected[observable],
+                rtol=0,
+                atol=1e-12 * np.max(np.abs(expected[observable])),
+            )
+        single = observables_for(f_input_field, bead_centers[0], "force")
+        np.testing.assert_allclose(
+            single["force"],
+            expected["force"][0],
+            rtol=0,
+            atol=1e-12 * np.max(np.abs(expected["force"])),
+        )
+
+
+def test_invalid_input_field(fields_for):
+    bfp_coords, bfp_fields = objective.sample_back_focal_plane(input_field((1, 0)), 15)
+    farfield_data = objective.back_focal_plane_to_farfield(bfp_coords, bfp_fields, bead.lambda_vac)
+    with pytest.raises(ValueError, match="bfp_sampling_n = 11"):
+        fields_for(farfield_data)
+    with pytest.raises(ValueError, match="need to have the shape"):
+        fields_for((bfp_fields.Ex, None))
+    with pytest.raises(ValueError, match="Unknown observable"):
+        trp.observables_response_factory(objective, bead, bfp_sampling_n=11)(
+            input_field((1, 0)), observables="energy"
+        )
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+
+bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+bfp_sampling_n = 9
+bead_center = np.array([0.1e-6, -0.05e-6, 0.2e-6])
+
+
+def input_field(dEx=0, dEy=0):
+    def f(_, x_bfp, y_bfp, *args):
+        amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2) * (1 + 0.3 * x_bfp / 4e-3)
+        return (amplitude + dEx, 0.3j * amplitude + dEy)
+
+    return f
+
+
+def force_and_gradients(f_input_field, position=bead_center):
+    return trp.force_factory(
+        f_input_field, objective, bead, bfp_sampling_n=bfp_sampling_n, gradients=True
+    )(position)
+
+
+@pytest.fixture(scope="module")
+def result():
+    return force_and_gradients(input_field())
+
+
+def test_force_and_stiffness(result):
+    force_on_bead = trp.force_factory(input_field(), objective, bead, bfp_sampling_n=bfp_sampling_n)
+    np.testing.assert_allclose(result["force"], force_on_bead(bead_center), rtol=1e-10)
+    h = 1e-10
+    for axis in range(3):
+        step = np.eye(3)[axis] * h
+        stiffness = -(force_on_bead(bead_center + step) - force_on_bead(bead_center - step))[
+            axis
+        ] / (2 * h)
+        np.testing.assert_allclose(result["stiffness"][axis], stiffness, rtol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "polarization, row, col, direction",
+    [(0, 8, 8, 1), (0, 5, 11, 1j), (1, 10, 4, 1), (1, 3, 9, -1j)],
+)
+def test_gradients(result, polarization, row, col, direction):
+    """The force is quadratic in the input field, so a central difference is exact"""
+    shape = (2 * bfp_sampling_n - 1,) * 2
+    assert result["force_gradient"].shape == result["stiffness_gradient"].shape == (3, 2, *shape)
+    delta = np.zeros(shape, dtype="complex128")
+    delta[row, col] = 1e-3 * direction
+    keyword = "dEy" if polarization else "dEx"
+    perturbations = [
+        force_and_gradients(input_field(**{keyword: sign * delta})) for sign in (1, -1)
+    ]
+    for name in ("force", "stiffness"):
+        difference = (perturbations[0][name] - perturbations[1][name]) / 2
+        gradient = result[f"{name}_gradient"][:, polarization, row, col]
+        np.testing.assert_allclose(
+            np.real(np.conj(gradient) * delta[row, col]),
+            difference,
+            rtol=0,
+            atol=1e-8 * np.max(np.abs(difference)),
+        )
+
+
+def test_outside_aperture_and_batches(result):
+    aperture = objective.sample_back_focal_plane(None, bfp_sampling_n)[0].aperture
+    for name in ("force_gradient", "stiffness_gradient"):
+        assert np.all(result[name][..., ~aperture] == 0)
+    batch = force_and_gradients(input_field(), np.stack((bead_center, -bead_center)))
+    for name, value in result.items():
+        assert batch[name].shape == (2, *value.shape)
+        np.testing.assert_allclose(batch[name][0], value, rtol=1e-12)
+
+
+def test_no_adaptive_integration_order():
+    with pytest.raises(ValueError, match="cannot be chosen adaptively"):
+        trp.force_factory(input_field(), objective, bead, integration_orders="auto", gradients=True)
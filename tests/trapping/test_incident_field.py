@@ -0,0 +1,42 @@
+"""Test the calculation of the incident field by the chirp-z transform on a grid, against the
+summation of plane waves per point in the numba kernels"""
+
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+bead = trp.Bead(1e-6, 1.6, 1.33, 1064e-9)
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    Ex = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    Ey = 0.3j * np.exp(-(x_bfp**2 + y_bfp**2) / 3e-3**2)
+    return (Ex, Ey)
+
+
+@pytest.mark.parametrize(
+    "x, y, z",
+    [
+        (np.linspace(-1.5e-6, 1.2e-6, 13), np.linspace(-1e-6, 1e-6, 5), [-1e-6, 0.2e-6, 0.9e-6]),
+        (0.9e-6, np.linspace(-1e-6, 1e-6, 5), [-1e-6, 0.2e-6]),
+        (np.linspace(-1e-6, 1e-6, 4), -0.1e-6, 0.0),
+    ],
+)
+@pytest.mark.parametrize("bead_center", [(0.0, 0.0, 0.0), (0.2e-6, -0.1e-6, 0.3e-6)])
+def test_incident_field_czt(x, y, z, bead_center):
+    kwargs = {"bfp_sampling_n": 11, "magnetic_field": True, "bead_center": bead_center}
+    fields_grid = trp.fields_focus(input_field, objective, bead, x=x, y=y, z=z, **kwargs)
+
+    X, Y, Z = [axis.reshape(-1) for axis in np.meshgrid(x, y, z, indexing="ij")]
+    fields_points = trp.fields_focus(
+        input_field, objective, bead, x=X, y=Y, z=Z, grid=False, **kwargs
+    )
+    for field_grid, field_points in zip(fields_grid, fields_points):
+        np.testing.assert_allclose(
+            field_grid.reshape(-1),
+            field_points.reshape(-1),
+            rtol=1e-10,
+            atol=1e-12 * np.max(np.abs(field_points)),
+        )
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+from lumicks.pyoptics.trapping.local_coordinates import CoordLocation, LocalBeadCoordinates
+
+x = np.linspace(-1e-6, 1e-6, 7)
+y = np.linspace(-0.8e-6, 0.8e-6, 5)
+z = np.array([-0.5e-6, 0.0, 0.2e-6])
+bead_diameter = 1.2e-6
+bead_center = (0.1e-6, -0.2e-6, 0.0)
+
+
+def grid_and_points():
+    grid = LocalBeadCoordinates(x, y, z, bead_diameter, bead_center, grid=True)
+    X, Y, Z = np.meshgrid(x, y, z, indexing="ij")
+    points = LocalBeadCoordinates(
+        X.reshape(-1), Y.reshape(-1), Z.reshape(-1), bead_diameter, bead_center, grid=False
+    )
+    return grid, points
+
+
+def test_separable_grid_equals_points():
+    grid, points = grid_and_points()
+    assert grid.coordinate_shape == (x.size, y.size, z.size)
+    np.testing.assert_equal(grid.xyz_stacked, points.xyz_stacked)
+    np.testing.assert_equal(grid._r, points._r)
+    for region in ("_region_inside_bead", "_region_outside_bead"):
+        np.testing.assert_equal(getattr(grid, region), getattr(points, region))
+    assert np.any(grid._region_inside_bead) and not np.all(grid._region_inside_bead)
+    for location in (CoordLocation.INSIDE_BEAD, CoordLocation.OUTSIDE_BEAD):
+        np.testing.assert_equal(grid.get_xyz_stacked(location), points.get_xyz_stacked(location))
+
+
+def test_region_without_stacking_all_points():
+    grid, points = grid_and_points()
+    inside = grid.get_xyz_stacked(CoordLocation.INSIDE_BEAD)
+    assert CoordLocation.EVERYWHERE not in grid._cache
+    np.testing.assert_equal(inside, points.xyz_stacked[:, points._region_inside_bead])
+
+
+def test_cached():
+    grid, _ = grid_and_points()
+    assert grid.xyz_stacked is grid.xyz_stacked
+    assert grid._r is grid._r
+    assert grid._region_outside_bead is grid._region_outside_bead
+    assert grid.get_xyz_stacked(CoordLocation.INSIDE_BEAD) is grid.get_xyz_stacked(
+        CoordLocation.INSIDE_BEAD
+    )
+
+
+@pytest.mark.parametrize("points_per_block", [1, 7, 16, 105, 1000])
+def test_point_blocks(points_per_block):
+    for coordinates in grid_and_points():
+        blocks = list(coordinates.point_blocks(points_per_block))
+        assert all(xyz.shape[1] <= points_per_block for _, xyz in blocks)
+        np.testing.assert_equal(
+            np.concatenate([xyz for _, xyz in blocks], axis=1), coordinates.xyz_stacked
+        )
+        np.testing.assert_equal(
+            np.concatenate([np.arange(x.size * y.size * z.size)[block] for block, _ in blocks]),
+            np.arange(x.size * y.size * z.size),
+        )
+
+
+def test_return_grid_views():
+    bead = trp.Bead(bead_diameter, 1.5, 1.33, 1064e-9)
+    *_, X, Y, Z = trp.fields_plane_wave(bead, x=x, y=0, z=z, return_grid=True)
+    X_ref, Z_ref = np.meshgrid(x, z, indexing="ij")
+    np.testing.assert_equal(X, X_ref)
+    np.testing.assert_equal(Y, np.zeros_like(X_ref))
+    np.testing.assert_equal(Z, Z_ref)
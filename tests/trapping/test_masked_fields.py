@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+
+bead = trp.Bead(1e-6, 1.6 + 0.05j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+bead_center = (0.1e-6, 0.0, 0.0)
+x = np.linspace(-1e-6, 1e-6, 11)
+y = np.linspace(-0.6e-6, 0.6e-6, 5)
+z = np.array([-0.2e-6, 0.3e-6])
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.2j * amplitude)
+
+
+def focus(**kwargs):
+    return trp.fields_focus(
+        input_field,
+        objective,
+        bead,
+        bead_center=bead_center,
+        x=x,
+        y=y,
+        z=z,
+        bfp_sampling_n=9,
+        **kwargs,
+    )
+
+
+def shell(X, Y, Z):
+    r = np.hypot(np.hypot(X - bead_center[0], Y - bead_center[1]), Z - bead_center[2])
+    return np.abs(r - bead.bead_diameter / 2) < 0.25e-6
+
+
+X, Y, Z = np.meshgrid(x, y, z, indexing="ij")
+shell_mask = shell(X, Y, Z)
+
+
+def assert_masked(actual, desired, mask, fill_value=np.nan):
+    assert actual.shape == desired.shape
+    np.testing.assert_equal(actual[np.logical_not(mask)], fill_value)
+    np.testing.assert_allclose(
+        actual[mask], desired[mask], rtol=0, atol=1e-12 * np.max(np.abs(desired))
+    )
+
+
+@pytest.mark.parametrize("far_zone_tolerance", [None, 1e-3])
+@pytest.mark.parametrize("mask", [shell_mask, shell])
+def test_masked_grid(mask, far_zone_tolerance):
+    assert np.any(shell_mask) and not np.all(shell_mask)
+    kwargs = dict(magnetic_field=True, far_zone_tolerance=far_zone_tolerance)
+    reference = focus(**kwargs)
+    for actual, desired in zip(focus(mask=mask, **kwargs), reference):
+        assert_masked(actual, desired, shell_mask)
+
+
+def test_broadcast_mask_and_fill_value():
+    # The footprint of a detector in the xy-plane, for every z
+    footprint = (np.abs(x) < 0.5e-6)[:, None, None]
+    reference = focus()
+    for actual, desired in zip(focus(mask=footprint, fill_value=0), reference):
+        assert_masked(actual, desired, np.broadcast_to(footprint, X.shape), 0)
+
+
+def test_masked_points():
+    kwargs = dict(x=X.reshape(-1), y=Y.reshape(-1), z=Z.reshape(-1), grid=False)
+    reference = trp.fields_focus(
+        input_field, objective, bead, bead_center=bead_center, bfp_sampling_n=9, **kwargs
+    )
+    result = trp.fields_focus(
+        input_field,
+        objective,
+        bead,
+        bead_center=bead_center,
+        bfp_sampling_n=9,
+        mask=shell,
+        **kwargs,
+    )
+    for actual, desired in zip(result, reference):
+        assert_masked(actual, desired, shell_mask.reshape(-1))
+
+
+@pytest.mark.parametrize("planes_per_chunk", [2, 0.5])
+def test_masked_chunks(planes_per_chunk):
+    full = trp.memory_estimate_focus(objective, bead, x, y, z, bfp_sampling_n=9)
+    max_memory = int((full.peak - full.output) * planes_per_chunk / x.size)
+    mask = np.logical_and(shell_mask, (x > 0)[:, None, None])
+    reference = focus()
+    for actual, desired in zip(focus(mask=mask, max_memory=max_memory), reference):
+        assert_masked(actual, desired, mask)
+
+
+def test_masked_quantities():
+    (reference,) = focus(quantities="intensity")
+    (intensity,) = focus(quantities="intensity", mask=shell, fill_value=-1)
+    assert_masked(intensity, reference, shell_mask, -1)
+
+
+def test_masked_output(tmp_path):
+    result = focus(mask=shell, output=tmp_path / "fields")
+    for actual, desired in zip(result, focus()):
+        assert_masked(actual, desired, shell_mask)
+    with pytest.raises(ValueError, match="different coordinates or parameters"):
+        focus(mask=np.logical_not(shell_mask), output=tmp_path / "fields")
+
+
+@pytest.mark.parametrize(
+    "mask, message",
+    [(np.ones((x.size, 2)), "boolean"), (np.ones((x.size, 2), dtype=bool), "does not match")],
+)
+def test_invalid_mask(mask, message):
+    with pytest.raises(ValueError, match=message):
+        focus(mask=mask)
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+
+bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+bfp_sampling_n = 9
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.3j * amplitude)
+
+
+x = np.linspace(-2e-6, 2e-6, 9)
+y = np.linspace(-1e-6, 1e-6, 5)
+z = np.array([0.0, 0.3e-6])
+
+
+def test_estimate_without_budget():
+    estimate = trp.memory_estimate_focus(
+        objective, bead, x, y, z, bfp_sampling_n=bfp_sampling_n, magnetic_field=True
+    )
+    assert estimate.num_chunks == 1
+    assert estimate.points_per_chunk == x.size * y.size * z.size
+    assert estimate.output == 6 * 16 * x.size * y.size * z.size
+    assert estimate.peak == sum(
+        (estimate.coordinates, estimate.legendre, estimate.radial, estimate.kernel, estimate.output)
+    )
+
+
+@pytest.mark.parametrize("fraction", [0.5, 0.1, 0.03])
+def test_estimate_fits_budget(fraction):
+    full = trp.memory_estimate_focus(objective, bead, x, y, z, bfp_sampling_n=bfp_sampling_n)
+    budget = full.output + int(fraction * (full.peak - full.output))
+    estimate = trp.memory_estimate_focus(
+        objective, bead, x, y, z, bfp_sampling_n=bfp_sampling_n, max_memory=budget
+    )
+    assert estimate.peak <= budget
+    assert estimate.num_chunks > 1
+    assert estimate.num_chunks * estimate.points_per_chunk >= x.size * y.size * z.size
+
+
+# Chunks of whole planes of constant x, and of individual points
+@pytest.mark.parametrize("points_per_chunk", [20, 4])
+@pytest.mark.parametrize("grid", [True, False])
+def test_chunked_fields_focus(points_per_chunk, grid):
+    coords = (x, y, z) if grid else (x, x[::-1], np.linspace(0, 1e-6, x.size))
+    kwargs = dict(
+        bead_center=(0.1e-6, 0, 0),
+        bfp_sampling_n=bfp_sampling_n,
+        magnetic_field=True,
+        grid=grid,
+    )
+    full = trp.memory_estimate_focus(
+        objective, bead, *coords, bfp_sampling_n=bfp_sampling_n, magnetic_field=True, grid=grid
+    )
+    # The estimate is proportional to the number of points in a chunk
+    n_points = full.points_per_chunk
+    budget = full.output + (full.peak - full.output) * points_per_chunk // n_points
+    x_, y_, z_ = coords
+    reference = trp.fields_focus(input_field, objective, bead, x=x_, y=y_, z=z_, **kwargs)
+    result = trp.fields_focus(
+        input_field, objective, bead, x=x_, y=y_, z=z_, **kwargs, max_memory=budget
+    )
+    assert len(result) == 6
+    for component, reference_component in zip(result, reference):
+        assert component.shape == reference_component.shape
+        np.testing.assert_allclose(
+            component, reference_component, rtol=0, atol=1e-12 * np.max(np.abs(reference_component))
+        )
+
+
+def test_chunked_field_factory():
+    field_fun = trp.field_factory(input_field, objective, bead, x, y, z, bfp_sampling_n=9)
+    bead_center = np.random.default_rng(0).uniform(-1e-7, 1e-7, (5, 3))
+    reference = field_fun(bead_center, magnetic_field=True)
+    full = trp.memory_estimate_focus(
+        objective, bead, x, y, z, bfp_sampling_n=9, magnetic_field=True, num_positions=5
+    )
+    budget = full.peak - full.kernel // 2
+    estimate = trp.memory_estimate_focus(
+        objective,
+        bead,
+        x,
+        y,
+        z,
+        bfp_sampling_n=9,
+        magnetic_field=True,
+        num_positions=5,
+        max_memory=budget,
+    )
+    assert estimate.positions_per_chunk < 5
+    try:
+        trp.set_max_memory(budget)
+        assert trp.get_max_memory() == budget
+        result = field_fun(bead_center, magnetic_field=True)
+    finally:
+        trp.set_max_memory(None)
+    for component, reference_component in zip(result, reference):
+        assert component.shape == (5, x.size, y.size, z.size)
+        np.testing.assert_allclose(component, reference_component, rtol=0, atol=0)
+
+
+def test_budget_too_small():
+    with pytest.raises(ValueError, match="exceeds the memory budget"):
+        trp.fields_focus(input_field, objective, bead, x=x, y=y, z=z, max_memory=1000)
+
+
+def test_invalid_budget():
+    with pytest.raises(ValueError, match="strictly positive"):
+        trp.set_max_memory(0)
+    assert trp.get_max_memory() is None
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+bead_centers = np.array([[0.2e-6, -0.1e-6, 0.3e-6], [0.0, 0.0, 0.0], [0.5e-6, 0.0, -0.6e-6]])
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.3j * amplitude)
+
+
+@pytest.mark.parametrize(
+    "bead",
+    [
+        trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9),
+        trp.Bead(0.5e-6, 1.45 + 0.01j, 1.33, 1064e-9),
+        trp.Bead(2e-6, 1.57 + 0.02j, 1.33, 1064e-9),
+    ],
+)
+def test_powers_match_integration(bead):
+    powers = trp.power_factory(input_field, objective, bead, bfp_sampling_n=11)(bead_centers)
+    reference = trp.observables_factory(input_field, objective, bead, bfp_sampling_n=11)(
+        bead_centers, ("absorbed_power", "scattered_power")
+    )
+    for observable in ("absorbed_power", "scattered_power"):
+        assert powers[observable].shape == (len(bead_centers),)
+        np.testing.assert_allclose(powers[observable], reference[observable], rtol=1e-5)
+    np.testing.assert_allclose(
+        powers["extinguished_power"],
+        powers["absorbed_power"] + powers["scattered_power"],
+        rtol=1e-12,
+    )
+
+
+def test_single_position():
+    bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+    power_at = trp.power_factory(input_field, objective, bead, bfp_sampling_n=11)
+    batch = power_at(bead_centers)
+    for idx, bead_center in enumerate(bead_centers):
+        single = power_at(bead_center)
+        for name, power in single.items():
+            assert np.ndim(power) == 0
+            np.testing.assert_allclose(power, batch[name][idx], rtol=1e-12)
+
+
+def test_no_absorption():
+    bead = trp.Bead(1e-6, 1.57, 1.33, 1064e-9)
+    powers = trp.power_factory(input_field, objective, bead, bfp_sampling_n=11)(bead_centers)
+    np.testing.assert_allclose(
+        powers["absorbed_power"], 0, atol=1e-12 * np.max(powers["scattered_power"])
+    )
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from scipy.constants import speed_of_light as C
+
+import lumicks.pyoptics.trapping as trp
+
+bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+bead_centers = np.array([[0.2e-6, -0.1e-6, 0.3e-6], [0.0, 0.0, 0.0], [-0.4e-6, 0.0, -0.2e-6]])
+
+
+def input_field(polarization):
+    def f(_, x_bfp, y_bfp, *args):
+        amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+        return (amplitude * polarization[0], amplitude * polarization[1])
+
+    return f
+
+
+@pytest.fixture(scope="module")
+def observables():
+    return trp.observables_factory(input_field((1, 1j)), objective, bead, bfp_sampling_n=11)
+
+
+def test_batch_and_subsets(observables):
+    batch = observables(bead_centers)
+    assert tuple(batch.keys()) == trp.OBSERVABLES
+    assert batch["force"].shape == batch["torque"].shape == (len(bead_centers), 3)
+    assert batch["absorbed_power"].shape == batch["scattered_power"].shape == (len(bead_centers),)
+    for idx, bead_center in enumerate(bead_centers):
+        for observable in trp.OBSERVABLES:
+            single = observables(bead_center, observable)
+            assert tuple(single.keys()) == (observable,)
+            np.testing.assert_allclose(single[observable], batch[observable][idx], rtol=1e-12)
+    pair = observables(bead_centers, ("scattered_power", "torque"))
+    assert tuple(pair.keys()) == ("scattered_power", "torque")
+
+
+def test_consistent_with_force_and_power_functions(observables):
+    f_input_field = input_field((1, 1j))
+    result = observables(bead_centers[0])
+    force = trp.force_factory(f_input_field, objective, bead, bfp_sampling_n=11)(bead_centers[0])
+    np.testing.assert_allclose(result["force"], force, rtol=1e-12)
+    for observable, function in (
+        ("absorbed_power", trp.absorbed_power_focus),
+        ("scattered_power", trp.scattered_power_focus),
+    ):
+        power = function(f_input_field, objective, bead, bead_centers[0], bfp_sampling_n=11)
+        np.testing.assert_allclose(result[observable], power, rtol=1e-12)
+
+
+@pytest.mark.parametrize("handedness", [1, -1])
+def test_torque_circular_polarization(handedness):
+    """A sphere on the optical axis does not change the angular momentum along z of the light it
+    scatters, so the torque along z is the absorbed spin angular momentum: P_abs / omega per unit of
+    helicity."""
+    observables = trp.observables_factory(
+        input_field((1, handedness * 1j)), objective, bead, bfp_sampling_n=11
+    )
+    result = observables((0, 0, 0), ("torque", "absorbed_power"))
+    omega = 2 * np.pi * C / bead.lambda_vac
+    np.testing.assert_allclose(
+        result["torque"],
+        [0, 0, handedness * result["absorbed_power"] / omega],
+        rtol=0,
+        atol=1e-3 * result["absorbed_power"] / omega,
+    )
+
+
+def test_no_torque_linear_polarization():
+    observables = trp.observables_factory(input_field((1, 0)), objective, bead, bfp_sampling_n=11)
+    result = observables((0, 0, 0), ("torque", "absorbed_power"))
+    omega = 2 * np.pi * C / bead.lambda_vac
+    np.testing.assert_allclose(result["torque"], 0, atol=1e-6 * result["absorbed_power"] / omega)
+
+
+def test_invalid_observable(observables):
+    with pytest.raises(ValueError, match="Unknown observable"):
+        observables((0, 0, 0), ("force", "energy"))
+
+
+def test_medium_mismatch():
+    other = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.5)
+    with pytest.raises(ValueError, match="immersion medium"):
+        trp.observables_factory(input_field((1, 0)), other, bead)
@@ -0,0 +1,86 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+from lumicks.pyoptics.trapping.focused_field_calculation import plane_wave_arguments
+from lumicks.pyoptics.trapping.legendre_data import calculate_legendre
+from lumicks.pyoptics.trapping.local_coordinates import (
+    LocalBeadCoordinates,
+    NearZoneBeadCoordinates,
+)
+
+bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.3j * amplitude)
+
+
+@pytest.fixture(scope="module")
+def farfield_data():
+    bfp_coords, bfp_fields = objective.sample_back_focal_plane(input_field, 9)
+    return objective.back_focal_plane_to_farfield(bfp_coords, bfp_fields, bead.lambda_vac)
+
+
+def test_plane_waves_in_aperture(farfield_data):
+    plane_waves = farfield_data.plane_waves()
+    aperture = farfield_data.aperture
+    assert plane_waves.size == np.count_nonzero(aperture)
+    assert plane_waves.grid_shape == aperture.shape
+    np.testing.assert_equal(plane_waves.weights, 1)
+    for name in ("cos_phi", "sin_phi", "cos_theta", "sin_theta", "kx", "ky", "kz", "kp"):
+        values = getattr(plane_waves, name)
+        assert values.shape == (plane_waves.size,) and values.flags.c_contiguous
+        np.testing.assert_equal(values, getattr(farfield_data, name)[aperture])
+    # The square grid is restored, with zeros outside of the aperture
+    for name in ("Einf_theta", "Einf_phi"):
+        np.testing.assert_equal(
+            plane_waves.to_grid(getattr(plane_waves, name)), getattr(farfield_data, name)
+        )
+    for component, reference in zip(
+        plane_waves.transform_to_xyz(), farfield_data.transform_to_xyz()
+    ):
+        np.testing.assert_equal(component, reference[aperture])
+
+
+def test_to_grid_leading_axes(farfield_data):
+    plane_waves = farfield_data.plane_waves()
+    values = np.arange(2 * 3 * plane_waves.size).reshape(2, 3, -1)
+    grid = plane_waves.to_grid(values, fill_value=-1)
+    assert grid.shape == (2, 3, *farfield_data.aperture.shape)
+    np.testing.assert_equal(grid[..., farfield_data.aperture], values)
+    np.testing.assert_equal(grid[..., ~farfield_data.aperture], -1)
+
+
+def test_pruned_plane_waves_are_skipped():
+    def underfilled_beam(_, x_bfp, y_bfp, *args):
+        return (np.exp(-(x_bfp**2 + y_bfp**2) / 1.2e-3**2), None)
+
+    bfp_coords, bfp_fields = objective.sample_back_focal_plane(underfilled_beam, 9)
+    farfield_data = objective.back_focal_plane_to_farfield(bfp_coords, bfp_fields, bead.lambda_vac)
+    pruned, summary = farfield_data.pruned(1e-3)
+    assert pruned.plane_waves().size == summary.kept_plane_waves < summary.total_plane_waves
+
+
+def test_quadrature_weights(farfield_data):
+    plane_waves = farfield_data.plane_waves()
+    weights = np.linspace(0.5, 1.5, plane_waves.size)
+    arguments = plane_wave_arguments(replace(plane_waves, weights=weights))
+    np.testing.assert_equal(arguments["Einf_theta"], plane_waves.Einf_theta * weights)
+    np.testing.assert_equal(arguments["Einf_phi"], plane_waves.Einf_phi * weights)
+    np.testing.assert_equal(arguments["kz"], plane_waves.kz)
+
+
+def test_legendre_indices_per_plane_wave(farfield_data):
+    plane_waves = farfield_data.plane_waves()
+    x = np.linspace(-1e-6, 1e-6, 5)
+    coordinates = NearZoneBeadCoordinates(
+        LocalBeadCoordinates(x, np.zeros(1), x, bead.bead_diameter, grid=True)
+    )
+    (alp_sin, indices), _ = calculate_legendre(coordinates, plane_waves, 5)
+    assert indices.shape == (plane_waves.size, coordinates.r.size)
+    assert alp_sin.shape[0] == 5 and np.max(indices) < alp_sin.shape[1]
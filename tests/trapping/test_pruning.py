@@ -0,0 +1,113 @@
+import logging
+
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+
+bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+x = np.linspace(-1e-6, 1e-6, 7)
+
+
+def underfilled_beam(_, x_bfp, y_bfp, *args):
+    return (np.exp(-(x_bfp**2 + y_bfp**2) / 1.2e-3**2), None)
+
+
+def farfield(f_input_field, bfp_sampling_n=15):
+    bfp_coords, bfp_fields = objective.sample_back_focal_plane(f_input_field, bfp_sampling_n)
+    return objective.back_focal_plane_to_farfield(bfp_coords, bfp_fields, bead.lambda_vac)
+
+
+def power(farfield_data):
+    aperture = farfield_data.aperture
+    return np.sum(
+        (np.abs(farfield_data.Einf_theta) ** 2 + np.abs(farfield_data.Einf_phi) ** 2)[aperture]
+        / farfield_data.cos_theta[aperture]
+    )
+
+
+@pytest.mark.parametrize("tolerance", [1e-6, 1e-3])
+def test_pruned_power(tolerance):
+    farfield_data = farfield(underfilled_beam)
+    pruned, summary = farfield_data.pruned(tolerance)
+    assert summary.total_plane_waves == np.count_nonzero(farfield_data.aperture)
+    assert summary.kept_plane_waves == np.count_nonzero(pruned.aperture)
+    assert summary.total_channels == 2 * summary.total_plane_waves
+    assert summary.kept_channels < summary.total_channels
+    assert summary.kept_fraction == summary.kept_channels / summary.total_channels
+    dropped_power = 1 - power(pruned) / power(farfield_data)
+    np.testing.assert_allclose(summary.dropped_power, dropped_power, rtol=1e-8, atol=1e-15)
+    assert 0 < summary.dropped_power <= tolerance
+    assert 0 < summary.error_bound < 1
+    # The input is not modified
+    assert np.count_nonzero(farfield_data.aperture) == summary.total_plane_waves
+
+
+def test_zero_channels_are_dropped():
+    def x_polarized(_, x_bfp, y_bfp, *args):
+        return (np.ones_like(x_bfp), None)
+
+    farfield_data = farfield(x_polarized)
+    pruned, summary = farfield_data.pruned(0)
+    # On the x and y axes of the back focal plane, one channel of an x-polarized beam is zero
+    rows, cols = np.nonzero(farfield_data.aperture)
+    center = farfield_data.aperture.shape[0] // 2
+    on_axis = np.count_nonzero((rows == center) | (cols == center))
+    assert summary.kept_plane_waves == summary.total_plane_waves
+    assert summary.kept_channels == summary.total_channels - on_axis
+    assert summary.dropped_power == 0 and summary.error_bound == 0
+    np.testing.assert_equal(pruned.Einf_theta, farfield_data.Einf_theta)
+
+
+def test_invalid_tolerance():
+    with pytest.raises(ValueError, match="positive or zero"):
+        farfield(underfilled_beam).pruned(-1e-3)
+    with pytest.raises(ValueError, match="positive or zero"):
+        trp.fields_focus(underfilled_beam, objective, bead, bfp_sampling_n=9, pruning_tolerance=-1)
+
+
+@pytest.mark.parametrize("tolerance", [1e-6, 1e-3])
+def test_fields_within_bound(tolerance, caplog):
+    kwargs = dict(x=x, y=0, z=x, bead_center=(0.2e-6, 0, 0), bfp_sampling_n=15)
+    reference = trp.fields_focus(underfilled_beam, objective, bead, magnetic_field=True, **kwargs)
+    with caplog.at_level(logging.INFO):
+        pruned = trp.fields_focus(
+            underfilled_beam,
+            objective,
+            bead,
+            magnetic_field=True,
+            pruning_tolerance=tolerance,
+            **kwargs,
+        )
+    assert "Pruning kept" in caplog.text
+    _, summary = farfield(underfilled_beam).pruned(tolerance)
+    for group in (slice(0, 3), slice(3, 6)):
+        scale = max(np.max(np.abs(field)) for field in reference[group])
+        for actual, desired in zip(pruned[group], reference[group]):
+            assert np.max(np.abs(actual - desired)) <= summary.error_bound * scale
+
+
+def test_zero_tolerance_is_exact():
+    def circular(_, x_bfp, y_bfp, *args):
+        amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+        return (amplitude, 1j * amplitude)
+
+    kwargs = dict(x=x, y=0, z=0, bfp_sampling_n=9)
+    reference = trp.field_factory(circular, objective, bead, **kwargs)((0.1e-6, 0, 0))
+    pruned = trp.field_factory(circular, objective, bead, pruning_tolerance=0, **kwargs)(
+        (0.1e-6, 0, 0)
+    )
+    for actual, desired in zip(pruned, reference):
+        np.testing.assert_allclose(
+            actual, desired, rtol=1e-14, atol=1e-14 * np.max(np.abs(desired))
+        )
+
+
+def test_force():
+    force = trp.force_factory(underfilled_beam, objective, bead, bfp_sampling_n=15)
+    pruned = trp.force_factory(
+        underfilled_beam, objective, bead, bfp_sampling_n=15, pruning_tolerance=1e-6
+    )
+    bead_center = (0.2e-6, 0.1e-6, 0.3e-6)
+    np.testing.assert_allclose(pruned(bead_center), force(bead_center), rtol=1e-2)
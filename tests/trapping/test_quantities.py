@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from scipy.constants import epsilon_0 as EPS0
+from scipy.constants import mu_0 as MU0
+
+import lumicks.pyoptics.trapping as trp
+
+bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+bead_center = (0.1e-6, 0.0, 0.0)
+x = np.linspace(-1.5e-6, 1.5e-6, 9)
+y = np.linspace(-0.5e-6, 0.5e-6, 3)
+z = np.array([0.0, 0.3e-6])
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.3j * amplitude)
+
+
+def focus(**kwargs):
+    return trp.fields_focus(
+        input_field,
+        objective,
+        bead,
+        bead_center=bead_center,
+        x=x,
+        y=y,
+        z=z,
+        bfp_sampling_n=9,
+        **kwargs,
+    )
+
+
+def reference_quantities(Ex, Ey, Ez, Hx, Hy, Hz, inside):
+    E2 = np.abs(Ex) ** 2 + np.abs(Ey) ** 2 + np.abs(Ez) ** 2
+    H2 = np.abs(Hx) ** 2 + np.abs(Hy) ** 2 + np.abs(Hz) ** 2
+    epsilon_r = np.where(inside, np.real(bead.n_bead**2), bead.n_medium**2)
+    S = [
+        0.5 * np.real(Ey * np.conj(Hz) - Ez * np.conj(Hy)),
+        0.5 * np.real(Ez * np.conj(Hx) - Ex * np.conj(Hz)),
+        0.5 * np.real(Ex * np.conj(Hy) - Ey * np.conj(Hx)),
+    ]
+    return E2, 0.25 * (EPS0 * epsilon_r * E2 + MU0 * H2), S
+
+
+def assert_close(actual, desired):
+    assert np.isrealobj(actual)
+    assert actual.shape == desired.shape
+    np.testing.assert_allclose(actual, desired, rtol=0, atol=1e-12 * np.max(np.abs(desired)))
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_focus_quantities(chunked):
+    *fields, X, Y, Z = focus(magnetic_field=True, return_grid=True)
+    inside = np.hypot(np.hypot(X - bead_center[0], Y - bead_center[1]), Z - bead_center[2]) <= (
+        bead.bead_diameter / 2
+    )
+    assert np.any(inside) and not np.all(inside)
+    intensity, energy_density, S = reference_quantities(*fields, inside)
+
+    max_memory = None
+    if chunked:
+        full = trp.memory_estimate_focus(
+            objective, bead, x, y, z, bfp_sampling_n=9, magnetic_field=True
+        )
+        max_memory = (full.peak - full.output) * 2 // x.size
+    result = focus(quantities=("poynting", "intensity", "energy_density"), max_memory=max_memory)
+    assert len(result) == 5
+    for actual, desired in zip(result, (*S, intensity, energy_density)):
+        assert_close(actual, desired)
+
+
+def test_intensity_only():
+    Ex, Ey, Ez = focus()
+    (intensity,) = focus(quantities="intensity")
+    assert_close(intensity, np.abs(Ex) ** 2 + np.abs(Ey) ** 2 + np.abs(Ez) ** 2)
+
+
+def test_plane_wave_quantities():
+    kwargs = dict(bead=bead, x=x, y=0, z=z, theta=0.3, phi=0.2, polarization=(1, 0.5j))
+    fields = trp.fields_plane_wave(magnetic_field=True, return_grid=False, **kwargs)
+    X, Z = np.meshgrid(x, z, indexing="ij")
+    inside = np.hypot(X, Z) <= bead.bead_diameter / 2
+    intensity, energy_density, S = reference_quantities(*fields, inside)
+    result = trp.fields_plane_wave(quantities=("energy_density", "poynting"), **kwargs)
+    for actual, desired in zip(result, (energy_density, *S)):
+        assert_close(actual, desired)
+
+
+def test_quantities_output(tmp_path):
+    reference = focus(quantities="poynting")
+    result = focus(quantities="poynting", output=tmp_path / "poynting")
+    reopened = trp.open_fields(tmp_path / "poynting")
+    assert len(reopened) == 3
+    for component, reopened_component, reference_component in zip(result, reopened, reference):
+        assert reopened_component.dtype == np.float64
+        np.testing.assert_equal(reopened_component, component)
+        np.testing.assert_equal(component, reference_component)
+    with pytest.raises(ValueError, match="different coordinates or parameters"):
+        focus(quantities="intensity", output=tmp_path / "poynting")
+
+
+@pytest.mark.parametrize("quantities", [(), "force", ("intensity", "Sx")])
+def test_invalid_quantities(quantities):
+    with pytest.raises(ValueError, match="At least one quantity|Unknown quantity"):
+        focus(quantities=quantities)
@@ -0,0 +1,59 @@
+"""Test the evaluation of fields on a spherical grid against the evaluation on a list of points"""
+
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    Ex = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    Ey = 0.3j * np.exp(-(x_bfp**2 + y_bfp**2) / 3e-3**2)
+    return (Ex, Ey)
+
+
+@pytest.mark.parametrize("n_bead", [1.6, 0.2 + 3.0j])
+@pytest.mark.parametrize("bead_center", [(0.0, 0.0, 0.0), (0.2e-6, -0.1e-6, 0.3e-6)])
+@pytest.mark.parametrize("total_field", [True, False])
+def test_spherical_grid(n_bead, bead_center, total_field):
+    bead = trp.Bead(1e-6, n_bead, 1.33, 1064e-9)
+    # Avoid the surface of the bead, where the normal component of E is discontinuous
+    r = np.asarray([0.0, 0.2e-6, 0.45e-6, 0.55e-6, 2e-6])
+    theta = np.linspace(0, np.pi, 7)
+    phi = np.linspace(0, 2 * np.pi, 9)[:-1]
+    kwargs = {
+        "bead_center": bead_center,
+        "bfp_sampling_n": 5,
+        "magnetic_field": True,
+        "total_field": total_field,
+    }
+    *fields_spherical, R, Theta, Phi = trp.fields_focus_spherical(
+        input_field, objective, bead, r, theta, phi, return_grid=True, **kwargs
+    )
+    assert R.shape == (r.size, theta.size, phi.size)
+
+    x, y, z = [
+        (coord + center).reshape(-1)
+        for coord, center in zip(
+            (R * np.sin(Theta) * np.cos(Phi), R * np.sin(Theta) * np.sin(Phi), R * np.cos(Theta)),
+            bead_center,
+        )
+    ]
+    fields_points = trp.fields_focus(
+        input_field, objective, bead, x=x, y=y, z=z, grid=False, **kwargs
+    )
+    for field_spherical, field_points in zip(fields_spherical, fields_points):
+        np.testing.assert_allclose(
+            field_spherical.reshape(-1),
+            field_points,
+            rtol=1e-10,
+            atol=1e-12 * np.max(np.abs(field_points)),
+        )
+
+
+def test_spherical_grid_negative_radius():
+    bead = trp.Bead(1e-6, 1.6, 1.33, 1064e-9)
+    with pytest.raises(ValueError, match="The radial coordinates need to be positive"):
+        trp.fields_focus_spherical(input_field, objective, bead, -1e-6, 0.0, 0.0)
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+from lumicks.pyoptics.trapping.symmetry import component_sign, input_field_parity
+
+bead = trp.Bead(1e-6, 1.6 + 0.05j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+x = np.linspace(-1e-6, 1e-6, 9)
+# Descending, and an even number of samples
+y = np.linspace(0.8e-6, -0.8e-6, 6)
+z = np.array([-0.2e-6, 0.3e-6])
+
+
+def input_field(polarization):
+    def f(_, x_bfp, y_bfp, *args):
+        amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+        return tuple(None if p == 0 else amplitude * p for p in polarization)
+
+    return f
+
+
+def focus(polarization=(1, 0), **kwargs):
+    kwargs = {"x": x, "y": y, "z": z, "bfp_sampling_n": 9, **kwargs}
+    return trp.fields_focus(input_field(polarization), objective, bead, **kwargs)
+
+
+def assert_fields_equal(actual, desired):
+    assert len(actual) == len(desired)
+    for actual_component, desired_component in zip(actual, desired):
+        assert actual_component.shape == desired_component.shape
+        np.testing.assert_allclose(
+            actual_component,
+            desired_component,
+            rtol=0,
+            atol=1e-12 * np.max(np.abs(desired_component)),
+        )
+
+
+@pytest.mark.parametrize(
+    "polarization, parities",
+    [((1, 0), {"x": -1, "y": 1}), ((0, 1), {"x": 1, "y": -1}), ((1, 1j), {}), ((1, 1), {})],
+)
+def test_input_field_parity(polarization, parities):
+    assert input_field_parity(input_field(polarization), objective, 9) == parities
+
+
+def test_component_sign():
+    # x-polarized focus: Ex is even in x and y, Ey is odd in x and y, Ez is odd in x only
+    assert [component_sign(name, "x", -1) for name in ("Ex", "Ey", "Ez")] == [1, -1, -1]
+    assert [component_sign(name, "y", 1) for name in ("Ex", "Ey", "Ez")] == [1, -1, 1]
+    assert [component_sign(name, "x", -1) for name in ("Hx", "Hy", "Hz")] == [-1, 1, 1]
+    assert [component_sign(name, "x", -1) for name in ("Sx", "Sy", "Sz")] == [-1, 1, 1]
+    assert component_sign("intensity", "x", -1) == component_sign("energy_density", "y", -1) == 1
+
+
+@pytest.mark.parametrize("polarization", [(1, 0), (0, 1j)])
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        dict(magnetic_field=True),
+        dict(magnetic_field=True, total_field=False, far_zone_tolerance=1e-3),
+        dict(quantities=("poynting", "intensity", "energy_density")),
+        dict(bead_center=(0, 0, 0.2e-6), bfp_sampling_n="auto", return_grid=True),
+    ],
+)
+def test_symmetric_fields(polarization, kwargs):
+    assert_fields_equal(
+        focus(polarization, symmetry="auto", **kwargs), focus(polarization, **kwargs)
+    )
+
+
+@pytest.mark.parametrize("symmetry", [{"x": -1}, {"y": 1}, {"x": -1, "y": 1}])
+def test_declared_symmetry(symmetry):
+    assert_fields_equal(focus(symmetry=symmetry, magnetic_field=True), focus(magnetic_field=True))
+
+
+def test_gaussian():
+    kwargs = dict(x=x, y=y, z=z, bfp_sampling_n=9, magnetic_field=True)
+    assert_fields_equal(
+        trp.fields_focus_gaussian(1.0, 0.9, objective, bead, symmetry={"x": -1, "y": 1}, **kwargs),
+        trp.fields_focus_gaussian(1.0, 0.9, objective, bead, **kwargs),
+    )
+
+
+def test_symmetry_with_mask():
+    # An asymmetric mask: the mirrored locations of the mask are calculated as well
+    X, Y, _ = np.meshgrid(x, y, z, indexing="ij")
+    mask = np.logical_and(X < 0.3e-6, Y > -0.2e-6)
+    result = focus(symmetry="auto", mask=mask)
+    for actual, desired in zip(result, focus()):
+        np.testing.assert_equal(actual[np.logical_not(mask)], np.nan)
+        np.testing.assert_allclose(
+            actual[mask], desired[mask], rtol=0, atol=1e-12 * np.max(np.abs(desired))
+        )
+
+
+@pytest.mark.parametrize(
+    "bead_center, y_axis", [((0.1e-6, 0, 0), y), ((0, 0, 0), np.linspace(-0.8e-6, 0.6e-6, 6))]
+)
+def test_auto_without_symmetry(bead_center, y_axis):
+    # The symmetry does not apply along x (bead center) or along y (coordinates)
+    kwargs = dict(bead_center=bead_center, y=y_axis)
+    assert_fields_equal(focus(symmetry="auto", **kwargs), focus(**kwargs))
+    with pytest.raises(ValueError, match="not symmetric along"):
+        focus(symmetry={"x": -1, "y": 1}, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "symmetry, kwargs, message",
+    [
+        ("xy", {}, "Invalid value for symmetry"),
+        ({"z": 1}, {}, "dictionary with the parity"),
+        ({"x": 2}, {}, "dictionary with the parity"),
+        ({}, {}, "dictionary with the parity"),
+        ({"x": -1}, {"grid": False, "y": x, "z": x}, "only be used for a grid"),
+    ],
+)
+def test_invalid_symmetry(symmetry, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        focus(symmetry=symmetry, **kwargs)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import lumicks.pyoptics.trapping as trp
+
+bead = trp.Bead(1e-6, 1.6 + 0.1j, 1.33, 1064e-9)
+objective = trp.Objective(NA=1.2, focal_length=4.43e-3, n_bfp=1.0, n_medium=1.33)
+
+
+def input_field(_, x_bfp, y_bfp, *args):
+    amplitude = np.exp(-(x_bfp**2 + y_bfp**2) / 4e-3**2)
+    return (amplitude, 0.3j * amplitude)
+
+
+@pytest.mark.parametrize("magnetic_field", [True, False])
+@pytest.mark.parametrize("total_field", [True, False])
+def test_z_slices(magnetic_field, total_field):
+    x = np.linspace(-2e-6, 2e-6, 9)
+    y = np.linspace(-1e-6, 1e-6, 5)
+    z = np.array([-0.3e-6, 0.0, 0.6e-6])
+    kwargs = dict(
+        bead_center=(0.1e-6, 0.0, 0.1e-6),
+        x=x,
+        y=y,
+        z=z,
+        bfp_sampling_n=9,
+        total_field=total_field,
+        magnetic_field=magnetic_field,
+    )
+    reference = trp.fields_focus(input_field, objective, bead, **kwargs)
+    slices = list(trp.fields_focus_z_slices(input_field, objective, bead, **kwargs))
+    assert len(slices) == z.size
+    for idx, (z_plane, *fields) in enumerate(slices):
+        assert z_plane == z[idx]
+        assert len(fields) == len(reference)
+        for field, reference_field in zip(fields, reference):
+            assert field.shape == (x.size, y.size)
+            np.testing.assert_allclose(
+                field,
+                reference_field[..., idx],
+                rtol=0,
+                atol=1e-12 * np.max(np.abs(reference_field)),
+            )
+
+
+def test_z_slices_checks_medium():
+    with pytest.raises(ValueError, match="immersion medium"):
+        trp.fields_focus_z_slices(
+            input_field, objective, trp.Bead(1e-6, 1.6, 1.0, 1064e-9), x=0, y=0, z=0
+        )
+
+
+def test_z_slices_set_up_the_plane_waves_once(monkeypatch):
+    from lumicks.pyoptics.farfield_data import FarfieldData
+    from lumicks.pyoptics.trapping import incident_field
+
+    calls = {"plane_waves": 0, "czt": 0}
+    plane_waves = FarfieldData.plane_waves
+    czt_factory = incident_field.plane_wave_sum_czt_factory
+
+    def count_plane_waves(self, *args, **kwargs):
+        calls["plane_waves"] += 1
+        return plane_waves(self, *args, **kwargs)
+
+    def count_czt(*args, **kwargs):
+        calls["czt"] += 1
+        return czt_factory(*args, **kwargs)
+
+    monkeypatch.setattr(FarfieldData, "plane_waves", count_plane_waves)
+    monkeypatch.setattr(incident_field, "plane_wave_sum_czt_factory", count_czt)
+    kwargs = dict(
+        bead_center=(0.1e-6, 0.0, 0.1e-6),
+        x=np.linspace(-4e-6, 4e-6, 9),
+        y=np.linspace(-1e-6, 1e-6, 5),
+        z=np.linspace(-1e-6, 1e-6, 4),
+        bfp_sampling_n=9,
+        far_zone_tolerance=0.5,
+    )
+    slices = list(trp.fields_focus_z_slices(input_field, objective, bead, **kwargs))
+    assert calls == {"plane_waves": 1, "czt": 1}
+
+    reference = trp.fields_focus(input_field, objective, bead, **kwargs)
+    for idx, (_, *fields) in enumerate(slices):
+        for field, reference_field in zip(fields, reference):
+            np.testing.assert_allclose(
+                field,
+                reference_field[..., idx],
+                rtol=0,
+                atol=1e-12 * np.max(np.abs(reference_field)),
+            )